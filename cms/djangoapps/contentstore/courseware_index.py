@@ -7,6 +7,7 @@ import re
 from six import add_metaclass
 
 from django.conf import settings
+from django.core.cache import cache
 from django.utils.translation import ugettext_lazy, ugettext as _
 from django.core.urlresolvers import resolve
 
@@ -17,6 +18,7 @@ from openedx.core.lib.courses import course_image_url
 from search.search_engine_base import SearchEngine
 from xmodule.annotator_mixin import html_to_text
 from xmodule.modulestore import ModuleStoreEnum
+from xmodule.modulestore.split_mongo import BlockKey
 from xmodule.library_tools import normalize_key_for_search
 
 # REINDEX_AGE is the default amount of time that we look back for changes
@@ -26,6 +28,11 @@ from xmodule.library_tools import normalize_key_for_search
 # how far back from the trigger point to look back in order to index
 REINDEX_AGE = timedelta(0, 60)  # 60 seconds
 
+# How long the version of the last indexed published structure of a split
+# course is remembered. Once it's forgotten, the next index of the course
+# walks the whole course.
+INDEXED_VERSION_CACHE_TIMEOUT = 60 * 60 * 24 * 7  # 7 days
+
 log = logging.getLogger('edx.modulestore')
 
 
@@ -48,6 +55,86 @@ def indexing_is_enabled():
     return settings.FEATURES.get('ENABLE_COURSEWARE_INDEX', False)
 
 
+def _block_parents(structure):
+    """
+    Returns a dict mapping the key of each block reachable from the root of the
+    split structure to the keys of its parents.
+    """
+    blocks = structure['blocks']
+    parents = {structure['root']: []}
+    stack = [structure['root']]
+    while stack:
+        block_key = stack.pop()
+        block = blocks.get(block_key)
+        if block is None:
+            continue
+        for child_key in block.fields.get('children', []):
+            child_key = BlockKey(*child_key)
+            if child_key not in parents:
+                parents[child_key] = []
+                stack.append(child_key)
+            parents[child_key].append(block_key)
+    return parents
+
+
+def _block_content(block):
+    """
+    Returns what determines the index document of the split block, apart from its children.
+    """
+    fields = {name: value for name, value in block.fields.iteritems() if name != 'children'}
+    return block.block_type, block.definition, block.defaults, fields
+
+
+def diff_structures(old_structure, new_structure):
+    """
+    Compares two versions of a split course structure.
+
+    Returns:
+    reindex_blocks - the keys of the blocks of new_structure whose index documents
+        may differ from old_structure's, along with their ancestors
+    deleted_blocks - the keys of the blocks of old_structure that are no longer in
+        the course
+    """
+    old_parents = _block_parents(old_structure)
+    new_parents = _block_parents(new_structure)
+    old_blocks = old_structure['blocks']
+    new_blocks = new_structure['blocks']
+
+    # Blocks that are new, were moved, or whose content changed; their descendants
+    # inherit their settings and have their names in their location, so are changed too
+    changed_blocks = []
+    reindex_blocks = set()
+    for block_key, parents in new_parents.iteritems():
+        new_block = new_blocks.get(block_key)
+        if new_block is None:
+            continue
+        old_block = old_blocks.get(block_key) if block_key in old_parents else None
+        if old_block is None or sorted(parents) != sorted(old_parents[block_key]) or \
+                _block_content(old_block) != _block_content(new_block):
+            changed_blocks.append(block_key)
+        elif old_block.fields.get('children') != new_block.fields.get('children'):
+            reindex_blocks.add(block_key)
+
+    while changed_blocks:
+        block_key = changed_blocks.pop()
+        if block_key not in reindex_blocks:
+            reindex_blocks.add(block_key)
+            changed_blocks.extend(
+                BlockKey(*child_key) for child_key in new_blocks[block_key].fields.get('children', [])
+            )
+
+    # The ancestors are walked through to reach the changed blocks, and reindexed
+    ancestors = [parent_key for block_key in reindex_blocks for parent_key in new_parents.get(block_key, [])]
+    while ancestors:
+        block_key = ancestors.pop()
+        if block_key not in reindex_blocks:
+            reindex_blocks.add(block_key)
+            ancestors.extend(new_parents[block_key])
+
+    deleted_blocks = set(old_parents) - set(new_parents)
+    return reindex_blocks, deleted_blocks
+
+
 class SearchIndexingError(Exception):
     """ Indicates some error(s) occured during indexing """
 
@@ -114,7 +201,8 @@ class SearchIndexerBase(object):
         searcher.remove(cls.DOCUMENT_TYPE, result_ids)
 
     @classmethod
-    def index(cls, modulestore, structure_key, triggered_at=None, reindex_age=REINDEX_AGE):
+    def index(cls, modulestore, structure_key, triggered_at=None, reindex_age=REINDEX_AGE,
+              reindex_blocks=None, deleted_blocks=None):
         """
         Process course for indexing
 
@@ -130,6 +218,13 @@ class SearchIndexerBase(object):
             which items may need to be removed from the index
             If None, then a full reindex takes place
 
+        reindex_blocks (set of BlockKey) - if provided, only these items are walked
+            through and have their index updated; the children of the walked items
+            that are not included keep their index
+
+        deleted_blocks (set of BlockKey) - used with reindex_blocks, the items to
+            remove from the index
+
         Returns:
         Number of items that have been added to the index
         """
@@ -163,6 +258,12 @@ class SearchIndexerBase(object):
             """
             return item.location.version_agnostic().replace(branch=None)
 
+        def is_reindexed(item):
+            """
+            Whether the item is to be walked through, if only some items are reindexed
+            """
+            return reindex_blocks is None or BlockKey.from_usage_key(item.location) in reindex_blocks
+
         def prepare_item_index(item, skip_index=False, groups_usage_info=None):
             """
             Add this item to the items_index and indexed_items list
@@ -214,7 +315,10 @@ class SearchIndexerBase(object):
                     (triggered_at is not None and (triggered_at - item.subtree_edited_on) > reindex_age)
                 children_groups_usage = []
                 for child_item in item.get_children():
-                    if modulestore.has_published_version(child_item):
+                    if not is_reindexed(child_item):
+                        # unchanged, so treated as a child that is too old to index
+                        children_groups_usage.append(None)
+                    elif modulestore.has_published_version(child_item):
                         children_groups_usage.append(
                             prepare_item_index(
                                 child_item,
@@ -256,9 +360,16 @@ class SearchIndexerBase(object):
 
                 # Now index the content
                 for item in structure.get_children():
-                    prepare_item_index(item, groups_usage_info=groups_usage_info)
+                    if is_reindexed(item):
+                        prepare_item_index(item, groups_usage_info=groups_usage_info)
                 searcher.index(cls.DOCUMENT_TYPE, items_index)
-                cls.remove_deleted_items(searcher, structure_key, indexed_items)
+                if reindex_blocks is None:
+                    cls.remove_deleted_items(searcher, structure_key, indexed_items)
+                elif deleted_blocks:
+                    searcher.remove(cls.DOCUMENT_TYPE, [
+                        unicode(cls._id_modifier(structure_key.make_usage_key(*block_key)))
+                        for block_key in deleted_blocks
+                    ])
         except Exception as err:  # pylint: disable=broad-except
             # broad exception so that index operation does not prevent the rest of the application from working
             log.exception(
@@ -367,6 +478,64 @@ class CoursewareSearchIndexer(SearchIndexerBase):
         """ Builds location info dictionary """
         return {"course": unicode(normalized_structure_key), "org": normalized_structure_key.org}
 
+    @classmethod
+    def index(cls, modulestore, structure_key, triggered_at=None, reindex_age=REINDEX_AGE):
+        """
+        Process course for indexing, as SearchIndexerBase.index does.
+
+        When indexing is triggered for a split course whose published structure
+        has been indexed before, the published structure is compared with the
+        indexed one, and only the items that changed are walked through and
+        indexed, and the deleted ones removed.
+        """
+        published_version, published_structure = cls._fetch_published_structure(modulestore, structure_key)
+        reindex_blocks = deleted_blocks = None
+        if triggered_at is not None and published_structure is not None:
+            indexed_structure = cls._fetch_indexed_structure(modulestore, structure_key)
+            if indexed_structure is not None:
+                reindex_blocks, deleted_blocks = diff_structures(indexed_structure, published_structure)
+
+        indexed_count = super(CoursewareSearchIndexer, cls).index(
+            modulestore, structure_key, triggered_at, reindex_age,
+            reindex_blocks=reindex_blocks, deleted_blocks=deleted_blocks
+        )
+
+        if published_version is not None:
+            cache.set(cls._indexed_version_cache_key(structure_key), published_version, INDEXED_VERSION_CACHE_TIMEOUT)
+        return indexed_count
+
+    @classmethod
+    def _indexed_version_cache_key(cls, course_key):
+        """ Cache key of the version of the last indexed published structure of the course """
+        return u'courseware_index.indexed_version.{}'.format(course_key)
+
+    @classmethod
+    def _fetch_published_structure(cls, modulestore, course_key):
+        """
+        Returns the version and the published structure of a split course, or
+        (None, None) for courses in other modulestores
+        """
+        if modulestore.get_modulestore_type(course_key) != ModuleStoreEnum.Type.split:
+            return None, None
+        split_store = modulestore._get_modulestore_for_courselike(course_key)  # pylint: disable=protected-access
+        course_index = split_store.get_course_index_info(course_key)
+        version = course_index['versions'].get(ModuleStoreEnum.BranchName.published) if course_index else None
+        if version is None:
+            return None, None
+        return version, split_store.get_structure(course_key, version)
+
+    @classmethod
+    def _fetch_indexed_structure(cls, modulestore, course_key):
+        """
+        Returns the last indexed published structure of a split course, or None
+        if it isn't known
+        """
+        version = cache.get(cls._indexed_version_cache_key(course_key))
+        if version is None:
+            return None
+        split_store = modulestore._get_modulestore_for_courselike(course_key)  # pylint: disable=protected-access
+        return split_store.get_structure(course_key, version)
+
     @classmethod
     def do_course_reindex(cls, modulestore, course_key):
         """
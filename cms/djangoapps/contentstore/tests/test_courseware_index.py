@@ -442,16 +442,63 @@ class TestCoursewareSearchIndexer(MixedWithOptionsTestCase):
 
         before_time = datetime.now(UTC)
         self.publish_item(store, vertical2.location)
-        # index based on time, will include an index of the origin sequential
-        # because it is in a common subtree but not of the original vertical
-        # because the original sequential's subtree is too old
         new_indexed_count = self.index_recent_changes(store, before_time)
-        self.assertEqual(new_indexed_count, 5)
+        if store.get_modulestore_type(self.course.id) == ModuleStoreEnum.Type.split:
+            # split courses are indexed by comparing with the last indexed published version,
+            # so only the new items and their ancestor are indexed
+            self.assertEqual(new_indexed_count, 4)
+        else:
+            # index based on time, will include an index of the origin sequential
+            # because it is in a common subtree but not of the original vertical
+            # because the original sequential's subtree is too old
+            self.assertEqual(new_indexed_count, 5)
 
         # full index again
         indexed_count = self.reindex_course(store)
         self.assertEqual(indexed_count, 7)
 
+    def _test_structure_diff_index(self, store):
+        """ Make sure that indexing a split course after a publish indexes only the changed items """
+        self.publish_item(store, self.vertical.location)
+        chapter2 = ItemFactory.create(
+            parent_location=self.course.location,
+            category='chapter',
+            display_name='Week 2',
+            modulestore=store,
+            publish_item=True,
+        )
+        sequential2 = ItemFactory.create(
+            parent_location=chapter2.location,
+            category='sequential',
+            display_name='Lesson 2',
+            modulestore=store,
+            publish_item=True,
+        )
+        vertical2 = ItemFactory.create(
+            parent_location=sequential2.location,
+            category='vertical',
+            display_name='Subsection 2',
+            modulestore=store,
+            publish_item=True,
+        )
+        self.assertEqual(self.reindex_course(store), 7)
+
+        # the changed html unit and its ancestors are indexed, however old the changes
+        # considered are, but not the other chapter
+        self.html_unit.display_name = "Changed Html Content"
+        self.update_item(store, self.html_unit)
+        self.publish_item(store, self.html_unit.location)
+        self.assertEqual(self.index_recent_changes(store, datetime(2015, 1, 1, tzinfo=UTC)), 4)
+        response = self.search(query_string="Changed")
+        self.assertEqual(response["total"], 1)
+
+        # the deleted vertical is removed from the index
+        self.delete_item(store, vertical2.location)
+        self.publish_item(store, sequential2.location)
+        self.assertEqual(self.index_recent_changes(store, datetime.now(UTC)), 2)
+        response = self.search()
+        self.assertEqual(response["total"], 6)
+
     def _test_course_about_property_index(self, store):
         """ Test that informational properties in the course object end up in the course_info index """
         display_name = "Help, I need somebody!"
@@ -582,6 +629,9 @@ class TestCoursewareSearchIndexer(MixedWithOptionsTestCase):
     def test_time_based_index(self, store_type):
         self._perform_test_using_store(store_type, self._test_time_based_index)
 
+    def test_structure_diff_index(self):
+        self._perform_test_using_store(ModuleStoreEnum.Type.split, self._test_structure_diff_index)
+
     @ddt.data(*WORKS_WITH_STORES)
     def test_exception(self, store_type):
         self._perform_test_using_store(store_type, self._test_exception)
@@ -141,6 +141,15 @@ if 'loc_cache' not in CACHES:
         'LOCATION': 'edx_location_mem_cache',
     }
 
+COURSE_STRUCTURE_LOCAL_CACHE_MAX_BLOCKS = ENV_TOKENS.get(
+    'COURSE_STRUCTURE_LOCAL_CACHE_MAX_BLOCKS', COURSE_STRUCTURE_LOCAL_CACHE_MAX_BLOCKS
+)
+COURSE_STRUCTURE_CACHE_FORMAT = ENV_TOKENS.get('COURSE_STRUCTURE_CACHE_FORMAT', COURSE_STRUCTURE_CACHE_FORMAT)
+STATIC_CONTENT_DISK_CACHE_DIR = ENV_TOKENS.get('STATIC_CONTENT_DISK_CACHE_DIR', STATIC_CONTENT_DISK_CACHE_DIR)
+STATIC_CONTENT_DISK_CACHE_MAX_SIZE = ENV_TOKENS.get(
+    'STATIC_CONTENT_DISK_CACHE_MAX_SIZE', STATIC_CONTENT_DISK_CACHE_MAX_SIZE
+)
+
 SESSION_COOKIE_DOMAIN = ENV_TOKENS.get('SESSION_COOKIE_DOMAIN')
 SESSION_COOKIE_HTTPONLY = ENV_TOKENS.get('SESSION_COOKIE_HTTPONLY', True)
 SESSION_ENGINE = ENV_TOKENS.get('SESSION_ENGINE', SESSION_ENGINE)
@@ -194,6 +203,11 @@ ENV_FEATURES = ENV_TOKENS.get('FEATURES', {})
 for feature, value in ENV_FEATURES.items():
     FEATURES[feature] = value
 
+# The max scores of published courses are computed by the LMS workers, so
+# this defaults to the LMS's default queue rather than Studio's.
+COMPUTE_MAX_SCORES_QUEUE = ENV_TOKENS.get('COMPUTE_MAX_SCORES_QUEUE', 'edx.lms.core.default')
+UPDATE_COURSE_BLOCKS_QUEUE = ENV_TOKENS.get('UPDATE_COURSE_BLOCKS_QUEUE', 'edx.lms.core.default')
+
 # Additional installed apps
 for app in ENV_TOKENS.get('ADDL_INSTALLED_APPS', []):
     INSTALLED_APPS += (app,)
@@ -182,6 +182,15 @@ FEATURES = {
     'ENABLE_SPECIAL_EXAMS': False,
 
     'ORGANIZATIONS_APP': False,
+
+    # Compute the max scores of the problems of published courses in a
+    # Celery task on the LMS workers (see COMPUTE_MAX_SCORES_QUEUE).
+    'PRECOMPUTE_MAX_SCORES_ON_PUBLISH': False,
+
+    # Update, or re-create, the cached course blocks of published courses
+    # in a Celery task on the LMS workers (see UPDATE_COURSE_BLOCKS_QUEUE),
+    # rather than leaving LMS requests to re-create them.
+    'PRECOMPUTE_COURSE_BLOCKS_ON_PUBLISH': False,
 }
 
 ENABLE_JASMINE = False
@@ -396,6 +405,22 @@ MODULESTORE = {
     }
 }
 
+# The maximum total number of blocks in the deserialized split modulestore course
+# structures kept in each process's memory, in front of the 'course_structure_cache'
+# cache. Set to 0 to disable the in-process cache.
+COURSE_STRUCTURE_LOCAL_CACHE_MAX_BLOCKS = 100000
+
+# How split modulestore course structures are serialized in the 'course_structure_cache'
+# cache: 'pickle', or 'compact', which decodes blocks only as they are used.
+COURSE_STRUCTURE_CACHE_FORMAT = 'pickle'
+
+# A local directory in which StaticContentServer caches assets too large for the
+# cache, so that they aren't streamed from the contentstore on each request. None
+# disables it. Its files are removed, least recently used first, to keep their total
+# size within STATIC_CONTENT_DISK_CACHE_MAX_SIZE bytes.
+STATIC_CONTENT_DISK_CACHE_DIR = None
+STATIC_CONTENT_DISK_CACHE_MAX_SIZE = 10 * 1024 * 1024 * 1024
+
 ############################ DJANGO_BUILTINS ################################
 # Change DEBUG in your environment settings files, not here
 DEBUG = False
@@ -679,6 +704,14 @@ CELERY_QUEUES = {
     DEFAULT_PRIORITY_QUEUE: {}
 }
 
+# The max scores of published courses are computed with the LMS's grading
+# code, so the task must be queued on a queue of the LMS workers.
+COMPUTE_MAX_SCORES_QUEUE = DEFAULT_PRIORITY_QUEUE
+
+# The cached course blocks are collected with the LMS's transformers, so
+# the task must be queued on a queue of the LMS workers.
+UPDATE_COURSE_BLOCKS_QUEUE = DEFAULT_PRIORITY_QUEUE
+
 
 ############################## Video ##########################################
 
@@ -806,6 +839,12 @@ INSTALLED_APPS = (
     # Bookmarks
     'openedx.core.djangoapps.bookmarks',
 
+    # Max scores precomputed on publish
+    'openedx.core.djangoapps.max_scores',
+
+    # Cached course blocks invalidated on publish
+    'openedx.core.djangoapps.content.block_structure',
+
     # programs support
     'openedx.core.djangoapps.programs',
 
@@ -173,6 +173,9 @@ CACHES = {
     },
 }
 
+# The in-process course structure cache would hide the mongo queries that tests count
+COURSE_STRUCTURE_LOCAL_CACHE_MAX_BLOCKS = 0
+
 # hide ratelimit warnings while running tests
 filterwarnings('ignore', message='No request passed to the backend, unable to rate-limit')
 
@@ -0,0 +1,203 @@
+"""
+A bounded cache of asset bodies on local disk, for StaticContentServer.
+
+Assets too large to cache in memcached are written here the first time they
+are served, so that later requests for them (including range requests) read
+them from disk instead of streaming them from GridFS.  Files are named by a
+hash of the asset's location and last modified time, so a changed asset is
+never served from an old file.  At most once every EVICTION_INTERVAL seconds,
+if the files take up more than the maximum size, the least recently used ones
+are removed, along with any temporary and lock files left behind by processes
+that died while writing them.
+
+The directory can be shared by all of the processes on a machine.  Only one
+process at a time writes each asset; the others serve it without caching it.
+"""
+import errno
+import hashlib
+import os
+import os.path
+import tempfile
+import time
+
+from django.conf import settings
+
+# Prefix of the files that are still being written.
+TEMP_FILE_PREFIX = '.tmp'
+
+# Prefix of the files that show that a process is writing an asset.
+LOCK_FILE_PREFIX = '.lock'
+
+# How many seconds a temporary or lock file can go unmodified before it is
+# assumed to have been left behind, and is removed.
+TEMP_FILE_MAX_AGE = 60 * 60
+
+# The file whose modification time is when the files were last evicted.
+EVICTION_FILE = '.evicted'
+
+# The minimum number of seconds between evictions, each of which walks the
+# whole directory.
+EVICTION_INTERVAL = 60
+
+
+def get_asset_disk_cache():
+    """
+    Returns the AssetDiskCache configured by the STATIC_CONTENT_DISK_CACHE_DIR
+    setting, or None if it isn't set.
+    """
+    directory = getattr(settings, 'STATIC_CONTENT_DISK_CACHE_DIR', None)
+    if not directory:
+        return None
+    return AssetDiskCache(directory, settings.STATIC_CONTENT_DISK_CACHE_MAX_SIZE)
+
+
+class AssetDiskCache(object):
+    """
+    Asset bodies in `directory`, using at most `max_size` bytes (plus whatever
+    is written between evictions, which are `eviction_interval` seconds apart).
+    """
+    def __init__(self, directory, max_size, eviction_interval=EVICTION_INTERVAL):
+        self.directory = directory
+        self.max_size = max_size
+        self.eviction_interval = eviction_interval
+
+    def _get_path(self, location, last_modified_at):
+        """
+        Returns the path of the file for the given version of an asset.
+        """
+        key = hashlib.sha1(
+            u'{}@{}'.format(location, last_modified_at.isoformat()).encode('utf-8')
+        ).hexdigest()
+        return os.path.join(self.directory, key[:2], key)
+
+    def _get_lock_path(self, path):
+        """
+        Returns the path of the lock file for the asset file at `path`.
+        """
+        directory, filename = os.path.split(path)
+        return os.path.join(directory, LOCK_FILE_PREFIX + filename)
+
+    def get(self, location, last_modified_at):
+        """
+        Returns the path of the cached body of the asset at `location`, last
+        modified at `last_modified_at`, or None if it isn't cached.
+        """
+        path = self._get_path(location, last_modified_at)
+        try:
+            # Mark the file as recently used.
+            os.utime(path, None)
+        except OSError:
+            return None
+        return path
+
+    def set(self, location, last_modified_at, chunks):
+        """
+        Caches the body of the asset at `location`, last modified at
+        `last_modified_at`, from the iterable of strings `chunks`.
+
+        Returns the path of the cached body, or None if another process is
+        already writing it, in which case `chunks` isn't read.  Raises an
+        IOError or OSError if it can't be written.
+        """
+        path = self._get_path(location, last_modified_at)
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # Another process may have just created it.
+                if not os.path.isdir(directory):
+                    raise
+
+        # Only the process that creates the lock file writes the body, so that
+        # concurrent requests for an asset that isn't cached yet don't all
+        # read it from the DB and write it.
+        lock_path = self._get_lock_path(path)
+        try:
+            os.close(os.open(lock_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL))
+        except OSError as error:
+            if error.errno == errno.EEXIST:
+                return None
+            raise
+
+        try:
+            if os.path.exists(path):
+                # Another process wrote it since it was looked up.
+                return path
+
+            # Write to a temporary file first, so that other processes never
+            # see a partially written body.
+            temp_fd, temp_path = tempfile.mkstemp(prefix=TEMP_FILE_PREFIX, dir=directory)
+            try:
+                with os.fdopen(temp_fd, 'wb') as temp_file:
+                    for chunk in chunks:
+                        temp_file.write(chunk)
+                os.rename(temp_path, path)
+            except Exception:
+                os.remove(temp_path)
+                raise
+        finally:
+            _remove(lock_path)
+
+        self._evict_if_due()
+        return path
+
+    def _evict_if_due(self):
+        """
+        Evicts files, unless any process has in the last `eviction_interval`
+        seconds.
+        """
+        eviction_path = os.path.join(self.directory, EVICTION_FILE)
+        now = time.time()
+        try:
+            if os.stat(eviction_path).st_mtime > now - self.eviction_interval:
+                return
+        except OSError:
+            # It hasn't been created yet.
+            pass
+        with open(eviction_path, 'ab'):
+            os.utime(eviction_path, (now, now))
+        self._evict()
+
+    def _evict(self):
+        """
+        Removes the least recently used files until the cached bodies take up
+        no more than `max_size` bytes, and the temporary and lock files that are
+        older than TEMP_FILE_MAX_AGE.
+        """
+        files = []
+        total_size = 0
+        temp_files_expire_at = time.time() - TEMP_FILE_MAX_AGE
+        for dirpath, __, filenames in os.walk(self.directory):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # Another process removed it.
+                    continue
+                if filename == EVICTION_FILE:
+                    continue
+                if filename.startswith((TEMP_FILE_PREFIX, LOCK_FILE_PREFIX)):
+                    if stat.st_mtime < temp_files_expire_at:
+                        _remove(path)
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+                total_size += stat.st_size
+
+        files.sort()
+        for __, size, path in files:
+            if total_size <= self.max_size:
+                break
+            _remove(path)
+            total_size -= size
+
+
+def _remove(path):
+    """
+    Removes the file at `path`, unless another process already has.
+    """
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -5,7 +5,7 @@ Middleware to serve assets.
 import logging
 
 from django.http import (
-    HttpResponse, HttpResponseNotModified, HttpResponseForbidden
+    FileResponse, HttpResponse, HttpResponseNotModified, HttpResponseForbidden, StreamingHttpResponse
 )
 from student.models import CourseEnrollment
 
@@ -15,6 +15,7 @@ from xmodule.modulestore import InvalidLocationError
 from opaque_keys import InvalidKeyError
 from opaque_keys.edx.locator import AssetLocator
 from cache_toolbox.core import get_cached_content, set_cached_content
+from contentserver.disk_cache import get_asset_disk_cache
 from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.exceptions import NotFoundError
 
@@ -23,6 +24,12 @@ from xmodule.exceptions import NotFoundError
 
 log = logging.getLogger(__name__)
 
+# Content smaller than this many bytes is cached in memcached, data and all.
+CACHED_CONTENT_MAX_SIZE = 1048576
+
+# The size of the chunks in which byte ranges of files in the disk cache are read.
+DISK_CACHE_CHUNK_SIZE = 65536
+
 
 class StaticContentServer(object):
     def process_request(self, request):
@@ -43,6 +50,15 @@ class StaticContentServer(object):
 
             # first look in our cache so we don't have to round-trip to the DB
             content = get_cached_content(loc)
+            disk_cache = get_asset_disk_cache()
+            content_path = None
+            if content is not None and content.data is None:
+                # only the metadata of large content is cached; its data may be in the disk cache
+                if disk_cache is not None:
+                    content_path = disk_cache.get(loc, content.last_modified_at)
+                if content_path is None:
+                    content = None
+
             if content is None:
                 # nope, not in cache, let's fetch from DB
                 try:
@@ -55,10 +71,24 @@ class StaticContentServer(object):
                 # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
                 # this is because I haven't been able to find a means to stream data out of memcached
                 if content.length is not None:
-                    if content.length < 1048576:
+                    if content.length < CACHED_CONTENT_MAX_SIZE:
                         # since we've queried as a stream, let's read in the stream into memory to set in cache
                         content = content.copy_to_in_mem()
                         set_cached_content(content)
+                    elif (
+                            disk_cache is not None and content.length <= disk_cache.max_size and
+                            not request.META.get('HTTP_RANGE')
+                    ):
+                        # larger content is cached on local disk instead, with just its metadata in the cache.
+                        # A byte range of content that isn't cached yet is streamed straight from the DB rather
+                        # than after reading all of the content into the disk cache.
+                        # If another process is already caching the content, it's streamed from the DB.
+                        try:
+                            content_path = cache_content_on_disk(disk_cache, loc, content)
+                        except (IOError, OSError):
+                            log.exception(u"Could not write content %s to the disk cache", unicode(loc))
+                            # the stream has been read, so start again
+                            content = AssetManager.find(loc, as_stream=True)
             else:
                 # NOP here, but we may wish to add a "cache-hit" counter in the future
                 pass
@@ -88,6 +118,14 @@ class StaticContentServer(object):
                 if if_modified_since == last_modified_at_str:
                     return HttpResponseNotModified()
 
+            content_file = None
+            if content_path is not None:
+                try:
+                    content_file = open(content_path, 'rb')
+                except IOError:
+                    # another process evicted it from the disk cache since it was found
+                    content = AssetManager.find(loc, as_stream=True)
+
             # *** File streaming within a byte range ***
             # If a Range is provided, parse Range attribute of the request
             # Add Content-Range in the response if Range is structurally correct
@@ -96,10 +134,6 @@ class StaticContentServer(object):
             # http://www.w3.org/Protocols/rfc2616/rfc2616-sec14.html#sec14.35
             response = None
             if request.META.get('HTTP_RANGE'):
-                # Data from cache (StaticContent) has no easy byte management, so we use the DB instead (StaticContentStream)
-                if type(content) == StaticContent:
-                    content = AssetManager.find(loc, as_stream=True)
-
                 header_value = request.META['HTTP_RANGE']
                 try:
                     unit, ranges = parse_range_header(header_value, content.length)
@@ -124,7 +158,13 @@ class StaticContentServer(object):
 
                         if 0 <= first <= last < content.length:
                             # If the byte range is satisfiable
-                            response = HttpResponse(content.stream_data_in_range(first, last))
+                            if content_file is not None:
+                                response = StreamingHttpResponse(stream_file_range(content_file, first, last))
+                            elif type(content) == StaticContent:
+                                # Data from cache (StaticContent) is already in memory
+                                response = HttpResponse(content.data[first:last + 1])
+                            else:
+                                response = HttpResponse(content.stream_data_in_range(first, last))
                             response['Content-Range'] = 'bytes {first}-{last}/{length}'.format(
                                 first=first, last=last, length=content.length
                             )
@@ -134,11 +174,17 @@ class StaticContentServer(object):
                             log.warning(
                                 u"Cannot satisfy ranges in Range header: %s for content: %s", header_value, unicode(loc)
                             )
+                            if content_file is not None:
+                                content_file.close()
                             return HttpResponse(status=416)  # Requested Range Not Satisfiable
 
             # If Range header is absent or syntactically invalid return a full content response.
             if response is None:
-                response = HttpResponse(content.stream_data())
+                if content_file is not None:
+                    # Lets the WSGI server use sendfile, if it can
+                    response = FileResponse(content_file)
+                else:
+                    response = HttpResponse(content.stream_data())
                 response['Content-Length'] = content.length
 
             # "Accept-Ranges: bytes" tells the user that only "bytes" ranges are allowed
@@ -149,6 +195,42 @@ class StaticContentServer(object):
             return response
 
 
+def cache_content_on_disk(disk_cache, location, content):
+    """
+    Writes the data of `content`, a StaticContentStream, to `disk_cache`, and caches its metadata.
+
+    Returns the path of the file containing the data, or None if another process is writing it, in
+    which case `content` isn't read.  Raises an IOError or OSError if it couldn't be written.
+    """
+    content_path = disk_cache.set(location, content.last_modified_at, content.stream_data())
+    if content_path is None:
+        return None
+
+    set_cached_content(StaticContent(
+        content.location, content.name, content.content_type, None,
+        last_modified_at=content.last_modified_at, thumbnail_location=content.thumbnail_location,
+        import_path=content.import_path, length=content.length, locked=content.locked
+    ))
+    return content_path
+
+
+def stream_file_range(content_file, first_byte, last_byte):
+    """
+    Streams the data in `content_file` between first_byte and last_byte (included), then closes it.
+    """
+    try:
+        content_file.seek(first_byte)
+        remaining = last_byte - first_byte + 1
+        while remaining > 0:
+            chunk = content_file.read(min(remaining, DISK_CACHE_CHUNK_SIZE))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        content_file.close()
+
+
 def parse_range_header(header_value, content_length):
     """
     Returns the unit and a list of (start, end) tuples of ranges.
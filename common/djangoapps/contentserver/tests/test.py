@@ -4,12 +4,17 @@ Tests for StaticContentServer
 import copy
 import ddt
 import logging
+import os
+import shutil
+import tempfile
 import unittest
 from uuid import uuid4
 
 from django.conf import settings
+from django.core.cache import cache
 from django.test.client import Client
 from django.test.utils import override_settings
+from mock import patch
 
 from xmodule.contentstore.django import contentstore
 from xmodule.modulestore.django import modulestore
@@ -17,7 +22,9 @@ from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.xml_importer import import_course_from_xml
 
-from contentserver.middleware import parse_range_header
+from cache_toolbox.core import get_cached_content
+from contentserver.disk_cache import get_asset_disk_cache
+from contentserver.middleware import parse_range_header, stream_file_range
 from student.models import CourseEnrollment
 
 log = logging.getLogger(__name__)
@@ -193,6 +200,132 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
         self.assertEqual(resp.status_code, 416)
 
 
+@patch('contentserver.middleware.CACHED_CONTENT_MAX_SIZE', 0)
+class ContentStoreDiskCacheTest(ContentStoreToyCourseTest):
+    """
+    Runs the toy course tests again with all of the assets cached on disk
+    rather than in memcached, and tests the disk cache.
+    """
+
+    def setUp(self):
+        super(ContentStoreDiskCacheTest, self).setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_override = override_settings(STATIC_CONTENT_DISK_CACHE_DIR=directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.unlocked_content = self.contentstore.find(self.unlocked_asset)
+
+    def get_content(self, response):
+        """
+        Returns the content of `response`, which may be streamed.
+        """
+        if response.streaming:
+            return ''.join(response.streaming_content)
+        return response.content
+
+    def test_served_from_disk_cache(self):
+        """
+        Test that an asset is served from the disk cache once it has been
+        served, with only its metadata in memcached.
+        """
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(self.get_content(resp), self.unlocked_content.data)
+        self.assertIsNone(get_cached_content(self.unlocked_asset).data)
+
+        with patch('contentserver.middleware.AssetManager.find') as mock_find:
+            resp = self.client.get(self.url_unlocked)
+            self.assertFalse(mock_find.called)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        self.assertEqual(self.get_content(resp), self.unlocked_content.data)
+        self.assertEqual(resp['Content-Length'], str(self.length_unlocked))
+
+    def test_range_served_from_disk_cache(self):
+        """
+        Test that a range request is served from the disk cache.
+        """
+        self.get_content(self.client.get(self.url_unlocked))
+
+        with patch('contentserver.middleware.AssetManager.find') as mock_find:
+            resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=2-5')
+            self.assertFalse(mock_find.called)
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(self.get_content(resp), self.unlocked_content.data[2:6])
+
+    def test_range_miss_not_cached(self):
+        """
+        Test that a range request for an asset that isn't in the disk cache is
+        served from the DB, without caching the asset.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(resp.status_code, 206)
+        self.assertEqual(self.get_content(resp), self.unlocked_content.data[2:6])
+        self.assertIsNone(
+            get_asset_disk_cache().get(self.unlocked_asset, self.unlocked_content.last_modified_at)
+        )
+
+    def test_being_cached_by_another_process(self):
+        """
+        Test that an asset that another process is writing to the disk cache
+        is served from the DB, without caching its metadata.
+        """
+        with patch('contentserver.disk_cache.AssetDiskCache.set', return_value=None):
+            resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.get_content(resp), self.unlocked_content.data)
+        self.assertIsNone(get_cached_content(self.unlocked_asset))
+
+    def test_metadata_cached_without_file(self):
+        """
+        Test that an asset whose metadata is in memcached, but which isn't in
+        the disk cache any more, is served from the DB.
+        """
+        self.get_content(self.client.get(self.url_unlocked))
+        shutil.rmtree(get_asset_disk_cache().directory)
+        os.mkdir(get_asset_disk_cache().directory)
+
+        resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.get_content(resp), self.unlocked_content.data)
+
+    def test_evicted_while_served(self):
+        """
+        Test that an asset removed from the disk cache by another process after
+        it was found there is served from the DB.
+        """
+        self.get_content(self.client.get(self.url_unlocked))
+
+        with patch('contentserver.disk_cache.AssetDiskCache.get', return_value='/nonexistent/asset'):
+            resp = self.client.get(self.url_unlocked)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.get_content(resp), self.unlocked_content.data)
+
+
+class StreamFileRangeTestCase(unittest.TestCase):
+    """
+    Tests for the stream_file_range function.
+    """
+
+    def setUp(self):
+        super(StreamFileRangeTestCase, self).setUp()
+        self.content_file = tempfile.TemporaryFile()
+        self.content_file.write('0123456789')
+
+    @patch('contentserver.middleware.DISK_CACHE_CHUNK_SIZE', 3)
+    def test_stream_range(self):
+        chunks = list(stream_file_range(self.content_file, 2, 8))
+        self.assertEqual(chunks, ['234', '567', '8'])
+        self.assertTrue(self.content_file.closed)
+
+    def test_stream_past_end_of_file(self):
+        self.assertEqual(''.join(stream_file_range(self.content_file, 8, 20)), '89')
+        self.assertTrue(self.content_file.closed)
+
+
 @ddt.ddt
 class ParseRangeHeaderTestCase(unittest.TestCase):
     """
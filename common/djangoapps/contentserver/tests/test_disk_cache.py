@@ -0,0 +1,134 @@
+"""
+Tests for the disk cache of StaticContentServer
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from django.test.utils import override_settings
+from opaque_keys.edx.locator import CourseLocator
+
+from contentserver.disk_cache import (
+    AssetDiskCache, get_asset_disk_cache, EVICTION_FILE, LOCK_FILE_PREFIX, TEMP_FILE_PREFIX
+)
+
+
+class AssetDiskCacheTestCase(unittest.TestCase):
+    """
+    Tests for AssetDiskCache.
+    """
+    def setUp(self):
+        super(AssetDiskCacheTestCase, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.disk_cache = AssetDiskCache(self.directory, 100, eviction_interval=0)
+
+        course_key = CourseLocator('edX', 'toy', '2012_Fall')
+        self.locations = [course_key.make_asset_key('asset', 'asset{}.txt'.format(i)) for i in xrange(3)]
+        self.last_modified_at = datetime(2016, 1, 1)
+
+    def read(self, path):
+        """
+        Returns the contents of the file at `path`.
+        """
+        with open(path, 'rb') as cached_file:
+            return cached_file.read()
+
+    def test_get_missing(self):
+        self.assertIsNone(self.disk_cache.get(self.locations[0], self.last_modified_at))
+
+    def test_set_and_get(self):
+        path = self.disk_cache.set(self.locations[0], self.last_modified_at, ['abc', 'def'])
+        self.assertEqual(self.read(path), 'abcdef')
+        self.assertEqual(self.disk_cache.get(self.locations[0], self.last_modified_at), path)
+        self.assertIsNone(self.disk_cache.get(self.locations[1], self.last_modified_at))
+
+    def unreadable_chunks(self):
+        """
+        Chunks of an asset that fail the test if they're read.
+        """
+        self.fail("The asset was read")
+        yield 'abc'
+
+    def test_set_while_being_written(self):
+        path = self.disk_cache._get_path(self.locations[0], self.last_modified_at)  # pylint: disable=protected-access
+        os.makedirs(os.path.dirname(path))
+        open(self.disk_cache._get_lock_path(path), 'wb').close()  # pylint: disable=protected-access
+
+        self.assertIsNone(self.disk_cache.set(self.locations[0], self.last_modified_at, self.unreadable_chunks()))
+        self.assertIsNone(self.disk_cache.get(self.locations[0], self.last_modified_at))
+
+    def test_set_already_written(self):
+        path = self.disk_cache.set(self.locations[0], self.last_modified_at, ['abc'])
+        self.assertFalse(os.path.exists(self.disk_cache._get_lock_path(path)))  # pylint: disable=protected-access
+
+        self.assertEqual(self.disk_cache.set(self.locations[0], self.last_modified_at, self.unreadable_chunks()), path)
+        self.assertEqual(self.read(path), 'abc')
+
+    def test_modified_asset(self):
+        self.disk_cache.set(self.locations[0], self.last_modified_at, ['abc'])
+        self.assertIsNone(self.disk_cache.get(self.locations[0], self.last_modified_at + timedelta(seconds=1)))
+
+    def test_failed_write(self):
+        def chunks():
+            """
+            Fails partway through the asset.
+            """
+            yield 'abc'
+            raise IOError("Couldn't read the asset")
+
+        with self.assertRaises(IOError):
+            self.disk_cache.set(self.locations[0], self.last_modified_at, chunks())
+        self.assertIsNone(self.disk_cache.get(self.locations[0], self.last_modified_at))
+        self.assertEqual([filenames for __, __, filenames in os.walk(self.directory) if filenames], [])
+
+    def test_evicts_least_recently_used(self):
+        paths = [self.disk_cache.set(location, self.last_modified_at, ['x' * 40]) for location in self.locations[:2]]
+        # Make the first asset the most recently used one.
+        os.utime(paths[0], (0, 0))
+        os.utime(paths[1], (0, 0))
+        self.assertIsNotNone(self.disk_cache.get(self.locations[0], self.last_modified_at))
+
+        self.disk_cache.set(self.locations[2], self.last_modified_at, ['x' * 40])
+        self.assertIsNotNone(self.disk_cache.get(self.locations[0], self.last_modified_at))
+        self.assertIsNone(self.disk_cache.get(self.locations[1], self.last_modified_at))
+        self.assertIsNotNone(self.disk_cache.get(self.locations[2], self.last_modified_at))
+
+    def test_evicts_at_most_once_per_interval(self):
+        disk_cache = AssetDiskCache(self.directory, 100)
+        paths = [disk_cache.set(location, self.last_modified_at, ['x' * 40]) for location in self.locations]
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+
+        for path in paths + [os.path.join(self.directory, EVICTION_FILE)]:
+            os.utime(path, (0, 0))
+        disk_cache.set(self.locations[0], self.last_modified_at + timedelta(seconds=1), ['x'])
+        self.assertEqual(sum(os.path.exists(path) for path in paths), 2)
+
+    def test_removes_stale_temp_files(self):
+        stale_paths = [
+            os.path.join(self.directory, prefix + 'stale') for prefix in (TEMP_FILE_PREFIX, LOCK_FILE_PREFIX)
+        ]
+        recent_path = os.path.join(self.directory, TEMP_FILE_PREFIX + 'recent')
+        for path in stale_paths + [recent_path]:
+            with open(path, 'wb') as temp_file:
+                temp_file.write('abc')
+        for path in stale_paths:
+            os.utime(path, (0, 0))
+
+        self.disk_cache.set(self.locations[0], self.last_modified_at, ['abc'])
+        for path in stale_paths:
+            self.assertFalse(os.path.exists(path))
+        # A file that may still be being written is kept.
+        self.assertTrue(os.path.exists(recent_path))
+
+    @override_settings(STATIC_CONTENT_DISK_CACHE_DIR=None)
+    def test_not_configured(self):
+        self.assertIsNone(get_asset_disk_cache())
+
+    def test_configured(self):
+        with override_settings(STATIC_CONTENT_DISK_CACHE_DIR=self.directory, STATIC_CONTENT_DISK_CACHE_MAX_SIZE=1000):
+            disk_cache = get_asset_disk_cache()
+        self.assertEqual(disk_cache.directory, self.directory)
+        self.assertEqual(disk_cache.max_size, 1000)
@@ -2,12 +2,15 @@
 A cache that is cleared after every request.
 
 This module requires that :class:`request_cache.middleware.RequestCache`
-is installed in order to clear the cache after each request.
+is installed in order to clear the cache after each request.  The cache is
+also cleared before and after each Celery task, which would otherwise share
+it with every other task run by the same worker process.
 """
 
 import logging
 from urlparse import urlparse
 
+from celery.signals import task_postrun, task_prerun
 from django.conf import settings
 from django.test.client import RequestFactory
 
@@ -29,6 +32,17 @@ def get_cache(name):
     return middleware.RequestCache.get_request_cache(name)
 
 
+@task_prerun.connect
+@task_postrun.connect
+def _clear_cache_for_task(task=None, **kwargs):  # pylint: disable=unused-argument
+    """
+    Clears the request cache around a Celery task, unless the task is run
+    eagerly, within the request (or task) that queued it.
+    """
+    if not getattr(task.request, 'is_eager', False):
+        middleware.RequestCache.clear_request_cache()
+
+
 def get_request():
     """
     Return the current request.
@@ -1,10 +1,12 @@
 """
 Tests for the request cache.
 """
+from celery.signals import task_prerun
 from django.conf import settings
 from django.test import TestCase
+from mock import Mock
 
-from request_cache import get_request_or_stub
+from request_cache import get_cache, get_request_or_stub
 
 
 class TestRequestCache(TestCase):
@@ -18,3 +20,15 @@ class TestRequestCache(TestCase):
         stub = get_request_or_stub()
         expected_url = "http://{site_name}/foobar".format(site_name=settings.SITE_NAME)
         self.assertEqual(stub.build_absolute_uri("foobar"), expected_url)
+
+    def test_cleared_for_celery_tasks(self):
+        """
+        Test that the cache is cleared before a task run by a worker, but not
+        before a task run eagerly.
+        """
+        get_cache('test')['key'] = 'value'
+        task_prerun.send(sender=None, task_id='eager', task=Mock(request=Mock(is_eager=True)), args=[], kwargs={})
+        self.assertEqual(get_cache('test'), {'key': 'value'})
+
+        task_prerun.send(sender=None, task_id='queued', task=Mock(request=Mock(is_eager=False)), args=[], kwargs={})
+        self.assertEqual(get_cache('test'), {})
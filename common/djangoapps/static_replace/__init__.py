@@ -1,5 +1,7 @@
 import logging
 import re
+import threading
+from collections import OrderedDict
 
 from django.contrib.staticfiles.storage import staticfiles_storage
 from django.contrib.staticfiles import finders
@@ -13,6 +15,18 @@ from opaque_keys.edx.locator import AssetLocator
 
 log = logging.getLogger(__name__)
 
+# The maximum number of static urls resolved to course assets or static files
+# that are memoized, for all courses together.
+COURSE_STATIC_URLS_CACHE_SIZE = 10000
+
+# Maps (course id, static url) pairs to the urls they resolve to, from the
+# least to the most recently used.
+_course_static_urls = OrderedDict()  # pylint: disable=invalid-name
+_course_static_urls_lock = threading.Lock()  # pylint: disable=invalid-name
+
+# Maps (STATIC_URL, data_dir) pairs to the regexes that match their static urls.
+_static_url_regexes = {}  # pylint: disable=invalid-name
+
 
 def _url_replace_regex(prefix):
     """
@@ -110,14 +124,22 @@ def process_static_urls(text, replacement_function, data_dir=None):
         rest = match.group('rest')
         return replacement_function(original, prefix, quote, rest)
 
-    return re.sub(
-        _url_replace_regex(u'(?:{static_url}|/static/)(?!{data_dir})'.format(
+    return _static_url_regex(data_dir).sub(wrap_part_extraction, text)
+
+
+def _static_url_regex(data_dir):
+    """
+    Returns the compiled regex matching the static urls that aren't in data_dir.
+    """
+    key = (settings.STATIC_URL, data_dir)
+    regex = _static_url_regexes.get(key)
+    if regex is None:
+        regex = re.compile(_url_replace_regex(u'(?:{static_url}|/static/)(?!{data_dir})'.format(
             static_url=settings.STATIC_URL,
             data_dir=data_dir
-        )),
-        wrap_part_extraction,
-        text
-    )
+        )))
+        _static_url_regexes[key] = regex
+    return regex
 
 
 def make_static_urls_absolute(request, html):
@@ -149,6 +171,15 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
     course_id: The course identifier used to distinguish static content for this course in studio
     static_asset_path: Path for static assets, which overrides data_directory and course_namespace, if nonempty
     """
+    modulestore_type = []
+
+    def get_modulestore_type():
+        """
+        Look up the type of the course's modulestore once for all of the matched urls.
+        """
+        if not modulestore_type:
+            modulestore_type.append(modulestore().get_modulestore_type(course_id))
+        return modulestore_type[0]
 
     def replace_static_url(original, prefix, quote, rest):
         """
@@ -164,26 +195,8 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
         # if we're running with a MongoBacked store course_namespace is not None, then use studio style urls
         elif (not static_asset_path) \
                 and course_id \
-                and modulestore().get_modulestore_type(course_id) != ModuleStoreEnum.Type.xml:
-            # first look in the static file pipeline and see if we are trying to reference
-            # a piece of static content which is in the edx-platform repo (e.g. JS associated with an xmodule)
-
-            exists_in_staticfiles_storage = False
-            try:
-                exists_in_staticfiles_storage = staticfiles_storage.exists(rest)
-            except Exception as err:
-                log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
-                    rest, str(err)))
-
-            if exists_in_staticfiles_storage:
-                url = staticfiles_storage.url(rest)
-            else:
-                # if not, then assume it's courseware specific content and then look in the
-                # Mongo-backed database
-                url = StaticContent.convert_legacy_static_url_with_course_id(rest, course_id)
-
-                if AssetLocator.CANONICAL_NAMESPACE in url:
-                    url = url.replace('block@', 'block/', 1)
+                and get_modulestore_type() != ModuleStoreEnum.Type.xml:
+            url = _course_static_url(rest, course_id)
 
         # Otherwise, look the file up in staticfiles_storage, and append the data directory if needed
         else:
@@ -203,3 +216,61 @@ def replace_static_urls(text, data_directory=None, course_id=None, static_asset_
         return "".join([quote, url, quote])
 
     return process_static_urls(text, replace_static_url, data_dir=static_asset_path or data_directory)
+
+
+def _course_static_url(rest, course_id):
+    """
+    Returns the url of the static file or course asset that the static url
+    /static/$rest refers to in the course.
+
+    Neither whether a static file exists nor the url of a course asset change
+    while the process runs, so the most recently used urls are memoized.
+    """
+    cache_key = (course_id, rest)
+    with _course_static_urls_lock:
+        url = _course_static_urls.pop(cache_key, None)
+        if url is not None:
+            _course_static_urls[cache_key] = url
+            return url
+
+    # first look in the static file pipeline and see if we are trying to reference
+    # a piece of static content which is in the edx-platform repo (e.g. JS associated with an xmodule)
+    exists_in_staticfiles_storage = False
+    memoize = True
+    try:
+        exists_in_staticfiles_storage = staticfiles_storage.exists(rest)
+    except Exception as err:
+        log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
+            rest, str(err)))
+        # Look it up again next time, in case it was a temporary failure.
+        memoize = False
+
+    if exists_in_staticfiles_storage:
+        url = staticfiles_storage.url(rest)
+    else:
+        # if not, then assume it's courseware specific content and then look in the
+        # Mongo-backed database
+        url = StaticContent.convert_legacy_static_url_with_course_id(rest, course_id)
+
+        if AssetLocator.CANONICAL_NAMESPACE in url:
+            url = url.replace('block@', 'block/', 1)
+
+    if memoize:
+        with _course_static_urls_lock:
+            if cache_key not in _course_static_urls and len(_course_static_urls) >= COURSE_STATIC_URLS_CACHE_SIZE:
+                _course_static_urls.popitem(last=False)
+            _course_static_urls[cache_key] = url
+    return url
+
+
+def clear_course_static_urls(course_id=None):
+    """
+    Forget the memoized static urls of the course, or of all courses if
+    course_id is None.
+    """
+    with _course_static_urls_lock:
+        if course_id is None:
+            _course_static_urls.clear()
+        else:
+            for cache_key in [cache_key for cache_key in _course_static_urls if cache_key[0] == course_id]:
+                del _course_static_urls[cache_key]
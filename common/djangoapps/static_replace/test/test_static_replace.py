@@ -1,12 +1,13 @@
 import re
 
-from nose.tools import assert_equals, assert_true, assert_false  # pylint: disable=no-name-in-module
+from nose.tools import assert_equals, assert_true, assert_false, with_setup  # pylint: disable=no-name-in-module
 from static_replace import (
     replace_static_urls,
     replace_course_urls,
     _url_replace_regex,
     process_static_urls,
-    make_static_urls_absolute
+    make_static_urls_absolute,
+    clear_course_static_urls
 )
 from mock import patch, Mock
 
@@ -83,6 +84,7 @@ def test_storage_url_not_exists(mock_storage):
     mock_storage.url.assert_called_once_with('data_dir/file.png')
 
 
+@with_setup(clear_course_static_urls, clear_course_static_urls)
 @patch('static_replace.StaticContent', autospec=True)
 @patch('static_replace.modulestore', autospec=True)
 def test_mongo_filestore(mock_modulestore, mock_static_content):
@@ -101,6 +103,40 @@ def test_mongo_filestore(mock_modulestore, mock_static_content):
 
     mock_static_content.convert_legacy_static_url_with_course_id.assert_called_once_with('file.png', COURSE_KEY)
 
+    # The url is memoized for the course
+    assert_equals(
+        '"' + mock_static_content.convert_legacy_static_url_with_course_id.return_value + '"',
+        replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY, course_id=COURSE_KEY)
+    )
+    mock_static_content.convert_legacy_static_url_with_course_id.assert_called_once_with('file.png', COURSE_KEY)
+
+
+@with_setup(clear_course_static_urls, clear_course_static_urls)
+@patch('static_replace.COURSE_STATIC_URLS_CACHE_SIZE', 2)
+@patch('static_replace.StaticContent', autospec=True)
+@patch('static_replace.modulestore', autospec=True)
+def test_memoized_urls_bounded(mock_modulestore, mock_static_content):
+    """
+    Make sure the least recently used url is dropped once the cache is full,
+    whichever course it belongs to
+    """
+    mock_modulestore.return_value = Mock(MongoModuleStore)
+    mock_static_content.convert_legacy_static_url_with_course_id.side_effect = lambda rest, course_id: 'c4x://' + rest
+    other_course_key = SlashSeparatedCourseKey('org', 'other', 'run')
+    convert = mock_static_content.convert_legacy_static_url_with_course_id
+
+    replace_static_urls('"/static/a.png"', DATA_DIRECTORY, course_id=COURSE_KEY)
+    replace_static_urls('"/static/b.png"', DATA_DIRECTORY, course_id=other_course_key)
+    # Using a.png again makes b.png the least recently used
+    replace_static_urls('"/static/a.png"', DATA_DIRECTORY, course_id=COURSE_KEY)
+    replace_static_urls('"/static/c.png"', DATA_DIRECTORY, course_id=COURSE_KEY)
+    assert_equals(convert.call_count, 3)
+
+    replace_static_urls('"/static/a.png"', DATA_DIRECTORY, course_id=COURSE_KEY)
+    assert_equals(convert.call_count, 3)
+    replace_static_urls('"/static/b.png"', DATA_DIRECTORY, course_id=other_course_key)
+    assert_equals(convert.call_count, 4)
+
 
 @patch('static_replace.settings', autospec=True)
 @patch('static_replace.modulestore', autospec=True)
@@ -127,6 +163,7 @@ def test_raw_static_check():
     assert_equals(path, replace_static_urls(path, text))
 
 
+@with_setup(clear_course_static_urls, clear_course_static_urls)
 @patch('static_replace.staticfiles_storage', autospec=True)
 @patch('static_replace.modulestore', autospec=True)
 def test_static_url_with_query(mock_modulestore, mock_storage):
@@ -0,0 +1,174 @@
+"""
+Event tracker backend that sends events to another backend in batches,
+from a background thread.
+
+Backends such as the MongoDB and Django ones write each event to their
+database as it is sent, within the request that emits it.  Wrapping one
+in this backend queues the events in memory instead, and a background
+thread sends them on with the wrapped backend's `send_many`, in batches
+of up to `max_batch_size` events, at most `max_batch_interval` seconds
+after they are queued::
+
+  TRACKING_BACKENDS = {
+      'mongo': {
+          'ENGINE': 'track.backends.batching.BatchingBackend',
+          'OPTIONS': {
+              'backend': {
+                  'ENGINE': 'track.backends.mongodb.MongoBackend',
+                  'OPTIONS': {...}
+              },
+              'max_batch_size': 100,
+          }
+      }
+  }
+
+When `max_queue_size` events are already queued, an event is dropped,
+after waiting up to `block_timeout` seconds for room in the queue; the
+dropped events are counted.  The queued events are sent when the process
+exits.
+
+"""
+
+from __future__ import absolute_import
+
+import atexit
+import logging
+import os
+import threading
+import time
+from Queue import Queue, Empty, Full
+
+from django.db import close_old_connections
+from dogapi import dog_stats_api
+
+from track.backends import BaseBackend
+
+
+log = logging.getLogger(__name__)
+
+
+class BatchingBackend(BaseBackend):
+    """Event tracker backend that sends events to another backend in batches"""
+
+    def __init__(self, backend, max_batch_size=100, max_batch_interval=1.0, max_queue_size=10000,
+                 block_timeout=0, shutdown_timeout=5.0, **kwargs):
+        """
+        Configure the wrapped backend and the batches.
+
+        :Parameters:
+
+          - `backend`: the configuration of the wrapped backend, with its
+            `ENGINE` and `OPTIONS` as in `TRACKING_BACKENDS`
+          - `max_batch_size`: the maximum number of events in a batch
+          - `max_batch_interval`: the maximum number of seconds an event
+            waits for its batch to be sent
+          - `max_queue_size`: the maximum number of events waiting to be
+            sent
+          - `block_timeout`: the number of seconds to wait for room in a
+            full queue before dropping an event
+          - `shutdown_timeout`: the maximum number of seconds to wait for
+            the queued events to be sent when the process exits
+
+        """
+        super(BatchingBackend, self).__init__(**kwargs)
+
+        from track.tracker import _instantiate_backend_from_name
+        self.backend = _instantiate_backend_from_name(backend['ENGINE'], backend.get('OPTIONS', {}))
+
+        self.max_batch_size = max_batch_size
+        self.max_batch_interval = max_batch_interval
+        self.max_queue_size = max_queue_size
+        self.block_timeout = block_timeout
+        self.shutdown_timeout = shutdown_timeout
+        self.dropped = 0
+
+        # The queue and thread are created the first time an event is sent
+        # in a process, so that they aren't shared by forked web workers.
+        self._pid = None
+        self._queue = None
+        self._stopped = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+        atexit.register(self.stop)
+
+    def send(self, event):
+        """Queue the event to be sent in a batch"""
+        self._start()
+        if self._stopped.is_set():
+            self.backend.send(event)
+            return
+
+        try:
+            if self.block_timeout:
+                self._queue.put(event, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(event)
+        except Full:
+            with self._lock:
+                self.dropped += 1
+            dog_stats_api.increment('track.send.batching.dropped')
+            log.warning('Dropped an event: the queue of the batching event tracker backend is full')
+
+    def flush(self):
+        """Wait until all of the queued events have been sent"""
+        if self._pid == os.getpid():
+            self._queue.join()
+
+    def stop(self):
+        """Send the queued events, and stop the background thread"""
+        if self._pid != os.getpid() or self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._thread.join(self.shutdown_timeout)
+
+    def _start(self):
+        """Start the background thread, if it isn't running in this process"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = Queue(self.max_queue_size)
+                self._stopped = threading.Event()
+                self._thread = threading.Thread(target=self._run, name='BatchingBackend')
+                self._thread.daemon = True
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _run(self):
+        """Send batches of events until stopped and the queue is empty"""
+        while not (self._stopped.is_set() and self._queue.empty()):
+            events = self._next_batch()
+            if not events:
+                continue
+            try:
+                # The thread's database connections aren't closed at the end of
+                # a request, so close any that have expired or become unusable
+                # before each batch, as is done at the start of each request.
+                close_old_connections()
+                with dog_stats_api.timer('track.send.batching.batch'):
+                    self.backend.send_many(events)
+            except Exception:  # pylint: disable=broad-except
+                log.exception('Error sending %d events with the batching event tracker backend', len(events))
+            finally:
+                for __ in events:
+                    self._queue.task_done()
+
+    def _next_batch(self):
+        """
+        Return the events queued in the next `max_batch_interval` seconds,
+        up to `max_batch_size` of them; once stopped, return the events
+        already queued without waiting.
+        """
+        events = []
+        deadline = time.time() + self.max_batch_interval
+        while len(events) < self.max_batch_size:
+            timeout = deadline - time.time()
+            try:
+                if timeout > 0 and not self._stopped.is_set():
+                    events.append(self._queue.get(timeout=timeout))
+                else:
+                    events.append(self._queue.get_nowait())
+            except Empty:
+                break
+        return events
@@ -75,9 +75,20 @@ class DjangoBackend(BaseBackend):
         self.name = name
 
     def send(self, event):
-        field_values = {x: event.get(x, '') for x in LOGFIELDS}
-        tldat = TrackingLog(**field_values)
+        tldat = self._tracking_log(event)
         try:
             tldat.save(using=self.name)
         except Exception as e:  # pylint: disable=broad-except
             log.exception(e)
+
+    def send_many(self, events):
+        tldats = [self._tracking_log(event) for event in events]
+        try:
+            TrackingLog.objects.using(self.name).bulk_create(tldats)
+        except Exception:  # pylint: disable=broad-except
+            log.exception(u'Failed to save %d tracking log events', len(tldats))
+
+    def _tracking_log(self, event):
+        """Returns an unsaved TrackingLog for the event."""
+        field_values = {x: event.get(x, '') for x in LOGFIELDS}
+        return TrackingLog(**field_values)
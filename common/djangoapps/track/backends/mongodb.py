@@ -97,3 +97,12 @@ class MongoBackend(BaseBackend):
             # during the next event.
             msg = 'Error inserting to MongoDB event tracker backend'
             log.exception(msg)
+
+    def send_many(self, events):
+        """Insert the events in to the Mongo collection with one bulk insert"""
+        try:
+            self.collection.insert(events, manipulate=False, continue_on_error=True)
+        except (PyMongoError, BSONError):
+            # As in send, the events that couldn't be inserted are lost.
+            msg = 'Error inserting to MongoDB event tracker backend'
+            log.exception(msg)
@@ -0,0 +1,102 @@
+from __future__ import absolute_import
+
+import threading
+from unittest import TestCase
+
+from mock import patch
+
+from track.backends import BaseBackend
+from track.backends.batching import BatchingBackend
+
+
+class RecordingBackend(BaseBackend):
+    """Records the batches of events it is sent, after waiting for `self.unblocked`"""
+    def __init__(self, **kwargs):
+        super(RecordingBackend, self).__init__(**kwargs)
+        self.batches = []
+        self.unblocked = threading.Event()
+        self.unblocked.set()
+
+    def send(self, event):
+        self.send_many([event])
+
+    def send_many(self, events):
+        self.unblocked.wait()
+        self.batches.append(events)
+
+
+class TestBatchingBackend(TestCase):
+    """
+    Tests for BatchingBackend, wrapping a RecordingBackend.
+    """
+    def create_backend(self, **options):
+        """
+        Returns a BatchingBackend with the given options, stopped after the test.
+        """
+        backend = BatchingBackend(
+            backend={'ENGINE': 'track.backends.tests.test_batching.RecordingBackend'},
+            **options
+        )
+        self.addCleanup(backend.stop)
+        return backend
+
+    def test_batches(self):
+        """
+        Test that the queued events are sent in order, in batches of at most max_batch_size.
+        """
+        backend = self.create_backend(max_batch_size=3, max_batch_interval=10)
+        backend.backend.unblocked.clear()
+        events = [{'test': index} for index in range(7)]
+        for event in events:
+            backend.send(event)
+        backend.backend.unblocked.set()
+        backend.stop()
+
+        self.assertEqual(sum(backend.backend.batches, []), events)
+        self.assertTrue(all(len(batch) <= 3 for batch in backend.backend.batches))
+        self.assertEqual(backend.dropped, 0)
+
+    def test_batch_interval(self):
+        """
+        Test that a batch is sent after max_batch_interval, even if it isn't full.
+        """
+        backend = self.create_backend(max_batch_size=100, max_batch_interval=0.01)
+        backend.send({'test': 1})
+        backend.flush()
+        self.assertEqual(backend.backend.batches, [[{'test': 1}]])
+
+    def test_full_queue(self):
+        """
+        Test that events are dropped and counted when the queue is full.
+        """
+        backend = self.create_backend(max_batch_size=1, max_queue_size=2)
+        backend.backend.unblocked.clear()
+        for index in range(10):
+            backend.send({'test': index})
+
+        # At most one event is waiting to be sent, and two are queued.
+        self.assertGreaterEqual(backend.dropped, 7)
+        backend.backend.unblocked.set()
+        backend.flush()
+        self.assertEqual(len(backend.backend.batches), 10 - backend.dropped)
+
+    def test_send_after_stop(self):
+        """
+        Test that the events sent after the backend has stopped are sent immediately.
+        """
+        backend = self.create_backend()
+        backend.send({'test': 1})
+        backend.stop()
+        backend.send({'test': 2})
+        self.assertEqual(backend.backend.batches, [[{'test': 1}], [{'test': 2}]])
+
+    @patch('track.backends.batching.close_old_connections')
+    def test_closes_old_connections(self, mock_close_old_connections):
+        """
+        Test that the background thread's expired database connections are closed before each batch.
+        """
+        backend = self.create_backend(max_batch_size=1)
+        for index in range(2):
+            backend.send({'test': index})
+        backend.flush()
+        self.assertEqual(mock_close_old_connections.call_count, 2)
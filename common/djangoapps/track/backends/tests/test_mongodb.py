@@ -37,3 +37,15 @@ class TestMongoBackend(TestCase):
 
         self.assertEqual(events[0], first_argument(calls[0]))
         self.assertEqual(events[1], first_argument(calls[1]))
+
+    def test_mongo_backend_send_many(self):
+        """
+        Test that the events sent together are inserted at once.
+        """
+        events = [{'test': 1}, {'test': 2}]
+
+        self.backend.send_many(events)
+
+        # Check if we inserted all of the events at once
+
+        self.backend.collection.insert.assert_called_once_with(events, manipulate=False, continue_on_error=True)
@@ -2,11 +2,18 @@
 Parser and evaluator for FormulaResponse and NumericalResponse
 
 Uses pyparsing to parse. Main function as of now is evaluator().
+
+Expressions that are evaluated repeatedly (e.g. at each of a FormulaResponse's
+samples) can be parsed once with compile_expression(), which keeps the most
+recently used ones.
 """
 
 import math
 import operator
 import numbers
+import threading
+from collections import OrderedDict
+
 import numpy
 import scipy.constants
 import functions
@@ -72,6 +79,9 @@ SUFFIXES = {
     'c': 1e-2, 'm': 1e-3, 'u': 1e-6, 'n': 1e-9, 'p': 1e-12
 }
 
+# The number of compiled expressions kept by `compile_expression`.
+COMPILED_EXPRESSION_CACHE_SIZE = 1000
+
 
 class UndefinedVariable(Exception):
     """
@@ -224,38 +234,277 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
      python numbers.
     -Unary functions are passed as a dictionary from string to function.
     """
-    # No need to go further.
-    if math_expr.strip() == "":
-        return float('nan')
+    return compile_expression(math_expr, case_sensitive).evaluate(variables, functions)
 
-    # Parse the tree.
-    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    math_interpreter.parse_algebra()
 
-    # Get our variables together.
-    all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
+_COMPILED_EXPRESSIONS = OrderedDict()
+_COMPILED_EXPRESSIONS_LOCK = threading.Lock()
 
-    # ...and check them
-    math_interpreter.check_variables(all_variables, all_functions)
 
-    # Create a recursion to evaluate the tree.
-    if case_sensitive:
-        casify = lambda x: x
-    else:
-        casify = lambda x: x.lower()  # Lowercase for case insens.
+def compile_expression(math_expr, case_sensitive=False):
+    """
+    Return a `CompiledExpression` for `math_expr`.
 
-    evaluate_actions = {
-        'number': eval_number,
-        'variable': lambda x: all_variables[casify(x[0])],
-        'function': lambda x: all_functions[casify(x[0])](x[1]),
-        'atom': eval_atom,
-        'power': eval_power,
-        'parallel': eval_parallel,
-        'product': eval_product,
-        'sum': eval_sum
-    }
+    The last `COMPILED_EXPRESSION_CACHE_SIZE` expressions compiled are kept,
+    so that evaluating the same expression again doesn't parse it again.
+    Raise a `pyparsing.ParseException` if `math_expr` can't be parsed.
+    """
+    key = (math_expr, bool(case_sensitive))
+    with _COMPILED_EXPRESSIONS_LOCK:
+        compiled = _COMPILED_EXPRESSIONS.pop(key, None)
+        if compiled is not None:
+            # Move it to the end, as the most recently used.
+            _COMPILED_EXPRESSIONS[key] = compiled
+            return compiled
+
+    compiled = CompiledExpression(math_expr, case_sensitive)
+    with _COMPILED_EXPRESSIONS_LOCK:
+        _COMPILED_EXPRESSIONS[key] = compiled
+        while len(_COMPILED_EXPRESSIONS) > COMPILED_EXPRESSION_CACHE_SIZE:
+            _COMPILED_EXPRESSIONS.popitem(last=False)
+    return compiled
+
+
+class _NotVectorizable(Exception):
+    """
+    Indicate that an expression can't be evaluated for all samples at once.
+    """
+    pass
+
+
+def _parallel(values):
+    """
+    Like `eval_parallel`, but `values` may also contain numpy arrays.
+    """
+    if not any(isinstance(value, numpy.ndarray) for value in values):
+        return eval_parallel(values)
+    if any(numpy.any(numpy.equal(value, 0)) for value in values):
+        # Only some of the samples would be NaN.
+        raise _NotVectorizable()
+    return 1. / sum(1. / value for value in values)
+
+
+def _compile_tree(node, casify):
+    """
+    Return a function of (all_variables, all_functions) that evaluates the
+    parse tree `node`.
+
+    This does the same as `reduce_tree` with the actions used by `evaluator`,
+    but the structure of the tree (and the numbers in it) are only processed
+    once.
+    """
+    node_name = node.getName()
+    if node_name == 'number':
+        value = eval_number(list(node))
+        return lambda variables, functions: value
+
+    if node_name == 'variable':
+        varname = casify(node[0])
+        return lambda variables, functions: variables[varname]
+
+    if node_name == 'function':
+        funcname = casify(node[0])
+        argument = _compile_tree(node[1], casify)
+        return lambda variables, functions: functions[funcname](argument(variables, functions))
+
+    if node_name == 'atom':
+        # Ignore any parentheses.
+        return next(_compile_tree(kid, casify) for kid in node if isinstance(kid, ParseResults))
+
+    if node_name in ('power', 'parallel'):
+        operands = [_compile_tree(kid, casify) for kid in node if isinstance(kid, ParseResults)]
+        if len(operands) == 1:
+            return operands[0]
+        if node_name == 'parallel':
+            return lambda variables, functions: _parallel([operand(variables, functions) for operand in operands])
+
+        def power(variables, functions):
+            """
+            Exponentiate the operands, right to left.
+            """
+            values = [operand(variables, functions) for operand in operands]
+            values.reverse()
+            return reduce(lambda a, b: b ** a, values)
+        return power
+
+    if node_name in ('product', 'sum'):
+        operators = {'*': operator.mul, '/': operator.truediv, '+': operator.add, '-': operator.sub}
+        if node_name == 'product':
+            initial, current_op = 1.0, operator.mul
+        else:
+            initial, current_op = 0.0, operator.add
+        operations = []
+        for kid in node:
+            if isinstance(kid, ParseResults):
+                operations.append((current_op, _compile_tree(kid, casify)))
+            else:
+                current_op = operators[kid]
+
+        def combine(variables, functions):
+            """
+            Apply each operation to the running result, left to right.
+            """
+            result = initial
+            for operation, operand in operations:
+                result = operation(result, operand(variables, functions))
+            return result
+        return combine
+
+    raise Exception(u"Unknown branch name '{}'".format(node_name))  # pragma: no cover
+
+
+class CompiledExpression(object):
+    """
+    A math expression, parsed once so that it can be evaluated many times.
+
+    Use `compile_expression` to get one, rather than creating it directly.
+    """
+    def __init__(self, math_expr, case_sensitive=False):
+        self.math_expr = math_expr
+        self.case_sensitive = case_sensitive
+        self.math_interpreter = None
 
-    return math_interpreter.reduce_tree(evaluate_actions)
+        # No need to go further.
+        if math_expr.strip() == "":
+            self._evaluate = lambda variables, functions: float('nan')
+            return
+
+        self.math_interpreter = ParseAugmenter(math_expr, case_sensitive)
+        self.math_interpreter.parse_algebra()
+
+        if case_sensitive:
+            casify = lambda x: x
+        else:
+            casify = lambda x: x.lower()  # Lowercase for case insens.
+        self._evaluate = _compile_tree(self.math_interpreter.tree, casify)
+
+    def evaluate(self, variables, functions):
+        """
+        Evaluate the expression with the given variables and functions, as
+        `evaluator` does.
+        """
+        # Get our variables together.
+        all_variables, all_functions = add_defaults(variables, functions, self.case_sensitive)
+
+        # ...and check them
+        if self.math_interpreter is not None:
+            self.math_interpreter.check_variables(all_variables, all_functions)
+
+        return self._evaluate(all_variables, all_functions)
+
+    def evaluate_samples(self, samples, functions):
+        """
+        Evaluate the expression at each of `samples`, a list of dictionaries of
+        variables, and return the list of results.
+
+        All of the samples are evaluated in one pass, with each variable as a
+        numpy array of its values. If that isn't possible (e.g. the expression
+        uses `factorial`, or a value is outside a function's domain for some
+        sample), they are evaluated one at a time instead; either way, the
+        results and exceptions are those of calling `evaluate` for each.
+        """
+        if not samples:
+            return []
+
+        arrays = _sample_arrays(samples)
+        if arrays is not None:
+            try:
+                with numpy.errstate(divide='raise', over='raise', invalid='raise'):
+                    results = self.evaluate(arrays, functions)
+            except Exception:  # pylint: disable=broad-except
+                pass
+            else:
+                if numpy.shape(results) == ():
+                    return [results] * len(samples)
+                if numpy.shape(results) == (len(samples),) and results.dtype.kind in 'biufc':
+                    return results.tolist()
+
+        return [self.evaluate(variables, functions) for variables in samples]
+
+
+def _sample_arrays(samples):
+    """
+    Return a dictionary of each variable in `samples` to a numpy array of its
+    values, or None if the samples don't all have the same numeric variables.
+    """
+    names = set(samples[0])
+    if any(set(variables) != names for variables in samples):
+        return None
+    arrays = {name: numpy.array([variables[name] for variables in samples]) for name in names}
+    if any(array.dtype.kind not in 'biufc' for array in arrays.values()):
+        return None
+    return arrays
+
+
+# The grammar is the same for every expression, so it's only built once.
+_GRAMMAR = None
+_GRAMMAR_LOCK = threading.Lock()
+
+
+def _get_grammar():
+    """
+    Return the pyparsing grammar for math expressions, building it if necessary.
+
+    The parse tree it produces has proper groupings to reflect parenthesis and
+    order of operations. All operators are left in the tree and no strings of
+    numbers are parsed into their float versions.
+    """
+    global _GRAMMAR  # pylint: disable=global-statement
+    with _GRAMMAR_LOCK:
+        if _GRAMMAR is None:
+            # 0.33 or 7 or .34 or 16.
+            number_part = Word(nums)
+            inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
+            # pyparsing allows spaces between tokens--`Combine` prevents that.
+            inner_number = Combine(inner_number)
+
+            # SI suffixes and percent.
+            number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
+
+            # 0.33k or 17
+            plus_minus = Literal('+') | Literal('-')
+            number = Group(
+                Optional(plus_minus) +
+                inner_number +
+                Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
+                Optional(number_suffix)
+            )
+            number = number("number")
+
+            # Predefine recursive variables.
+            expr = Forward()
+
+            # Handle variables passed in. They must start with letters/underscores
+            # and may contain numbers afterward.
+            inner_varname = Word(alphas + "_", alphanums + "_")
+            varname = Group(inner_varname)("variable")
+
+            # Same thing for functions.
+            function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
+
+            atom = number | function | varname | "(" + expr + ")"
+            atom = Group(atom)("atom")
+
+            # Do the following in the correct order to preserve order of operation.
+            pow_term = atom + ZeroOrMore("^" + atom)
+            pow_term = Group(pow_term)("power")
+
+            par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
+            par_term = Group(par_term)("parallel")
+
+            prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
+            prod_term = Group(prod_term)("product")
+
+            sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
+            sum_term = Group(sum_term)("sum")
+
+            # Finish the recursion.
+            expr << sum_term  # pylint: disable=pointless-statement
+            grammar = expr + stringEnd
+            # Streamline it now, rather than in whichever thread parses first.
+            grammar.streamline()
+            _GRAMMAR = grammar
+    return _GRAMMAR
 
 
 class ParseAugmenter(object):
@@ -278,23 +527,6 @@ class ParseAugmenter(object):
         self.variables_used = set()
         self.functions_used = set()
 
-        def vpa(tokens):
-            """
-            When a variable is recognized, store it in `variables_used`.
-            """
-            varname = tokens[0][0]
-            self.variables_used.add(varname)
-
-        def fpa(tokens):
-            """
-            When a function is recognized, store it in `functions_used`.
-            """
-            varname = tokens[0][0]
-            self.functions_used.add(varname)
-
-        self.variable_parse_action = vpa
-        self.function_parse_action = fpa
-
     def parse_algebra(self):
         """
         Parse an algebraic expression into a tree.
@@ -307,57 +539,21 @@ class ParseAugmenter(object):
         really gross. For debugging, use something like
           print OBJ.tree.asXML()
         """
-        # 0.33 or 7 or .34 or 16.
-        number_part = Word(nums)
-        inner_number = (number_part + Optional("." + Optional(number_part))) | ("." + number_part)
-        # pyparsing allows spaces between tokens--`Combine` prevents that.
-        inner_number = Combine(inner_number)
-
-        # SI suffixes and percent.
-        number_suffix = MatchFirst(Literal(k) for k in SUFFIXES.keys())
-
-        # 0.33k or 17
-        plus_minus = Literal('+') | Literal('-')
-        number = Group(
-            Optional(plus_minus) +
-            inner_number +
-            Optional(CaselessLiteral("E") + Optional(plus_minus) + number_part) +
-            Optional(number_suffix)
-        )
-        number = number("number")
-
-        # Predefine recursive variables.
-        expr = Forward()
-
-        # Handle variables passed in. They must start with letters/underscores
-        # and may contain numbers afterward.
-        inner_varname = Word(alphas + "_", alphanums + "_")
-        varname = Group(inner_varname)("variable")
-        varname.setParseAction(self.variable_parse_action)
-
-        # Same thing for functions.
-        function = Group(inner_varname + Suppress("(") + expr + Suppress(")"))("function")
-        function.setParseAction(self.function_parse_action)
-
-        atom = number | function | varname | "(" + expr + ")"
-        atom = Group(atom)("atom")
-
-        # Do the following in the correct order to preserve order of operation.
-        pow_term = atom + ZeroOrMore("^" + atom)
-        pow_term = Group(pow_term)("power")
-
-        par_term = pow_term + ZeroOrMore('||' + pow_term)  # 5k || 4k
-        par_term = Group(par_term)("parallel")
-
-        prod_term = par_term + ZeroOrMore((Literal('*') | Literal('/')) + par_term)  # 7 * 5 / 4
-        prod_term = Group(prod_term)("product")
-
-        sum_term = Optional(plus_minus) + prod_term + ZeroOrMore(plus_minus + prod_term)  # -5 + 4 - 3
-        sum_term = Group(sum_term)("sum")
-
-        # Finish the recursion.
-        expr << sum_term  # pylint: disable=pointless-statement
-        self.tree = (expr + stringEnd).parseString(self.math_expr)[0]
+        self.tree = _get_grammar().parseString(self.math_expr)[0]
+
+        # Store the variables and functions used.
+        def find_names(node):
+            """
+            Add the variables and functions in the tree under `node`.
+            """
+            for kid in node:
+                if isinstance(kid, ParseResults):
+                    if kid.getName() == 'variable':
+                        self.variables_used.add(kid[0])
+                    elif kid.getName() == 'function':
+                        self.functions_used.add(kid[0])
+                    find_names(kid)
+        find_names(self.tree)
 
     def reduce_tree(self, handle_actions, terminal_converter=None):
         """
@@ -559,3 +559,85 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+
+class CompiledExpressionTest(unittest.TestCase):
+    """
+    Run tests for calc.compile_expression and CompiledExpression
+    """
+
+    def test_compiled_expressions_cached(self):
+        """
+        Compiling the same expression again should reuse the compiled one
+        """
+        compiled = calc.compile_expression('2*x+1')
+        self.assertIs(calc.compile_expression('2*x+1'), compiled)
+        self.assertIsNot(calc.compile_expression('2*x+1', case_sensitive=True), compiled)
+        self.assertEqual(compiled.evaluate({'x': 3.0}, {}), 7.0)
+        self.assertEqual(compiled.math_interpreter.variables_used, {'x'})
+
+    def test_least_recently_used_evicted(self):
+        """
+        Only the most recently used compiled expressions should be kept
+        """
+        compiled = calc.compile_expression('x^2')
+        for index in range(calc.COMPILED_EXPRESSION_CACHE_SIZE - 1):
+            calc.compile_expression('x+{}'.format(index))
+        self.assertIs(calc.compile_expression('x^2'), compiled)
+
+        for index in range(calc.COMPILED_EXPRESSION_CACHE_SIZE):
+            calc.compile_expression('y+{}'.format(index))
+        self.assertIsNot(calc.compile_expression('x^2'), compiled)
+
+    def test_parse_error(self):
+        """
+        Expressions that can't be parsed should raise every time
+        """
+        for __ in range(2):
+            with self.assertRaises(ParseException):
+                calc.compile_expression('x+*2')
+
+    def test_evaluate_samples(self):
+        """
+        Evaluating at many samples should match evaluating each one
+        """
+        samples = [{'x': x, 'y': y} for x, y in [(1.0, 2.0), (3.5, -0.25), (0.5, 7.0)]]
+        expressions = [
+            'x^2 + 2*x*y - y/3',
+            'sin(x) * exp(y) + sqrt(x)',
+            'x || y',
+            '-x^y^2',
+            '3.5k * pi',
+            'x * i + y',
+            '',
+        ]
+        for expression in expressions:
+            compiled = calc.compile_expression(expression)
+            expected = [calc.evaluator(variables, {}, expression) for variables in samples]
+            results = compiled.evaluate_samples(samples, {})
+            self.assertEqual(len(results), len(samples))
+            for result, expected_result in zip(results, expected):
+                if numpy.isnan(expected_result):
+                    self.assertTrue(numpy.isnan(result))
+                else:
+                    self.assertAlmostEqual(result, expected_result)
+        self.assertEqual(calc.compile_expression('x').evaluate_samples([], {}), [])
+
+    def test_evaluate_samples_fallback(self):
+        """
+        Expressions that can't be evaluated for all samples at once should be
+        evaluated one sample at a time
+        """
+        samples = [{'x': 3.0}, {'x': 0.0}]
+        self.assertEqual(calc.compile_expression('fact(x)').evaluate_samples(samples, {}), [6, 1])
+
+        results = calc.compile_expression('x || 2').evaluate_samples(samples, {})
+        self.assertAlmostEqual(results[0], 1.2)
+        self.assertTrue(numpy.isnan(results[1]))
+
+        with self.assertRaises(ZeroDivisionError):
+            calc.compile_expression('1/x').evaluate_samples(samples, {})
+        with self.assertRaises(ValueError):
+            calc.compile_expression('fact(x - 1)').evaluate_samples(samples, {})
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'y'):
+            calc.compile_expression('x + y').evaluate_samples(samples, {})
@@ -29,7 +29,7 @@ import capa.customrender as customrender
 import capa.responsetypes as responsetypes
 from capa.util import contextualize_text, convert_files_to_filenames
 import capa.xqueue_interface as xqueue_interface
-from capa.safe_exec import safe_exec
+from capa.safe_exec import safe_exec, safe_exec_many
 
 
 # extra things displayed after "show answers" is pressed
@@ -402,6 +402,33 @@ class LoncapaProblem(object):
         """
         return self._grade_answers(None)
 
+    def cache_script_contexts(self, seeds, anonymous_student_ids):
+        """
+        Run this problem's script for other students, given their `seeds` and
+        `anonymous_student_ids`, so that loading the problem for them uses the
+        cached results rather than running the script again.
+
+        The scripts are run together with `safe_exec_many`, rather than in a
+        sandbox for each student.  This does nothing if there is no script or
+        no cache.
+        """
+        if not self.context['script_code'] or not self.capa_system.cache:
+            return
+
+        safe_exec_many(
+            self.context['script_code'],
+            [
+                self._initial_context(seed, anonymous_student_id)
+                for seed, anonymous_student_id in zip(seeds, anonymous_student_ids)
+            ],
+            seeds,
+            python_path=self.context['python_path'],
+            extra_files=self.context['extra_files'] or [],
+            cache=self.capa_system.cache,
+            slug=self.problem_id,
+            unsafely=self.capa_system.can_execute_unsafe_code(),
+        )
+
     def _grade_answers(self, student_answers):
         """
         Internal grading call used for checking new 'student_answers' and also
@@ -660,6 +687,17 @@ class LoncapaProblem(object):
 
         return path
 
+    @staticmethod
+    def _initial_context(seed, anonymous_student_id):
+        """
+        Return the context that the problem's script is run in, for a student
+        with the given `seed` and `anonymous_student_id`.
+        """
+        return {
+            'seed': seed,
+            'anonymous_student_id': anonymous_student_id,
+        }
+
     def _extract_context(self, tree):
         """
         Extract content of <script>...</script> from the problem.xml file, and exec it in the
@@ -668,9 +706,7 @@ class LoncapaProblem(object):
 
         Problem XML goes to Python execution context. Runs everything in script tags.
         """
-        context = {}
-        context['seed'] = self.seed
-        context['anonymous_student_id'] = self.capa_system.anonymous_student_id
+        context = self._initial_context(self.seed, self.capa_system.anonymous_student_id)
         all_code = ''
 
         python_path = []
@@ -37,7 +37,7 @@ from shapely.geometry import Point, MultiPoint
 import dogstats_wrapper as dog_stats_api
 
 # specific library imports
-from calc import evaluator, UndefinedVariable
+from calc import compile_expression, evaluator, UndefinedVariable
 from . import correctmap
 from .registry import TagRegistry
 from datetime import datetime
@@ -3197,18 +3197,19 @@ class FormulaResponse(LoncapaResponse):
         Takes in an answer and a list of dictionaries mapping variables to values.
         Each dictionary represents a test case for the answer.
         Returns a tuple of formula evaluation results.
+
+        The answer is only parsed once, and is evaluated for all of the test
+        cases together when possible.
         """
         _ = self.capa_system.i18n.ugettext
 
         out = []
-        for var_dict in var_dict_list:
+        if var_dict_list:
             try:
-                out.append(evaluator(
-                    var_dict,
-                    dict(),
+                out = compile_expression(
                     answer,
                     case_sensitive=self.case_sensitive,
-                ))
+                ).evaluate_samples(var_dict_list, dict())
             except UndefinedVariable as err:
                 log.debug(
                     'formularesponse: undefined variable in formula=%s',
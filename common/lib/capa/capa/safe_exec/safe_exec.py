@@ -4,6 +4,7 @@ from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
 from . import lazymod
+from . import worker_pool
 from dogapi import dog_stats_api
 
 import hashlib
@@ -46,6 +47,67 @@ for name, modname in ASSUMED_IMPORTS:
 
 LAZY_IMPORTS = "".join(LAZY_IMPORTS)
 
+# The number of executions that safe_exec_many runs in each sandbox.  The
+# sandbox's limits apply to the whole batch, so this can't be too large.
+BATCH_SIZE = 20
+
+# The code run in the sandbox for a batch of executions.  `batch` is a list
+# of (code, globals dict) pairs; each code is run in its globals, and
+# `batch_results` is the list of the resulting globals (as they would be
+# returned by a single execution), or None if the code raised an exception.
+#
+# The modules named in `preload` (the assumed imports) are imported first.
+# Each execution then starts from the same interpreter state: the modules
+# imported by the previous one are removed, and sys.path and the random
+# module are restored, as if it had a sandbox of its own.
+BATCH_CODE = """\
+import json
+import random
+import sys
+
+
+def run_batch(batch, preload):
+    ok_types = (type(None), int, long, float, str, unicode, list, tuple, dict)
+
+    def jsonable(value):
+        if not isinstance(value, ok_types):
+            return False
+        try:
+            json.dumps(value)
+        except Exception:
+            return False
+        return True
+
+    for module_name in preload:
+        try:
+            __import__(module_name)
+        except Exception:
+            pass
+    initial_modules = set(sys.modules)
+    initial_path = list(sys.path)
+
+    results = []
+    for code, globals_dict in batch:
+        # Undo the previous code's changes to the interpreter.
+        for module_name in set(sys.modules) - initial_modules:
+            del sys.modules[module_name]
+        sys.modules['random'] = random
+        sys.path[:] = initial_path
+        try:
+            exec code in globals_dict
+        except Exception:
+            results.append(None)
+        else:
+            results.append({
+                key: value for key, value in globals_dict.iteritems()
+                if key != '__builtins__' and jsonable(value)
+            })
+    return results
+
+batch_results = run_batch(batch, preload)
+del batch, preload
+"""
+
 
 def update_hash(hasher, obj):
     """
@@ -70,6 +132,48 @@ def update_hash(hasher, obj):
         hasher.update(repr(obj))
 
 
+def configure_worker_pool(size, max_executions=100, python_bin=None, user=None):
+    """
+    Run sandboxed code with a pool of `size` warm workers, which have already
+    imported the `ASSUMED_IMPORTS`, rather than starting a new sandbox for
+    each execution.  A `size` of 0 stops using the pool.
+
+    See `worker_pool.configure` for the other arguments.
+    """
+    worker_pool.configure(
+        size,
+        max_executions=max_executions,
+        python_bin=python_bin,
+        user=user,
+        imports=[modname for __, modname in ASSUMED_IMPORTS],
+    )
+
+
+def get_exec_fn(unsafely):
+    """
+    Return the function to execute code with, which runs it unsandboxed if
+    `unsafely` is true.
+    """
+    if unsafely:
+        return codejail_not_safe_exec
+    elif worker_pool.is_configured():
+        return worker_pool.safe_exec
+    else:
+        return codejail_safe_exec
+
+
+def get_cache_key(code, globals_dict, random_seed):
+    """
+    Return the key that the execution of `code` with `globals_dict` and
+    `random_seed` is cached under.
+    """
+    safe_globals = json_safe(globals_dict)
+    md5er = hashlib.md5()
+    md5er.update(repr(code))
+    update_hash(md5er, safe_globals)
+    return "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
+
+
 @dog_stats_api.timed('capa.safe_exec.time')
 def safe_exec(
     code,
@@ -109,11 +213,7 @@ def safe_exec(
     """
     # Check the cache for a previous result.
     if cache:
-        safe_globals = json_safe(globals_dict)
-        md5er = hashlib.md5()
-        md5er.update(repr(code))
-        update_hash(md5er, safe_globals)
-        key = "safe_exec.%r.%s" % (random_seed, md5er.hexdigest())
+        key = get_cache_key(code, globals_dict, random_seed)
         cached = cache.get(key)
         if cached is not None:
             # We have a cached result.  The result is a pair: the exception
@@ -128,10 +228,7 @@ def safe_exec(
     code_prolog = CODE_PROLOG % random_seed
 
     # Decide which code executor to use.
-    if unsafely:
-        exec_fn = codejail_not_safe_exec
-    else:
-        exec_fn = codejail_safe_exec
+    exec_fn = get_exec_fn(unsafely)
 
     # Run the code!  Results are side effects in globals_dict.
     try:
@@ -153,3 +250,90 @@ def safe_exec(
     # If an exception happened, raise it now.
     if emsg:
         raise e
+
+
+@dog_stats_api.timed('capa.safe_exec.many.time')
+def safe_exec_many(
+    code,
+    globals_dicts,
+    random_seeds,
+    python_path=None,
+    extra_files=None,
+    cache=None,
+    slug=None,
+    unsafely=False,
+    batch_size=BATCH_SIZE,
+):
+    """
+    Execute python code safely, once for each of `globals_dicts`.
+
+    This is the same as calling `safe_exec` with each of `globals_dicts` and
+    the corresponding one of `random_seeds`, but rather than starting a
+    sandbox for each execution, the executions that aren't already in `cache`
+    are run `batch_size` at a time in a single sandbox.  Modules imported by
+    the code are only imported once per batch.
+
+    If the code raises an exception for one of the globals, or the sandbox
+    fails for a whole batch, those executions are run again on their own, so
+    that their results and exceptions are exactly those of `safe_exec`.
+
+    The other arguments are those of `safe_exec`, and apply to all of the
+    executions.  Rather than raising a SafeExecException, return a list of
+    the exception for each of `globals_dicts`, or None if it succeeded.
+
+    """
+    errors = [None] * len(globals_dicts)
+
+    # Check the cache for previous results.
+    pending = []
+    for index, (globals_dict, random_seed) in enumerate(zip(globals_dicts, random_seeds)):
+        key = None
+        if cache:
+            key = get_cache_key(code, globals_dict, random_seed)
+            cached = cache.get(key)
+            if cached is not None:
+                emsg, cleaned_results = cached
+                globals_dict.update(cleaned_results)
+                if emsg:
+                    errors[index] = SafeExecException(emsg)
+                continue
+        pending.append((index, key))
+
+    # Decide which code executor to use.
+    exec_fn = get_exec_fn(unsafely)
+
+    for start in xrange(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        batch_globals = {
+            'batch': [
+                (CODE_PROLOG % random_seeds[index] + LAZY_IMPORTS + code, json_safe(globals_dicts[index]))
+                for index, __ in batch
+            ],
+            'preload': [modname for __, modname in ASSUMED_IMPORTS],
+        }
+        try:
+            exec_fn(
+                BATCH_CODE, batch_globals,
+                python_path=python_path, extra_files=extra_files, slug=slug,
+            )
+            results = batch_globals['batch_results']
+        except SafeExecException:
+            results = [None] * len(batch)
+
+        for (index, key), results_globals in zip(batch, results):
+            globals_dict = globals_dicts[index]
+            if results_globals is None:
+                try:
+                    safe_exec(
+                        code, globals_dict, random_seed=random_seeds[index],
+                        python_path=python_path, extra_files=extra_files, cache=cache, slug=slug, unsafely=unsafely,
+                    )
+                except SafeExecException as e:
+                    errors[index] = e
+                continue
+
+            globals_dict.update(results_globals)
+            if cache:
+                cache.set(key, (None, json_safe(globals_dict)))
+
+    return errors
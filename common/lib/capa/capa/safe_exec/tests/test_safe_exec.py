@@ -7,9 +7,11 @@ import random
 import textwrap
 import unittest
 
+from mock import patch
 from nose.plugins.skip import SkipTest
 
-from capa.safe_exec import safe_exec, update_hash
+from capa.safe_exec import safe_exec, safe_exec_many, update_hash
+from capa.safe_exec.safe_exec import BATCH_CODE, get_exec_fn
 from codejail.safe_exec import SafeExecException
 from codejail.jail_code import is_configured
 
@@ -177,6 +179,96 @@ class TestSafeExecCaching(unittest.TestCase):
                 self.fail("Tried executing code with non-ASCII unicode: {0}".format(code))
 
 
+class TestSafeExecMany(unittest.TestCase):
+    """Test running the same code for many globals with safe_exec_many."""
+
+    CODE = textwrap.dedent("""\
+        if n == 3:
+            raise ValueError("Three!")
+        a = n / 2 + random.randint(0, 999)
+        """)
+
+    def run_safe_exec(self, random_seed, cache=None):
+        """Return the globals and exception from running CODE with safe_exec."""
+        g = {'n': random_seed}
+        try:
+            safe_exec(self.CODE, g, random_seed=random_seed, cache=cache)
+        except SafeExecException as e:
+            return g, e.message
+        return g, None
+
+    def test_same_as_safe_exec(self):
+        seeds = range(7)
+        globals_dicts = [{'n': seed} for seed in seeds]
+        errors = safe_exec_many(self.CODE, globals_dicts, seeds, batch_size=3)
+
+        for seed, g, error in zip(seeds, globals_dicts, errors):
+            expected_g, expected_message = self.run_safe_exec(seed)
+            self.assertEqual(g, expected_g)
+            if expected_message is None:
+                self.assertIsNone(error)
+            else:
+                self.assertEqual(error.message, expected_message)
+        self.assertIn("Three!", errors[3].message)
+
+    def test_results_cached(self):
+        seeds = range(5)
+        cache = {}
+        errors = safe_exec_many(self.CODE, [{'n': seed} for seed in seeds], seeds, cache=DictCache(cache))
+        self.assertEqual(len(cache), 5)
+
+        # Each result is cached the same way as by safe_exec.
+        for seed in seeds:
+            self.assertEqual(self.run_safe_exec(seed, cache=DictCache(cache)), self.run_safe_exec(seed))
+        self.assertEqual(len(cache), 5)
+
+        # Change the values stored in the cache, the results should change.
+        for key in cache:
+            cache[key] = (None, {'a': 17})
+        globals_dicts = [{'n': seed} for seed in seeds]
+        errors = safe_exec_many(self.CODE, globals_dicts, seeds, cache=DictCache(cache))
+        self.assertEqual(errors, [None] * 5)
+        self.assertEqual([g['a'] for g in globals_dicts], [17] * 5)
+
+    def test_executions_start_from_same_state(self):
+        # Changes one execution makes to modules and sys.path aren't seen by
+        # the next one in the batch.
+        pylib = os.path.dirname(__file__) + "/test_files/pylib"
+        code = textwrap.dedent("""\
+            import sys
+            import constant
+            a = getattr(constant, 'changed', False)
+            constant.changed = True
+            path_length = len(sys.path)
+            sys.path.append('/nowhere')
+            """)
+        globals_dicts = [{} for __ in range(4)]
+        errors = safe_exec_many(code, globals_dicts, range(4), python_path=[pylib], batch_size=4)
+
+        self.assertEqual(errors, [None] * 4)
+        self.assertEqual([g['a'] for g in globals_dicts], [False] * 4)
+        self.assertEqual(len(set(g['path_length'] for g in globals_dicts)), 1)
+
+    def test_fallback_when_batch_fails(self):
+        # If the sandbox fails for a whole batch, each execution is run again
+        # on its own.
+        def failing_batch_exec(code, globals_dict, **kwargs):
+            """Fail to run the batch, but run anything else."""
+            if code == BATCH_CODE:
+                raise SafeExecException("The batch failed")
+            return get_exec_fn(False)(code, globals_dict, **kwargs)
+
+        seeds = range(5)
+        globals_dicts = [{'n': seed} for seed in seeds]
+        with patch('capa.safe_exec.safe_exec.get_exec_fn', return_value=failing_batch_exec):
+            errors = safe_exec_many(self.CODE, globals_dicts, seeds, batch_size=5)
+
+        for seed, g, error in zip(seeds, globals_dicts, errors):
+            expected_g, expected_message = self.run_safe_exec(seed)
+            self.assertEqual(g, expected_g)
+            self.assertEqual(error and error.message, expected_message)
+
+
 class TestUpdateHash(unittest.TestCase):
     """Test the safe_exec.update_hash function to be sure it canonicalizes properly."""
 
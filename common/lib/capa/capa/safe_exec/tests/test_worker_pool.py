@@ -0,0 +1,133 @@
+"""Test worker_pool.py"""
+
+import os
+import os.path
+import sys
+import unittest
+
+from mock import patch
+
+from capa.safe_exec import configure_worker_pool, safe_exec
+from capa.safe_exec.worker_pool import SandboxWorkerPool, WorkerError
+from codejail import jail_code
+from codejail.safe_exec import SafeExecException
+
+
+class TestWorkerPool(unittest.TestCase):
+    """
+    Test running code with the worker pool, using workers that run this
+    Python unsandboxed.
+    """
+    def setUp(self):
+        super(TestWorkerPool, self).setUp()
+        configure_worker_pool(2, max_executions=3)
+        self.addCleanup(configure_worker_pool, 0)
+
+    def test_set_values(self):
+        g = {'b': 2}
+        safe_exec("a = b + 15", g)
+        self.assertEqual(g, {'a': 17, 'b': 2})
+
+    def test_division_and_assumed_imports(self):
+        g = {}
+        safe_exec("a = 1/2 + int(math.pi) + int(numpy.sqrt(4))", g)
+        self.assertEqual(g['a'], 5.5)
+
+    def test_random_seeding(self):
+        g = {}
+        safe_exec("a = random.randint(0, 999)", g, random_seed=17)
+        first = g['a']
+        for __ in range(4):
+            safe_exec("a = random.randint(0, 999)", g, random_seed=17)
+            self.assertEqual(g['a'], first)
+
+    def test_python_lib(self):
+        pylib = os.path.dirname(__file__) + "/test_files/pylib"
+        g = {}
+        safe_exec("import constant; a = constant.THE_CONST", g, python_path=[pylib])
+        self.assertEqual(g['a'], 23)
+
+    def test_raising_exceptions(self):
+        g = {}
+        with self.assertRaises(SafeExecException) as cm:
+            safe_exec("1/0", g)
+        self.assertIn("ZeroDivisionError", cm.exception.message)
+        self.assertEqual(g, {})
+
+    def test_executions_are_isolated(self):
+        g = {}
+        safe_exec("import sys; sys.leaked = True; a = 1", g)
+        for __ in range(4):
+            safe_exec("import sys; leaked = hasattr(sys, 'leaked')", g)
+            self.assertFalse(g['leaked'])
+
+    def test_workers_recycled(self):
+        worker_pids = set()
+        for __ in range(7):
+            g = {}
+            safe_exec("import os; pid = os.getppid()", g)
+            worker_pids.add(g['pid'])
+        # Each worker is replaced after 3 executions.
+        self.assertGreaterEqual(len(worker_pids), 3)
+
+    def test_realtime_limit(self):
+        with patch.dict(jail_code.LIMITS, {'REALTIME': 0.5}):
+            with self.assertRaises(SafeExecException):
+                safe_exec("while True: pass", {})
+        g = {}
+        safe_exec("a = 17", g)
+        self.assertEqual(g['a'], 17)
+
+    def test_file_writes_limited(self):
+        with patch.dict(jail_code.LIMITS, {'FSIZE': 0}):
+            with self.assertRaises(SafeExecException) as cm:
+                safe_exec("with open('out.txt', 'w') as out: out.write('x')", {})
+        self.assertIn("File too large", cm.exception.message)
+
+    @unittest.skipIf(os.geteuid() == 0, "root isn't limited in the number of processes it starts")
+    def test_processes_limited(self):
+        with self.assertRaises(SafeExecException) as cm:
+            safe_exec("import os; os.fork()", {})
+        self.assertIn("OSError", cm.exception.message)
+
+    def test_worker_replaced_after_abnormal_exit(self):
+        configure_worker_pool(1, max_executions=3)
+        g = {}
+        safe_exec("import os; pid = os.getppid()", g)
+        worker_pid = g['pid']
+        with self.assertRaises(SafeExecException):
+            safe_exec("import os; os._exit(3)", {})
+        safe_exec("import os; pid = os.getppid()", g)
+        self.assertNotEqual(g['pid'], worker_pid)
+
+
+class TestSandboxWorkerPool(unittest.TestCase):
+    """
+    Test how the pool handles workers that fail.
+    """
+    EXECUTION = {'code': 'a = 1', 'globals': {}, 'files': [], 'python_path': [], 'limits': {'REALTIME': 0.1}}
+
+    @patch('capa.safe_exec.worker_pool.RESPONSE_TIMEOUT_MARGIN', 0.1)
+    def test_unresponsive_worker_replaced(self):
+        # This worker reads its executions, but never responds to them.
+        pool = SandboxWorkerPool([sys.executable, '-c', 'import sys; sys.stdin.read()'], 1, 10)
+        self.addCleanup(pool.stop)
+        pool._start()  # pylint: disable=protected-access
+        worker = pool._idle.queue[0]  # pylint: disable=protected-access
+
+        with self.assertRaises(WorkerError):
+            pool.execute(self.EXECUTION)
+
+        self.assertIsNotNone(worker.process.poll())
+        self.assertEqual(pool._idle.qsize(), 1)  # pylint: disable=protected-access
+        self.assertIsNot(pool._idle.queue[0], worker)  # pylint: disable=protected-access
+
+    def test_worker_fails_to_start(self):
+        pool = SandboxWorkerPool(['/nonexistent/python'], 2, 10)
+
+        for __ in range(3):
+            with self.assertRaises(WorkerError):
+                pool.execute(self.EXECUTION)
+
+        # The places of the workers that couldn't be started aren't lost.
+        self.assertEqual(pool._idle.qsize(), 2)  # pylint: disable=protected-access
@@ -0,0 +1,442 @@
+"""
+A pool of warm sandbox processes for running capa's Python code.
+
+Running code with codejail starts a new sandboxed Python process for each
+execution, which then has to import numpy, scipy and the rest of the
+`ASSUMED_IMPORTS` before it can run a few milliseconds of course code.
+
+A pool worker is a sandboxed Python process that imports those modules once,
+and then runs each execution it is sent in a child process forked from
+itself, so the child starts with the modules already imported.  Each child
+gets the codejail resource limits, a fresh temporary directory with the
+execution's files, and no access to the worker's pipes.  It runs in its own
+process group, which is killed once the execution is over.  A worker is
+replaced after running `max_executions` executions, after a child exits
+abnormally, or if it doesn't respond within the execution's REALTIME limit
+plus `RESPONSE_TIMEOUT_MARGIN`.
+
+If codejail isn't configured with a sandboxed Python, the workers run the
+current Python unsandboxed, as a stand-in for development and tests.
+
+"""
+import base64
+import json
+import logging
+import os
+import os.path
+import select
+import subprocess
+import sys
+import threading
+from Queue import Queue, Empty
+
+from codejail import jail_code
+from codejail.safe_exec import json_safe, SafeExecException
+
+log = logging.getLogger(__name__)
+
+# How many seconds longer than an execution's REALTIME limit to wait for a
+# worker to respond, before killing it.  This covers writing the execution's
+# files and forking, which the limit doesn't apply to.
+RESPONSE_TIMEOUT_MARGIN = 5
+
+# The code run by each worker.  The names of the modules to import are its
+# arguments.  It reads an execution from each line of stdin, and writes the
+# result of each to a line of stdout.
+WORKER_CODE = r"""
+import base64
+import json
+import os
+import resource
+import select
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import traceback
+
+for module_name in sys.argv[1:]:
+    try:
+        __import__(module_name)
+    except Exception:
+        pass
+
+OK_TYPES = (type(None), int, long, float, str, unicode, list, tuple, dict)
+RLIMITS = {
+    'CPU': resource.RLIMIT_CPU,
+    'VMEM': resource.RLIMIT_AS,
+    'FSIZE': resource.RLIMIT_FSIZE,
+    'NPROC': resource.RLIMIT_NPROC,
+}
+
+
+class DevNull(object):
+    def write(self, *args, **kwargs):
+        pass
+
+
+def jsonable(value):
+    if not isinstance(value, OK_TYPES):
+        return False
+    try:
+        json.dumps(value)
+    except Exception:
+        return False
+    return True
+
+
+def set_limits(limits):
+    for name, value in limits.items():
+        if value is None or name not in RLIMITS:
+            continue
+        if name == 'VMEM':
+            # As for codejail, 0 means no limit.
+            if not value:
+                continue
+            # The child starts with the worker's memory, imported modules and
+            # all, so only limit what the execution itself allocates.
+            try:
+                with open('/proc/self/statm') as statm:
+                    value += int(statm.read().split()[0]) * resource.getpagesize()
+            except (IOError, ValueError):
+                pass
+        resource.setrlimit(RLIMITS[name], (value, value))
+
+
+def run_child(execution, output_fd):
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    sys.stdout = DevNull()
+    output = os.fdopen(output_fd, 'w')
+    set_limits(execution['limits'])
+    sys.path.extend(execution['python_path'])
+
+    g_dict = execution['globals']
+    try:
+        exec execution['code'] in g_dict
+    except BaseException:
+        output.write(json.dumps({'stderr': traceback.format_exc()}))
+        output.close()
+        os._exit(1)
+    g_dict = dict(
+        (key, value) for key, value in g_dict.iteritems()
+        if key != '__builtins__' and jsonable(value)
+    )
+    output.write(json.dumps({'globals': g_dict}))
+    output.close()
+    os._exit(0)
+
+
+def run(execution):
+    tmpdir = tempfile.mkdtemp(prefix='codejail-')
+    try:
+        for name, contents in execution['files']:
+            path = os.path.join(tmpdir, name)
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'wb') as output:
+                output.write(base64.b64decode(contents))
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os.setsid()
+                os.close(read_fd)
+                os.close(RESPONSES_FD)
+                os.chdir(tmpdir)
+                run_child(execution, write_fd)
+            finally:
+                os._exit(1)
+        os.close(write_fd)
+
+        realtime = execution['limits'].get('REALTIME')
+        deadline = time.time() + realtime if realtime else None
+        chunks = []
+        while True:
+            timeout = max(deadline - time.time(), 0) if deadline else None
+            readable = select.select([read_fd], [], [], timeout)[0]
+            if not readable:
+                kill_group(pid)
+                break
+            chunk = os.read(read_fd, 65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        os.close(read_fd)
+        status = os.waitpid(pid, 0)[1]
+        # Kill anything the child left running.
+        kill_group(pid)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    if os.WIFSIGNALED(status):
+        status = -os.WTERMSIG(status)
+    else:
+        status = os.WEXITSTATUS(status)
+    try:
+        result = json.loads(''.join(chunks))
+    except ValueError:
+        result = {}
+    if status == 0 and 'globals' in result:
+        return result
+    # A child that didn't report an exception was killed, or broke out of
+    # run_child, so the worker isn't trusted with more executions.
+    return {'stderr': result.get('stderr', ''), 'status': status, 'retire': 'stderr' not in result}
+
+
+def kill_group(pgid):
+    try:
+        os.killpg(pgid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+RESPONSES_FD = os.dup(1)
+responses = os.fdopen(RESPONSES_FD, 'w')
+sys.stdout = DevNull()
+while True:
+    line = sys.stdin.readline()
+    if not line:
+        break
+    responses.write(json.dumps(run(json.loads(line))) + '\n')
+    responses.flush()
+"""
+
+
+class WorkerError(Exception):
+    """
+    Raised when a worker process can't be started or stops responding.
+    """
+    pass
+
+
+class SandboxWorker(object):
+    """
+    One worker process, which runs one execution at a time.
+    """
+    def __init__(self, command):
+        try:
+            self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, close_fds=True)
+        except OSError as err:
+            raise WorkerError(err)
+        self.executions = 0
+
+    def execute(self, execution, timeout=None):
+        """
+        Send `execution` to the worker, and return its result.
+
+        If the worker doesn't respond within `timeout` seconds, it is killed.
+        """
+        self.executions += 1
+        try:
+            self.process.stdin.write(json.dumps(execution) + '\n')
+            self.process.stdin.flush()
+            if not select.select([self.process.stdout], [], [], timeout)[0]:
+                self.kill()
+                raise WorkerError("worker didn't respond within {} seconds".format(timeout))
+            line = self.process.stdout.readline()
+        except (IOError, select.error) as err:
+            raise WorkerError(err)
+        if not line:
+            raise WorkerError("worker exited with status {}".format(self.process.poll()))
+        return json.loads(line)
+
+    def kill(self):
+        """
+        Kill the worker.
+        """
+        try:
+            self.process.kill()
+            self.process.wait()
+        except OSError:
+            pass
+
+    def stop(self):
+        """
+        Stop the worker; it exits once its stdin is closed.
+        """
+        try:
+            self.process.stdin.close()
+        except IOError:
+            pass
+
+
+class SandboxWorkerPool(object):
+    """
+    A pool of up to `size` workers, each replaced after `max_executions`.
+
+    Workers are started the first time the pool is used in a process, so a
+    pool configured before the web server forks isn't shared between its
+    processes.
+    """
+    def __init__(self, command, size, max_executions):
+        self.command = command
+        self.size = size
+        self.max_executions = max_executions
+        self._pid = None
+        self._idle = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        """
+        Start the workers, if they haven't been started in this process.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self._idle = Queue()
+                for __ in xrange(self.size):
+                    self._idle.put(self._new_worker())
+                self._pid = os.getpid()
+
+    def _new_worker(self):
+        """
+        Start a new worker, or return None if it can't be started.  The idle
+        queue holds None in place of that worker, and it is started again
+        the next time its place is used, so that the pool doesn't shrink.
+        """
+        try:
+            return SandboxWorker(self.command)
+        except WorkerError:
+            log.exception("Couldn't start a sandbox worker")
+            return None
+
+    def execute(self, execution):
+        """
+        Run `execution` on the next idle worker, and return its result.
+        """
+        self._start()
+        idle = self._idle
+        realtime = execution['limits'].get('REALTIME')
+        timeout = realtime + RESPONSE_TIMEOUT_MARGIN if realtime else None
+        worker = idle.get()
+        try:
+            if worker is None:
+                worker = SandboxWorker(self.command)
+            result = worker.execute(execution, timeout)
+            if result.pop('retire', False):
+                worker.executions = self.max_executions
+            return result
+        except Exception:
+            # Don't reuse a worker that might be in a bad state.
+            if worker is not None:
+                worker.executions = self.max_executions
+            raise
+        finally:
+            if worker is not None and worker.executions >= self.max_executions:
+                worker.stop()
+                worker = self._new_worker()
+            idle.put(worker)
+
+    def stop(self):
+        """
+        Stop the idle workers.
+        """
+        if self._pid != os.getpid():
+            return
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except Empty:
+                break
+            if worker is not None:
+                worker.stop()
+
+
+_POOL = None
+
+
+def configure(size, max_executions=100, python_bin=None, user=None, imports=()):
+    """
+    Run sandboxed code with a pool of `size` workers, or stop using the pool
+    if `size` is 0.
+
+    `python_bin` and `user` are the sandboxed Python and the user to run it
+    as, as configured for codejail.  If `python_bin` is None, the workers
+    run this Python unsandboxed.  `imports` are the names of the modules the
+    workers import before running any code.
+    """
+    global _POOL  # pylint: disable=global-statement
+    if _POOL is not None:
+        _POOL.stop()
+        _POOL = None
+    if not size:
+        return
+
+    if python_bin:
+        command = ['sudo', '-u', user] if user else []
+        command.extend([python_bin, '-E', '-B'])
+    else:
+        command = [sys.executable, '-B']
+    command.extend(['-c', WORKER_CODE])
+    command.extend(imports)
+    _POOL = SandboxWorkerPool(command, size, max_executions)
+
+
+def is_configured():
+    """
+    Return whether sandboxed code should be run with the worker pool.
+    """
+    return _POOL is not None
+
+
+def _read_files(path, name):
+    """
+    Return a list of (filename, contents) pairs for the file or directory at
+    `path`, named `name` in the sandbox.
+    """
+    if not os.path.isdir(path):
+        with open(path, 'rb') as source:
+            return [(name, source.read())]
+    files = []
+    for dirpath, __, filenames in os.walk(path):
+        for filename in filenames:
+            file_path = os.path.join(dirpath, filename)
+            files.extend(_read_files(file_path, os.path.join(name, os.path.relpath(file_path, path))))
+    return files
+
+
+def safe_exec(code, globals_dict, python_path=None, extra_files=None, slug=None):
+    """
+    Execute `code` with `globals_dict` in a pool worker, like
+    `codejail.safe_exec.safe_exec`.
+
+    The files and directories in `python_path` are copied into the sandbox
+    (unless they are named in `extra_files`) and added to the Python path,
+    and `extra_files` is a list of (filename, contents) pairs to create in it.
+
+    """
+    extra_files = extra_files or ()
+    extra_names = set(name for name, __ in extra_files)
+    files = list(extra_files)
+    sys_path = []
+    for pydir in python_path or ():
+        pybase = os.path.basename(pydir)
+        sys_path.append(pybase)
+        if pybase not in extra_names:
+            files.extend(_read_files(pydir, pybase))
+
+    execution = {
+        'code': code,
+        'globals': json_safe(globals_dict),
+        'files': [(name, base64.b64encode(contents)) for name, contents in files],
+        'python_path': sys_path,
+        'limits': dict(jail_code.LIMITS),
+    }
+    # codejail doesn't let sandboxed code start processes.
+    execution['limits'].setdefault('NPROC', 0)
+    log.debug("Executing jailed code %s in a worker", slug)
+    try:
+        result = _POOL.execute(execution)
+    except WorkerError as err:
+        raise SafeExecException("Couldn't execute jailed code: the sandbox worker failed: {}".format(err))
+
+    if 'globals' not in result:
+        raise SafeExecException(
+            "Couldn't execute jailed code: stdout: %r, stderr: %r with status code: %d" % (
+                '', result['stderr'].encode('utf-8'), result['status']
+            )
+        )
+    globals_dict.update(result['globals'])
@@ -0,0 +1,55 @@
+"""
+Test capa_problem.
+"""
+import textwrap
+import unittest
+
+from mock import patch
+
+from capa.safe_exec.tests.test_safe_exec import DictCache
+from . import test_capa_system, new_loncapa_problem
+
+
+class CacheScriptContextsTest(unittest.TestCase):
+    """
+    Test LoncapaProblem.cache_script_contexts.
+    """
+    XML = textwrap.dedent("""\
+        <problem>
+            <script type="loncapa/python">
+        value = random.randint(0, 999)
+        student = anonymous_student_id
+            </script>
+            <p>$value</p>
+        </problem>
+        """)
+
+    def load_problem(self, seed, anonymous_student_id, cache=None):
+        """Load the problem for the student with `seed` and `anonymous_student_id`."""
+        capa_system = test_capa_system()
+        capa_system.anonymous_student_id = anonymous_student_id
+        capa_system.cache = cache
+        return new_loncapa_problem(self.XML, capa_system=capa_system, seed=seed)
+
+    def test_contexts_cached(self):
+        cache = {}
+        problem = self.load_problem(723, 'student', cache=DictCache(cache))
+        self.assertEqual(len(cache), 1)
+
+        problem.cache_script_contexts([1, 2], ['student1', 'student2'])
+        self.assertEqual(len(cache), 3)
+
+        # Loading the problem for the other students finds their results in
+        # the cache, and they are those of running the script for them.
+        for seed, anonymous_student_id in [(1, 'student1'), (2, 'student2')]:
+            cached_problem = self.load_problem(seed, anonymous_student_id, cache=DictCache(cache))
+            expected_problem = self.load_problem(seed, anonymous_student_id)
+            self.assertEqual(cached_problem.context['value'], expected_problem.context['value'])
+            self.assertEqual(cached_problem.context['student'], anonymous_student_id)
+        self.assertEqual(len(cache), 3)
+
+    def test_no_cache(self):
+        problem = self.load_problem(723, 'student')
+        with patch('capa.capa_problem.safe_exec_many') as mock_safe_exec_many:
+            problem.cache_script_contexts([1], ['student1'])
+        self.assertFalse(mock_safe_exec_many.called)
@@ -568,6 +568,13 @@ class MixedModuleStore(ModuleStoreDraftAndPublished, ModuleStoreWriteBase):
         except NotImplementedError:
             return None, None
 
+    def get_structure(self, course_key, version_guid):
+        """
+        Returns the raw structure with the given version of a split course.
+        """
+        store = self._verify_modulestore_support(course_key, 'get_structure')
+        return store.get_structure(course_key, version_guid)
+
     def get_modulestore_type(self, course_id):
         """
         Returns a type which identifies which modulestore is servicing the given course_id.
@@ -0,0 +1,110 @@
+"""
+Performance test comparing the formats CourseStructureCache can store course structures in.
+"""
+import cPickle as pickle
+import logging
+import unittest
+import zlib
+from time import time
+
+import ddt
+from path import Path as path
+
+from xmodule.modulestore.split_mongo.compact_structure import decode_structure, encode_structure
+from xmodule.modulestore.tests.utils import TEST_DATA_DIR, VersioningModulestoreBuilder
+from xmodule.modulestore.xml_importer import import_course_from_xml
+
+# The courses in common/test/data whose structures are compared.
+TEST_COURSES = ('toy', 'simple', 'graded', 'manual-testing-complete', 'split_test_module')
+
+# Number of times each structure is decoded, to average out the timings.
+NUM_DECODES = 20
+
+# pylint: disable=invalid-name
+log = logging.getLogger(__name__)
+TEST_DIR = path(__file__).dirname()
+PLATFORM_ROOT = TEST_DIR.parent.parent.parent.parent.parent.parent
+TEST_DATA_ROOT = PLATFORM_ROOT / TEST_DATA_DIR
+
+
+def average_time(func, *args):
+    """
+    Return the average time, in milliseconds, that `func(*args)` takes.
+    """
+    start = time()
+    for __ in xrange(NUM_DECODES):
+        func(*args)
+    return (time() - start) * 1000 / NUM_DECODES
+
+
+def decode_one_block(data, block_key):
+    """
+    Decode the compact structure in `data`, and then just the block `block_key`.
+    """
+    return decode_structure(data)['blocks'][block_key]
+
+
+def decode_all_blocks(data):
+    """
+    Decode the compact structure in `data`, and then all of its blocks.
+    """
+    blocks = decode_structure(data)['blocks']
+    blocks.decode_all()
+    return blocks
+
+
+@ddt.ddt
+# Eventually, exclude this attribute from regular unittests while running *only* tests
+# with this attribute during regular performance tests.
+# @attr("perf_test")
+@unittest.skip
+class CourseStructureCacheFormatTest(unittest.TestCase):
+    """
+    This class exists to compare the cached size and the decoding time of
+    course structures stored with pickle and with the compact format.
+    """
+
+    # Use this attribute to skip this test on regular unittest CI runs.
+    perf_test = True
+
+    @ddt.data(*TEST_COURSES)
+    def test_structure_formats(self, course_name):
+        """
+        Log the compressed size of the course's structure in each format, and
+        the time taken to decompress and decode it.
+        """
+        with VersioningModulestoreBuilder().build() as (contentstore, store):
+            course_key = store.make_course_key('a', course_name, 'run')
+            import_course_from_xml(
+                store,
+                'test_user',
+                TEST_DATA_ROOT,
+                source_dirs=[course_name],
+                static_content_store=contentstore,
+                target_id=course_key,
+                create_if_not_present=True,
+                raise_on_failure=True,
+            )
+            structure = store._lookup_course(course_key).structure  # pylint: disable=protected-access
+
+        pickled = zlib.compress(pickle.dumps(structure, pickle.HIGHEST_PROTOCOL), 1)
+        compact = zlib.compress(encode_structure(structure), 1)
+
+        results = [
+            ('blocks', len(structure['blocks'])),
+            ('pickle_size', len(pickled)),
+            ('compact_size', len(compact)),
+            ('pickle_decode_ms', average_time(lambda: pickle.loads(zlib.decompress(pickled)))),
+            ('compact_decode_ms', average_time(lambda: decode_structure(zlib.decompress(compact)))),
+            (
+                'compact_decode_one_block_ms',
+                average_time(lambda: decode_one_block(zlib.decompress(compact), structure['root']))
+            ),
+            ('compact_decode_all_blocks_ms', average_time(lambda: decode_all_blocks(zlib.decompress(compact)))),
+        ]
+        log.info(
+            "CourseStructureCacheFormat:%s: %s",
+            course_name,
+            ", ".join("{}={:.2f}".format(name, value) for name, value in results)
+        )
+        self.assertEqual(decode_structure(zlib.decompress(compact)), structure)
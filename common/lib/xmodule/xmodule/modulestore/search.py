@@ -1,10 +1,150 @@
 ''' useful functions for finding content and its position '''
+import threading
+from collections import defaultdict, OrderedDict
 from logging import getLogger
 
+from . import ModuleStoreEnum
 from .exceptions import (ItemNotFoundError, NoPathToItem)
 
 LOGGER = getLogger(__name__)
 
+# The maximum number of course versions whose navigation indexes are kept in
+# the memory of each process.
+NAVIGATION_INDEX_CACHE_SIZE = 16
+
+_navigation_indexes = OrderedDict()
+_navigation_indexes_lock = threading.Lock()
+
+
+class CourseNavigationIndex(object):
+    '''
+    The path from a course to each block reachable from it, and the position of
+    each block among the children of its parent on that path, so that the paths
+    to many blocks can be found with one walk down the course.
+
+    Blocks are identified by their (block type, block id) pairs (see
+    _index_key), so that the index doesn't depend on the version or branch of
+    the course. A block reachable along more than one path (in a DAG) is given
+    the first path found.
+    '''
+    def __init__(self, root, get_children):
+        '''
+        root is the index key of the course, and get_children returns the index
+        keys of the children of a block, in order, given its index key.
+        '''
+        # index key -> tuple of the index keys from the course to the block
+        self.paths = {root: (root,)}
+        # index key -> position of the block among its parent's children, as a
+        # 1-indexed string
+        self.positions = {}
+
+        stack = [root]
+        while stack:
+            block_key = stack.pop()
+            path = self.paths[block_key]
+            for position, child_key in enumerate(get_children(block_key), 1):
+                if child_key not in self.paths:
+                    self.paths[child_key] = path + (child_key,)
+                    self.positions[child_key] = str(position)
+                    stack.append(child_key)
+
+    @classmethod
+    def from_structure(cls, structure):
+        '''
+        Build the index of a split course from its raw structure, without
+        instantiating its blocks.
+        '''
+        blocks = structure['blocks']
+
+        def get_children(block_key):
+            '''
+            Like get_children, skip the children that don't exist.
+            '''
+            return [
+                child_key for child_key in blocks[block_key].fields.get('children', [])
+                if child_key in blocks
+            ]
+
+        return cls(_index_key(structure['root']), get_children)
+
+    @classmethod
+    def from_course(cls, course):
+        '''
+        Build the index of a course by walking down its blocks.
+        '''
+        blocks = {_index_key(course.location): course}
+
+        def get_children(block_key):
+            '''
+            Return the index keys of the block's children, remembering them.
+            '''
+            # this calls get_children rather than just children b/c old mongo includes private children
+            # in children but not in get_children
+            children = blocks.pop(block_key).get_children()
+            blocks.update((_index_key(child.location), child) for child in children)
+            return [_index_key(child.location) for child in children]
+
+        return cls(_index_key(course.location), get_children)
+
+
+def _index_key(key):
+    '''
+    Return the key of a block in a CourseNavigationIndex given its usage key,
+    or its BlockKey in a split structure.
+    '''
+    if hasattr(key, 'block_type'):
+        return (key.block_type, key.block_id)
+    return (key.type, key.id)
+
+
+def get_navigation_index(modulestore, course_key, build_uncached=False):
+    '''
+    Return the CourseNavigationIndex of the course, or None if the course
+    doesn't exist.
+
+    The indexes of split courses are built from the course's raw structure,
+    and cached in memory by its version. Other courses have no version to
+    cache them by: their index is built anew, by walking down the course's
+    blocks, if build_uncached is True, and None is returned otherwise.
+    '''
+    version = None
+    if modulestore.get_modulestore_type(course_key) == ModuleStoreEnum.Type.split:
+        course = modulestore.get_course(course_key)
+        if course is None:
+            return None
+        version = course.location.course_key.version_guid
+
+    if version is None:
+        if not build_uncached:
+            return None
+        course = modulestore.get_course(course_key, depth=None)
+        return CourseNavigationIndex.from_course(course) if course is not None else None
+
+    cache_key = (course_key.for_branch(None), version)
+    with _navigation_indexes_lock:
+        navigation_index = _navigation_indexes.pop(cache_key, None)
+        if navigation_index is not None:
+            # Mark the index as recently used.
+            _navigation_indexes[cache_key] = navigation_index
+            return navigation_index
+
+    navigation_index = CourseNavigationIndex.from_structure(
+        modulestore.get_structure(course.location.course_key, version)
+    )
+    with _navigation_indexes_lock:
+        _navigation_indexes[cache_key] = navigation_index
+        while len(_navigation_indexes) > NAVIGATION_INDEX_CACHE_SIZE:
+            _navigation_indexes.popitem(last=False)
+    return navigation_index
+
+
+def clear_navigation_indexes():
+    '''
+    Clear the cached navigation indexes.
+    '''
+    with _navigation_indexes_lock:
+        _navigation_indexes.clear()
+
 
 def path_to_location(modulestore, usage_key, full_path=False):
     '''
@@ -29,6 +169,47 @@ def path_to_location(modulestore, usage_key, full_path=False):
     If the section is a sequential or vertical, position will be the children index
     of this location under that sequence.
     '''
+    with modulestore.bulk_operations(usage_key.course_key):
+        navigation_index = get_navigation_index(modulestore, usage_key.course_key)
+        return _path_to_location(modulestore, usage_key, full_path, navigation_index)
+
+
+def paths_to_locations(modulestore, usage_keys, full_path=False):
+    '''
+    Find the paths to many locations at once, walking each of their courses at
+    most once.
+
+    Args:
+        modulestore: which store holds the relevant objects
+        usage_keys: the :class:`UsageKey`s of the locations to which to generate the paths
+        full_path: :class:`Bool` if True, return the full paths to the locations. Default is False.
+
+    Returns:
+        a dict mapping each usage key to what path_to_location returns for it.
+        The locations that don't exist, or aren't accessible via a
+        chapter/section path, are left out.
+    '''
+    usage_keys_by_course = defaultdict(list)
+    for usage_key in usage_keys:
+        usage_keys_by_course[usage_key.course_key].append(usage_key)
+
+    paths = {}
+    for course_key, course_usage_keys in usage_keys_by_course.iteritems():
+        with modulestore.bulk_operations(course_key):
+            navigation_index = get_navigation_index(modulestore, course_key, build_uncached=True)
+            for usage_key in course_usage_keys:
+                try:
+                    paths[usage_key] = _path_to_location(modulestore, usage_key, full_path, navigation_index)
+                except (ItemNotFoundError, NoPathToItem):
+                    pass
+    return paths
+
+
+def _path_to_location(modulestore, usage_key, full_path, navigation_index):
+    '''
+    Implements path_to_location, looking the path up in navigation_index (a
+    CourseNavigationIndex, or None) when the location is in it.
+    '''
 
     def flatten(xs):
         '''Convert lisp-style (a, (b, (c, ()))) list into a python list.
@@ -74,7 +255,11 @@ def path_to_location(modulestore, usage_key, full_path=False):
             newpath = (next_usage, path)
             queue.append((parent, newpath))
 
-    with modulestore.bulk_operations(usage_key.course_key):
+    indexed_path = navigation_index.paths.get(_index_key(usage_key)) if navigation_index else None
+    if indexed_path is not None:
+        path = [usage_key.course_key.make_usage_key(*key) for key in indexed_path[:-1]]
+        path.append(usage_key)
+    else:
         if not modulestore.has_item(usage_key):
             raise ItemNotFoundError(usage_key)
 
@@ -82,37 +267,40 @@ def path_to_location(modulestore, usage_key, full_path=False):
         if path is None:
             raise NoPathToItem(usage_key)
 
-        if full_path:
-            return path
-
-        n = len(path)
-        course_id = path[0].course_key
-        # pull out the location names
-        chapter = path[1].name if n > 1 else None
-        section = path[2].name if n > 2 else None
-        vertical = path[3].name if n > 3 else None
-        # Figure out the position
-        position = None
-
-        # This block of code will find the position of a module within a nested tree
-        # of modules. If a problem is on tab 2 of a sequence that's on tab 3 of a
-        # sequence, the resulting position is 3_2. However, no positional modules
-        # (e.g. sequential and videosequence) currently deal with this form of
-        # representing nested positions. This needs to happen before jumping to a
-        # module nested in more than one positional module will work.
-        if n > 3:
-            position_list = []
-            for path_index in range(2, n - 1):
-                category = path[path_index].block_type
-                if category == 'sequential' or category == 'videosequence':
-                    section_desc = modulestore.get_item(path[path_index])
-                    # this calls get_children rather than just children b/c old mongo includes private children
-                    # in children but not in get_children
-                    child_locs = [c.location for c in section_desc.get_children()]
-                    # positions are 1-indexed, and should be strings to be consistent with
-                    # url parsing.
-                    position_list.append(str(child_locs.index(path[path_index + 1]) + 1))
-            position = "_".join(position_list)
+    if full_path:
+        return path
+
+    n = len(path)
+    course_id = path[0].course_key
+    # pull out the location names
+    chapter = path[1].name if n > 1 else None
+    section = path[2].name if n > 2 else None
+    vertical = path[3].name if n > 3 else None
+    # Figure out the position
+    position = None
+
+    # This block of code will find the position of a module within a nested tree
+    # of modules. If a problem is on tab 2 of a sequence that's on tab 3 of a
+    # sequence, the resulting position is 3_2. However, no positional modules
+    # (e.g. sequential and videosequence) currently deal with this form of
+    # representing nested positions. This needs to happen before jumping to a
+    # module nested in more than one positional module will work.
+    if n > 3:
+        position_list = []
+        for path_index in range(2, n - 1):
+            category = path[path_index].block_type
+            if category == 'sequential' or category == 'videosequence':
+                if indexed_path is not None:
+                    position_list.append(navigation_index.positions[_index_key(path[path_index + 1])])
+                    continue
+                section_desc = modulestore.get_item(path[path_index])
+                # this calls get_children rather than just children b/c old mongo includes private children
+                # in children but not in get_children
+                child_locs = [c.location for c in section_desc.get_children()]
+                # positions are 1-indexed, and should be strings to be consistent with
+                # url parsing.
+                position_list.append(str(child_locs.index(path[path_index + 1]) + 1))
+        position = "_".join(position_list)
 
     return (course_id, chapter, section, vertical, position, path[-1])
 
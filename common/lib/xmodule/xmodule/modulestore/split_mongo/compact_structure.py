@@ -0,0 +1,219 @@
+"""
+A compact serialization format for split modulestore course structures, used by
+:class:`~xmodule.modulestore.split_mongo.mongo_connection.CourseStructureCache`.
+
+Pickling a whole structure means that reading it back constructs every
+:class:`BlockData` in the course, even if the caller only needs a few of them.
+This format instead stores:
+
+* the structure's top-level fields, the distinct block types, and the
+  (type index, block id) pair of every block, pickled together as a header;
+* an index of the offset of every block's data;
+* each block's data, pickled separately as a tuple of its fields in a fixed
+  order, with its children stored as indices into the list of blocks.
+
+Only the header is unpickled when the structure is decoded. The structure's
+'blocks' mapping is a :class:`LazyBlockDict`, which decodes each block the
+first time it is accessed.
+"""
+import cPickle as pickle
+import struct
+from array import array
+from collections import MutableMapping
+
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.split_mongo import BlockKey
+
+
+# Marks data in this format, so that it can be told apart from a pickled structure.
+MAGIC = 'CSF1'
+
+# The number of header bytes and the number of blocks.
+_LENGTHS = struct.Struct('!II')
+
+# The order in which EditInfo fields are stored.
+_EDIT_INFO_FIELDS = (
+    'previous_version',
+    'update_version',
+    'source_version',
+    'edited_on',
+    'edited_by',
+    'original_usage',
+    'original_usage_version',
+)
+
+
+def is_compact_structure(data):
+    """
+    Return whether `data` was produced by :func:`encode_structure`.
+    """
+    return data.startswith(MAGIC)
+
+
+def encode_structure(structure):
+    """
+    Return `structure` (as returned by ``structure_from_mongo``) serialized as a string.
+    """
+    block_keys = list(structure['blocks'])
+    block_indices = {block_key: index for index, block_key in enumerate(block_keys)}
+    block_types = []
+    type_indices = {}
+
+    def type_index(block_type):
+        """
+        Return the index of `block_type` in `block_types`, adding it if necessary.
+        """
+        if block_type not in type_indices:
+            type_indices[block_type] = len(block_types)
+            block_types.append(block_type)
+        return type_indices[block_type]
+
+    offsets = array('I', [0])
+    block_data = []
+    for block_key in block_keys:
+        block = structure['blocks'][block_key]
+        fields = block.fields
+        children = None
+        if 'children' in fields:
+            fields = dict(fields)
+            # Children that aren't in the structure are stored as BlockKeys.
+            children = [block_indices.get(child, child) for child in fields.pop('children')]
+        data = pickle.dumps(
+            (
+                type_index(block.block_type),
+                block.definition,
+                fields,
+                children,
+                block.defaults,
+                tuple(getattr(block.edit_info, field) for field in _EDIT_INFO_FIELDS),
+            ),
+            pickle.HIGHEST_PROTOCOL
+        )
+        block_data.append(data)
+        offsets.append(offsets[-1] + len(data))
+
+    header = {field: value for field, value in structure.iteritems() if field != 'blocks'}
+    header_data = pickle.dumps(
+        (header, block_types, [(type_index(block_key.type), block_key.id) for block_key in block_keys]),
+        pickle.HIGHEST_PROTOCOL
+    )
+    return ''.join(
+        [MAGIC, _LENGTHS.pack(len(header_data), len(block_keys)), header_data, offsets.tostring()] + block_data
+    )
+
+
+def decode_structure(data):
+    """
+    Return the structure serialized in `data` by :func:`encode_structure`. Its
+    blocks are decoded as they are accessed.
+    """
+    position = len(MAGIC)
+    header_length, num_blocks = _LENGTHS.unpack_from(data, position)
+    position += _LENGTHS.size
+    structure, block_types, block_ids = pickle.loads(data[position:position + header_length])
+    position += header_length
+
+    offsets = array('I')
+    offsets_length = offsets.itemsize * (num_blocks + 1)
+    offsets.fromstring(data[position:position + offsets_length])
+    position += offsets_length
+
+    # BlockKey.__new__ checks its arguments with a contract; they come from a
+    # valid structure, so skip that for speed.
+    block_keys = [tuple.__new__(BlockKey, (block_types[type_index], block_id)) for type_index, block_id in block_ids]
+
+    def decode_block(index):
+        """
+        Return the BlockData for the block at `index` in `block_keys`.
+        """
+        start = position + offsets[index]
+        type_index, definition, fields, children, defaults, edit_info = pickle.loads(
+            data[start:position + offsets[index + 1]]
+        )
+        if children is not None:
+            fields['children'] = [
+                block_keys[child] if isinstance(child, int) else child
+                for child in children
+            ]
+        return BlockData(
+            block_type=block_types[type_index],
+            definition=definition,
+            fields=fields,
+            defaults=defaults,
+            edit_info=dict(zip(_EDIT_INFO_FIELDS, edit_info)),
+        )
+
+    structure['blocks'] = LazyBlockDict(
+        decode_block,
+        ((block_key, _EncodedBlock(index)) for index, block_key in enumerate(block_keys))
+    )
+    return structure
+
+
+class _EncodedBlock(object):
+    """
+    The value stored in a :class:`LazyBlockDict` for a block that hasn't been decoded yet.
+    """
+    __slots__ = ('index',)
+
+    def __init__(self, index):
+        self.index = index
+
+
+class LazyBlockDict(MutableMapping):
+    """
+    A mapping of BlockKey to BlockData which decodes each block the first
+    time it is accessed.
+
+    The blocks are kept in an inner dict rather than by subclassing dict, so
+    that every way of reading a value, including ``dict(blocks)`` and
+    ``other.update(blocks)``, goes through ``__getitem__`` and is decoded.
+    Methods that only need keys (``in``, ``len``, ``keys``, iteration) don't
+    decode anything. Copying or pickling it returns a plain dict.
+    """
+    def __init__(self, decode_block, encoded_blocks):
+        self._blocks = dict(encoded_blocks)
+        self._decode_block = decode_block
+
+    def __getitem__(self, block_key):
+        value = self._blocks[block_key]
+        if isinstance(value, _EncodedBlock):
+            value = self._blocks[block_key] = self._decode_block(value.index)
+        return value
+
+    def __setitem__(self, block_key, value):
+        self._blocks[block_key] = value
+
+    def __delitem__(self, block_key):
+        del self._blocks[block_key]
+
+    def __contains__(self, block_key):
+        return block_key in self._blocks
+
+    def __iter__(self):
+        return iter(self._blocks)
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def keys(self):
+        return self._blocks.keys()
+
+    def decode_all(self):
+        """
+        Decode all of the blocks that haven't been decoded yet.
+        """
+        for block_key in self._blocks.keys():
+            self[block_key]  # pylint: disable=pointless-statement
+
+    def copy(self):
+        """
+        Return a plain dict of the decoded blocks.
+        """
+        return dict(self.iteritems())
+
+    def __reduce__(self):
+        return (dict, (self.copy(),))
+
+    def __repr__(self):
+        return repr(self.copy())
@@ -8,6 +8,8 @@ import zlib
 import pymongo
 import pytz
 import re
+import threading
+from collections import OrderedDict
 from contextlib import contextmanager
 from time import time
 
@@ -15,6 +17,7 @@ from time import time
 from pymongo.errors import DuplicateKeyError  # pylint: disable=unused-import
 
 try:
+    from django.conf import settings
     from django.core.cache import caches, InvalidCacheBackendError
     DJANGO_AVAILABLE = True
 except ImportError:
@@ -27,6 +30,9 @@ from mongodb_proxy import autoretry_read
 from xmodule.exceptions import HeartbeatFailure
 from xmodule.modulestore import BlockData
 from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.compact_structure import (
+    decode_structure, encode_structure, is_compact_structure
+)
 from xmodule.mongo_connection import connect_to_mongodb
 
 
@@ -42,6 +48,34 @@ def get_cache(alias):
     return caches[alias]
 
 
+# The process-wide cache of deserialized course structures, created on first use.
+_LOCAL_STRUCTURE_CACHE = None
+_LOCAL_STRUCTURE_CACHE_LOCK = threading.Lock()
+
+
+def get_local_structure_cache():
+    """
+    Return the in-process :class:`StructureLRUCache`, or None if it is disabled.
+
+    Its size is set by the COURSE_STRUCTURE_LOCAL_CACHE_MAX_BLOCKS setting; if
+    that is missing or 0, no structures are cached in-process.
+
+    Note: The primary purpose of this is to mock the cache in test_split_modulestore.py
+    """
+    global _LOCAL_STRUCTURE_CACHE  # pylint: disable=global-statement
+    if not DJANGO_AVAILABLE:
+        return None
+
+    max_blocks = getattr(settings, 'COURSE_STRUCTURE_LOCAL_CACHE_MAX_BLOCKS', 0)
+    if not max_blocks:
+        return None
+
+    with _LOCAL_STRUCTURE_CACHE_LOCK:
+        if _LOCAL_STRUCTURE_CACHE is None or _LOCAL_STRUCTURE_CACHE.max_blocks != max_blocks:
+            _LOCAL_STRUCTURE_CACHE = StructureLRUCache(max_blocks)
+        return _LOCAL_STRUCTURE_CACHE
+
+
 def round_power_2(value):
     """
     Return value rounded up to the nearest power of 2.
@@ -206,7 +240,7 @@ def structure_to_mongo(structure, course_context=None):
         tagger.measure('blocks', len(structure['blocks']))
 
         check('BlockKey', structure['root'])
-        check('dict(BlockKey: BlockData)', structure['blocks'])
+        check('map(BlockKey: BlockData)', structure['blocks'])
         for block in structure['blocks'].itervalues():
             if 'children' in block.fields:
                 check('list(BlockKey)', block.fields['children'])
@@ -223,58 +257,162 @@ def structure_to_mongo(structure, course_context=None):
         return new_structure
 
 
+class StructureLRUCache(object):
+    """
+    A thread-safe, in-process, least-recently-used cache of deserialized course
+    structures, keyed by structure version id. Its size is bounded by the total
+    number of blocks in the cached structures, rather than by the number of
+    structures, since course sizes vary by orders of magnitude.
+
+    Structures are shared between all of the callers that fetch them, so they
+    must not be modified (the modulestore copies a structure before changing it,
+    in ``version_structure``).
+    """
+    def __init__(self, max_blocks):
+        self.max_blocks = max_blocks
+        self.num_blocks = 0
+        self._structures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Return the structure cached for `key`, or None, and mark it as the
+        most recently used.
+        """
+        with self._lock:
+            entry = self._structures.pop(key, None)
+            if entry is None:
+                return None
+            self._structures[key] = entry
+            return entry[0]
+
+    def set(self, key, structure):
+        """
+        Cache `structure` for `key`, evicting the least recently used structures
+        until the cache fits in `max_blocks`. Structures with more blocks than
+        that are not cached at all.
+        """
+        num_blocks = len(structure['blocks'])
+        if num_blocks > self.max_blocks:
+            return
+
+        with self._lock:
+            previous = self._structures.pop(key, None)
+            if previous is not None:
+                self.num_blocks -= previous[1]
+            self._structures[key] = (structure, num_blocks)
+            self.num_blocks += num_blocks
+            while self.num_blocks > self.max_blocks:
+                __, (__, evicted_blocks) = self._structures.popitem(last=False)
+                self.num_blocks -= evicted_blocks
+
+    def clear(self):
+        """
+        Remove all structures from the cache.
+        """
+        with self._lock:
+            self._structures.clear()
+            self.num_blocks = 0
+
+    def __len__(self):
+        return len(self._structures)
+
+
 class CourseStructureCache(object):
     """
     Wrapper around django cache object to cache course structure objects.
-    The course structures are pickled and compressed when cached.
+    The course structures are serialized and compressed when cached.
+
+    The COURSE_STRUCTURE_CACHE_FORMAT setting selects the serialization format:
+    'pickle' (the default) pickles the whole structure, and 'compact' uses
+    :mod:`~xmodule.modulestore.split_mongo.compact_structure`, which only
+    decodes blocks as they are used. Structures in either format can be read
+    whichever format is selected, so the setting can be changed at any time.
+
+    Deserialized structures are also kept in an in-process LRU cache (see
+    :func:`get_local_structure_cache`), which is checked before the django
+    cache, so that frequently used structures don't have to be decompressed
+    and unpickled on every request.
 
     If the 'course_structure_cache' doesn't exist, then don't do anything for
     for set and get.
     """
+    PICKLE_FORMAT = 'pickle'
+    COMPACT_FORMAT = 'compact'
+
     def __init__(self):
         self.cache = None
+        self.local_cache = get_local_structure_cache()
+        self.format = self.PICKLE_FORMAT
         if DJANGO_AVAILABLE:
+            self.format = getattr(settings, 'COURSE_STRUCTURE_CACHE_FORMAT', self.PICKLE_FORMAT)
             try:
                 self.cache = get_cache('course_structure_cache')
             except InvalidCacheBackendError:
                 pass
 
     def get(self, key, course_context=None):
-        """Pull the compressed, pickled struct data from cache and deserialize."""
+        """
+        Return the deserialized struct data from the in-process cache, or pull
+        the compressed, serialized struct data from cache and deserialize.
+        """
+        if self.local_cache is not None:
+            with TIMER.timer("CourseStructureCache.get_local", course_context) as tagger:
+                structure = self.local_cache.get(key)
+                tagger.tag(from_cache=str(structure is not None).lower())
+                tagger.measure('local_cache_blocks', self.local_cache.num_blocks)
+                if structure is not None:
+                    return structure
+
         if self.cache is None:
             return None
 
         with TIMER.timer("CourseStructureCache.get", course_context) as tagger:
-            compressed_pickled_data = self.cache.get(key)
-            tagger.tag(from_cache=str(compressed_pickled_data is not None).lower())
+            compressed_data = self.cache.get(key)
+            tagger.tag(from_cache=str(compressed_data is not None).lower())
 
-            if compressed_pickled_data is None:
+            if compressed_data is None:
                 # Always log cache misses, because they are unexpected
                 tagger.sample_rate = 1
                 return None
 
-            tagger.measure('compressed_size', len(compressed_pickled_data))
+            tagger.measure('compressed_size', len(compressed_data))
 
-            pickled_data = zlib.decompress(compressed_pickled_data)
-            tagger.measure('uncompressed_size', len(pickled_data))
+            data = zlib.decompress(compressed_data)
+            tagger.measure('uncompressed_size', len(data))
 
-            return pickle.loads(pickled_data)
+            if is_compact_structure(data):
+                tagger.tag(format=self.COMPACT_FORMAT)
+                structure = decode_structure(data)
+            else:
+                tagger.tag(format=self.PICKLE_FORMAT)
+                structure = pickle.loads(data)
+            if self.local_cache is not None:
+                self.local_cache.set(key, structure)
+            return structure
 
     def set(self, key, structure, course_context=None):
-        """Given a structure, will pickle, compress, and write to cache."""
+        """Given a structure, will serialize, compress, and write to cache."""
+        if self.local_cache is not None:
+            self.local_cache.set(key, structure)
+
         if self.cache is None:
             return None
 
         with TIMER.timer("CourseStructureCache.set", course_context) as tagger:
-            pickled_data = pickle.dumps(structure, pickle.HIGHEST_PROTOCOL)
-            tagger.measure('uncompressed_size', len(pickled_data))
+            tagger.tag(format=self.format)
+            if self.format == self.COMPACT_FORMAT:
+                data = encode_structure(structure)
+            else:
+                data = pickle.dumps(structure, pickle.HIGHEST_PROTOCOL)
+            tagger.measure('uncompressed_size', len(data))
 
             # 1 = Fastest (slightly larger results)
-            compressed_pickled_data = zlib.compress(pickled_data, 1)
-            tagger.measure('compressed_size', len(compressed_pickled_data))
+            compressed_data = zlib.compress(data, 1)
+            tagger.measure('compressed_size', len(compressed_data))
 
             # Stuctures are immutable, so we set a timeout of "never"
-            self.cache.set(key, compressed_pickled_data, None)
+            self.cache.set(key, compressed_data, None)
 
 
 class MongoConnection(object):
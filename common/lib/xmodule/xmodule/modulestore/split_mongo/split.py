@@ -748,12 +748,17 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
                 definitions = {definition['_id']: definition
                                for definition in descendent_definitions}
 
-                for block in new_module_data.itervalues():
+                for block_key, block in new_module_data.items():
                     if block.definition in definitions:
                         definition = definitions[block.definition]
+                        # The block is shared with every other user of the (cached) structure,
+                        # so load the definition into a copy of it instead of the block itself.
+                        block = copy.copy(block)
+                        block.fields = dict(block.fields)
                         # convert_fields gets done later in the runtime's xblock_from_json
                         block.fields.update(definition.get('fields'))
                         block.definition_loaded = True
+                        new_module_data[block_key] = block
 
             system.module_data.update(new_module_data)
             return system.module_data
@@ -2529,7 +2534,7 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
 
             return result
 
-    @contract(root_block_key=BlockKey, blocks='dict(BlockKey: BlockData)')
+    @contract(root_block_key=BlockKey, blocks='map(BlockKey: BlockData)')
     def _remove_subtree(self, root_block_key, blocks):
         """
         Remove the subtree rooted at root_block_key
@@ -3057,8 +3062,8 @@ class SplitMongoModuleStore(SplitBulkWriteMixin, ModuleStoreWriteBase):
 
     @contract(
         block_key=BlockKey,
-        source_blocks="dict(BlockKey: *)",
-        destination_blocks="dict(BlockKey: *)",
+        source_blocks="map(BlockKey: *)",
+        destination_blocks="map(BlockKey: *)",
         blacklist="list(BlockKey) | str",
     )
     def _copy_subdag(self, user_id, destination_version, block_key, source_blocks, destination_blocks, blacklist):
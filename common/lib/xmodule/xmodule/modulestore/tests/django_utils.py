@@ -12,6 +12,7 @@ from django.contrib.auth.models import User
 from django.test import TestCase
 from django.test.utils import override_settings
 from request_cache.middleware import RequestCache
+from static_replace import clear_course_static_urls
 
 from courseware.field_overrides import OverrideFieldData  # pylint: disable=import-error
 from openedx.core.lib.tempdir import mkdtemp_clean
@@ -278,6 +279,9 @@ class SharedModuleStoreTestCase(TestCase):
         # OverrideFieldData.provider_classes is always reset to `None` so
         # that they're recalculated for every test
         OverrideFieldData.provider_classes = None
+        # Static urls memoized by earlier tests may point at courses that
+        # have since been dropped and recreated
+        clear_course_static_urls()
         super(SharedModuleStoreTestCase, self).setUp()
 
     def reset(self):
@@ -405,6 +409,10 @@ class ModuleStoreTestCase(TestCase):
         # that they're recalculated for every test
         OverrideFieldData.provider_classes = None
 
+        # Static urls memoized by earlier tests may point at courses that
+        # have since been dropped and recreated
+        clear_course_static_urls()
+
         super(ModuleStoreTestCase, self).setUp()
 
         SignalHandler.course_published.disconnect(trigger_update_xblocks_cache_task)
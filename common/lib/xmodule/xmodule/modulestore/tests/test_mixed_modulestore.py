@@ -41,7 +41,9 @@ from xmodule.modulestore import ModuleStoreEnum
 from xmodule.modulestore.draft_and_published import UnsupportedRevisionError, DIRECT_ONLY_CATEGORIES
 from xmodule.modulestore.exceptions import ItemNotFoundError, DuplicateCourseError, ReferentialIntegrityError, NoPathToItem
 from xmodule.modulestore.mixed import MixedModuleStore
-from xmodule.modulestore.search import path_to_location, navigation_index
+from xmodule.modulestore.search import (
+    CourseNavigationIndex, path_to_location, paths_to_locations, navigation_index
+)
 from xmodule.modulestore.tests.factories import check_mongo_calls, check_exact_number_of_calls, \
     mongo_uses_error_check
 from xmodule.modulestore.tests.utils import create_modulestore_instance, LocationMixin, mock_tab_from_json
@@ -1272,6 +1274,55 @@ class TestMixedModuleStore(CommonMixedModuleStoreSetup):
         with self.assertRaises(NoPathToItem):
             path_to_location(self.store, orphan)
 
+    @ddt.data(ModuleStoreEnum.Type.mongo, ModuleStoreEnum.Type.split)
+    def test_paths_to_locations(self, default_ms):
+        """
+        Make sure that paths_to_locations returns what path_to_location does,
+        leaving out the locations without a path
+        """
+        self.initdb(default_ms)
+
+        course_key = self.course_locations[self.MONGO_COURSEID].course_key
+        with self.store.branch_setting(ModuleStoreEnum.Branch.published_only, course_key):
+            self._create_block_hierarchy()
+
+            orphan = course_key.make_usage_key('chapter', 'OrphanChapter')
+            self.store.create_item(self.user_id, orphan.course_key, orphan.block_type, block_id=orphan.block_id)
+            locations = [
+                self.problem_x1a_2,
+                self.chapter_x,
+                self.vertical_y1a,
+                course_key.make_usage_key('video', 'WelcomeX'),
+                orphan,
+            ]
+
+            paths = paths_to_locations(self.store, locations)
+            self.assertEqual(set(paths), {self.problem_x1a_2, self.chapter_x, self.vertical_y1a})
+            for location, path in paths.iteritems():
+                self.assertEqual(path, path_to_location(self.store, location))
+
+    def test_navigation_index_from_structure(self):
+        """
+        Make sure that the navigation index of a split course built from its
+        structure matches the one built by walking down its blocks.
+        """
+        self.initdb(ModuleStoreEnum.Type.split)
+        course_key = self.course_locations[self.MONGO_COURSEID].course_key
+        with self.store.branch_setting(ModuleStoreEnum.Branch.published_only, course_key):
+            self._create_block_hierarchy()
+            course = self.store.get_course(course_key, depth=None)
+            structure = self.store.get_structure(course_key, course.location.course_key.version_guid)
+
+            with patch(
+                'xmodule.modulestore.split_mongo.caching_descriptor_system.CachingDescriptorSystem._load_item'
+            ) as load_item:
+                from_structure = CourseNavigationIndex.from_structure(structure)
+            self.assertFalse(load_item.called)
+
+            from_course = CourseNavigationIndex.from_course(course)
+            self.assertEqual(from_structure.paths, from_course.paths)
+            self.assertEqual(from_structure.positions, from_course.positions)
+
     def test_xml_path_to_location(self):
         """
         Make sure that path_to_location works: should be passed a modulestore
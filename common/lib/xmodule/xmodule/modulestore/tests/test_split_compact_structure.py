@@ -0,0 +1,97 @@
+""" Test the compact serialization format for split modulestore course structures """
+import copy
+import cPickle as pickle
+import datetime
+import unittest
+
+from bson.objectid import ObjectId
+from pytz import UTC
+
+from xmodule.modulestore import BlockData
+from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.compact_structure import (
+    decode_structure, encode_structure, is_compact_structure, LazyBlockDict
+)
+
+
+class TestCompactStructure(unittest.TestCase):
+    """ Test encoding and decoding course structures """
+    def setUp(self):
+        super(TestCompactStructure, self).setUp()
+        self.course_key = BlockKey('course', 'course')
+        self.problem_keys = [BlockKey('problem', 'problem_{}'.format(index)) for index in range(3)]
+        version = ObjectId()
+        edit_info = {
+            'edited_on': datetime.datetime(2016, 1, 1, tzinfo=UTC),
+            'edited_by': 42,
+            'update_version': version,
+        }
+        blocks = {
+            problem_key: BlockData(
+                block_type='problem',
+                definition=ObjectId(),
+                fields={'display_name': u'Probl\xe8me {}'.format(index), 'weight': 2},
+                edit_info=edit_info,
+            )
+            for index, problem_key in enumerate(self.problem_keys)
+        }
+        blocks[self.course_key] = BlockData(
+            block_type='course',
+            definition=ObjectId(),
+            # Include a child that isn't in the structure.
+            fields={'children': self.problem_keys + [BlockKey('problem', 'missing')]},
+            defaults={'display_name': u'Course'},
+            edit_info=edit_info,
+        )
+        self.structure = {
+            '_id': version,
+            'root': self.course_key,
+            'previous_version': None,
+            'schema_version': 1,
+            'blocks': blocks,
+        }
+
+    def test_round_trip(self):
+        data = encode_structure(self.structure)
+        self.assertTrue(is_compact_structure(data))
+        self.assertFalse(is_compact_structure(pickle.dumps(self.structure, pickle.HIGHEST_PROTOCOL)))
+
+        structure = decode_structure(data)
+        self.assertEqual(structure, self.structure)
+        self.assertEqual(structure['root'], self.course_key)
+        children = structure['blocks'][self.course_key].fields['children']
+        self.assertEqual(children, self.problem_keys + [BlockKey('problem', 'missing')])
+        self.assertTrue(all(isinstance(child, BlockKey) for child in children))
+
+    def test_lazy_decoding(self):
+        blocks = decode_structure(encode_structure(self.structure))['blocks']
+        self.assertIsInstance(blocks, LazyBlockDict)
+
+        # Looking up keys doesn't decode any blocks.
+        self.assertEqual(len(blocks), 4)
+        self.assertIn(self.course_key, blocks)
+        self.assertEqual(set(blocks), set(self.structure['blocks']))
+
+        block = blocks[self.problem_keys[0]]
+        self.assertEqual(block, self.structure['blocks'][self.problem_keys[0]])
+        # Blocks are only decoded once, so changes to them are kept.
+        self.assertIs(blocks[self.problem_keys[0]], block)
+        self.assertIs(blocks.get(self.problem_keys[0]), block)
+        self.assertIsNone(blocks.get(BlockKey('problem', 'missing')))
+
+        self.assertEqual(dict(blocks.items()), self.structure['blocks'])
+
+    def test_copies_are_plain_dicts(self):
+        structure = decode_structure(encode_structure(self.structure))
+        for copied in (copy.deepcopy(structure), pickle.loads(pickle.dumps(structure, pickle.HIGHEST_PROTOCOL))):
+            self.assertIs(type(copied['blocks']), dict)
+            self.assertEqual(copied, self.structure)
+
+    def test_copied_blocks_are_decoded(self):
+        blocks = decode_structure(encode_structure(self.structure))['blocks']
+        updated = {}
+        updated.update(blocks)
+        for copied in (dict(blocks), updated, copy.copy(blocks), blocks.copy()):
+            self.assertIs(type(copied), dict)
+            self.assertTrue(all(isinstance(block, BlockData) for block in copied.itervalues()))
+            self.assertEqual(copied, self.structure['blocks'])
@@ -14,6 +14,7 @@ import ddt
 from contracts import contract
 from nose.plugins.attrib import attr
 from django.core.cache import caches, InvalidCacheBackendError
+from django.test.utils import override_settings
 
 from openedx.core.lib import tempdir
 from xblock.fields import Reference, ReferenceList, ReferenceValueDict
@@ -32,6 +33,7 @@ from xmodule.fields import Date, Timedelta
 from xmodule.modulestore.split_mongo.split import SplitMongoModuleStore
 from xmodule.modulestore.tests.test_modulestore import check_has_course_method
 from xmodule.modulestore.split_mongo import BlockKey
+from xmodule.modulestore.split_mongo.mongo_connection import StructureLRUCache
 from xmodule.modulestore.tests.factories import check_mongo_calls
 from xmodule.modulestore.tests.mongo_connection import MONGO_PORT_NUM, MONGO_HOST
 from xmodule.modulestore.tests.utils import mock_tab_from_json
@@ -928,6 +930,7 @@ class SplitModuleCourseTests(SplitModuleTest):
         self.assertEqual(root_block_key.name, "course")
 
 
+@ddt.ddt
 class TestCourseStructureCache(SplitModuleTest):
     """Tests for the CourseStructureCache"""
 
@@ -949,16 +952,19 @@ class TestCourseStructureCache(SplitModuleTest):
 
         super(TestCourseStructureCache, self).setUp()
 
+    @ddt.data('pickle', 'compact')
     @patch('xmodule.modulestore.split_mongo.mongo_connection.get_cache')
-    def test_course_structure_cache(self, mock_get_cache):
+    def test_course_structure_cache(self, cache_format, mock_get_cache):
         # force get_cache to return the default cache so we can test
         # its caching behavior
         mock_get_cache.return_value = self.cache
 
-        with check_mongo_calls(1):
-            not_cached_structure = self._get_structure(self.new_course)
+        with override_settings(COURSE_STRUCTURE_CACHE_FORMAT=cache_format):
+            with check_mongo_calls(1):
+                not_cached_structure = self._get_structure(self.new_course)
 
-        # when cache is warmed, we should have one fewer mongo call
+        # when cache is warmed, we should have one fewer mongo call (the
+        # cached structure can be read whichever format is configured)
         with check_mongo_calls(0):
             cached_structure = self._get_structure(self.new_course)
 
@@ -992,6 +998,40 @@ class TestCourseStructureCache(SplitModuleTest):
         # now make sure that you get the same structure
         self.assertEqual(cached_structure, not_cached_structure)
 
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_local_structure_cache')
+    def test_local_structure_cache(self, mock_get_local_cache):
+        local_cache = StructureLRUCache(1000)
+        mock_get_local_cache.return_value = local_cache
+
+        with check_mongo_calls(1):
+            not_cached_structure = self._get_structure(self.new_course)
+
+        # The django cache is a dummy cache, so this is served from the
+        # in-process cache, without deserializing the structure again
+        with check_mongo_calls(0):
+            cached_structure = self._get_structure(self.new_course)
+
+        self.assertIs(cached_structure, not_cached_structure)
+        self.assertEqual(len(local_cache), 1)
+
+    @patch('xmodule.modulestore.split_mongo.mongo_connection.get_local_structure_cache')
+    def test_local_structure_cache_not_modified(self, mock_get_local_cache):
+        """
+        Test that loading a course's definitions eagerly doesn't copy them into
+        the structure that is shared through the in-process cache.
+        """
+        mock_get_local_cache.return_value = StructureLRUCache(1000)
+        structure = self._get_structure(self.new_course)
+        block_fields = {block_key: dict(block.fields) for block_key, block in structure['blocks'].iteritems()}
+
+        modulestore().get_course(self.new_course.id, depth=None, lazy=False)
+
+        self.assertIs(self._get_structure(self.new_course), structure)
+        self.assertEqual(
+            {block_key: block.fields for block_key, block in structure['blocks'].iteritems()},
+            block_fields
+        )
+
     def _get_structure(self, course):
         """
         Helper function to get a structure from a course.
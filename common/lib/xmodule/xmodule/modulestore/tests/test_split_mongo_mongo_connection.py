@@ -1,7 +1,7 @@
 """ Test the behavior of split_mongo/MongoConnection """
 import unittest
 from mock import patch
-from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection
+from xmodule.modulestore.split_mongo.mongo_connection import MongoConnection, StructureLRUCache
 from xmodule.exceptions import HeartbeatFailure
 
 
@@ -17,3 +17,49 @@ class TestHeartbeatFailureException(unittest.TestCase):
 
             with self.assertRaises(HeartbeatFailure):
                 useless_conn.heartbeat()
+
+
+class TestStructureLRUCache(unittest.TestCase):
+    """ Test the in-process cache of deserialized course structures """
+    def _structure(self, num_blocks):
+        """ Return a fake structure with `num_blocks` blocks """
+        return {'blocks': {index: None for index in range(num_blocks)}}
+
+    def test_get_and_set(self):
+        cache = StructureLRUCache(10)
+        structure = self._structure(3)
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', structure)
+        self.assertIs(cache.get('a'), structure)
+        self.assertEqual(cache.num_blocks, 3)
+
+        # Setting the same key again doesn't count its blocks twice
+        cache.set('a', structure)
+        self.assertEqual(cache.num_blocks, 3)
+
+    def test_evicts_least_recently_used(self):
+        cache = StructureLRUCache(10)
+        cache.set('a', self._structure(4))
+        cache.set('b', self._structure(4))
+        # Using 'a' makes 'b' the least recently used structure
+        cache.get('a')
+        cache.set('c', self._structure(4))
+
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertEqual(cache.num_blocks, 8)
+
+    def test_too_large_structure(self):
+        cache = StructureLRUCache(10)
+        cache.set('a', self._structure(4))
+        cache.set('b', self._structure(11))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 1)
+
+    def test_clear(self):
+        cache = StructureLRUCache(10)
+        cache.set('a', self._structure(4))
+        cache.clear()
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.num_blocks, 0)
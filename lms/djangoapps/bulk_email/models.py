@@ -12,6 +12,9 @@ file and check it in at the same time as your model changes. To do that,
 
 """
 import logging
+import re
+from string import Formatter
+
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.db import models, transaction
@@ -136,6 +139,68 @@ class Optout(models.Model):
 # the location where the email message body is to be inserted.
 COURSE_EMAIL_MESSAGE_BODY_TAG = '{{message_body}}'
 
+# The template context values that differ for each recipient of an email.
+RECIPIENT_CONTEXT_KEYS = ('name', 'email', 'user_id')
+
+
+class CompiledEmailTemplate(object):
+    """
+    A template and message body, rendered with all of the context values that
+    are the same for every recipient, so that rendering an email for each
+    recipient only has to substitute their own values.
+    """
+    def __init__(self, format_string, message_body, context):
+        """
+        Renders the fields of the template which don't refer to any of the
+        RECIPIENT_CONTEXT_KEYS with the values in `context`, and keeps the
+        others for `render`.
+        """
+        parts = []
+        for literal_text, field_name, format_spec, conversion in Formatter().parse(format_string):
+            parts.append(self._escape(literal_text))
+            if field_name is None:
+                continue
+            field = u'{' + field_name
+            if conversion:
+                field += u'!' + conversion
+            if format_spec:
+                field += u':' + format_spec
+            field += u'}'
+            if re.match(r'[^.[]*', field_name).group() in RECIPIENT_CONTEXT_KEYS:
+                parts.append(field)
+            else:
+                parts.append(self._escape(field.format(**context)))
+        self.format_string = u''.join(parts)
+        self.message_body = message_body
+
+    @staticmethod
+    def _escape(text):
+        """
+        Returns `text` escaped for use in a format string.
+        """
+        return text.replace(u'{', u'{{').replace(u'}', u'}}')
+
+    def render(self, context):
+        """
+        Returns the message for the recipient whose values are in `context`,
+        as rendered by `CourseEmailTemplate._render`.
+        """
+        # Substitute all %%-encoded keywords in the message body
+        message_body = self.message_body
+        if 'user_id' in context and 'course_id' in context:
+            message_body = substitute_keywords_with_data(message_body, context)
+
+        result = self.format_string.format(**context)
+
+        # Note that the body tag in the template will now have been
+        # "formatted", so we need to do the same to the tag being
+        # searched for.
+        message_body_tag = COURSE_EMAIL_MESSAGE_BODY_TAG.format()
+        result = result.replace(message_body_tag, message_body, 1)
+
+        # finally, return the result, after wrapping long lines and without converting to an encoded byte array.
+        return wrap_message(result)
+
 
 class CourseEmailTemplate(models.Model):
     """
@@ -183,21 +248,7 @@ class CourseEmailTemplate(models.Model):
         Such encoding is left to the email code, which will use the value
         of settings.DEFAULT_CHARSET to encode the message.
         """
-
-        # Substitute all %%-encoded keywords in the message body
-        if 'user_id' in context and 'course_id' in context:
-            message_body = substitute_keywords_with_data(message_body, context)
-
-        result = format_string.format(**context)
-
-        # Note that the body tag in the template will now have been
-        # "formatted", so we need to do the same to the tag being
-        # searched for.
-        message_body_tag = COURSE_EMAIL_MESSAGE_BODY_TAG.format()
-        result = result.replace(message_body_tag, message_body, 1)
-
-        # finally, return the result, after wrapping long lines and without converting to an encoded byte array.
-        return wrap_message(result)
+        return CompiledEmailTemplate(format_string, message_body, context).render(context)
 
     def render_plaintext(self, plaintext, context):
         """
@@ -217,6 +268,22 @@ class CourseEmailTemplate(models.Model):
         """
         return CourseEmailTemplate._render(self.html_template, htmltext, context)
 
+    def compile_plaintext(self, plaintext, context):
+        """
+        Returns a CompiledEmailTemplate which renders the plain text message
+        of `render_plaintext` for each recipient, given the `context` values
+        shared by all of them.
+        """
+        return CompiledEmailTemplate(self.plain_template, plaintext, context)
+
+    def compile_htmltext(self, htmltext, context):
+        """
+        Returns a CompiledEmailTemplate which renders the HTML message of
+        `render_htmltext` for each recipient, given the `context` values
+        shared by all of them.
+        """
+        return CompiledEmailTemplate(self.html_template, htmltext, context)
+
 
 class CourseAuthorization(models.Model):
     """
@@ -6,6 +6,7 @@ to a course.
 import re
 import random
 import json
+import threading
 from time import sleep
 from collections import Counter
 import logging
@@ -169,9 +170,9 @@ def _get_course_email_context(course):
 
 def perform_delegate_email_batches(entry_id, course_id, task_input, action_name):
     """
-    Delegates emails by querying for the list of recipients who should
-    get the mail, chopping up into batches of no more than settings.BULK_EMAIL_EMAILS_PER_TASK
-    in size, and queueing up worker jobs.
+    Delegates emails by querying for the ids of the recipients who should
+    get the mail, chopping them up into chunks of no more than settings.BULK_EMAIL_EMAILS_PER_TASK
+    ids, and queueing up worker jobs that each read the recipients with their chunk of ids.
     """
     entry = InstructorTask.objects.get(pk=entry_id)
     # Get inputs to use in this task from the entry.
@@ -226,7 +227,6 @@ def perform_delegate_email_batches(entry_id, course_id, task_input, action_name)
     global_email_context = _get_course_email_context(course)
 
     recipient_qsets = _get_recipient_querysets(user_id, to_option, course_id)
-    recipient_fields = ['profile__name', 'email']
 
     log.info(u"Task %s: Preparing to queue subtasks for sending emails for course %s, email %s, to_option %s",
              task_id, course_id, email_id, to_option)
@@ -239,14 +239,14 @@ def perform_delegate_email_batches(entry_id, course_id, task_input, action_name)
     if total_recipients <= settings.BULK_EMAIL_JOB_SIZE_THRESHOLD:
         routing_key = settings.BULK_EMAIL_ROUTING_KEY_SMALL_JOBS
 
-    def _create_send_email_subtask(to_list, initial_subtask_status):
-        """Creates a subtask to send email to a given recipient list."""
+    def _create_send_email_subtask(item_ids, initial_subtask_status):
+        """Creates a subtask to send email to the recipients with the given ids."""
         subtask_id = initial_subtask_status.task_id
         new_subtask = send_course_email.subtask(
             (
                 entry_id,
                 email_id,
-                to_list,
+                {'item_ids': item_ids},
                 global_email_context,
                 initial_subtask_status.to_dict(),
             ),
@@ -260,9 +260,10 @@ def perform_delegate_email_batches(entry_id, course_id, task_input, action_name)
         action_name,
         _create_send_email_subtask,
         recipient_qsets,
-        recipient_fields,
+        [],
         settings.BULK_EMAIL_EMAILS_PER_TASK,
         total_recipients,
+        item_ids=True,
     )
 
     # We want to return progress here, as this is what will be stored in the
@@ -285,6 +286,8 @@ def send_course_email(entry_id, email_id, to_list, global_email_context, subtask
         - 'profile__name': full name of User.
         - 'email': email address of User.
         - 'pk': primary key of User model.
+        Or, before the recipients have been read, a dict whose 'item_ids' are their ids,
+        as passed to subtasks by queue_subtasks_for_query().
       * `global_email_context`: dict containing values that are unique for this email but the same
         for all recipients of this email.  This dict is to be used to fill in slots in email
         template.  It does not include 'name' and 'email', which will be provided by the to_list.
@@ -310,7 +313,10 @@ def send_course_email(entry_id, email_id, to_list, global_email_context, subtask
     """
     subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
     current_task_id = subtask_status.task_id
-    num_to_send = len(to_list)
+    if isinstance(to_list, dict):
+        num_to_send = sum(len(recipient_ids) for __, recipient_ids in to_list['item_ids'])
+    else:
+        num_to_send = len(to_list)
     log.info((u"Preparing to send email %s to %d recipients as subtask %s "
               u"for instructor task %d: context = %s, status=%s"),
              email_id, num_to_send, current_task_id, entry_id, global_email_context, subtask_status)
@@ -369,6 +375,30 @@ def send_course_email(entry_id, email_id, to_list, global_email_context, subtask
     return new_subtask_status.to_dict()
 
 
+def _get_recipients_with_ids(item_ids, requester_id, course_email):
+    """
+    Returns the recipients of `course_email` with the ids queued in `item_ids`, as a
+    list of dicts with their 'profile__name', 'email' and 'pk', and the number of
+    queued recipients who are no longer to be emailed.
+
+    Recipients who have opted out of email from the course are excluded by the query.
+    Only the queued ids are read, so users who became recipients since the email was
+    queued are not emailed.
+    """
+    recipient_qsets = _get_recipient_querysets(requester_id, course_email.to_option, course_email.course_id)
+    to_list = []
+    num_queued = 0
+    for qset_index, recipient_ids in item_ids:
+        num_queued += len(recipient_ids)
+        recipients = recipient_qsets[qset_index].filter(
+            id__in=recipient_ids
+        ).exclude(
+            optout__course_id=course_email.course_id
+        )
+        to_list.extend(recipients.values('profile__name', 'email', 'pk'))
+    return to_list, num_queued - len(to_list)
+
+
 def _filter_optouts_from_recipients(to_list, course_id):
     """
     Filters a recipient list based on student opt-outs for a given course.
@@ -424,13 +454,17 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
         - 'profile__name': full name of User.
         - 'email': email address of User.
         - 'pk': primary key of User model.
+        Or, before the recipients have been read, a dict whose 'item_ids' are their ids,
+        as passed to subtasks by queue_subtasks_for_query().
       * `global_email_context`: dict containing values that are unique for this email but the same
         for all recipients of this email.  This dict is to be used to fill in slots in email
         template.  It does not include 'name' and 'email', which will be provided by the to_list.
       * `subtask_status` : object of class SubtaskStatus representing current status.
 
     Sends to all addresses contained in to_list that are not also in the Optout table.
-    Emails are sent multi-part, in both plain text and html.
+    Emails are sent multi-part, in both plain text and html.  They are sent over
+    settings.BULK_EMAIL_SMTP_CONNECTIONS connections at once, or one connection
+    once the subtask has been throttled.
 
     Returns a tuple of two values:
       * First value is a SubtaskStatus object which represents current progress at the end of this call.
@@ -440,22 +474,14 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
         'failed' count above.
     """
     # Get information from current task's request:
-    parent_task_id = InstructorTask.objects.get(pk=entry_id).task_id
+    entry = InstructorTask.objects.get(pk=entry_id)
+    parent_task_id = entry.task_id
     task_id = subtask_status.task_id
-    total_recipients = len(to_list)
     recipient_num = 0
     total_recipients_successful = 0
     total_recipients_failed = 0
     recipients_info = Counter()
 
-    log.info(
-        "BulkEmail ==> Task: %s, SubTask: %s, EmailId: %s, TotalRecipients: %s",
-        parent_task_id,
-        task_id,
-        email_id,
-        total_recipients
-    )
-
     try:
         course_email = CourseEmail.objects.get(id=email_id)
     except CourseEmail.DoesNotExist as exc:
@@ -467,16 +493,32 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
         )
         raise
 
-    # Exclude optouts (if not a retry):
-    # Note that we don't have to do the optout logic at all if this is a retry,
-    # because we have presumably already performed the optout logic on the first
-    # attempt.  Anyone on the to_list on a retry has already passed the filter
-    # that existed at that time, and we don't need to keep checking for changes
-    # in the Optout list.
-    if subtask_status.get_retry_count() == 0:
+    if isinstance(to_list, dict):
+        # Read the recipients with the ids queued by perform_delegate_email_batches(),
+        # excluding optouts in the query.  Those that were queued but are no longer
+        # recipients (mostly optouts) are counted as skipped.  Retries are passed the
+        # list of recipients still to be emailed instead.
+        to_list, num_skipped = _get_recipients_with_ids(to_list['item_ids'], entry.requester_id, course_email)
+        subtask_status.increment(skipped=num_skipped)
+    elif subtask_status.get_retry_count() == 0:
+        # Exclude optouts (if not a retry) from a list of recipients:
+        # Note that we don't have to do the optout logic at all if this is a retry,
+        # because we have presumably already performed the optout logic on the first
+        # attempt.  Anyone on the to_list on a retry has already passed the filter
+        # that existed at that time, and we don't need to keep checking for changes
+        # in the Optout list.
         to_list, num_optout = _filter_optouts_from_recipients(to_list, course_email.course_id)
         subtask_status.increment(skipped=num_optout)
 
+    total_recipients = len(to_list)
+    log.info(
+        "BulkEmail ==> Task: %s, SubTask: %s, EmailId: %s, TotalRecipients: %s",
+        parent_task_id,
+        task_id,
+        email_id,
+        total_recipients
+    )
+
     course_title = global_email_context['course_title']
 
     # use the email from address in the CourseEmail, if it is present, otherwise compute it
@@ -485,41 +527,52 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
 
     # use the CourseEmailTemplate that was associated with the CourseEmail
     course_email_template = course_email.get_template()
+    connections = []
     try:
-        connection = get_connection()
-        connection.open()
+        # Throttling is only done between sends over a single connection.
+        num_connections = 1 if subtask_status.retried_nomax > 0 else settings.BULK_EMAIL_SMTP_CONNECTIONS
+        for __ in xrange(max(num_connections, 1)):
+            connections.append(get_connection())
+            connections[-1].open()
 
         # Define context values to use in all course emails:
         email_context = {'name': '', 'email': ''}
         email_context.update(global_email_context)
+        email_context['course_id'] = course_email.course_id
+
+        # Render the templates with the values shared by all recipients once:
+        plaintext_template = course_email_template.compile_plaintext(course_email.text_message, email_context)
+        html_template = course_email_template.compile_htmltext(course_email.html_message, email_context)
 
         while to_list:
-            # Update context with user-specific values from the user at the end of the list.
-            # At the end of processing this user, they will be popped off of the to_list.
+            # Send to as many of the users at the end of the list at once as there are connections.
+            # At the end of processing them, they will be removed from the to_list, except those
+            # whose emails need to be retried.
             # That way, the to_list will always contain the recipients remaining to be emailed.
             # This is convenient for retries, which will need to send to those who haven't
             # yet been emailed, but not send to those who have already been sent to.
-            recipient_num += 1
-            current_recipient = to_list[-1]
-            email = current_recipient['email']
-            email_context['email'] = email
-            email_context['name'] = current_recipient['profile__name']
-            email_context['user_id'] = current_recipient['pk']
-            email_context['course_id'] = course_email.course_id
-
-            # Construct message content using templates and context:
-            plaintext_msg = course_email_template.render_plaintext(course_email.text_message, email_context)
-            html_msg = course_email_template.render_htmltext(course_email.html_message, email_context)
-
-            # Create email:
-            email_msg = EmailMultiAlternatives(
-                course_email.subject,
-                plaintext_msg,
-                from_addr,
-                [email],
-                connection=connection
-            )
-            email_msg.attach_alternative(html_msg, 'text/html')
+            batch = []
+            for connection, current_recipient in zip(connections, reversed(to_list)):
+                recipient_num += 1
+                email = current_recipient['email']
+                email_context['email'] = email
+                email_context['name'] = current_recipient['profile__name']
+                email_context['user_id'] = current_recipient['pk']
+
+                # Construct message content using templates and context:
+                plaintext_msg = plaintext_template.render(email_context)
+                html_msg = html_template.render(email_context)
+
+                # Create email:
+                email_msg = EmailMultiAlternatives(
+                    course_email.subject,
+                    plaintext_msg,
+                    from_addr,
+                    [email],
+                    connection=connection
+                )
+                email_msg.attach_alternative(html_msg, 'text/html')
+                batch.append((recipient_num, current_recipient, email_msg))
 
             # Throttle if we have gotten the rate limiter.  This is not very high-tech,
             # but if a task has been retried for rate-limiting reasons, then we sleep
@@ -529,94 +582,112 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
             if subtask_status.retried_nomax > 0:
                 sleep(settings.BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS)
 
-            try:
+            for current_num, current_recipient, __ in batch:
                 log.info(
                     "BulkEmail ==> Task: %s, SubTask: %s, EmailId: %s, Recipient num: %s/%s, \
                     Recipient name: %s, Email address: %s",
                     parent_task_id,
                     task_id,
                     email_id,
-                    recipient_num,
+                    current_num,
                     total_recipients,
                     current_recipient['profile__name'],
-                    email
-                )
-                with dog_stats_api.timer('course_email.single_send.time.overall', tags=[_statsd_tag(course_title)]):
-                    connection.send_messages([email_msg])
-
-            except SMTPDataError as exc:
-                # According to SMTP spec, we'll retry error codes in the 4xx range.  5xx range indicates hard failure.
-                total_recipients_failed += 1
-                log.error(
-                    "BulkEmail ==> Status: Failed(SMTPDataError), Task: %s, SubTask: %s, EmailId: %s, \
-                    Recipient num: %s/%s, Email address: %s",
-                    parent_task_id,
-                    task_id,
-                    email_id,
-                    recipient_num,
-                    total_recipients,
-                    email
+                    current_recipient['email']
                 )
-                if exc.smtp_code >= 400 and exc.smtp_code < 500:
-                    # This will cause the outer handler to catch the exception and retry the entire task.
-                    raise exc
-                else:
+            send_errors = _send_email_messages([email_msg for __, __, email_msg in batch], course_title)
+
+            # The first error that stops the task is raised once the whole batch has been processed,
+            # and the recipients whose emails weren't sent are put back on the end of the to_list.
+            task_error = None
+            unsent_recipients = []
+            for (current_num, current_recipient, __), send_error in zip(batch, send_errors):
+                email = current_recipient['email']
+                if send_error is None:
+                    total_recipients_successful += 1
+                    log.info(
+                        "BulkEmail ==> Status: Success, Task: %s, SubTask: %s, EmailId: %s, \
+                        Recipient num: %s/%s, Email address: %s,",
+                        parent_task_id,
+                        task_id,
+                        email_id,
+                        current_num,
+                        total_recipients,
+                        email
+                    )
+                    dog_stats_api.increment('course_email.sent', tags=[_statsd_tag(course_title)])
+                    if settings.BULK_EMAIL_LOG_SENT_EMAILS:
+                        log.info('Email with id %s sent to %s', email_id, email)
+                    else:
+                        log.debug('Email with id %s sent to %s', email_id, email)
+                    subtask_status.increment(succeeded=1)
+
+                elif isinstance(send_error, SMTPDataError):
+                    # According to SMTP spec, we'll retry error codes in the 4xx range.
+                    # 5xx range indicates hard failure.
+                    total_recipients_failed += 1
+                    log.error(
+                        "BulkEmail ==> Status: Failed(SMTPDataError), Task: %s, SubTask: %s, EmailId: %s, \
+                        Recipient num: %s/%s, Email address: %s",
+                        parent_task_id,
+                        task_id,
+                        email_id,
+                        current_num,
+                        total_recipients,
+                        email
+                    )
+                    if send_error.smtp_code >= 400 and send_error.smtp_code < 500:
+                        # This will cause the outer handler to catch the exception and retry the entire task.
+                        task_error = task_error or send_error
+                        unsent_recipients.append(current_recipient)
+                        continue
+                    else:
+                        # This will fall through and not retry the message.
+                        log.warning(
+                            'BulkEmail ==> Task: %s, SubTask: %s, EmailId: %s, Recipient num: %s/%s, \
+                            Email not delivered to %s due to error %s',
+                            parent_task_id,
+                            task_id,
+                            email_id,
+                            current_num,
+                            total_recipients,
+                            email,
+                            send_error.smtp_error
+                        )
+                        dog_stats_api.increment('course_email.error', tags=[_statsd_tag(course_title)])
+                        subtask_status.increment(failed=1)
+
+                elif isinstance(send_error, SINGLE_EMAIL_FAILURE_ERRORS):
                     # This will fall through and not retry the message.
-                    log.warning(
-                        'BulkEmail ==> Task: %s, SubTask: %s, EmailId: %s, Recipient num: %s/%s, \
-                        Email not delivered to %s due to error %s',
+                    total_recipients_failed += 1
+                    log.error(
+                        "BulkEmail ==> Status: Failed(SINGLE_EMAIL_FAILURE_ERRORS), Task: %s, SubTask: %s, \
+                        EmailId: %s, Recipient num: %s/%s, Email address: %s, Exception: %s",
                         parent_task_id,
                         task_id,
                         email_id,
-                        recipient_num,
+                        current_num,
                         total_recipients,
                         email,
-                        exc.smtp_error
+                        send_error
                     )
                     dog_stats_api.increment('course_email.error', tags=[_statsd_tag(course_title)])
                     subtask_status.increment(failed=1)
 
-            except SINGLE_EMAIL_FAILURE_ERRORS as exc:
-                # This will fall through and not retry the message.
-                total_recipients_failed += 1
-                log.error(
-                    "BulkEmail ==> Status: Failed(SINGLE_EMAIL_FAILURE_ERRORS), Task: %s, SubTask: %s, \
-                    EmailId: %s, Recipient num: %s/%s, Email address: %s, Exception: %s",
-                    parent_task_id,
-                    task_id,
-                    email_id,
-                    recipient_num,
-                    total_recipients,
-                    email,
-                    exc
-                )
-                dog_stats_api.increment('course_email.error', tags=[_statsd_tag(course_title)])
-                subtask_status.increment(failed=1)
-
-            else:
-                total_recipients_successful += 1
-                log.info(
-                    "BulkEmail ==> Status: Success, Task: %s, SubTask: %s, EmailId: %s, \
-                    Recipient num: %s/%s, Email address: %s,",
-                    parent_task_id,
-                    task_id,
-                    email_id,
-                    recipient_num,
-                    total_recipients,
-                    email
-                )
-                dog_stats_api.increment('course_email.sent', tags=[_statsd_tag(course_title)])
-                if settings.BULK_EMAIL_LOG_SENT_EMAILS:
-                    log.info('Email with id %s sent to %s', email_id, email)
                 else:
-                    log.debug('Email with id %s sent to %s', email_id, email)
-                subtask_status.increment(succeeded=1)
+                    # This will cause the outer handlers to deal with the exception.
+                    task_error = task_error or send_error
+                    unsent_recipients.append(current_recipient)
+                    continue
 
-            # Pop the user that was emailed off the end of the list only once they have
-            # successfully been processed.  (That way, if there were a failure that
-            # needed to be retried, the user is still on the list.)
-            recipients_info[email] += 1
-            to_list.pop()
+                recipients_info[email] += 1
+
+            # Remove the users that were emailed from the end of the list only once they have
+            # been processed.  (That way, if there were a failure that needed to be retried,
+            # the user is still on the list.)
+            del to_list[-len(batch):]
+            to_list.extend(reversed(unsent_recipients))
+            if task_error is not None:
+                raise task_error  # pylint: disable=raising-bad-type
 
         log.info(
             "BulkEmail ==> Task: %s, SubTask: %s, EmailId: %s, Total Successful Recipients: %s/%s, \
@@ -697,7 +768,38 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
         return subtask_status, None
     finally:
         # Clean up at the end.
-        connection.close()
+        for connection in connections:
+            connection.close()
+
+
+def _send_email_messages(email_msgs, course_title):
+    """
+    Sends each of the `email_msgs` over its own connection, all at the same time.
+
+    Returns a list of the exception raised when sending each of them, or None for
+    each that was sent.
+    """
+    send_errors = [None] * len(email_msgs)
+
+    def send(index):
+        """
+        Sends the email at `index`, and records the exception if it fails.
+        """
+        email_msg = email_msgs[index]
+        try:
+            with dog_stats_api.timer('course_email.single_send.time.overall', tags=[_statsd_tag(course_title)]):
+                email_msg.connection.send_messages([email_msg])
+        except Exception as exc:  # pylint: disable=broad-except
+            send_errors[index] = exc
+
+    # The first email is sent from this thread, so that a single connection doesn't use any others.
+    threads = [threading.Thread(target=send, args=(index,)) for index in xrange(1, len(email_msgs))]
+    for thread in threads:
+        thread.start()
+    send(0)
+    for thread in threads:
+        thread.join()
+    return send_errors
 
 
 def _get_current_task():
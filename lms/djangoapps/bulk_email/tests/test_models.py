@@ -139,6 +139,24 @@ class CourseEmailTemplateTest(TestCase):
         context = self._get_sample_plain_context()
         template.render_plaintext("My new plain text.", context)
 
+    def test_compiled_templates_render_same_messages(self):
+        template = CourseEmailTemplate.get_template()
+        context = self._get_sample_html_context()
+        context['course_title'] = u"A {bogus} title"
+        plaintext_template = template.compile_plaintext(u"Dear %%USER_FULLNAME%%, {plain}", context)
+        html_template = template.compile_htmltext(u"<p>Dear %%USER_FULLNAME%%, {html}</p>", context)
+        for name, email in ((u'Robot {0}', u'robot0@test.com'), (u'Robot 1', u'robot1@test.com')):
+            context.update({'name': name, 'email': email, 'user_id': 1, 'course_id': 'a/b/c'})
+            self.assertEquals(
+                plaintext_template.render(context),
+                template.render_plaintext(u"Dear %%USER_FULLNAME%%, {plain}", context)
+            )
+            self.assertEquals(
+                html_template.render(context),
+                template.render_htmltext(u"<p>Dear %%USER_FULLNAME%%, {html}</p>", context)
+            )
+            self.assertIn(name, plaintext_template.render(context))
+
 
 @attr('shard_1')
 class CourseAuthorizationTest(TestCase):
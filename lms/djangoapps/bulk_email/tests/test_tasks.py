@@ -29,9 +29,11 @@ from celery.states import SUCCESS, FAILURE  # pylint: disable=no-name-in-module,
 
 from django.conf import settings
 from django.core.management import call_command
+from django.test.utils import override_settings
 
 from xmodule.modulestore.tests.factories import CourseFactory
 
+from bulk_email import tasks as bulk_email_tasks
 from bulk_email.models import CourseEmail, Optout, SEND_TO_ALL
 
 from instructor_task.tasks import send_bulk_course_email
@@ -39,6 +41,7 @@ from instructor_task.subtasks import update_subtask_status, SubtaskStatus
 from instructor_task.models import InstructorTask
 from instructor_task.tests.test_base import InstructorTaskCourseTestCase
 from instructor_task.tests.factories import InstructorTaskFactory
+from student.models import CourseEnrollment
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 
 
@@ -246,6 +249,54 @@ class TestBulkEmailInstructorTask(InstructorTaskCourseTestCase):
                 send_bulk_course_email, 'emailed', num_emails, expected_succeeds, skipped=expected_skipped
             )
 
+    def test_recipients_changed_after_queueing(self):
+        # Select number of emails to fit into a single subtask.
+        num_emails = settings.BULK_EMAIL_EMAILS_PER_TASK
+        # We also send email to the instructor:
+        students = self._create_students(num_emails - 1)
+        # One student enrolls only after the email is queued, with an id amid
+        # those of the queued recipients.
+        late_student = students[1]
+        CourseEnrollment.unenroll(late_student, self.course.id)
+        # Another student opts out.
+        Optout.objects.create(user=students[2], course_id=self.course.id)
+
+        send_email = bulk_email_tasks._send_course_email  # pylint: disable=protected-access
+
+        def enroll_and_send_email(*args):
+            """Enroll the late student after the recipients were queued, then send the email."""
+            CourseEnrollment.enroll(late_student, self.course.id)
+            return send_email(*args)
+
+        with patch('bulk_email.tasks._send_course_email', side_effect=enroll_and_send_email):
+            with patch('bulk_email.tasks.get_connection', autospec=True) as get_conn:
+                get_conn.return_value.send_messages.side_effect = cycle([None])
+                self._test_run_with_task(
+                    send_bulk_course_email, 'emailed', num_emails - 1, num_emails - 2, skipped=1
+                )
+        sent_to = [
+            email.to[0]
+            for call in get_conn.return_value.send_messages.call_args_list
+            for email in call[0][0]
+        ]
+        self.assertNotIn(late_student.email, sent_to)
+        self.assertNotIn(students[2].email, sent_to)
+
+    @override_settings(BULK_EMAIL_SMTP_CONNECTIONS=3)
+    def test_successful_over_several_connections(self):
+        # Select number of emails to fit into a single subtask.
+        num_emails = settings.BULK_EMAIL_EMAILS_PER_TASK
+        # We also send email to the instructor:
+        self._create_students(num_emails - 1)
+        with patch('bulk_email.tasks.get_connection', autospec=True) as get_conn:
+            get_conn.return_value.send_messages.side_effect = cycle([None])
+            self._test_run_with_task(send_bulk_course_email, 'emailed', num_emails, num_emails)
+            self.assertEquals(get_conn.call_count, 3)
+
+    @override_settings(BULK_EMAIL_SMTP_CONNECTIONS=3)
+    def test_email_address_failures_over_several_connections(self):
+        self._test_email_address_failures(SMTPDataError(554, "Email address is blacklisted"))
+
     def _test_email_address_failures(self, exception):
         """Test that celery handles bad address errors by failing and not retrying."""
         # Select number of emails to fit into a single subtask.
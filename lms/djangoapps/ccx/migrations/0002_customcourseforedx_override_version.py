@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import lms.djangoapps.ccx.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ccx', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customcourseforedx',
+            name='override_version',
+            field=models.CharField(default=lms.djangoapps.ccx.models.new_override_version, max_length=32),
+        ),
+    ]
@@ -3,6 +3,7 @@ Models for the custom course feature
 """
 from datetime import datetime
 import logging
+from uuid import uuid4
 
 from django.contrib.auth.models import User
 from django.db import models
@@ -17,6 +18,13 @@ from xmodule.modulestore.django import modulestore
 log = logging.getLogger("edx.ccx")
 
 
+def new_override_version():
+    """
+    Return a new value for CustomCourseForEdX.override_version.
+    """
+    return uuid4().hex
+
+
 class CustomCourseForEdX(models.Model):
     """
     A Custom Course.
@@ -25,6 +33,11 @@ class CustomCourseForEdX(models.Model):
     display_name = models.CharField(max_length=255)
     coach = models.ForeignKey(User, db_index=True)
 
+    # Identifies the current set of field overrides of this CCX; replaced
+    # whenever one of them changes, so that the overrides can be cached
+    # across requests (see ccx.overrides).
+    override_version = models.CharField(max_length=32, default=new_override_version)
+
     class Meta(object):
         app_label = 'ccx'
 
@@ -173,6 +173,11 @@ class CCXModulestoreWrapper(object):
             orig_key, version = self._modulestore.get_block_original_usage(usage_key)
             return restore(orig_key), version
 
+    def get_structure(self, course_key, version_guid):
+        """See the docs for xmodule.modulestore.mixed.MixedModuleStore"""
+        course_key, _ = strip_ccx(course_key)
+        return self._modulestore.get_structure(course_key, version_guid)
+
     def get_modulestore_type(self, course_id):
         """See the docs for xmodule.modulestore.mixed.MixedModuleStore"""
         with remove_ccx(course_id) as (course_id, restore):
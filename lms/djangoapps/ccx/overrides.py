@@ -1,23 +1,40 @@
 """
 API related to providing field overrides for individual students.  This is used
 by the individual custom courses feature.
+
+The overrides of a CCX are cached across requests by its override_version,
+which is replaced whenever one of them changes: first in the memory of each
+process, then in the Django cache.
 """
 import json
 import logging
+import threading
+from collections import OrderedDict
 
+from django.core.cache import cache
 from django.db import transaction, IntegrityError
 
 import request_cache
 
-from courseware.field_overrides import FieldOverrideProvider
+from courseware.field_overrides import FieldOverrideProvider, clear_resolved_overrides
 from opaque_keys.edx.keys import CourseKey, UsageKey
 from ccx_keys.locator import CCXLocator, CCXBlockUsageLocator
 
-from lms.djangoapps.ccx.models import CcxFieldOverride, CustomCourseForEdX
+from lms.djangoapps.ccx.models import CcxFieldOverride, CustomCourseForEdX, new_override_version
 
 
 log = logging.getLogger(__name__)
 
+# The maximum number of CCXs whose overrides are kept in the memory of each
+# process.
+CCX_OVERRIDES_CACHE_SIZE = 500
+
+# How long the overrides of a CCX are kept in the Django cache, in seconds.
+CCX_OVERRIDES_CACHE_TIMEOUT = 60 * 60 * 24
+
+_ccx_overrides = OrderedDict()
+_ccx_overrides_lock = threading.Lock()
+
 
 class CustomCoursesForEdxOverrideProvider(FieldOverrideProvider):
     """
@@ -57,6 +74,13 @@ class CustomCoursesForEdxOverrideProvider(FieldOverrideProvider):
         """
         return getattr(course, 'enable_ccx', False)
 
+    def overrides_version(self, course):
+        """
+        The override_version of the ccx that is active for `course`, if any.
+        """
+        ccx = get_current_ccx(course.id) if course is not None else None
+        return ccx.override_version if ccx else None
+
 
 def get_current_ccx(course_key):
     """
@@ -109,20 +133,84 @@ def _get_overrides_for_ccx(ccx):
     overrides_cache = request_cache.get_cache('ccx-overrides')
 
     if ccx not in overrides_cache:
-        overrides = {}
-        query = CcxFieldOverride.objects.filter(
-            ccx=ccx,
-        )
+        overrides = _get_cached_overrides_for_ccx(ccx)
+        if overrides is None:
+            overrides = {}
+            query = CcxFieldOverride.objects.filter(
+                ccx=ccx,
+            )
+
+            for override in query:
+                block_overrides = overrides.setdefault(override.location, {})
+                block_overrides[override.field] = json.loads(override.value)
+                block_overrides[override.field + "_id"] = override.id
+
+            _cache_overrides_for_ccx(ccx, overrides)
+
+        # The overrides are updated in place by override_field_for_ccx, so
+        # copy the ones that are shared with other requests.
+        overrides_cache[ccx] = {
+            location: dict(block_overrides) for location, block_overrides in overrides.iteritems()
+        }
 
-        for override in query:
-            block_overrides = overrides.setdefault(override.location, {})
-            block_overrides[override.field] = json.loads(override.value)
-            block_overrides[override.field + "_id"] = override.id
-            block_overrides[override.field + "_instance"] = override
+    return overrides_cache[ccx]
 
-        overrides_cache[ccx] = overrides
 
-    return overrides_cache[ccx]
+def _overrides_cache_key(ccx):
+    """
+    Returns the key of the current overrides of `ccx` in the caches.
+    """
+    return u'ccx.overrides.{}.{}'.format(ccx.id, ccx.override_version)
+
+
+def _get_cached_overrides_for_ccx(ccx):
+    """
+    Returns the current overrides of `ccx` from the memory of this process or
+    the Django cache, or None if they are in neither.
+    """
+    cache_key = _overrides_cache_key(ccx)
+    with _ccx_overrides_lock:
+        overrides = _ccx_overrides.pop(cache_key, None)
+        if overrides is not None:
+            # Mark the overrides as recently used.
+            _ccx_overrides[cache_key] = overrides
+            return overrides
+
+    overrides = cache.get(cache_key)
+    if overrides is not None:
+        _remember_overrides(cache_key, overrides)
+    return overrides
+
+
+def _cache_overrides_for_ccx(ccx, overrides):
+    """
+    Stores the current overrides of `ccx` in the memory of this process and
+    in the Django cache.
+    """
+    cache_key = _overrides_cache_key(ccx)
+    _remember_overrides(cache_key, overrides)
+    cache.set(cache_key, overrides, CCX_OVERRIDES_CACHE_TIMEOUT)
+
+
+def _remember_overrides(cache_key, overrides):
+    """
+    Keeps `overrides` in the memory of this process, forgetting the least
+    recently used ones beyond CCX_OVERRIDES_CACHE_SIZE.
+    """
+    with _ccx_overrides_lock:
+        _ccx_overrides[cache_key] = overrides
+        while len(_ccx_overrides) > CCX_OVERRIDES_CACHE_SIZE:
+            _ccx_overrides.popitem(last=False)
+
+
+def _bump_override_version(ccx):
+    """
+    Replaces the override_version of `ccx` after its overrides have changed,
+    so that the cached ones are no longer used by any process.
+    """
+    ccx.override_version = new_override_version()
+    CustomCourseForEdX.objects.filter(pk=ccx.pk).update(override_version=ccx.override_version)
+    clear_resolved_overrides()
 
 
 @transaction.atomic
@@ -136,6 +224,7 @@ def override_field_for_ccx(ccx, block, name, value):
     value_json = field.to_json(value)
     serialized_value = json.dumps(value_json)
     override_has_changes = False
+    created = False
 
     override = get_override_for_ccx(ccx, block, name + "_instance")
     if override:
@@ -157,6 +246,9 @@ def override_field_for_ccx(ccx, block, name, value):
         override.value = serialized_value
         override.save()
 
+    if created or override_has_changes:
+        _bump_override_version(ccx)
+
     _get_overrides_for_ccx(ccx).setdefault(block.location, {})[name] = value_json
     _get_overrides_for_ccx(ccx).setdefault(block.location, {})[name + "_instance"] = override
 
@@ -175,6 +267,7 @@ def clear_override_for_ccx(ccx, block, name):
             field=name).delete()
 
         clear_ccx_field_info_from_ccx_map(ccx, block, name)
+        _bump_override_version(ccx)
 
     except CcxFieldOverride.DoesNotExist:
         pass
@@ -201,3 +294,4 @@ def bulk_delete_ccx_override_fields(ccx, ids):
     ids = list(set(ids))
     if ids:
         CcxFieldOverride.objects.filter(ccx=ccx, id__in=ids).delete()
+        _bump_override_version(ccx)
@@ -214,24 +214,24 @@ class TestFieldOverrideMongoPerformance(FieldOverridePerformanceTestCase):
 
     TEST_DATA = {
         # (providers, course_width, enable_ccx, view_as_ccx): # of sql queries, # of mongo queries, # of xblocks
-        ('no_overrides', 1, True, False): (48, 6, 13),
-        ('no_overrides', 2, True, False): (135, 6, 84),
-        ('no_overrides', 3, True, False): (480, 6, 335),
-        ('ccx', 1, True, False): (48, 6, 13),
-        ('ccx', 2, True, False): (135, 6, 84),
-        ('ccx', 3, True, False): (480, 6, 335),
-        ('ccx', 1, True, True): (48, 6, 13),
-        ('ccx', 2, True, True): (135, 6, 84),
-        ('ccx', 3, True, True): (480, 6, 335),
-        ('no_overrides', 1, False, False): (48, 6, 13),
-        ('no_overrides', 2, False, False): (135, 6, 84),
-        ('no_overrides', 3, False, False): (480, 6, 335),
-        ('ccx', 1, False, False): (48, 6, 13),
-        ('ccx', 2, False, False): (135, 6, 84),
-        ('ccx', 3, False, False): (480, 6, 335),
-        ('ccx', 1, False, True): (48, 6, 13),
-        ('ccx', 2, False, True): (135, 6, 84),
-        ('ccx', 3, False, True): (480, 6, 335),
+        ('no_overrides', 1, True, False): (55, 6, 13),
+        ('no_overrides', 2, True, False): (142, 6, 84),
+        ('no_overrides', 3, True, False): (487, 6, 335),
+        ('ccx', 1, True, False): (55, 6, 13),
+        ('ccx', 2, True, False): (142, 6, 84),
+        ('ccx', 3, True, False): (487, 6, 335),
+        ('ccx', 1, True, True): (55, 6, 13),
+        ('ccx', 2, True, True): (142, 6, 84),
+        ('ccx', 3, True, True): (487, 6, 335),
+        ('no_overrides', 1, False, False): (55, 6, 13),
+        ('no_overrides', 2, False, False): (142, 6, 84),
+        ('no_overrides', 3, False, False): (487, 6, 335),
+        ('ccx', 1, False, False): (55, 6, 13),
+        ('ccx', 2, False, False): (142, 6, 84),
+        ('ccx', 3, False, False): (487, 6, 335),
+        ('ccx', 1, False, True): (55, 6, 13),
+        ('ccx', 2, False, True): (142, 6, 84),
+        ('ccx', 3, False, True): (487, 6, 335),
     }
 
 
@@ -243,22 +243,22 @@ class TestFieldOverrideSplitPerformance(FieldOverridePerformanceTestCase):
     __test__ = True
 
     TEST_DATA = {
-        ('no_overrides', 1, True, False): (48, 4, 9),
-        ('no_overrides', 2, True, False): (135, 19, 54),
-        ('no_overrides', 3, True, False): (480, 84, 215),
-        ('ccx', 1, True, False): (48, 4, 9),
-        ('ccx', 2, True, False): (135, 19, 54),
-        ('ccx', 3, True, False): (480, 84, 215),
-        ('ccx', 1, True, True): (50, 4, 13),
-        ('ccx', 2, True, True): (137, 19, 84),
-        ('ccx', 3, True, True): (482, 84, 335),
-        ('no_overrides', 1, False, False): (48, 4, 9),
-        ('no_overrides', 2, False, False): (135, 19, 54),
-        ('no_overrides', 3, False, False): (480, 84, 215),
-        ('ccx', 1, False, False): (48, 4, 9),
-        ('ccx', 2, False, False): (135, 19, 54),
-        ('ccx', 3, False, False): (480, 84, 215),
-        ('ccx', 1, False, True): (48, 4, 9),
-        ('ccx', 2, False, True): (135, 19, 54),
-        ('ccx', 3, False, True): (480, 84, 215),
+        ('no_overrides', 1, True, False): (55, 4, 9),
+        ('no_overrides', 2, True, False): (142, 19, 54),
+        ('no_overrides', 3, True, False): (487, 84, 215),
+        ('ccx', 1, True, False): (55, 4, 9),
+        ('ccx', 2, True, False): (142, 19, 54),
+        ('ccx', 3, True, False): (487, 84, 215),
+        ('ccx', 1, True, True): (57, 4, 13),
+        ('ccx', 2, True, True): (144, 19, 84),
+        ('ccx', 3, True, True): (489, 84, 335),
+        ('no_overrides', 1, False, False): (55, 4, 9),
+        ('no_overrides', 2, False, False): (142, 19, 54),
+        ('no_overrides', 3, False, False): (487, 84, 215),
+        ('ccx', 1, False, False): (55, 4, 9),
+        ('ccx', 2, False, False): (142, 19, 54),
+        ('ccx', 3, False, False): (487, 84, 215),
+        ('ccx', 1, False, True): (55, 4, 9),
+        ('ccx', 2, False, True): (142, 19, 54),
+        ('ccx', 3, False, True): (487, 84, 215),
     }
@@ -18,7 +18,7 @@ from xmodule.modulestore.tests.django_utils import (
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 
 from lms.djangoapps.ccx.models import CustomCourseForEdX
-from lms.djangoapps.ccx.overrides import override_field_for_ccx
+from lms.djangoapps.ccx.overrides import get_override_for_ccx, override_field_for_ccx
 
 from lms.djangoapps.ccx.tests.test_views import flatten, iter_blocks
 
@@ -100,7 +100,8 @@ class TestFieldOverrides(ModuleStoreTestCase):
         # One SELECT and one INSERT.
         # One inner SAVEPOINT/RELEASE SAVEPOINT pair around the INSERT caused by the
         # transaction.atomic down in Django's get_or_create()/_create_object_from_params().
-        with self.assertNumQueries(6):
+        # One UPDATE of the CCX's override_version.
+        with self.assertNumQueries(7):
             override_field_for_ccx(self.ccx, chapter, 'start', ccx_start)
 
     def test_override_num_queries_update_existing_field(self):
@@ -111,7 +112,7 @@ class TestFieldOverrides(ModuleStoreTestCase):
         new_ccx_start = datetime.datetime(2015, 12, 25, 00, 00, tzinfo=pytz.UTC)
         chapter = self.ccx.course.get_children()[0]
         override_field_for_ccx(self.ccx, chapter, 'start', ccx_start)
-        with self.assertNumQueries(3):
+        with self.assertNumQueries(4):
             override_field_for_ccx(self.ccx, chapter, 'start', new_ccx_start)
 
     def test_override_num_queries_field_value_not_changed(self):
@@ -135,9 +136,32 @@ class TestFieldOverrides(ModuleStoreTestCase):
         # One SELECT and one INSERT.
         # One inner SAVEPOINT/RELEASE SAVEPOINT pair around the INSERT caused by the
         # transaction.atomic down in Django's get_or_create()/_create_object_from_params().
-        with self.assertNumQueries(6):
+        # One UPDATE of the CCX's override_version.
+        with self.assertNumQueries(7):
             override_field_for_ccx(self.ccx, chapter, 'start', ccx_start)
 
+    def test_overrides_cached_across_requests(self):
+        """
+        Test that the overrides are read from the cache in later requests,
+        until they change.
+        """
+        ccx_start = datetime.datetime(2014, 12, 25, 00, 00, tzinfo=pytz.UTC)
+        new_ccx_start = datetime.datetime(2015, 12, 25, 00, 00, tzinfo=pytz.UTC)
+        chapter = self.ccx.course.get_children()[0]
+        override_field_for_ccx(self.ccx, chapter, 'start', ccx_start)
+
+        RequestCache.clear_request_cache()
+        with self.assertNumQueries(1):
+            self.assertEquals(get_override_for_ccx(self.ccx, chapter, 'start'), ccx_start)
+        RequestCache.clear_request_cache()
+        with self.assertNumQueries(0):
+            self.assertEquals(get_override_for_ccx(self.ccx, chapter, 'start'), ccx_start)
+
+        override_field_for_ccx(self.ccx, chapter, 'start', new_ccx_start)
+        RequestCache.clear_request_cache()
+        with self.assertNumQueries(1):
+            self.assertEquals(get_override_for_ccx(self.ccx, chapter, 'start'), new_ccx_start)
+
     def test_override_is_inherited(self):
         """
         Test that sequentials inherit overridden start date from chapter.
@@ -21,7 +21,8 @@ plans for refactoring the current has_access code to use Course Blocks
 instead (https://openedx.atlassian.net/browse/MA-1019).  We have
 introduced this redundancy in the short-term as an incremental
 implementation approach, reducing risk with initial release of this app.
-"""
 
-# Importing signals is necessary to activate the course publish/delete signal handlers.
-from . import signals
+The cached course blocks are invalidated when courses are published or
+deleted by openedx.core.djangoapps.content.block_structure, which is also
+installed in Studio, where courses are published.
+"""
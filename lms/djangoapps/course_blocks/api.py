@@ -1,10 +1,13 @@
 """
 API entry point to the course_blocks app with top-level
-get_course_blocks and clear_course_from_cache functions.
+get_course_blocks, get_course_block_keys_for_users,
+update_course_in_cache and clear_course_from_cache functions.
 """
 from django.core.cache import cache
 
-from openedx.core.lib.block_cache.block_cache import get_blocks, clear_block_cache
+from openedx.core.lib.block_cache.block_cache import (
+    get_blocks, get_blocks_for_many, clear_block_cache, update_block_cache
+)
 from xmodule.modulestore.django import modulestore
 
 from .transformers import (
@@ -64,13 +67,7 @@ def get_course_blocks(
             access.
     """
     store = modulestore()
-    if root_block_usage_key != store.make_course_usage_key(root_block_usage_key.course_key):
-        # Enforce this check for now until MA-1604 is implemented.
-        # Otherwise, callers will get incorrect block data after a
-        # new version of the course is published, since
-        # clear_course_from_cache only clears the cached block
-        # structures starting at the root block of the course.
-        raise NotImplementedError
+    _check_root_block_usage_key(store, root_block_usage_key)
 
     return get_blocks(
         cache,
@@ -81,6 +78,45 @@ def get_course_blocks(
     )
 
 
+def get_course_block_keys_for_users(
+        users,
+        root_block_usage_key,
+        transformers=None
+):
+    """
+    A higher order function implemented on top of the
+    block_cache.get_blocks_for_many function returning, for each of the
+    given users, the usage keys of the blocks in the block structure
+    starting at root_block_usage_key transformed for that user.
+
+    This is meant for bulk consumers that need the course blocks of
+    many users: the cached block structure is only loaded once, and the
+    default transformers evaluate their access rules for all users at
+    once.
+
+    Arguments:
+        users ([django.contrib.auth.models.User]) - User objects for
+            which the block structure is to be transformed.
+
+        See get_course_blocks for the description of the other
+        arguments.
+
+    Returns:
+        [set(UsageKey)] - For each of the given users, the usage keys
+            of the blocks the user has access to.
+    """
+    store = modulestore()
+    _check_root_block_usage_key(store, root_block_usage_key)
+
+    return get_blocks_for_many(
+        cache,
+        store,
+        [CourseUsageInfo(root_block_usage_key.course_key, user) for user in users],
+        root_block_usage_key,
+        COURSE_BLOCK_ACCESS_TRANSFORMERS if transformers is None else transformers,
+    )
+
+
 def clear_course_from_cache(course_key):
     """
     A higher order function implemented on top of the
@@ -95,3 +131,32 @@ def clear_course_from_cache(course_key):
     """
     course_usage_key = modulestore().make_course_usage_key(course_key)
     return clear_block_cache(cache, course_usage_key)
+
+
+def update_course_in_cache(course_key, recollect=False):
+    """
+    A higher order function implemented on top of the
+    block_cache.update_block_cache function that updates the cached
+    block structure starting at the root block of the course for the
+    given course_key with the blocks that changed in the modulestore.
+
+    If recollect is True, the block structure is re-collected and
+    cached when it can't be updated, rather than removed from the cache.
+    """
+    store = modulestore()
+    course_usage_key = store.make_course_usage_key(course_key)
+    return update_block_cache(cache, store, course_usage_key, recollect=recollect)
+
+
+def _check_root_block_usage_key(store, root_block_usage_key):
+    """
+    Raises NotImplementedError if the given root_block_usage_key isn't
+    the root block of its course.
+    """
+    if root_block_usage_key != store.make_course_usage_key(root_block_usage_key.course_key):
+        # Enforce this check for now until MA-1604 is implemented.
+        # Otherwise, callers will get incorrect block data after a
+        # new version of the course is published, since
+        # clear_course_from_cache only clears the cached block
+        # structures starting at the root block of the course.
+        raise NotImplementedError
@@ -18,6 +18,8 @@ class ContentLibraryTransformer(BlockStructureTransformer):
     Staff users are *not* exempted from library content pathways.
     """
     VERSION = 1
+    SUPPORTS_SUBTREE_UPDATES = True
+    SUPPORTS_BATCH_TRANSFORM = True
 
     @classmethod
     def name(cls):
@@ -66,36 +68,18 @@ class ContentLibraryTransformer(BlockStructureTransformer):
 
         all_library_children = set()
         all_selected_children = set()
-        for block_key in block_structure.topological_traversal(
-                filter_func=lambda block_key: block_key.block_type == 'library_content',
-                yield_descendants_of_unyielded=True,
-        ):
+        for block_key in self._get_library_blocks(block_structure):
             library_children = block_structure.get_children(block_key)
             if library_children:
                 all_library_children.update(library_children)
-                selected = []
-                mode = block_structure.get_xblock_field(block_key, 'mode')
-                max_count = block_structure.get_xblock_field(block_key, 'max_count')
 
                 # Retrieve "selected" json from LMS MySQL database.
                 module = self._get_student_module(usage_info.user, usage_info.course_key, block_key)
-                if module:
-                    state_dict = json.loads(module.state)
-                    # Add all selected entries for this user for this
-                    # library module to the selected list.
-                    for state in state_dict['selected']:
-                        usage_key = usage_info.course_key.make_usage_key(state[0], state[1])
-                        if usage_key in library_children:
-                            selected.append((state[0], state[1]))
-
-                # update selected
-                previous_count = len(selected)
-                block_keys = LibraryContentModule.make_selection(selected, library_children, max_count, mode)
-                selected = block_keys['selected']
-
-                # publish events for analytics
-                self._publish_events(block_structure, block_key, previous_count, max_count, block_keys)
-                all_selected_children.update(usage_info.course_key.make_usage_key(s[0], s[1]) for s in selected)
+                all_selected_children.update(
+                    self._get_selected_children(
+                        block_structure, block_key, library_children, usage_info, module, publish_events=True
+                    )
+                )
 
         def check_child_removal(block_key):
             """
@@ -116,6 +100,97 @@ class ContentLibraryTransformer(BlockStructureTransformer):
             check_child_removal
         )
 
+    def get_removal_masks(self, usage_infos, block_structure):
+        """
+        Returns the blocks that transform removes for each of the given
+        usage_infos.
+
+        Unlike transform, this doesn't publish the analytics events of the
+        selections it makes: they are made on behalf of the users, outside of
+        their requests, and aren't stored.
+        """
+        library_blocks = {
+            block_key: block_structure.get_children(block_key)
+            for block_key in self._get_library_blocks(block_structure)
+            if block_structure.get_children(block_key)
+        }
+        if not library_blocks or not usage_infos:
+            return []
+
+        # Retrieve the "selected" json of all the users for all the
+        # library modules at once.
+        student_modules = {
+            (module.student_id, module.module_state_key): module
+            for module in StudentModule.objects.filter(
+                student__in=[usage_info.user for usage_info in usage_infos],
+                course_id=usage_infos[0].course_key,
+                module_state_key__in=library_blocks.keys(),
+                state__contains='"selected": [[',
+            )
+        }
+
+        all_library_children = set()
+        for library_children in library_blocks.itervalues():
+            all_library_children.update(library_children)
+
+        masks = {}
+        for index, usage_info in enumerate(usage_infos):
+            all_selected_children = set()
+            for block_key, library_children in library_blocks.iteritems():
+                module = student_modules.get((usage_info.user.id, block_key))
+                all_selected_children.update(
+                    self._get_selected_children(block_structure, block_key, library_children, usage_info, module)
+                )
+            for block_key in all_library_children - all_selected_children:
+                masks[block_key] = masks.get(block_key, 0) | (1 << index)
+        return [(False, masks)]
+
+    @classmethod
+    def _get_library_blocks(cls, block_structure):
+        """
+        Returns the usage keys of the library_content blocks in the given
+        block structure.
+        """
+        return block_structure.topological_traversal(
+            filter_func=lambda block_key: block_key.block_type == 'library_content',
+            yield_descendants_of_unyielded=True,
+        )
+
+    @classmethod
+    def _get_selected_children(
+            cls, block_structure, block_key, library_children, usage_info, module, publish_events=False
+    ):
+        """
+        Returns the usage keys of the children of the given
+        library_content block that are selected for the given
+        usage_info, given the user's student module for the block.
+
+        If publish_events is True, the analytics events of the
+        selection are published for the current request's user.
+        """
+        selected = []
+        mode = block_structure.get_xblock_field(block_key, 'mode')
+        max_count = block_structure.get_xblock_field(block_key, 'max_count')
+
+        if module:
+            state_dict = json.loads(module.state)
+            # Add all selected entries for this user for this
+            # library module to the selected list.
+            for state in state_dict['selected']:
+                usage_key = usage_info.course_key.make_usage_key(state[0], state[1])
+                if usage_key in library_children:
+                    selected.append((state[0], state[1]))
+
+        # update selected
+        previous_count = len(selected)
+        block_keys = LibraryContentModule.make_selection(selected, library_children, max_count, mode)
+        selected = block_keys['selected']
+
+        # publish events for analytics
+        if publish_events:
+            cls._publish_events(block_structure, block_key, previous_count, max_count, block_keys)
+        return set(usage_info.course_key.make_usage_key(s[0], s[1]) for s in selected)
+
     @classmethod
     def _get_student_module(cls, user, course_key, block_key):
         """
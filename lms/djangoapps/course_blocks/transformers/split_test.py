@@ -20,6 +20,8 @@ class SplitTestTransformer(BlockStructureTransformer):
     'group_access' fields.
     """
     VERSION = 1
+    SUPPORTS_SUBTREE_UPDATES = True
+    SUPPORTS_BATCH_TRANSFORM = True
 
     @classmethod
     def name(cls):
@@ -79,3 +81,18 @@ class SplitTestTransformer(BlockStructureTransformer):
             lambda block_key: block_key.block_type == 'split_test',
             keep_descendants=True,
         )
+
+    def get_removal_masks(self, usage_infos, block_structure):
+        """
+        Returns the blocks that transform removes for each of the given
+        usage_infos.
+        """
+        all_usage_infos = (1 << len(usage_infos)) - 1
+        return [(
+            True,
+            {
+                block_key: all_usage_infos
+                for block_key in block_structure.get_block_keys()
+                if block_key.block_type == 'split_test'
+            },
+        )]
@@ -3,9 +3,11 @@ Start Date Transformer implementation.
 """
 from openedx.core.lib.block_cache.transformer import BlockStructureTransformer
 from lms.djangoapps.courseware.access_utils import check_start_date
+from courseware.masquerade import is_masquerading_as_student
+from student.roles import CourseBetaTesterRole
 from xmodule.course_metadata_utils import DEFAULT_START_DATE
 
-from .utils import get_field_on_block
+from .utils import get_field_on_block, group_into_bitsets
 
 
 class StartDateTransformer(BlockStructureTransformer):
@@ -25,6 +27,8 @@ class StartDateTransformer(BlockStructureTransformer):
     Staff users are exempted from visibility rules.
     """
     VERSION = 1
+    SUPPORTS_SUBTREE_UPDATES = True
+    SUPPORTS_BATCH_TRANSFORM = True
     MERGED_START_DATE = 'merged_start_date'
 
     @classmethod
@@ -99,3 +103,41 @@ class StartDateTransformer(BlockStructureTransformer):
                 usage_info.course_key,
             )
         )
+
+    def get_removal_masks(self, usage_infos, block_structure):
+        """
+        Returns the blocks that transform removes for each of the given
+        usage_infos.
+        """
+        if not usage_infos:
+            return []
+
+        # Whether check_start_date grants a non-staff user access to a
+        # block only depends on whether the user is a beta tester and
+        # whether the user is masquerading as a student, so it is only
+        # evaluated for one user of each such group.
+        beta_tester_ids = set(
+            CourseBetaTesterRole(usage_infos[0].course_key).users_with_role().values_list('id', flat=True)
+        )
+        user_groups = group_into_bitsets(
+            usage_infos,
+            lambda usage_info: None if usage_info.has_staff_access else (
+                usage_info.user.id in beta_tester_ids,
+                is_masquerading_as_student(usage_info.user, usage_info.course_key),
+            ),
+        ).values()
+
+        masks = {}
+        for block_key in block_structure.get_block_keys():
+            mask = 0
+            for usage_info, group_mask in user_groups:
+                if not check_start_date(
+                        usage_info.user,
+                        block_structure.get_xblock_field(block_key, 'days_early_for_beta'),
+                        self.get_merged_start_date(block_structure, block_key),
+                        usage_info.course_key,
+                ):
+                    mask |= group_mask
+            if mask:
+                masks[block_key] = mask
+        return [(False, masks)]
@@ -8,7 +8,7 @@ from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 from lms.djangoapps.courseware.access import has_access
 
-from ...api import get_course_blocks
+from ...api import get_course_block_keys_for_users, get_course_blocks
 
 
 class CourseStructureTestCase(ModuleStoreTestCase):
@@ -313,6 +313,16 @@ class BlockParentsMapTestCase(ModuleStoreTestCase):
         # verify staff has access to all blocks
         check_results(self.staff, set(range(len(self.parents_map))), {})
 
+        # verify the results of transforming for both users at once
+        test_user_block_keys, staff_block_keys = get_course_block_keys_for_users(
+            [test_user, self.staff], self.course.location, transformers=transformers
+        )
+        self.assertEquals(
+            test_user_block_keys,
+            {self.xblock_keys[i] for i in expected_user_accessible_blocks},
+        )
+        self.assertEquals(staff_block_keys, set(self.xblock_keys))
+
     def get_block(self, block_index):
         """
         Helper method to retrieve the requested block (index) from the
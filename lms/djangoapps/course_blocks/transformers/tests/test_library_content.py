@@ -5,7 +5,7 @@ import mock
 from student.tests.factories import CourseEnrollmentFactory
 
 from course_blocks.transformers.library_content import ContentLibraryTransformer
-from course_blocks.api import get_course_blocks, clear_course_from_cache
+from course_blocks.api import get_course_block_keys_for_users, get_course_blocks, clear_course_from_cache
 from lms.djangoapps.course_blocks.transformers.tests.test_helpers import CourseStructureTestCase
 
 
@@ -163,3 +163,17 @@ class ContentLibraryTransformerTestCase(CourseStructureTestCase):
                     'html1'
                 )
             )
+
+    @mock.patch('course_blocks.transformers.library_content.tracker.emit')
+    def test_batch_publishes_no_events(self, mock_emit):
+        """
+        Test that the events of assigning library content are published
+        when getting the user's blocks, but not when getting the blocks of
+        many users at once.
+        """
+        block_keys = get_course_block_keys_for_users([self.user], self.course.location, [self.transformer])[0]
+        self.assertIn(self.get_block_key_set(self.blocks, 'library_content1').pop(), block_keys)
+        self.assertFalse(mock_emit.called)
+
+        get_course_blocks(self.user, self.course.location, transformers={self.transformer})
+        self.assertTrue(mock_emit.called)
@@ -4,7 +4,7 @@ User Partitions Transformer
 from openedx.core.lib.block_cache.transformer import BlockStructureTransformer
 
 from .split_test import SplitTestTransformer
-from .utils import get_field_on_block
+from .utils import get_field_on_block, group_into_bitsets
 
 
 class UserPartitionTransformer(BlockStructureTransformer):
@@ -17,6 +17,8 @@ class UserPartitionTransformer(BlockStructureTransformer):
     Staff users are *not* exempted from user partition pathways.
     """
     VERSION = 1
+    SUPPORTS_SUBTREE_UPDATES = True
+    SUPPORTS_BATCH_TRANSFORM = True
 
     @classmethod
     def name(cls):
@@ -89,6 +91,47 @@ class UserPartitionTransformer(BlockStructureTransformer):
             ).check_group_access(user_groups)
         )
 
+    def get_removal_masks(self, usage_infos, block_structure):
+        """
+        Returns the blocks that transform removes for each of the given
+        usage_infos.
+        """
+        removals = SplitTestTransformer().get_removal_masks(usage_infos, block_structure)
+
+        user_partitions = block_structure.get_transformer_data(self, 'user_partitions')
+
+        if not user_partitions:
+            return removals
+
+        # Group access to a block only depends on the user's groups, so
+        # it is only evaluated once for each distinct set of groups.
+        user_groups_list = [
+            _get_user_partition_groups(usage_info.course_key, user_partitions, usage_info.user)
+            for usage_info in usage_infos
+        ]
+        user_groups_bitsets = group_into_bitsets(
+            user_groups_list,
+            lambda user_groups: frozenset(
+                (partition_id, group.id) for partition_id, group in user_groups.iteritems()
+            ),
+        ).values()
+
+        masks = {}
+        for block_key in block_structure.get_block_keys():
+            # The split_test blocks were already removed by the split
+            # test transformer.
+            if block_key.block_type == 'split_test':
+                continue
+            merged_group_access = block_structure.get_transformer_block_field(block_key, self, 'merged_group_access')
+            mask = 0
+            for user_groups, group_mask in user_groups_bitsets:
+                if not merged_group_access.check_group_access(user_groups):
+                    mask |= group_mask
+            if mask:
+                masks[block_key] = mask
+        removals.append((False, masks))
+        return removals
+
 
 class _MergedGroupAccess(object):
     """
@@ -14,3 +14,37 @@ def get_field_on_block(block, field_name, default_value=None):
         return getattr(block, field_name)
     else:
         return default_value
+
+
+def get_usage_infos_mask(usage_infos, condition):
+    """
+    Returns a bitset of the given usage_infos that satisfy the given
+    condition, whose i-th bit is set for usage_infos[i]. Used by the
+    transformers' get_removal_masks methods.
+    """
+    mask = 0
+    for index, usage_info in enumerate(usage_infos):
+        if condition(usage_info):
+            mask |= 1 << index
+    return mask
+
+
+def group_into_bitsets(items, get_key):
+    """
+    Groups the given items by the value of get_key for each item, so
+    that a per-user computation that only depends on that value can be
+    done once for each group in the transformers' get_removal_masks
+    methods. Items whose key is None are left out.
+
+    Returns:
+        dict {key: (item, int)} - For each distinct key, the first item
+            with that key and a bitset of all the items with that key,
+            whose i-th bit is set for items[i].
+    """
+    groups = {}
+    for index, item in enumerate(items):
+        key = get_key(item)
+        if key is not None:
+            representative, mask = groups.get(key, (item, 0))
+            groups[key] = (representative, mask | (1 << index))
+    return groups
@@ -3,6 +3,8 @@ Visibility Transformer implementation.
 """
 from openedx.core.lib.block_cache.transformer import BlockStructureTransformer
 
+from .utils import get_usage_infos_mask
+
 
 class VisibilityTransformer(BlockStructureTransformer):
     """
@@ -18,6 +20,8 @@ class VisibilityTransformer(BlockStructureTransformer):
     Staff users are exempted from visibility rules.
     """
     VERSION = 1
+    SUPPORTS_SUBTREE_UPDATES = True
+    SUPPORTS_BATCH_TRANSFORM = True
 
     MERGED_VISIBLE_TO_STAFF_ONLY = 'merged_visible_to_staff_only'
 
@@ -78,3 +82,16 @@ class VisibilityTransformer(BlockStructureTransformer):
         block_structure.remove_block_if(
             lambda block_key: self.get_visible_to_staff_only(block_structure, block_key)
         )
+
+    def get_removal_masks(self, usage_infos, block_structure):
+        """
+        Returns the blocks that transform removes for each of the given
+        usage_infos.
+        """
+        non_staff_mask = get_usage_infos_mask(usage_infos, lambda usage_info: not usage_info.has_staff_access)
+        masks = {}
+        if non_staff_mask:
+            for block_key in block_structure.get_block_keys():
+                if self.get_visible_to_staff_only(block_structure, block_key):
+                    masks[block_key] = non_staff_mask
+        return [(False, masks)]
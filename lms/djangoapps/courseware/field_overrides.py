@@ -13,18 +13,26 @@ Currently, this module is used in the `module_render` module in this same
 package and is used to wrap the `authored_data` when constructing an
 `LmsFieldData`.  This means overrides will be in effect for all scopes covered
 by `authored_data`, e.g. course content and settings stored in Mongo.
+
+The override of each field of each block, and the override it inherits from
+its ancestors, are resolved at most once per request (or Celery task) for each
+user, and shared by all of the user's blocks.  They are resolved again if the
+`overrides_version` of any of the providers changes.  Code that changes
+overrides must call `clear_resolved_overrides`.
 """
 import threading
 
 from abc import ABCMeta, abstractmethod
 from contextlib import contextmanager
 from django.conf import settings
+import request_cache
 from request_cache.middleware import RequestCache
 from xblock.field_data import FieldData
 from xmodule.modulestore.inheritance import InheritanceMixin
 
 NOTSET = object()
 ENABLED_OVERRIDE_PROVIDERS_KEY = "courseware.field_overrides.enabled_providers.{course_id}"
+RESOLVED_OVERRIDES_CACHE_NAME = "courseware.field_overrides.resolved"
 
 
 def resolve_dotted(name):
@@ -82,7 +90,7 @@ class OverrideFieldData(FieldData):
             # to check for instance.providers after the instance is built. This
             # would allow for the case where we have registered providers but
             # none are enabled for the provided course
-            return cls(user, wrapped, enabled_providers)
+            return cls(user, wrapped, enabled_providers, course)
 
         return wrapped
 
@@ -110,22 +118,82 @@ class OverrideFieldData(FieldData):
 
         return enabled_providers
 
-    def __init__(self, user, fallback, providers):
+    def __init__(self, user, fallback, providers, course=None):
         self.fallback = fallback
+        self.course = course
         self.providers = tuple(provider(user) for provider in providers)
+        self.resolved_key = (getattr(user, 'id', user), providers)
+
+    def _resolved_overrides(self):
+        """
+        Returns the dictionaries of the overrides and the inherited overrides
+        resolved in this request for the user and providers of this instance,
+        keyed by block location and field name.  Only the latest user's are
+        kept, so that the request cache doesn't grow when rendering or grading
+        for one user after another, and only until the version of the
+        providers' overrides in the course changes.
+        """
+        cache = request_cache.get_cache(RESOLVED_OVERRIDES_CACHE_NAME)
+        key = self.resolved_key + (tuple(provider.overrides_version(self.course) for provider in self.providers),)
+        if cache.get('key') != key:
+            cache['key'] = key
+            cache['overrides'] = {}
+            cache['inherited'] = {}
+        return cache['overrides'], cache['inherited']
 
     def get_override(self, block, name):
         """
         Checks for an override for the field identified by `name` in `block`.
         Returns the overridden value or `NOTSET` if no override is found.
         """
-        if not overrides_disabled():
-            for provider in self.providers:
-                value = provider.get(block, name, NOTSET)
-                if value is not NOTSET:
-                    return value
+        if overrides_disabled():
+            return NOTSET
+        location = getattr(block, 'location', None)
+        if location is None:
+            return self._get_override(block, name)
+
+        overrides = self._resolved_overrides()[0]
+        try:
+            return overrides[location, name]
+        except KeyError:
+            value = overrides[location, name] = self._get_override(block, name)
+            return value
+
+    def _get_override(self, block, name):
+        """
+        Queries the providers for an override of the field `name` in `block`.
+        """
+        for provider in self.providers:
+            value = provider.get(block, name, NOTSET)
+            if value is not NOTSET:
+                return value
         return NOTSET
 
+    def get_inherited_override(self, block, name):
+        """
+        Returns the override of the inheritable field `name` of the nearest
+        ancestor of `block` which has one, or `NOTSET` if none of them do.
+        The result for each ancestor is reused for all of its descendants.
+        """
+        if overrides_disabled():
+            return NOTSET
+        location = getattr(block, 'location', None)
+        if location is not None:
+            inherited = self._resolved_overrides()[1]
+            if (location, name) in inherited:
+                return inherited[location, name]
+
+        value = NOTSET
+        parent = block.get_parent()
+        if parent:
+            value = self.get_override(parent, name)
+            if value is NOTSET:
+                value = self.get_inherited_override(parent, name)
+        if location is not None:
+            # Resolving the ancestors may have replaced the dictionaries.
+            self._resolved_overrides()[1][location, name] = value
+        return value
+
     def get(self, block, name):
         value = self.get_override(block, name)
         if value is not NOTSET:
@@ -147,11 +215,8 @@ class OverrideFieldData(FieldData):
             # If this is an inheritable field and an override is set above,
             # then we want to return False here, so the field_data uses the
             # override and not the original value for this block.
-            inheritable = InheritanceMixin.fields.keys()
-            if name in inheritable:
-                for ancestor in _lineage(block):
-                    if self.get_override(ancestor, name) is not NOTSET:
-                        return False
+            if name in InheritanceMixin.fields and self.get_inherited_override(block, name) is not NOTSET:
+                return False
 
         return has is not NOTSET or self.fallback.has(block, name)
 
@@ -162,12 +227,10 @@ class OverrideFieldData(FieldData):
         # The `default` method is overloaded by the field storage system to
         # also handle inheritance.
         if self.providers and not overrides_disabled():
-            inheritable = InheritanceMixin.fields.keys()
-            if name in inheritable:
-                for ancestor in _lineage(block):
-                    value = self.get_override(ancestor, name)
-                    if value is not NOTSET:
-                        return value
+            if name in InheritanceMixin.fields:
+                value = self.get_inherited_override(block, name)
+                if value is not NOTSET:
+                    return value
         return self.fallback.default(block, name)
 
 
@@ -193,6 +256,14 @@ def disable_overrides():
     _OVERRIDES_DISABLED.disabled = prev
 
 
+def clear_resolved_overrides():
+    """
+    Drops the overrides resolved in this request, after any of them have been
+    set or cleared.
+    """
+    request_cache.get_cache(RESOLVED_OVERRIDES_CACHE_NAME).clear()
+
+
 def overrides_disabled():
     """
     Checks to see whether overrides are disabled in the current context.
@@ -236,13 +307,11 @@ class FieldOverrideProvider(object):
         """
         return False
 
-
-def _lineage(block):
-    """
-    Returns an iterator over all ancestors of the given block, starting with
-    its immediate parent and ending at the root of the block tree.
-    """
-    parent = block.get_parent()
-    while parent:
-        yield parent
-        parent = parent.get_parent()
+    def overrides_version(self, course):
+        """
+        Return a value that is replaced whenever any of this provider's
+        overrides in `course` changes, or None if there is no such value.
+        The overrides resolved by `OverrideFieldData` are resolved again when
+        it changes.
+        """
+        return None
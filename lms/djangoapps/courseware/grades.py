@@ -2,19 +2,27 @@
 from __future__ import division
 from collections import defaultdict
 from functools import partial
+from itertools import islice
 import json
 import random
 import logging
 
 from contextlib import contextmanager
+from datetime import datetime
 from django.conf import settings
-from django.test.client import RequestFactory
+from django.contrib.auth.models import AnonymousUser
 from django.core.cache import cache
+from django.test.client import RequestFactory
+from django.db.models import Max, Min
+from django.db.models.signals import m2m_changed, post_delete
+from django.dispatch import receiver
+from django.utils.timezone import UTC
 
 import dogstats_wrapper as dog_stats_api
 
 from courseware import courses
 from courseware.access import has_access
+from courseware.masquerade import get_course_masquerade
 from courseware.model_data import FieldDataCache, ScoresClient
 from student.models import anonymous_id_for_user
 from util.db import outer_atomic
@@ -23,19 +31,29 @@ from xmodule import graders
 from xmodule.graders import Score
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore.exceptions import ItemNotFoundError
-from .models import StudentModule
+from .models import PersistentMaxScore, PersistentSubsectionGrade, SCORE_CHANGED, StudentModule, iterate_in_id_order
 from .module_render import get_module_for_descriptor
+from .student_field_overrides import has_overrides_for_user, prefetch_overrides_for_users
+from ccx_keys.locator import CCXLocator
 from opaque_keys import InvalidKeyError
-from opaque_keys.edx.keys import CourseKey
+from opaque_keys.edx.keys import CourseKey, UsageKey
+from openedx.core.djangoapps.course_groups.models import CourseUserGroup
 from openedx.core.djangoapps.signals.signals import GRADES_UPDATED
 
 
 log = logging.getLogger("edx.courseware")
 
+# Number of students graded together by iterate_grades_for
+GRADING_CHUNK_SIZE = 100
+
+# Number of StudentModules fetched at a time by answer_distributions
+ANSWER_DISTRIBUTION_BATCH_SIZE = 1000
+
 
 class MaxScoresCache(object):
     """
-    A cache for unweighted max scores for problems.
+    A cache for unweighted max scores for problems, stored in the
+    PersistentMaxScore table for the published version of a course.
 
     The key assumption here is that any problem that has not yet recorded a
     score for a user is worth the same number of points. An XBlock is free to
@@ -43,9 +61,15 @@ class MaxScoresCache(object):
     issued a score -- say a problem two students have only seen mentioned in
     their progress pages and never interacted with -- should be worth the same
     number of points for everyone.
+
+    The max scores of a course without a version (see
+    course_version_for_grading), such as an XML course, are cached in Django's
+    cache for a day instead, since its content could change without its stored
+    max scores being replaced.
     """
-    def __init__(self, cache_prefix):
-        self.cache_prefix = cache_prefix
+    def __init__(self, course_id, course_version):
+        self.course_id = course_id
+        self.course_version = course_version
         self._max_scores_cache = {}
         self._max_scores_updates = {}
 
@@ -54,35 +78,52 @@ class MaxScoresCache(object):
         """
         Given a CourseDescriptor, return a correctly configured `MaxScoresCache`
 
-        This method will base the `MaxScoresCache` cache prefix value on the
-        last time something was published to the live version of the course.
-        This is so that we don't have to worry about stale cached values for
-        max scores -- any time a content change occurs, we change our cache
-        keys.
+        The max scores are keyed by the last time something was published to
+        the live version of the course, so that we don't have to worry about
+        stale values for max scores -- any time a content change occurs, the
+        max scores of the new version are computed and stored.
         """
-        if course.subtree_edited_on is None:
-            # check for subtree_edited_on because old XML courses doesn't have this attribute
-            cache_key = u"{}".format(course.id)
-        else:
-            cache_key = u"{}.{}".format(course.id, course.subtree_edited_on.isoformat())
-        return cls(cache_key)
+        return cls(course.id, course_version_for_grading(course))
 
     def fetch_from_remote(self, locations):
         """
-        Populate the local cache with values from django's cache
+        Populate the local cache with the stored max scores of `locations`
         """
-        remote_dict = cache.get_many([self._remote_cache_key(loc) for loc in locations])
+        locations = set(unicode(location) for location in locations)
+        if not locations:
+            return
+        if not self.course_version:
+            remote_dict = cache.get_many([self._remote_cache_key(location) for location in locations])
+            self._max_scores_cache = {
+                self._local_cache_key(remote_key): value
+                for remote_key, value in remote_dict.items()
+                if value is not None
+            }
+            return
         self._max_scores_cache = {
-            self._local_cache_key(remote_key): value
-            for remote_key, value in remote_dict.items()
-            if value is not None
+            location: max_score
+            for location, max_score in PersistentMaxScore.max_scores_for_course(
+                self.course_id, self.course_version
+            ).iteritems()
+            if location in locations
         }
 
     def push_to_remote(self):
         """
-        Update the remote cache
+        Store the updated max scores
         """
-        if self._max_scores_updates:
+        if not self._max_scores_updates:
+            return
+        if self.course_version:
+            PersistentMaxScore.save_max_scores(
+                self.course_id,
+                self.course_version,
+                {
+                    UsageKey.from_string(key).map_into_course(self.course_id): value
+                    for key, value in self._max_scores_updates.items()
+                },
+            )
+        else:
             cache.set_many(
                 {
                     self._remote_cache_key(key): value
@@ -90,21 +131,25 @@ class MaxScoresCache(object):
                 },
                 60 * 60 * 24  # 1 day
             )
+        # The cache may be shared by several gradings (see
+        # iterate_grades_for), so don't push the same updates again.
+        self._max_scores_cache.update(self._max_scores_updates)
+        self._max_scores_updates = {}
 
     def _remote_cache_key(self, location):
-        """Convert a location to a remote cache key (add our prefixing)."""
-        return u"grades.MaxScores.{}___{}".format(self.cache_prefix, unicode(location))
+        """Convert a location to a key in Django's cache (add our prefixing)."""
+        return u"grades.MaxScores.{}___{}".format(self.course_id, unicode(location))
 
     def _local_cache_key(self, remote_key):
-        """Convert a remote cache key to a local cache key (i.e. location str)."""
+        """Convert a key in Django's cache to a local cache key (i.e. location str)."""
         return remote_key.split(u"___", 1)[1]
 
     def num_cached_from_remote(self):
-        """How many items did we pull down from the remote cache?"""
+        """How many items did we pull down from the stored max scores?"""
         return len(self._max_scores_cache)
 
     def num_cached_updates(self):
-        """How many local updates are we waiting to push to the remote cache?"""
+        """How many local updates are we waiting to store?"""
         return len(self._max_scores_updates)
 
     def set(self, location, max_score):
@@ -202,7 +247,16 @@ def field_data_cache_for_grading(course, user):
     )
 
 
-def answer_distributions(course_key):
+def descriptors_for_grading(course):
+    """
+    Return the list of descriptors in `course` that field_data_cache_for_grading
+    would load state for.
+    """
+    descriptor_filter = partial(descriptor_affects_grading, course.block_types_affecting_grading)
+    return FieldDataCache.descriptor_descendents(course, depth=None, descriptor_filter=descriptor_filter)
+
+
+def answer_distributions(course_key, id_range=None, batch_size=ANSWER_DISTRIBUTION_BATCH_SIZE):
     """
     Given a course_key, return answer distributions in the form of a dictionary
     mapping:
@@ -230,6 +284,12 @@ def answer_distributions(course_key):
     generate the report.
 
     This method will try to use a read-replica database if one is available.
+
+    The StudentModule entries are fetched batch_size at a time, in order of id,
+    so that they are never all held in memory at once. To split the work
+    between tasks, each can count the entries with ids within an id_range
+    (an inclusive (first id, last id) tuple, see answer_distribution_id_ranges),
+    and the results can be combined with merge_answer_distributions.
     """
     # dict: { module.module_state_key : (url_name, display_name) }
     state_keys_to_problem_info = {}  # For caching, used by url_and_display_name
@@ -252,10 +312,13 @@ def answer_distributions(course_key):
 
         return state_keys_to_problem_info[usage_key]
 
-    # Iterate through all problems submitted for this course in no particular
-    # order, and build up our answer_counts dict that we will eventually return
+    # Iterate through all problems submitted for this course in order of id,
+    # and build up our answer_counts dict that we will eventually return
     answer_counts = defaultdict(lambda: defaultdict(int))
-    for module in StudentModule.all_submitted_problems_read_only(course_key):
+    modules = StudentModule.all_submitted_problems_read_only(course_key)
+    if id_range is not None:
+        modules = modules.filter(id__range=id_range)
+    for module in iterate_in_id_order(modules, batch_size):
         try:
             state_dict = json.loads(module.state) if module.state else {}
             raw_answers = state_dict.get("student_answers", {})
@@ -295,13 +358,47 @@ def answer_distributions(course_key):
     return answer_counts
 
 
-def grade(student, request, course, keep_raw_scores=False, field_data_cache=None, scores_client=None):
+def answer_distribution_id_ranges(course_key, count):
+    """
+    Split the ids of the StudentModule entries counted by answer_distributions
+    for course_key into at most count inclusive (first id, last id) ranges of
+    about the same size, to pass as its id_range.
+    """
+    id_bounds = StudentModule.all_submitted_problems_read_only(course_key).aggregate(Min('id'), Max('id'))
+    first_id, last_id = id_bounds['id__min'], id_bounds['id__max']
+    if first_id is None:
+        return []
+    range_size = (last_id - first_id) // count + 1
+    return [
+        (range_first_id, min(range_first_id + range_size - 1, last_id))
+        for range_first_id in xrange(first_id, last_id + 1, range_size)
+    ]
+
+
+def merge_answer_distributions(distributions):
+    """
+    Combine the answer distributions returned by answer_distributions for
+    different id ranges into the answer distribution of all of them.
+    """
+    answer_counts = defaultdict(lambda: defaultdict(int))
+    for distribution in distributions:
+        for problem_part, counts in distribution.iteritems():
+            for answer, count in counts.iteritems():
+                answer_counts[problem_part][answer] += count
+    return answer_counts
+
+
+def grade(student, request, course, keep_raw_scores=False, field_data_cache=None, scores_client=None,
+          bulk_data=None):
     """
     Returns the grade of the student.
 
     Also sends a signal to update the minimum grade requirement status.
+
+    `bulk_data` is only used by iterate_grades_for, to share course-wide
+    grading data between the students it grades.
     """
-    grade_summary = _grade(student, request, course, keep_raw_scores, field_data_cache, scores_client)
+    grade_summary = _grade(student, request, course, keep_raw_scores, field_data_cache, scores_client, bulk_data)
     responses = GRADES_UPDATED.send_robust(
         sender=None,
         username=student.username,
@@ -316,7 +413,7 @@ def grade(student, request, course, keep_raw_scores=False, field_data_cache=None
     return grade_summary
 
 
-def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_client):
+def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_client, bulk_data=None):
     """
     Unwrapped version of "grade"
 
@@ -336,36 +433,25 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
       for every graded module
 
     More information on the format is in the docstring for CourseGrader.
-    """
-    with outer_atomic():
-        if field_data_cache is None:
-            field_data_cache = field_data_cache_for_grading(course, student)
-        if scores_client is None:
-            scores_client = ScoresClient.from_field_data_cache(field_data_cache)
-
-    # Dict of item_ids -> (earned, possible) point tuples. This *only* grabs
-    # scores that were registered with the submissions API, which for the moment
-    # means only openassessment (edx-ora2)
-    # We need to import this here to avoid a circular dependency of the form:
-    # XBlock --> submissions --> Django Rest Framework error strings -->
-    # Django translation --> ... --> courseware --> submissions
-    from submissions import api as sub_api  # installed from the edx-submissions repository
-
-    with outer_atomic():
-        submissions_scores = sub_api.get_scores(
-            course.id.to_deprecated_string(),
-            anonymous_id_for_user(student, course.id)
-        )
-        max_scores_cache = MaxScoresCache.create_for_course(course)
 
-        # For the moment, we have to get scorable_locations from field_data_cache
-        # and not from scores_client, because scores_client is ignorant of things
-        # in the submissions API. As a further refactoring step, submissions should
-        # be hidden behind the ScoresClient.
-        max_scores_cache.fetch_from_remote(field_data_cache.scorable_locations)
+    If the ENABLE_PERSISTENT_SUBSECTION_GRADES feature is on, subsection totals
+    stored by a previous call are reused, and only the subsections without a
+    stored total are graded (and then stored). The student's scoring data is
+    not loaded at all if every subsection has a stored total.
+    """
+    use_persisted_grades = _use_persisted_grades(student, request, course, keep_raw_scores)
+    course_version = course_version_for_grading(course)
+    persisted_grades = {}
+    if use_persisted_grades:
+        with outer_atomic():
+            # The version is read before any scores, so that the totals computed
+            # from them aren't stored if they change meanwhile.
+            grades_version = PersistentSubsectionGrade.grades_version(student, course.id)
+            persisted_grades = PersistentSubsectionGrade.grades_for_user(student, course.id, course_version)
 
     grading_context = course.grading_context
     raw_scores = []
+    scoring_data = None
 
     totaled_scores = {}
     # This next complicated loop is just to collect the totaled_scores, which is
@@ -376,98 +462,45 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
             section_descriptor = section['section_descriptor']
             section_name = section_descriptor.display_name_with_default_escaped
 
-            with outer_atomic():
-                # some problems have state that is updated independently of interaction
-                # with the LMS, so they need to always be scored. (E.g. combinedopenended ORA1)
-                # TODO This block is causing extra savepoints to be fired that are empty because no queries are executed
-                # during the loop. When refactoring this code please keep this outer_atomic call in mind and ensure we
-                # are not making unnecessary database queries.
-                should_grade_section = any(
-                    descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']
-                )
-
-                # If there are no problems that always have to be regraded, check to
-                # see if any of our locations are in the scores from the submissions
-                # API. If scores exist, we have to calculate grades for this section.
-                if not should_grade_section:
-                    should_grade_section = any(
-                        descriptor.location.to_deprecated_string() in submissions_scores
-                        for descriptor in section['xmoduledescriptors']
-                    )
+            # some problems have state that is updated independently of interaction
+            # with the LMS, so they need to always be scored. (E.g. combinedopenended ORA1)
+            always_recalculate = any(
+                descriptor.always_recalculate_grades for descriptor in section['xmoduledescriptors']
+            )
 
-                if not should_grade_section:
-                    should_grade_section = any(
-                        descriptor.location in scores_client
-                        for descriptor in section['xmoduledescriptors']
+            persisted_grade = persisted_grades.get(section_descriptor.location)
+            if persisted_grade is not None and not always_recalculate:
+                earned, possible = persisted_grade
+                graded_total = Score(earned, possible, True, section_name, None)
+            else:
+                if scoring_data is None:
+                    scoring_data = _ScoringData.load(student, course, field_data_cache, scores_client, bulk_data)
+
+                with outer_atomic():
+                    graded_total, scores = _grade_section(
+                        student, request, course, section, scoring_data, always_recalculate
                     )
-
-                # If we haven't seen a single problem in the section, we don't have
-                # to grade it at all! We can assume 0%
-                if should_grade_section:
-                    scores = []
-
-                    def create_module(descriptor):
-                        '''creates an XModule instance given a descriptor'''
-                        # TODO: We need the request to pass into here. If we could forego that, our arguments
-                        # would be simpler
-                        return get_module_for_descriptor(
-                            student, request, descriptor, field_data_cache, course.id, course=course
-                        )
-
-                    descendants = yield_dynamic_descriptor_descendants(section_descriptor, student.id, create_module)
-                    for module_descriptor in descendants:
-                        user_access = has_access(
-                            student, 'load', module_descriptor, module_descriptor.location.course_key
-                        )
-                        if not user_access:
-                            continue
-
-                        (correct, total) = get_score(
+                    if keep_raw_scores:
+                        raw_scores += scores
+                    if use_persisted_grades and not always_recalculate and _has_started(section):
+                        PersistentSubsectionGrade.save_grade(
                             student,
-                            module_descriptor,
-                            create_module,
-                            scores_client,
-                            submissions_scores,
-                            max_scores_cache,
-                        )
-                        if correct is None and total is None:
-                            continue
-
-                        if settings.GENERATE_PROFILE_SCORES:    # for debugging!
-                            if total > 1:
-                                correct = random.randrange(max(total - 2, 1), total + 1)
-                            else:
-                                correct = total
-
-                        graded = module_descriptor.graded
-                        if not total > 0:
-                            # We simply cannot grade a problem that is 12/0, because we might need it as a percentage
-                            graded = False
-
-                        scores.append(
-                            Score(
-                                correct,
-                                total,
-                                graded,
-                                module_descriptor.display_name_with_default_escaped,
-                                module_descriptor.location
-                            )
+                            course.id,
+                            section_descriptor.location,
+                            course_version,
+                            graded_total.earned,
+                            graded_total.possible,
+                            grades_version,
                         )
 
-                    __, graded_total = graders.aggregate_scores(scores, section_name)
-                    if keep_raw_scores:
-                        raw_scores += scores
-                else:
-                    graded_total = Score(0.0, 1.0, True, section_name, None)
-
-                #Add the graded total to totaled_scores
-                if graded_total.possible > 0:
-                    format_scores.append(graded_total)
-                else:
-                    log.info(
-                        "Unable to grade a section with a total possible score of zero. " +
-                        str(section_descriptor.location)
-                    )
+            #Add the graded total to totaled_scores
+            if graded_total.possible > 0:
+                format_scores.append(graded_total)
+            else:
+                log.info(
+                    "Unable to grade a section with a total possible score of zero. " +
+                    str(section_descriptor.location)
+                )
 
         totaled_scores[section_format] = format_scores
 
@@ -488,11 +521,404 @@ def _grade(student, request, course, keep_raw_scores, field_data_cache, scores_c
             # so grader can be double-checked
             grade_summary['raw_scores'] = raw_scores
 
-        max_scores_cache.push_to_remote()
+        if scoring_data is not None:
+            scoring_data.max_scores_cache.push_to_remote()
 
     return grade_summary
 
 
+class _ScoringData(object):
+    """
+    The per-student data needed to score the problems in a course: student
+    state, scores from the submissions API and cached max scores.
+    """
+    def __init__(self, student, course, field_data_cache, scores_client, submissions_scores, max_scores_cache,
+                 descriptors=None):
+        self.student = student
+        self.course = course
+        self.scores_client = scores_client
+        self.submissions_scores = submissions_scores
+        self.max_scores_cache = max_scores_cache
+        self._field_data_cache = field_data_cache
+        self._descriptors = descriptors
+
+    @property
+    def field_data_cache(self):
+        """
+        The student's FieldDataCache. When grading in bulk, it is only created
+        (from the shared descriptors) the first time a module is instantiated.
+        """
+        if self._field_data_cache is None:
+            with outer_atomic():
+                self._field_data_cache = FieldDataCache(self._descriptors, self.course.id, self.student)
+        return self._field_data_cache
+
+    @classmethod
+    def load(cls, student, course, field_data_cache=None, scores_client=None, bulk_data=None):
+        """
+        Load the scoring data for `student` in `course`, reusing the
+        `field_data_cache` and `scores_client` if they were provided, and the
+        course-wide data in `bulk_data` (a _BulkGradingData) if it was.
+        """
+        descriptors = None
+        if bulk_data is not None:
+            descriptors = bulk_data.descriptors
+            max_scores_cache = bulk_data.max_scores_cache
+            if scores_client is None:
+                scores_client = bulk_data.scores_client_for(student)
+        else:
+            with outer_atomic():
+                if field_data_cache is None:
+                    field_data_cache = field_data_cache_for_grading(course, student)
+                if scores_client is None:
+                    scores_client = ScoresClient.from_field_data_cache(field_data_cache)
+
+                max_scores_cache = MaxScoresCache.create_for_course(course)
+
+                # For the moment, we have to get scorable_locations from field_data_cache
+                # and not from scores_client, because scores_client is ignorant of things
+                # in the submissions API. As a further refactoring step, submissions should
+                # be hidden behind the ScoresClient.
+                max_scores_cache.fetch_from_remote(field_data_cache.scorable_locations)
+
+        # Dict of item_ids -> (earned, possible) point tuples. This *only* grabs
+        # scores that were registered with the submissions API, which for the moment
+        # means only openassessment (edx-ora2)
+        # We need to import this here to avoid a circular dependency of the form:
+        # XBlock --> submissions --> Django Rest Framework error strings -->
+        # Django translation --> ... --> courseware --> submissions
+        from submissions import api as sub_api  # installed from the edx-submissions repository
+
+        with outer_atomic():
+            submissions_scores = sub_api.get_scores(
+                course.id.to_deprecated_string(),
+                anonymous_id_for_user(student, course.id)
+            )
+
+        return cls(
+            student, course, field_data_cache, scores_client, submissions_scores, max_scores_cache, descriptors
+        )
+
+
+class _BulkGradingData(object):
+    """
+    Course-wide grading data shared by all the students graded in one call to
+    iterate_grades_for: the descriptors that affect grading and the max scores
+    cache are loaded once for the course, and the ScoresClients of a chunk of
+    students are fetched together.
+    """
+    def __init__(self, course):
+        self.course = course
+        with outer_atomic():
+            self.descriptors = descriptors_for_grading(course)
+            self.scorable_locations = set(
+                descriptor.location for descriptor in self.descriptors if descriptor.has_score
+            )
+            self.max_scores_cache = MaxScoresCache.create_for_course(course)
+            self.max_scores_cache.fetch_from_remote(self.scorable_locations)
+        self._scores_clients = {}
+
+    def prefetch_scores(self, students):
+        """
+        Fetch the scores of all `students` at once, replacing the scores
+        fetched for the previous chunk of students. Their individual due date
+        extensions are fetched at once too, if the feature is enabled.
+        """
+        with outer_atomic():
+            self._scores_clients = ScoresClient.create_for_users(
+                self.course.id,
+                [student.id for student in students],
+                self.scorable_locations,
+            )
+            if settings.FEATURES.get('INDIVIDUAL_DUE_DATES'):
+                prefetch_overrides_for_users(students, self.course.id)
+
+    def scores_client_for(self, student):
+        """
+        Return the ScoresClient for `student`, fetching it on its own if it
+        wasn't part of the prefetched chunk.
+        """
+        scores_client = self._scores_clients.get(student.id)
+        if scores_client is None:
+            scores_client = ScoresClient(self.course.id, student.id)
+            scores_client.fetch_scores(self.scorable_locations)
+        return scores_client
+
+
+def _grade_section(student, request, course, section, scoring_data, should_grade_section=False):
+    """
+    Grade a single section of the course's grading context for `student`.
+
+    Returns a tuple of (graded_total, scores), where graded_total is the
+    aggregated Score for the section and scores is the list of Scores of the
+    individual problems in it.
+    """
+    section_descriptor = section['section_descriptor']
+    section_name = section_descriptor.display_name_with_default_escaped
+    scores = []
+
+    # If there are no problems that always have to be regraded, check to
+    # see if any of our locations are in the scores from the submissions
+    # API. If scores exist, we have to calculate grades for this section.
+    if not should_grade_section:
+        should_grade_section = any(
+            descriptor.location.to_deprecated_string() in scoring_data.submissions_scores
+            for descriptor in section['xmoduledescriptors']
+        )
+
+    if not should_grade_section:
+        should_grade_section = any(
+            descriptor.location in scoring_data.scores_client
+            for descriptor in section['xmoduledescriptors']
+        )
+
+    # If we haven't seen a single problem in the section, we don't have
+    # to grade it at all! We can assume 0%
+    if not should_grade_section:
+        return Score(0.0, 1.0, True, section_name, None), scores
+
+    def create_module(descriptor):
+        '''creates an XModule instance given a descriptor'''
+        # TODO: We need the request to pass into here. If we could forego that, our arguments
+        # would be simpler
+        return get_module_for_descriptor(
+            student, request, descriptor, scoring_data.field_data_cache, course.id, course=course
+        )
+
+    descendants = yield_dynamic_descriptor_descendants(section_descriptor, student.id, create_module)
+    for module_descriptor in descendants:
+        user_access = has_access(
+            student, 'load', module_descriptor, module_descriptor.location.course_key
+        )
+        if not user_access:
+            continue
+
+        (correct, total) = get_score(
+            student,
+            module_descriptor,
+            create_module,
+            scoring_data.scores_client,
+            scoring_data.submissions_scores,
+            scoring_data.max_scores_cache,
+        )
+        if correct is None and total is None:
+            continue
+
+        if settings.GENERATE_PROFILE_SCORES:    # for debugging!
+            if total > 1:
+                correct = random.randrange(max(total - 2, 1), total + 1)
+            else:
+                correct = total
+
+        graded = module_descriptor.graded
+        if not total > 0:
+            # We simply cannot grade a problem that is 12/0, because we might need it as a percentage
+            graded = False
+
+        scores.append(
+            Score(
+                correct,
+                total,
+                graded,
+                module_descriptor.display_name_with_default_escaped,
+                module_descriptor.location
+            )
+        )
+
+    __, graded_total = graders.aggregate_scores(scores, section_name)
+    return graded_total, scores
+
+
+def _use_persisted_grades(student, request, course, keep_raw_scores=False):
+    """
+    Whether subsection totals can be read from and written to the
+    PersistentSubsectionGrade table. Raw scores are never persisted, so callers
+    asking for them always get a full grading pass.
+
+    The stored totals are keyed by the published version of the course, so
+    they aren't used when the student's view of the course differs from it:
+    in a CCX, whose overrides change without a publish, when the student has
+    individual field overrides (e.g. due dates), or when the requesting user
+    is masquerading.
+    """
+    return (
+        settings.FEATURES.get('ENABLE_PERSISTENT_SUBSECTION_GRADES', False) and
+        not keep_raw_scores and
+        not settings.GENERATE_PROFILE_SCORES and
+        not isinstance(course.id, CCXLocator) and
+        get_course_masquerade(getattr(request, 'user', None), course.id) is None and
+        not has_overrides_for_user(student, course.id)
+    )
+
+
+def _has_started(section):
+    """
+    Whether all the blocks of a section of the grading context have started.
+    The total of a section that is still being released isn't stored, since
+    the blocks the student can access change when their start dates pass.
+    """
+    now = datetime.now(UTC())
+    return all(
+        descriptor.start is None or descriptor.start <= now
+        for descriptor in [section['section_descriptor']] + section['xmoduledescriptors']
+    )
+
+
+def course_version_for_grading(course):
+    """
+    Return a string identifying the published content of `course`, used to key
+    stored grading data so that it stops being used after the next publish.
+    """
+    if course.subtree_edited_on is None:
+        # check for subtree_edited_on because old XML courses doesn't have this attribute
+        return u""
+    return course.subtree_edited_on.isoformat()
+
+
+def compute_max_scores(course):
+    """
+    Compute and store the max scores of the problems in the published version
+    of `course`, so that grading reads them instead of instantiating problems
+    the students haven't been scored on. The max scores stored for the
+    previous versions of the course are deleted.
+
+    With the PRECOMPUTE_MAX_SCORES_ON_PUBLISH feature, this is run on publish
+    by the openedx.core.djangoapps.max_scores app.
+
+    The problems are instantiated for an anonymous "noauth" user, like
+    module_render.handle_xblock_callback_noauth, since a problem that has not
+    recorded a score for a user is worth the same number of points to all of
+    them (see MaxScoresCache).
+    """
+    course_version = course_version_for_grading(course)
+    if not course_version:
+        return
+
+    user = AnonymousUser()
+    user.known = False
+    request = _get_mock_request(user)
+    field_data_cache = FieldDataCache([], course.id, user)
+
+    max_scores = {}
+    for descriptor in descriptors_for_grading(course):
+        # Problems that are always recalculated are instantiated for each
+        # user by get_score anyway.
+        if not descriptor.has_score or descriptor.always_recalculate_grades:
+            continue
+        try:
+            problem = get_module_for_descriptor(user, request, descriptor, field_data_cache, course.id, course=course)
+            max_score = problem.max_score() if problem is not None else None
+        except Exception:  # pylint: disable=broad-except
+            log.exception(u"Unable to compute the max score of %s", descriptor.location)
+            continue
+        if max_score is not None:
+            max_scores[descriptor.location] = max_score
+
+    PersistentMaxScore.save_max_scores(course.id, course_version, max_scores)
+    PersistentMaxScore.delete_other_versions(course.id, course_version)
+
+
+def _subsections_for_location(usage_key):
+    """
+    Return a list with the location of the subsection containing `usage_key`,
+    or None if it could not be found in the modulestore.
+    """
+    store = modulestore()
+    location = usage_key
+    try:
+        while location is not None:
+            if location.block_type == 'sequential':
+                return [location]
+            location = store.get_parent_location(location)
+    except ItemNotFoundError:
+        pass
+    return None
+
+
+@receiver(SCORE_CHANGED)
+def invalidate_persisted_subsection_grade(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Consume signals that indicate score changes, and remove the stored total
+    of the subsection containing the changed problem so that it is recomputed
+    on the next grading. See the definition of courseware.models.SCORE_CHANGED
+    for a description of the signal.
+    """
+    if not settings.FEATURES.get('ENABLE_PERSISTENT_SUBSECTION_GRADES', False):
+        return
+
+    user_id = kwargs.get('user_id', None)
+    course_id = kwargs.get('course_id', None)
+    usage_id = kwargs.get('usage_id', None)
+    if None in (user_id, course_id, usage_id):
+        return
+
+    try:
+        course_key = CourseKey.from_string(course_id)
+        usage_key = UsageKey.from_string(usage_id).map_into_course(course_key)
+    except InvalidKeyError:
+        log.warning(u"Unable to invalidate persisted grades for course %s, usage %s", course_id, usage_id)
+        return
+
+    # If the subsection can't be found, drop all of the user's totals for the
+    # course rather than risk serving a stale one.
+    PersistentSubsectionGrade.invalidate(user_id, course_key, _subsections_for_location(usage_key))
+
+
+@receiver(post_delete, sender=StudentModule)
+def invalidate_persisted_subsection_grade_on_delete(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Deleting a StudentModule (e.g. when an instructor deletes a student's state
+    for a problem) removes its score without sending SCORE_CHANGED, so the
+    stored total of the containing subsection is removed here.
+    """
+    if not settings.FEATURES.get('ENABLE_PERSISTENT_SUBSECTION_GRADES', False):
+        return
+
+    if instance.grade is None and instance.max_grade is None:
+        return
+
+    usage_key = instance.module_state_key.map_into_course(instance.course_id)
+    PersistentSubsectionGrade.invalidate(
+        instance.student_id, instance.course_id, _subsections_for_location(usage_key)
+    )
+
+
+@receiver(m2m_changed, sender=CourseUserGroup.users.through)
+def invalidate_persisted_grades_on_group_change(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Adding a user to a cohort or another group, or removing them from it,
+    changes the content they can access, and so the problems that count
+    towards their grade. All of their stored totals for the group's course
+    are removed.
+    """
+    if not settings.FEATURES.get('ENABLE_PERSISTENT_SUBSECTION_GRADES', False):
+        return
+
+    action = kwargs["action"]
+    instance = kwargs["instance"]
+    pk_set = kwargs["pk_set"]
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    if kwargs["reverse"]:
+        # The groups of a user changed.
+        if action == 'pre_clear':
+            groups = instance.course_groups.all()
+        else:
+            groups = CourseUserGroup.objects.filter(pk__in=pk_set)
+        user_courses = [(instance.id, course_id) for course_id in set(group.course_id for group in groups)]
+    else:
+        # The users of a group changed.
+        if action == 'pre_clear':
+            user_ids = instance.users.values_list('id', flat=True)
+        else:
+            user_ids = pk_set
+        user_courses = [(user_id, instance.course_id) for user_id in user_ids]
+
+    for user_id, course_id in user_courses:
+        PersistentSubsectionGrade.invalidate(user_id, course_id)
+
+
 def grade_for_percentage(grade_cutoffs, percentage):
     """
     Returns a letter grade as defined in grading_policy (e.g. 'A' 'B' 'C' for 6.002x) or None.
@@ -752,7 +1178,7 @@ def get_score(user, problem_descriptor, module_creator, scores_client, submissio
     return weighted_score(correct, total, problem_descriptor.weight)
 
 
-def iterate_grades_for(course_or_id, students, keep_raw_scores=False):
+def iterate_grades_for(course_or_id, students, keep_raw_scores=False, chunk_size=GRADING_CHUNK_SIZE):
     """Given a course_id and an iterable of students (User), yield a tuple of:
 
     (student, gradeset, err_msg) for every student enrolled in the course.
@@ -769,34 +1195,57 @@ def iterate_grades_for(course_or_id, students, keep_raw_scores=False):
     - grade_breakdown : A breakdown of the major components that
         make up the final grade. (For display)
     - raw_scores: contains scores for every graded module
+
+    Students are graded in chunks of `chunk_size`. The course structure and
+    max scores are loaded once for the whole course, and the scores of each
+    chunk of students are fetched with a single query.
     """
     if isinstance(course_or_id, (basestring, CourseKey)):
         course = courses.get_course_by_id(course_or_id)
     else:
         course = course_or_id
 
-    for student in students:
-        with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course.id)]):
-            try:
-                request = _get_mock_request(student)
-                # Grading calls problem rendering, which calls masquerading,
-                # which checks session vars -- thus the empty session dict below.
-                # It's not pretty, but untangling that is currently beyond the
-                # scope of this feature.
-                request.session = {}
-                gradeset = grade(student, request, course, keep_raw_scores)
-                yield student, gradeset, ""
-            except Exception as exc:  # pylint: disable=broad-except
-                # Keep marching on even if this student couldn't be graded for
-                # some reason, but log it for future reference.
-                log.exception(
-                    'Cannot grade student %s (%s) in course %s because of exception: %s',
-                    student.username,
-                    student.id,
-                    course.id,
-                    exc.message
-                )
-                yield student, {}, exc.message
+    bulk_data = None
+    for student_chunk in _chunked(students, chunk_size):
+        if bulk_data is None:
+            bulk_data = _BulkGradingData(course)
+        bulk_data.prefetch_scores(student_chunk)
+
+        for student in student_chunk:
+            with dog_stats_api.timer('lms.grades.iterate_grades_for', tags=[u'action:{}'.format(course.id)]):
+                try:
+                    request = _get_mock_request(student)
+                    # Grading calls problem rendering, which calls masquerading,
+                    # which checks session vars -- thus the empty session dict below.
+                    # It's not pretty, but untangling that is currently beyond the
+                    # scope of this feature.
+                    request.session = {}
+                    gradeset = grade(student, request, course, keep_raw_scores, bulk_data=bulk_data)
+                    yield student, gradeset, ""
+                except Exception as exc:  # pylint: disable=broad-except
+                    # Keep marching on even if this student couldn't be graded for
+                    # some reason, but log it for future reference.
+                    log.exception(
+                        'Cannot grade student %s (%s) in course %s because of exception: %s',
+                        student.username,
+                        student.id,
+                        course.id,
+                        exc.message
+                    )
+                    yield student, {}, exc.message
+
+
+def _chunked(iterable, chunk_size):
+    """
+    Yield lists of up to `chunk_size` items from `iterable`, without loading
+    all of it into memory.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
 
 
 def _get_mock_request(student):
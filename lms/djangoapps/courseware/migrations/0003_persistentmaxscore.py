@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import xmodule_django.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courseware', '0002_persistentsubsectiongrade'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PersistentMaxScore',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('course_id', xmodule_django.models.CourseKeyField(max_length=255, db_index=True)),
+                ('course_version', models.CharField(max_length=255)),
+                ('usage_key', xmodule_django.models.LocationKeyField(max_length=255)),
+                ('max_score', models.FloatField()),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='persistentmaxscore',
+            unique_together=set([('course_id', 'course_version', 'usage_key')]),
+        ),
+    ]
@@ -750,6 +750,22 @@ class FieldDataCache(object):
             descriptor_filter is a function that accepts a descriptor and return whether the field data
                 should be cached
         """
+        self.add_descriptors_to_cache(self.descriptor_descendents(descriptor, depth, descriptor_filter))
+
+    @staticmethod
+    def descriptor_descendents(descriptor, depth=None, descriptor_filter=lambda descriptor: True):
+        """
+        Return a list of `descriptor` and its descendants that would be added
+        to a FieldDataCache by `add_descriptor_descendents`. This lets callers
+        that build caches for many users walk the course only once.
+
+        Arguments:
+            descriptor: An XModuleDescriptor
+            depth is the number of levels of descendant modules to include, in addition to
+                the supplied descriptor. If depth is None, include all descendants
+            descriptor_filter is a function that accepts a descriptor and return whether it
+                should be included
+        """
 
         def get_child_descriptors(descriptor, depth, descriptor_filter):
             """
@@ -775,9 +791,7 @@ class FieldDataCache(object):
             return descriptors
 
         with modulestore().bulk_operations(descriptor.location.course_key):
-            descriptors = get_child_descriptors(descriptor, depth, descriptor_filter)
-
-        self.add_descriptors_to_cache(descriptors)
+            return get_child_descriptors(descriptor, depth, descriptor_filter)
 
     @classmethod
     def cache_for_descriptor_descendents(cls, course_id, user, descriptor, depth=None,
@@ -989,6 +1003,37 @@ class ScoresClient(object):
         client.fetch_scores(fd_cache.scorable_locations)
         return client
 
+    @classmethod
+    def create_for_users(cls, course_key, user_ids, locations):
+        """
+        Create ScoresClients for many users at once, fetching all of their
+        scores for `locations` in a single query.
+
+        Returns a dict mapping each of the `user_ids` to its ScoresClient.
+        """
+        clients = {}
+        for user_id in user_ids:
+            client = cls(course_key, user_id)
+            client._has_fetched = True  # pylint: disable=protected-access
+            clients[user_id] = client
+
+        if not clients:
+            return clients
+
+        scores_qset = StudentModule.objects.filter(
+            student_id__in=clients.keys(),
+            course_id=course_key,
+            module_state_key__in=set(locations),
+        )
+        for user_id, location, correct, total in scores_qset.values_list(
+                'student_id', 'module_state_key', 'grade', 'max_grade'
+        ):
+            # See fetch_scores() for why the course key is mapped back in.
+            usage_key = UsageKey.from_string(location).map_into_course(course_key)
+            clients[user_id]._locations_to_scores[usage_key] = cls.Score(correct, total)  # pylint: disable=protected-access
+
+        return clients
+
 
 # @contract(user_id=int, usage_key=UsageKey, score="number|None", max_score="number|None")
 def set_score(user_id, usage_key, score, max_score):
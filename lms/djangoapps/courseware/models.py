@@ -17,7 +17,7 @@ import itertools
 
 from django.contrib.auth.models import User
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver, Signal
 
@@ -39,6 +39,27 @@ def chunks(items, chunk_size):
     return (items[i:i + chunk_size] for i in xrange(0, len(items), chunk_size))
 
 
+def iterate_in_id_order(queryset, batch_size):
+    """
+    Yields the instances in queryset in order of id, fetching batch_size of
+    them per query.
+
+    Each query starts after the last id of the previous one rather than at an
+    offset, so every query costs the same, and only one batch of instances is
+    held in memory at a time.
+    """
+    queryset = queryset.order_by('id')
+    last_id = None
+    while True:
+        batch_queryset = queryset if last_id is None else queryset.filter(id__gt=last_id)
+        batch = list(batch_queryset[:batch_size])
+        for instance in batch:
+            yield instance
+        if len(batch) < batch_size:
+            return
+        last_id = batch[-1].id
+
+
 class ChunkingManager(models.Manager):
     """
     :class:`~Manager` that adds an additional method :meth:`chunked_filter` to provide
@@ -313,6 +334,197 @@ class StudentFieldOverride(TimeStampedModel):
     value = models.TextField(default='null')
 
 
+class PersistentSubsectionGrade(TimeStampedModel):
+    """
+    Stores a user's aggregated score for one graded subsection of a course, so
+    that `courseware.grades.grade` can read subsection totals instead of
+    instantiating every module in the subsection each time it is called.
+
+    Rows are only valid for the version of the course content they were
+    computed against (`course_version`), and are deleted whenever one of the
+    user's scores inside the subsection changes.
+
+    To keep a total computed from scores read before such a change from being
+    stored after it, totals are only saved if the user's
+    PersistentSubsectionGradesVersion for the course is still the one read
+    before grading.
+    """
+    class Meta(object):
+        app_label = "courseware"
+        unique_together = (('user', 'course_id', 'usage_key'),)
+
+    user = models.ForeignKey(User, db_index=True)
+    course_id = CourseKeyField(max_length=255, db_index=True)
+
+    # The subsection (sequential) that these totals were aggregated for
+    usage_key = LocationKeyField(max_length=255, db_index=True)
+
+    # Identifies the published course content the totals were computed from.
+    # Based on the course's subtree_edited_on, like MaxScoresCache.
+    course_version = models.CharField(max_length=255, blank=True)
+
+    earned = models.FloatField()
+    possible = models.FloatField()
+
+    @classmethod
+    def grades_for_user(cls, user, course_id, course_version):
+        """
+        Return a dict of subsection usage key -> (earned, possible) for all the
+        rows stored for `user` in `course_id` at `course_version`.
+        """
+        return {
+            row.usage_key.map_into_course(course_id): (row.earned, row.possible)
+            for row in cls.objects.filter(user=user, course_id=course_id, course_version=course_version)
+        }
+
+    @classmethod
+    def grades_version(cls, user, course_id):
+        """
+        Return the current version of the stored totals for `user` in
+        `course_id`, to be read before the scores that totals are computed from
+        and passed to `save_grade`.
+        """
+        version, __ = PersistentSubsectionGradesVersion.objects.get_or_create(user=user, course_id=course_id)
+        return version.version
+
+    @classmethod
+    def save_grade(cls, user, course_id, usage_key, course_version, earned, possible, grades_version):
+        """
+        Create or update the stored totals for one subsection, unless the
+        user's totals in the course were invalidated since `grades_version`
+        was read. Returns whether the totals were stored.
+        """
+        with transaction.atomic():
+            # Lock the version, so that an invalidation either happens before
+            # this check or waits until the totals are stored.
+            current_version = PersistentSubsectionGradesVersion.objects.select_for_update().filter(
+                user=user, course_id=course_id
+            ).values_list('version', flat=True).first()
+            if current_version != grades_version:
+                return False
+
+            cls.objects.update_or_create(
+                user=user,
+                course_id=course_id,
+                usage_key=usage_key,
+                defaults={
+                    'course_version': course_version,
+                    'earned': earned,
+                    'possible': possible,
+                }
+            )
+        return True
+
+    @classmethod
+    def invalidate(cls, user_id, course_id, usage_keys=None):
+        """
+        Delete stored totals for `user_id` in `course_id`. If `usage_keys` is
+        given, only the rows for those subsections are removed.
+
+        The user's PersistentSubsectionGradesVersion is incremented, so that
+        totals being computed meanwhile aren't stored.
+        """
+        PersistentSubsectionGradesVersion.objects.filter(user_id=user_id, course_id=course_id).update(
+            version=models.F('version') + 1
+        )
+        queryset = cls.objects.filter(user_id=user_id, course_id=course_id)
+        if usage_keys is not None:
+            queryset = queryset.filter(usage_key__in=usage_keys)
+        queryset.delete()
+
+    def __unicode__(self):
+        return u"[PersistentSubsectionGrade] {}: {} ({}) = {}/{}".format(
+            self.user_id, self.usage_key, self.course_version, self.earned, self.possible
+        )
+
+
+class PersistentSubsectionGradesVersion(models.Model):
+    """
+    Counts the invalidations of a user's PersistentSubsectionGrade rows in a
+    course, so that grading can tell whether the totals it computed are still
+    valid when it stores them.
+    """
+    class Meta(object):
+        app_label = "courseware"
+        unique_together = (('user', 'course_id'),)
+
+    user = models.ForeignKey(User, db_index=True)
+    course_id = CourseKeyField(max_length=255, db_index=True)
+    version = models.IntegerField(default=0)
+
+    def __unicode__(self):
+        return u"[PersistentSubsectionGradesVersion] {}: {} = {}".format(self.user_id, self.course_id, self.version)
+
+
+class PersistentMaxScore(models.Model):
+    """
+    Stores the unweighted max score of one problem in one version of a course,
+    so that `courseware.grades.get_score` can read it instead of instantiating
+    the problem for users who haven't been scored on it yet.
+
+    Rows are computed when a course is published (see
+    `courseware.grades.compute_max_scores`) or the first time a problem is
+    graded, and are keyed by the version of the course content they were
+    computed against (`course_version`), like PersistentSubsectionGrade.
+    Storing the rows of a version deletes those of the course's other
+    versions, so that only the rows of one version are kept for each course.
+    """
+    class Meta(object):
+        app_label = "courseware"
+        unique_together = (('course_id', 'course_version', 'usage_key'),)
+
+    course_id = CourseKeyField(max_length=255, db_index=True)
+    course_version = models.CharField(max_length=255)
+    usage_key = LocationKeyField(max_length=255)
+    max_score = models.FloatField()
+
+    @classmethod
+    def max_scores_for_course(cls, course_id, course_version):
+        """
+        Return a dict of unicode(usage key) -> max score for all the rows
+        stored for `course_id` at `course_version`.
+        """
+        return {
+            unicode(row.usage_key.map_into_course(course_id)): row.max_score
+            for row in cls.objects.filter(course_id=course_id, course_version=course_version)
+        }
+
+    @classmethod
+    def save_max_scores(cls, course_id, course_version, max_scores):
+        """
+        Store `max_scores`, a dict of usage key -> max score, for `course_id`
+        at `course_version`, skipping the ones that are already stored, and
+        delete the rows stored for its other versions.
+        """
+        stored = cls.max_scores_for_course(course_id, course_version)
+        rows = [
+            cls(course_id=course_id, course_version=course_version, usage_key=usage_key, max_score=max_score)
+            for usage_key, max_score in max_scores.iteritems()
+            if unicode(usage_key) not in stored
+        ]
+        if not rows:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.bulk_create(rows)
+                cls.delete_other_versions(course_id, course_version)
+        except IntegrityError:
+            # Another process stored some of them first. Any rows that were not
+            # stored are computed again the next time they are needed.
+            pass
+
+    @classmethod
+    def delete_other_versions(cls, course_id, course_version):
+        """
+        Delete the rows stored for `course_id` at versions other than
+        `course_version`.
+        """
+        cls.objects.filter(course_id=course_id).exclude(course_version=course_version).delete()
+
+    def __unicode__(self):
+        return u"[PersistentMaxScore] {} ({}) = {}".format(self.usage_key, self.course_version, self.max_score)
+
+
 # Signal that indicates that a user's score for a problem has been updated.
 # This signal is generated when a scoring event occurs either within the core
 # platform or in the Submissions module. Note that this signal will be triggered
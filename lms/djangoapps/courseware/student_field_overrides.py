@@ -1,11 +1,25 @@
 """
 API related to providing field overrides for individual students.  This is used
 by the individual due dates feature.
+
+All of a student's overrides in a course are loaded with one query the first
+time any of them is read, and kept in the request cache (which is cleared
+around each Celery task).  The cache only holds the overrides of one course,
+for at most MAX_CACHED_USERS students besides the ones prefetched together.
 """
 import json
+from collections import defaultdict, OrderedDict
+
+import request_cache
+
+from .field_overrides import FieldOverrideProvider, clear_resolved_overrides
+from .models import PersistentSubsectionGrade, StudentFieldOverride
 
-from .field_overrides import FieldOverrideProvider
-from .models import StudentFieldOverride
+OVERRIDES_CACHE_NAME = 'courseware.student_field_overrides'
+
+# The maximum number of students whose overrides are loaded one at a time and
+# kept in the request cache; the ones loaded first are dropped first.
+MAX_CACHED_USERS = 500
 
 
 class IndividualStudentOverrideProvider(FieldOverrideProvider):
@@ -29,33 +43,104 @@ def get_override_for_user(user, block, name, default=None):
     specify the block and the name of the field.  If the field is not
     overridden for the given user, returns `default`.
     """
-    if not hasattr(block, '_student_overrides'):
-        block._student_overrides = {}  # pylint: disable=protected-access
-    overrides = block._student_overrides.get(user.id)  # pylint: disable=protected-access
+    # Only the latest user's overrides are memoized on the block, since the
+    # same block may be bound for one user after another (e.g. when grading).
+    overrides = getattr(block, '_student_overrides', {}).get(user.id)
     if overrides is None:
         overrides = _get_overrides_for_user(user, block)
-        block._student_overrides[user.id] = overrides  # pylint: disable=protected-access
+        block._student_overrides = {user.id: overrides}  # pylint: disable=protected-access
     return overrides.get(name, default)
 
 
+def has_overrides_for_user(user, course_id):
+    """
+    Returns whether any field is overridden for the `user` in the course.
+    """
+    return bool(_get_course_overrides_for_user(user, course_id))
+
+
 def _get_overrides_for_user(user, block):
     """
     Gets all of the individual student overrides for given user and block.
     Returns a dictionary of field override values keyed by field name.
     """
-    query = StudentFieldOverride.objects.filter(
-        course_id=block.runtime.course_id,
-        location=block.location,
-        student_id=user.id,
-    )
+    course_id = block.runtime.course_id
     overrides = {}
+    block_overrides = _get_course_overrides_for_user(user, course_id).get(
+        block.location.map_into_course(course_id), {}
+    )
+    for name, serialized_value in block_overrides.iteritems():
+        field = block.fields[name]
+        value = field.from_json(json.loads(serialized_value))
+        overrides[name] = value
+    return overrides
+
+
+def prefetch_overrides_for_users(users, course_id):
+    """
+    Loads the individual student overrides of all of the `users` in the course
+    with one query, so that reading them doesn't query for each user.
+
+    The overrides previously loaded for other users are dropped from the
+    request cache, so that prefetching the overrides of one chunk of users
+    after another (e.g. when grading them) doesn't grow it.
+    """
+    cache = request_cache.get_cache(OVERRIDES_CACHE_NAME)
+    cache['course_id'] = course_id
+    cache['users'] = OrderedDict(_load_overrides(course_id, [user.id for user in users]))
+
+
+def _get_course_overrides_for_user(user, course_id):
+    """
+    Returns the serialized override values of the `user` in the course, keyed
+    by usage key and then by field name, loading them if they aren't cached.
+    """
+    course_overrides = _get_cached_overrides(course_id)
+    if user.id not in course_overrides:
+        while len(course_overrides) >= MAX_CACHED_USERS:
+            course_overrides.popitem(last=False)
+        course_overrides.update(_load_overrides(course_id, [user.id]))
+    return course_overrides[user.id]
+
+
+def _get_cached_overrides(course_id):
+    """
+    Returns the ordered dictionary of the overrides in the course kept in the
+    request cache, keyed by user id.  The overrides kept for another course
+    are dropped.
+    """
+    cache = request_cache.get_cache(OVERRIDES_CACHE_NAME)
+    if cache.get('course_id') != course_id:
+        cache['course_id'] = course_id
+        cache['users'] = OrderedDict()
+    return cache['users']
+
+
+def _load_overrides(course_id, user_ids):
+    """
+    Returns a dictionary mapping each of the `user_ids` to a dictionary of
+    their serialized override values in the course, keyed by usage key and
+    then by field name.
+    """
+    overrides = {user_id: defaultdict(dict) for user_id in user_ids}
+    query = StudentFieldOverride.objects.filter(course_id=course_id, student_id__in=user_ids)
     for override in query:
-        field = block.fields[override.field]
-        value = field.from_json(json.loads(override.value))
-        overrides[override.field] = value
+        location = override.location.map_into_course(course_id)
+        overrides[override.student_id][location][override.field] = override.value
     return overrides
 
 
+def _clear_cached_overrides(user, block):
+    """
+    Drops the cached overrides of `user` in the course of `block`, and their
+    stored subsection totals, after one of the overrides has changed.
+    """
+    PersistentSubsectionGrade.invalidate(user.id, block.runtime.course_id)
+    _get_cached_overrides(block.runtime.course_id).pop(user.id, None)
+    getattr(block, '_student_overrides', {}).pop(user.id, None)
+    clear_resolved_overrides()
+
+
 def override_field_for_user(user, block, name, value):
     """
     Overrides a field for the `user`.  `block` and `name` specify the block
@@ -70,6 +155,7 @@ def override_field_for_user(user, block, name, value):
     field = block.fields[name]
     override.value = json.dumps(field.to_json(value))
     override.save()
+    _clear_cached_overrides(user, block)
 
 
 def clear_override_for_user(user, block, name):
@@ -87,3 +173,4 @@ def clear_override_for_user(user, block, name):
             field=name).delete()
     except StudentFieldOverride.DoesNotExist:
         pass
+    _clear_cached_overrides(user, block)
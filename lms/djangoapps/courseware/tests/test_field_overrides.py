@@ -1,17 +1,21 @@
 """
 Tests for `field_overrides` module.
 """
+import datetime
 import unittest
 from nose.plugins.attrib import attr
 
+import pytz
 from django.test.utils import override_settings
+from request_cache.middleware import RequestCache
 from xblock.field_data import DictFieldData
-from xmodule.modulestore.tests.factories import CourseFactory
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import (
     ModuleStoreTestCase,
 )
 
 from ..field_overrides import (
+    clear_resolved_overrides,
     disable_overrides,
     FieldOverrideProvider,
     OverrideFieldData,
@@ -95,6 +99,54 @@ class OverrideFieldDataTests(ModuleStoreTestCase):
         self.assertIsInstance(data, DictFieldData)
 
 
+@attr('shard_1')
+@override_settings(FIELD_OVERRIDE_PROVIDERS=(
+    'courseware.tests.test_field_overrides.TestLocationOverrideProvider',))
+class OverrideFieldDataInheritanceTests(ModuleStoreTestCase):
+    """
+    Tests for the inheritance of overrides by `OverrideFieldData`.
+    """
+
+    def setUp(self):
+        super(OverrideFieldDataInheritanceTests, self).setUp()
+        self.course = CourseFactory.create()
+        self.chapter = ItemFactory.create(parent=self.course, category='chapter')
+        self.sequentials = [
+            ItemFactory.create(parent=self.chapter, category='sequential') for __ in range(2)
+        ]
+        inject_field_overrides(self.sequentials, self.course, TESTUSER)
+        self.due = datetime.datetime(2015, 1, 1, tzinfo=pytz.UTC)
+        TestLocationOverrideProvider.overrides = {(self.chapter.location, 'due'): self.due}
+        TestLocationOverrideProvider.lookups = []
+        TestLocationOverrideProvider.version = None
+        RequestCache.clear_request_cache()
+        self.addCleanup(RequestCache.clear_request_cache)
+
+    def test_inherited_override_resolved_once(self):
+        for sequential in self.sequentials:
+            self.assertEqual(sequential.due, self.due)
+        self.assertEqual(TestLocationOverrideProvider.lookups.count((self.chapter.location, 'due')), 1)
+
+    def test_clear_resolved_overrides(self):
+        self.assertEqual(self.sequentials[0].due, self.due)
+        clear_resolved_overrides()
+        TestLocationOverrideProvider.overrides = {}
+        self.assertIsNone(self.sequentials[1].due)
+
+    def test_overrides_version_changed(self):
+        self.assertEqual(self.sequentials[0].due, self.due)
+        # Overrides changed elsewhere, without clearing the resolved overrides
+        TestLocationOverrideProvider.overrides = {}
+        TestLocationOverrideProvider.version = 'changed'
+        self.assertIsNone(self.sequentials[1].due)
+        self.assertIsNone(self.sequentials[0].due)
+
+    def test_overrides_disabled(self):
+        with disable_overrides():
+            self.assertIsNone(self.sequentials[0].due)
+        self.assertEqual(self.sequentials[1].due, self.due)
+
+
 @attr('shard_1')
 class ResolveDottedTests(unittest.TestCase):
     """
@@ -134,6 +186,29 @@ class TestOverrideProvider(FieldOverrideProvider):
         return True
 
 
+class TestLocationOverrideProvider(FieldOverrideProvider):
+    """
+    A concrete implementation of `FieldOverrideProvider` for testing, which
+    overrides the fields in `overrides`, keyed by block location and field
+    name, and records each lookup in `lookups`.  Its overrides_version is
+    `version`.
+    """
+    overrides = {}
+    lookups = []
+    version = None
+
+    def get(self, block, name, default):
+        self.lookups.append((block.location, name))
+        return self.overrides.get((block.location, name), default)
+
+    @classmethod
+    def enabled_for(cls, course):
+        return True
+
+    def overrides_version(self, course):
+        return self.version
+
+
 def inject_field_overrides(blocks, course, user):
     """
     Apparently the test harness doesn't use LmsFieldStorage, and I'm
@@ -1,6 +1,8 @@
 """
 Test grade calculation.
 """
+from datetime import datetime
+
 from django.http import Http404
 from django.test import TestCase
 from django.test.client import RequestFactory
@@ -9,15 +11,28 @@ from mock import patch, MagicMock
 from nose.plugins.attrib import attr
 from opaque_keys.edx.locations import SlashSeparatedCourseKey
 from opaque_keys.edx.locator import CourseLocator, BlockUsageLocator
-
-from courseware.grades import field_data_cache_for_grading, grade, iterate_grades_for, MaxScoresCache, ProgressSummary
+from pytz import UTC
+
+from courseware import grades as grades_module
+from courseware.grades import (
+    compute_max_scores,
+    course_version_for_grading,
+    field_data_cache_for_grading,
+    grade,
+    iterate_grades_for,
+    MaxScoresCache,
+    ProgressSummary,
+)
+from courseware.models import PersistentMaxScore, PersistentSubsectionGrade, SCORE_CHANGED
+from courseware.student_field_overrides import override_field_for_user
+from openedx.core.djangoapps.course_groups.tests.helpers import CohortFactory
 from student.tests.factories import UserFactory
 from student.models import CourseEnrollment
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
 
 
-def _grade_with_errors(student, request, course, keep_raw_scores=False):
+def _grade_with_errors(student, request, course, keep_raw_scores=False, **kwargs):
     """This fake grade method will throw exceptions for student3 and
     student4, but allow any other students to go through normal grading.
 
@@ -28,7 +43,7 @@ def _grade_with_errors(student, request, course, keep_raw_scores=False):
     if student.username in ['student3', 'student4']:
         raise Exception("I don't like {}".format(student.username))
 
-    return grade(student, request, course, keep_raw_scores=keep_raw_scores)
+    return grade(student, request, course, keep_raw_scores=keep_raw_scores, **kwargs)
 
 
 @attr('shard_1')
@@ -111,6 +126,19 @@ class TestGradeIteration(ModuleStoreTestCase):
         self.assertTrue(all_gradesets[student2])
         self.assertTrue(all_gradesets[student5])
 
+    def test_chunked_grading(self):
+        """Grading in small chunks gives the same results as one big chunk."""
+        chunked = [
+            (student, gradeset['percent'])
+            for student, gradeset, __ in iterate_grades_for(self.course.id, self.students, chunk_size=2)
+        ]
+        unchunked = [
+            (student, gradeset['percent'])
+            for student, gradeset, __ in iterate_grades_for(self.course.id, self.students)
+        ]
+        self.assertEqual(chunked, unchunked)
+        self.assertEqual([student for student, __ in chunked], self.students)
+
     ################################# Helpers #################################
     def _gradesets_and_errors_for(self, course_id, students):
         """Simple helper method to iterate through student grades and give us
@@ -150,7 +178,7 @@ class TestMaxScoresCache(ModuleStoreTestCase):
         """
         Tests the behavior fo the MaxScoresCache
         """
-        max_scores_cache = MaxScoresCache("test_max_scores_cache")
+        max_scores_cache = MaxScoresCache.create_for_course(self.course)
         self.assertEqual(max_scores_cache.num_cached_from_remote(), 0)
         self.assertEqual(max_scores_cache.num_cached_updates(), 0)
 
@@ -162,11 +190,61 @@ class TestMaxScoresCache(ModuleStoreTestCase):
         max_scores_cache.push_to_remote()
 
         # create a new cache with the same params, fetch from remote cache
-        max_scores_cache = MaxScoresCache("test_max_scores_cache")
+        max_scores_cache = MaxScoresCache.create_for_course(self.course)
         max_scores_cache.fetch_from_remote(self.locations)
 
         # see cache is populated
         self.assertEqual(max_scores_cache.num_cached_from_remote(), 1)
+        self.assertEqual(max_scores_cache.get(self.locations[0]), 1)
+
+    def test_other_versions_deleted_on_push(self):
+        """
+        Tests that storing the max scores of the course's current version
+        deletes the ones of its other versions
+        """
+        PersistentMaxScore.save_max_scores(self.course.id, 'old version', {self.locations[0]: 1})
+
+        max_scores_cache = MaxScoresCache.create_for_course(self.course)
+        max_scores_cache.set(self.locations[1], 1)
+        max_scores_cache.push_to_remote()
+
+        self.assertFalse(PersistentMaxScore.objects.filter(course_version='old version').exists())
+        self.assertEqual(PersistentMaxScore.objects.filter(course_id=self.course.id).count(), 1)
+
+    def test_course_without_version(self):
+        """
+        Tests that the max scores of a course without a version are cached
+        in Django's cache rather than stored
+        """
+        max_scores_cache = MaxScoresCache(self.course.id, u"")
+        max_scores_cache.set(self.locations[0], 1)
+        max_scores_cache.push_to_remote()
+        self.assertFalse(PersistentMaxScore.objects.exists())
+
+        max_scores_cache = MaxScoresCache(self.course.id, u"")
+        max_scores_cache.fetch_from_remote(self.locations)
+        self.assertEqual(max_scores_cache.num_cached_from_remote(), 1)
+        self.assertEqual(max_scores_cache.get(self.locations[0]), 1)
+
+    def test_compute_max_scores(self):
+        """
+        Tests that the max scores of a course are computed for its current
+        version, replacing the ones of its other versions
+        """
+        course_version = course_version_for_grading(self.course)
+        PersistentMaxScore.save_max_scores(self.course.id, 'old version', {self.locations[0]: 1})
+
+        compute_max_scores(self.course)
+
+        self.assertEqual(
+            set(PersistentMaxScore.max_scores_for_course(self.course.id, course_version)),
+            set(unicode(location) for location in self.locations),
+        )
+        self.assertFalse(PersistentMaxScore.objects.filter(course_version='old version').exists())
+
+        max_scores_cache = MaxScoresCache.create_for_course(self.course)
+        max_scores_cache.fetch_from_remote(self.locations)
+        self.assertEqual(max_scores_cache.num_cached_from_remote(), 3)
 
 
 class TestFieldDataCacheScorableLocations(ModuleStoreTestCase):
@@ -318,3 +396,123 @@ class TestProgressSummary(TestCase):
         earned, possible = self.progress_summary.score_for_module(self.loc_m)
         self.assertEqual(earned, 0)
         self.assertEqual(possible, 0)
+
+
+@patch.dict('django.conf.settings.FEATURES', {'ENABLE_PERSISTENT_SUBSECTION_GRADES': True})
+class TestPersistentSubsectionGrades(ModuleStoreTestCase):
+    """
+    Tests that subsection totals are stored by grade() and reused until one of
+    the student's scores in the subsection changes.
+    """
+    def setUp(self):
+        super(TestPersistentSubsectionGrades, self).setUp()
+        self.student = UserFactory.create()
+        self.course = CourseFactory.create()
+        chapter = ItemFactory.create(category='chapter', parent=self.course)
+        self.sequential = ItemFactory.create(
+            category='sequential', parent=chapter, graded=True, format='Homework'
+        )
+        vertical = ItemFactory.create(category='vertical', parent=self.sequential)
+        self.problem = ItemFactory.create(category='problem', parent=vertical)
+        self.course = self.store.get_course(self.course.id)
+
+        CourseEnrollment.enroll(self.student, self.course.id)
+        self.request = RequestFactory().get('/')
+        self.request.user = self.student
+        self.request.session = {}
+
+    def _stored_grades(self):
+        """Return the stored subsection totals for the student."""
+        return PersistentSubsectionGrade.grades_for_user(
+            self.student, self.course.id, course_version_for_grading(self.course)
+        )
+
+    def test_grade_is_stored(self):
+        grade(self.student, self.request, self.course)
+        self.assertIn(self.sequential.location, self._stored_grades())
+
+    def test_stored_grade_is_reused(self):
+        first_grade = grade(self.student, self.request, self.course)
+        with patch('courseware.grades._grade_section') as mock_grade_section:
+            second_grade = grade(self.student, self.request, self.course)
+        self.assertFalse(mock_grade_section.called)
+        self.assertEqual(first_grade['percent'], second_grade['percent'])
+
+    def test_raw_scores_are_not_read_from_storage(self):
+        grade(self.student, self.request, self.course)
+        grade_summary = grade(self.student, self.request, self.course, keep_raw_scores=True)
+        self.assertIn('raw_scores', grade_summary)
+
+    def _change_score(self):
+        """Send SCORE_CHANGED for the student's score on the problem."""
+        SCORE_CHANGED.send(
+            sender=None,
+            points_possible=1,
+            points_earned=1,
+            user_id=self.student.id,
+            course_id=unicode(self.course.id),
+            usage_id=unicode(self.problem.location),
+        )
+
+    def test_score_change_invalidates_stored_grade(self):
+        grade(self.student, self.request, self.course)
+        self._change_score()
+        self.assertNotIn(self.sequential.location, self._stored_grades())
+
+    def test_score_change_while_grading(self):
+        # A total computed from scores read before they changed isn't stored.
+        grade_section = grades_module._grade_section  # pylint: disable=protected-access
+
+        def change_score_and_grade_section(*args):
+            """Change the score after it has been read, then grade the section."""
+            self._change_score()
+            return grade_section(*args)
+
+        with patch('courseware.grades._grade_section', side_effect=change_score_and_grade_section):
+            grade(self.student, self.request, self.course)
+        self.assertNotIn(self.sequential.location, self._stored_grades())
+
+        grade(self.student, self.request, self.course)
+        self.assertIn(self.sequential.location, self._stored_grades())
+
+    def test_cohort_change_invalidates_stored_grades(self):
+        grade(self.student, self.request, self.course)
+        CohortFactory.create(course_id=self.course.id, users=[self.student])
+        self.assertEqual(self._stored_grades(), {})
+
+    def test_unstarted_subsection_not_stored(self):
+        chapter = ItemFactory.create(category='chapter', parent=self.course)
+        unstarted_sequential = ItemFactory.create(
+            category='sequential',
+            parent=chapter,
+            graded=True,
+            format='Homework',
+            start=datetime(2100, 1, 1, tzinfo=UTC),
+        )
+        ItemFactory.create(category='problem', parent=unstarted_sequential)
+        self.course = self.store.get_course(self.course.id)
+
+        grade(self.student, self.request, self.course)
+        self.assertIn(self.sequential.location, self._stored_grades())
+        self.assertNotIn(unstarted_sequential.location, self._stored_grades())
+
+    def test_individual_override_invalidates_stored_grades(self):
+        grade(self.student, self.request, self.course)
+        override_field_for_user(
+            self.student, self.store.get_item(self.sequential.location), 'due', datetime(2100, 1, 1, tzinfo=UTC)
+        )
+        self.assertEqual(self._stored_grades(), {})
+
+        # Totals graded with the student's overrides aren't stored.
+        grade(self.student, self.request, self.course)
+        self.assertEqual(self._stored_grades(), {})
+
+    def test_masquerading_grade_not_stored(self):
+        self.request.user.masquerade_settings = {self.course.id: MagicMock(role='student', user_name=None)}
+        grade(self.student, self.request, self.course)
+        self.assertEqual(self._stored_grades(), {})
+
+    @patch.dict('django.conf.settings.FEATURES', {'ENABLE_PERSISTENT_SUBSECTION_GRADES': False})
+    def test_disabled(self):
+        grade(self.student, self.request, self.course)
+        self.assertEqual(self._stored_grades(), {})
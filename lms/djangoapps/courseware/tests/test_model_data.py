@@ -6,7 +6,7 @@ from mock import Mock, patch
 from nose.plugins.attrib import attr
 from functools import partial
 
-from courseware.model_data import DjangoKeyValueStore, FieldDataCache, InvalidScopeError
+from courseware.model_data import DjangoKeyValueStore, FieldDataCache, InvalidScopeError, ScoresClient
 from courseware.models import StudentModule, XModuleUserStateSummaryField
 from courseware.models import XModuleStudentInfoField, XModuleStudentPrefsField
 
@@ -415,3 +415,27 @@ class TestStudentInfoStorage(OtherUserFailureTestMixin, StorageTestBase, TestCas
     storage_class = XModuleStudentInfoField
     other_key_factory = partial(DjangoKeyValueStore.Key, Scope.user_info, 2, 'mock_problem')  # user_id=2, not 1
     existing_field_name = "existing_field"
+
+
+@attr('shard_1')
+class TestScoresClientForUsers(TestCase):
+    """
+    Tests for fetching the scores of many users at once.
+    """
+    def setUp(self):
+        super(TestScoresClientForUsers, self).setUp()
+        self.users = [UserFactory.create() for __ in range(3)]
+        StudentModuleFactory.create(student=self.users[0], grade=1, max_grade=2)
+        StudentModuleFactory.create(student=self.users[1], grade=2, max_grade=2)
+
+    def test_create_for_users(self):
+        clients = ScoresClient.create_for_users(
+            course_id, [user.id for user in self.users], [location('usage_id')]
+        )
+        self.assertEqual(clients[self.users[0].id].get(location('usage_id')), ScoresClient.Score(1, 2))
+        self.assertEqual(clients[self.users[1].id].get(location('usage_id')), ScoresClient.Score(2, 2))
+        self.assertIsNone(clients[self.users[2].id].get(location('usage_id')))
+        self.assertNotIn(location('usage_id'), clients[self.users[2].id])
+
+    def test_no_users(self):
+        self.assertEqual(ScoresClient.create_for_users(course_id, [], [location('usage_id')]), {})
@@ -13,6 +13,7 @@ from django.test import TestCase
 from django.test.client import RequestFactory
 from mock import patch
 from nose.plugins.attrib import attr
+from opaque_keys.edx.locator import CourseLocator
 
 from capa.tests.response_xml_factory import (
     OptionResponseXMLFactory, CustomResponseXMLFactory, SchematicResponseXMLFactory,
@@ -1093,6 +1094,24 @@ class TestAnswerDistributions(TestSubmittingProblems):
             }
         )
 
+    def test_id_ranges(self):
+        # Counting the submissions in batches, split between id ranges, gives
+        # the same distribution as counting them all at once.
+        self.submit_question_answer('p1', {'2_1': u'Correct'})
+        self.submit_question_answer('p2', {'2_1': u'Incorrect'})
+        self.submit_question_answer('p3', {'2_1': u'Correct'})
+
+        id_ranges = grades.answer_distribution_id_ranges(self.course.id, 2)
+        self.assertEqual(len(id_ranges), 2)
+        self.assertEqual(
+            grades.merge_answer_distributions(
+                grades.answer_distributions(self.course.id, id_range=id_range, batch_size=1)
+                for id_range in id_ranges
+            ),
+            grades.answer_distributions(self.course.id),
+        )
+        self.assertEqual(grades.answer_distribution_id_ranges(CourseLocator('Org', 'Course', 'Run'), 2), [])
+
     def test_other_data_types(self):
         # We'll submit one problem, and then muck with the student_answers
         # dict inside its state to try different data types (str, int, float,
@@ -4,7 +4,6 @@ defined in edx_user_state_client.
 """
 
 from collections import defaultdict
-from unittest import skip
 
 from django.test import TestCase
 
@@ -31,37 +30,3 @@ class TestDjangoUserStateClient(UserStateClientTestBase, TestCase):
         super(TestDjangoUserStateClient, self).setUp()
         self.client = DjangoXBlockUserStateClient()
         self.users = defaultdict(UserFactory.create)
-
-    # We're skipping these tests because the iter_all_by_block and iter_all_by_course
-    # are not implemented in the DjangoXBlockUserStateClient
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_deleted_block(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_empty(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_many_users(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_blocks_single_user(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_deleted_block(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_empty(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_single_user(self):
-        pass
-
-    @skip("Not supported by DjangoXBlockUserStateClient")
-    def test_iter_course_many_users(self):
-        pass
@@ -15,7 +15,7 @@ except ImportError:
 import dogstats_wrapper as dog_stats_api
 from django.contrib.auth.models import User
 from xblock.fields import Scope, ScopeBase
-from courseware.models import StudentModule, StudentModuleHistory
+from courseware.models import StudentModule, StudentModuleHistory, iterate_in_id_order
 from edx_user_state_client.interface import XBlockUserStateClient, XBlockUserState
 
 
@@ -42,6 +42,10 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
     # Use this sample rate for DataDog events.
     API_DATADOG_SAMPLE_RATE = 0.1
 
+    # The number of StudentModules fetched at a time by iter_all_for_block
+    # and iter_all_for_course, unless they are given a batch_size.
+    ITER_BATCH_SIZE = 1000
+
     class ServiceUnavailable(XBlockUserStateClient.ServiceUnavailable):
         """
         This error is raised if the service backing this client is currently unavailable.
@@ -347,7 +351,11 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         """
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
-        raise NotImplementedError()
+        student_modules = StudentModule.objects.filter(
+            course_id=block_key.course_key,
+            module_state_key=block_key,
+        )
+        return self._iter_student_modules(student_modules, block_key.course_key, scope, batch_size)
 
     def iter_all_for_course(self, course_key, block_type=None, scope=Scope.user_state, batch_size=None):
         """
@@ -357,4 +365,27 @@ class DjangoXBlockUserStateClient(XBlockUserStateClient):
         """
         if scope != Scope.user_state:
             raise ValueError("Only Scope.user_state is supported")
-        raise NotImplementedError()
+        student_modules = StudentModule.objects.filter(course_id=course_key)
+        if block_type is not None:
+            student_modules = student_modules.filter(module_type=block_type)
+        return self._iter_student_modules(student_modules, course_key, scope, batch_size)
+
+    def _iter_student_modules(self, student_modules, course_key, scope, batch_size):
+        """
+        Yield an XBlockUserState for each StudentModule in student_modules
+        that has state, fetching batch_size of them at a time, in order of id.
+        """
+        student_modules = student_modules.select_related('student')
+        for module in iterate_in_id_order(student_modules, batch_size or self.ITER_BATCH_SIZE):
+            if module.state is None:
+                continue
+
+            state = json.loads(module.state)
+
+            # If the state is the empty dict, then it has been deleted, and so
+            # conformant UserStateClients should treat it as if it doesn't exist.
+            if state == {}:
+                continue
+
+            block_key = module.module_state_key.map_into_course(course_key)
+            yield XBlockUserState(module.student.username, block_key, state, module.modified, scope)
@@ -10,8 +10,11 @@ import unittest
 from django.utils.timezone import utc
 from django.test.utils import override_settings
 from nose.plugins.attrib import attr
+import request_cache
+from request_cache.middleware import RequestCache
 
 from courseware.field_overrides import OverrideFieldData
+from courseware.student_field_overrides import OVERRIDES_CACHE_NAME, get_override_for_user
 from lms.djangoapps.ccx.tests.test_overrides import inject_field_overrides
 from student.tests.factories import UserFactory
 from xmodule.fields import Date
@@ -246,6 +249,28 @@ class TestSetDueDateExtension(ModuleStoreTestCase):
             tools.set_due_date_extension(self.course, self.week1, self.user, extended)
             self._clear_field_data_cache()
 
+    def test_get_due_date_extensions_num_queries(self):
+        extended = datetime.datetime(2013, 12, 25, 0, 0, tzinfo=utc)
+        tools.set_due_date_extension(self.course, self.week1, self.user, extended)
+        tools.set_due_date_extension(self.course, self.week2, self.user, extended)
+        self._clear_field_data_cache()
+        # All of the user's overrides in the course are loaded at once.
+        with self.assertNumQueries(1):
+            self.assertEqual(self.week1.due, extended)
+            self.assertEqual(self.week2.due, extended)
+            self.assertEqual(self.assignment.due, extended)
+            self.assertEqual(self.week3.due, None)
+
+    @mock.patch('courseware.student_field_overrides.MAX_CACHED_USERS', 2)
+    def test_cached_overrides_bounded(self):
+        RequestCache.clear_request_cache()
+        users = [self.user] + UserFactory.create_batch(2)
+        for user in users:
+            get_override_for_user(user, self.week1, 'due')
+        # The overrides of the user loaded first were dropped.
+        cache = request_cache.get_cache(OVERRIDES_CACHE_NAME)
+        self.assertEqual(list(cache['users']), [user.id for user in users[1:]])
+
     def test_set_due_date_extension_invalid_date(self):
         extended = datetime.datetime(2009, 1, 1, 0, 0, tzinfo=utc)
         with self.assertRaises(tools.DashboardError):
@@ -176,12 +176,20 @@ class InstructorTask(models.Model):
         return json.dumps({'message': 'Task revoked before running'})
 
 
+class ReportShardMissing(Exception):
+    """
+    Raised when a partial report file that should have been written by a
+    report subtask can't be found.
+    """
+    pass
+
+
 class ReportStore(object):
     """
     Simple abstraction layer that can fetch and store CSV files for reports
-    download. Should probably refactor later to create a ReportFile object that
-    can simply be appended to for the sake of memory efficiency, rather than
-    passing in the whole dataset. Doing that for now just because it's simpler.
+    download. `store_rows` accepts any iterable of rows, including generators,
+    and writes rows out as they are produced, so reports don't have to be built
+    in memory first.
     """
     @classmethod
     def from_config(cls, config_name):
@@ -204,6 +212,23 @@ class ReportStore(object):
         for row in rows:
             yield [unicode(item).encode('utf-8') for item in row]
 
+    def _get_utf8_decoded_rows(self, csv_data):
+        """
+        Given the contents of a CSV file written by `store_shard_rows`, yield
+        its rows with their utf-8 strings decoded to unicode.
+        """
+        for row in csv.reader(StringIO(csv_data)):
+            yield [item.decode('utf-8') for item in row]
+
+    def _get_csv_data(self, rows):
+        """
+        Return the uncompressed CSV contents for `rows`.
+        """
+        output_buffer = StringIO()
+        csvwriter = csv.writer(output_buffer)
+        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+        return output_buffer.getvalue()
+
 
 class S3ReportStore(ReportStore):
     """
@@ -217,6 +242,10 @@ class S3ReportStore(ReportStore):
     conventions on where files are stored to know what to display. Clients using
     this class can name the final file whatever they want.
     """
+    # Amount of compressed data to buffer before uploading it as a part of a
+    # multipart upload. S3 requires every part but the last to be at least 5MB.
+    UPLOAD_PART_SIZE = 5 * 1024 * 1024
+
     def __init__(self, bucket_name, root_path):
         self.root_path = root_path
 
@@ -304,14 +333,85 @@ class S3ReportStore(ReportStore):
 
         Even though we store it in gzip format, browsers will transparently
         download and decompress it. Filenames should end in `.csv`, not `.gz`.
+
+        `rows` may be a generator. Rows are compressed as they are generated,
+        and once the compressed data reaches `UPLOAD_PART_SIZE` it is sent as
+        part of an S3 multipart upload, so that memory use doesn't grow with
+        the size of the report.
         """
         output_buffer = StringIO()
         gzip_file = GzipFile(fileobj=output_buffer, mode="wb")
         csvwriter = csv.writer(gzip_file)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
-        gzip_file.close()
+        multipart_upload = None
+        num_parts = 0
+        try:
+            for row in self._get_utf8_encoded_rows(rows):
+                csvwriter.writerow(row)
+                if output_buffer.tell() >= self.UPLOAD_PART_SIZE:
+                    if multipart_upload is None:
+                        multipart_upload = self.bucket.initiate_multipart_upload(
+                            self.key_for(course_id, filename).key,
+                            headers={"Content-Encoding": "gzip", "Content-Type": "text/csv"},
+                        )
+                    num_parts += 1
+                    self._upload_part(multipart_upload, num_parts, output_buffer)
+            gzip_file.close()
+
+            if multipart_upload is None:
+                self.store(course_id, filename, output_buffer)
+            else:
+                self._upload_part(multipart_upload, num_parts + 1, output_buffer)
+                multipart_upload.complete_upload()
+        except Exception:
+            if multipart_upload is not None:
+                multipart_upload.cancel_upload()
+            raise
+
+    def _upload_part(self, multipart_upload, part_num, output_buffer):
+        """
+        Upload the contents of `output_buffer` as part number `part_num` of
+        `multipart_upload`, and empty the buffer.
+        """
+        multipart_upload.upload_part_from_file(StringIO(output_buffer.getvalue()), part_num)
+        output_buffer.seek(0)
+        output_buffer.truncate()
+
+    def shard_key_for(self, course_id, filename):
+        """Return the S3 key used for a partial report file (see
+        `store_shard_rows`). These live outside the course's directory, so
+        they are never returned by `links_for`."""
+        hashed_course_id = hashlib.sha1(course_id.to_deprecated_string())
 
-        self.store(course_id, filename, output_buffer)
+        key = Key(self.bucket)
+        key.key = "{}/shards/{}/{}".format(
+            self.root_path,
+            hashed_course_id.hexdigest(),
+            filename
+        )
+
+        return key
+
+    def store_shard_rows(self, course_id, filename, rows):
+        """
+        Store `rows` as a partial report file, to be read back with
+        `shard_rows` when the partial files of a report are merged.
+        """
+        key = self.shard_key_for(course_id, filename)
+        key.set_contents_from_string(self._get_csv_data(rows))
+
+    def shard_rows(self, course_id, filename):
+        """
+        Yield the rows of a partial report file stored by `store_shard_rows`.
+        Raises `ReportShardMissing` if it doesn't exist.
+        """
+        key = self.bucket.get_key(self.shard_key_for(course_id, filename).key)
+        if key is None:
+            raise ReportShardMissing(filename)
+        return self._get_utf8_decoded_rows(key.get_contents_as_string())
+
+    def delete_shard(self, course_id, filename):
+        """Delete a partial report file, if it exists."""
+        self.bucket.delete_key(self.shard_key_for(course_id, filename).key)
 
     def links_for(self, course_id):
         """
@@ -362,6 +462,38 @@ class LocalFSReportStore(ReportStore):
         """Return the full path to a given file for a given course."""
         return os.path.join(self.root_path, urllib.quote(course_id.to_deprecated_string(), safe=''), filename)
 
+    def shard_path_to(self, course_id, filename):
+        """Return the full path to a partial report file (see
+        `store_shard_rows`). These are kept out of the course's directory, so
+        they are never returned by `links_for`."""
+        return os.path.join(
+            self.root_path, 'shards', urllib.quote(course_id.to_deprecated_string(), safe=''), filename
+        )
+
+    def store_shard_rows(self, course_id, filename, rows):
+        """
+        Store `rows` as a partial report file, to be read back with
+        `shard_rows` when the partial files of a report are merged.
+        """
+        self._write_rows(self.shard_path_to(course_id, filename), rows)
+
+    def shard_rows(self, course_id, filename):
+        """
+        Yield the rows of a partial report file stored by `store_shard_rows`.
+        Raises `ReportShardMissing` if it doesn't exist.
+        """
+        full_path = self.shard_path_to(course_id, filename)
+        if not os.path.exists(full_path):
+            raise ReportShardMissing(filename)
+        with open(full_path, "rb") as f:
+            return self._get_utf8_decoded_rows(f.read())
+
+    def delete_shard(self, course_id, filename):
+        """Delete a partial report file, if it exists."""
+        full_path = self.shard_path_to(course_id, filename)
+        if os.path.exists(full_path):
+            os.remove(full_path)
+
     def store(self, course_id, filename, buff, config=None):  # pylint: disable=unused-argument
         """
         Given the `course_id` and `filename`, store the contents of `buff` in
@@ -380,13 +512,33 @@ class LocalFSReportStore(ReportStore):
     def store_rows(self, course_id, filename, rows):
         """
         Given a course_id, filename, and rows (each row is an iterable of strings),
-        write this data out.
+        write this data out. `rows` may be a generator; rows are written to the
+        file as they are generated.
         """
-        output_buffer = StringIO()
-        csvwriter = csv.writer(output_buffer)
-        csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+        self._write_rows(self.path_to(course_id, filename), rows)
 
-        self.store(course_id, filename, output_buffer)
+    def _write_rows(self, full_path, rows):
+        """
+        Write `rows` as CSV to the file at `full_path`, creating its directory
+        if needed.
+
+        The rows are written to a temporary file, which is then renamed to
+        `full_path`, so that a partly written report is never listed by
+        `links_for` or read back by `shard_rows`.
+        """
+        for directory in (os.path.dirname(full_path), os.path.join(self.root_path, 'tmp')):
+            if not os.path.exists(directory):
+                os.makedirs(directory)
+
+        temp_path = os.path.join(self.root_path, 'tmp', uuid4().hex)
+        try:
+            with open(temp_path, "wb") as f:
+                csvwriter = csv.writer(f)
+                csvwriter.writerows(self._get_utf8_encoded_rows(rows))
+            os.rename(temp_path, full_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
 
     def links_for(self, course_id):
         """
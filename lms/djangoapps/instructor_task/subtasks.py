@@ -24,6 +24,8 @@ SUBTASK_LOCK_EXPIRE = 60 * 10  # Lock expires in 10 minutes
 # Number of times to retry if a subtask update encounters a lock on the InstructorTask.
 # (These are recursive retries, so don't make this number too large.)
 MAX_DATABASE_LOCK_RETRIES = 5
+# Number of item ids to read per query when dividing item ids into subtasks.
+ID_RANGE_QUERY_BATCH_SIZE = 10000
 
 
 class DuplicateTaskException(Exception):
@@ -126,6 +128,73 @@ def _generate_items_for_subtask(
         TASK_LOG.info("Number of items generated by chunking %s not equal to original total %s", num_items_queued, total_num_items)
 
 
+def _iterate_ids(queryset, batch_size=ID_RANGE_QUERY_BATCH_SIZE):
+    """
+    Yields the ids of the items in `queryset` in order, reading `batch_size` of them per query.
+
+    Each query starts after the last id read by the previous one rather than at an offset,
+    so that every query costs the same.
+    """
+    queryset = queryset.order_by('id').values_list('id', flat=True)
+    last_id = None
+    while True:
+        batch_queryset = queryset if last_id is None else queryset.filter(id__gt=last_id)
+        batch = list(batch_queryset[:batch_size])
+        for item_id in batch:
+            yield item_id
+        if len(batch) < batch_size:
+            return
+        last_id = batch[-1]
+
+
+def _generate_item_ids_for_subtask(
+    item_querysets,  # pylint: disable=bad-continuation
+    total_num_items,
+    items_per_task,
+    total_num_subtasks,
+    course_id,
+):
+    """
+    Generates the ids of a chunk of "items" that should be passed into a subtask.
+
+    Arguments are the same as for _generate_items_for_subtask(), which chunks the items
+    in the same way, but only the ids of the items are read.
+
+    Returns:  yields a list of [queryset_index, item_ids] lists, where `queryset_index` is
+        the index in `item_querysets` of the queryset of the items with ids `item_ids`.
+    """
+    num_items_queued = 0
+    num_subtasks = 0
+
+    item_ids_for_task = []
+    num_items_for_task = 0
+
+    with track_memory_usage('course_email.subtask_generation.memory', course_id):
+        for queryset_index, queryset in enumerate(item_querysets):
+            for item_id in _iterate_ids(queryset):
+                if num_items_for_task == items_per_task and num_subtasks < total_num_subtasks - 1:
+                    yield item_ids_for_task
+                    num_items_queued += items_per_task
+                    item_ids_for_task = []
+                    num_items_for_task = 0
+                    num_subtasks += 1
+                if item_ids_for_task and item_ids_for_task[-1][0] == queryset_index:
+                    item_ids_for_task[-1][1].append(item_id)
+                else:
+                    item_ids_for_task.append([queryset_index, [item_id]])
+                num_items_for_task += 1
+
+        # yield remainder items for task, if any
+        if item_ids_for_task:
+            yield item_ids_for_task
+            num_items_queued += num_items_for_task
+
+    if num_items_queued != total_num_items:
+        TASK_LOG.info(
+            "Number of items generated by chunking %s not equal to original total %s", num_items_queued, total_num_items
+        )
+
+
 class SubtaskStatus(object):
     """
     Create and return a dict for tracking the status of a subtask.
@@ -285,6 +354,7 @@ def queue_subtasks_for_query(
     item_fields,
     items_per_task,
     total_num_items,
+    item_ids=False,
 ):
     """
     Generates and queues subtasks to each execute a chunk of "items" generated by a queryset.
@@ -300,6 +370,9 @@ def queue_subtasks_for_query(
             These are in addition to the 'pk' field.
         `items_per_task` : maximum size of chunks to break each query chunk into for use by a subtask.
         `total_num_items` : total amount of items that will be put into subtasks
+        `item_ids` : if True, only the ids of the items are read, and the list passed to
+            `create_subtask_fcn` is of the ids of the items, as generated by
+            _generate_item_ids_for_subtask(), rather than of the items.  `item_fields` is ignored.
 
     Returns:  the task progress as stored in the InstructorTask object.
 
@@ -324,14 +397,23 @@ def queue_subtasks_for_query(
 
     # Construct a generator that will return the recipients to use for each subtask.
     # Pass in the desired fields to fetch for each recipient.
-    item_list_generator = _generate_items_for_subtask(
-        item_querysets,
-        item_fields,
-        total_num_items,
-        items_per_task,
-        total_num_subtasks,
-        entry.course_id,
-    )
+    if item_ids:
+        item_list_generator = _generate_item_ids_for_subtask(
+            item_querysets,
+            total_num_items,
+            items_per_task,
+            total_num_subtasks,
+            entry.course_id,
+        )
+    else:
+        item_list_generator = _generate_items_for_subtask(
+            item_querysets,
+            item_fields,
+            total_num_items,
+            items_per_task,
+            total_num_subtasks,
+            entry.course_id,
+        )
 
     # Now create the subtasks, and start them running.
     TASK_LOG.info(
@@ -463,10 +545,13 @@ def check_subtask_is_valid(entry_id, current_task_id, new_subtask_status):
         raise DuplicateTaskException(msg)
 
 
-def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_count=0):
+def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_count=0, complete_task=True):
     """
     Update the status of the subtask in the parent InstructorTask object tracking its progress.
 
+    If `complete_task` is False, the InstructorTask's state is not set when its last subtask
+    completes, so that the caller can set it once it has finished the task's remaining work.
+
     Because select_for_update is used to lock the InstructorTask object while it is being updated,
     multiple subtasks updating at the same time may time out while waiting for the lock.
     The actual update operation is surrounded by a try/except/else that permits the update to be
@@ -474,9 +559,11 @@ def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_c
 
     The subtask lock acquired in the call to check_subtask_is_valid() is released here, only when
     the attempting of retries has concluded.
+
+    Returns True if this update completed the last of the InstructorTask's subtasks.
     """
     try:
-        _update_subtask_status(entry_id, current_task_id, new_subtask_status)
+        return _update_subtask_status(entry_id, current_task_id, new_subtask_status, complete_task)
     except DatabaseError:
         # If we fail, try again recursively.
         retry_count += 1
@@ -484,7 +571,7 @@ def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_c
             TASK_LOG.info("Retrying to update status for subtask %s of instructor task %d with status %s:  retry %d",
                           current_task_id, entry_id, new_subtask_status, retry_count)
             dog_stats_api.increment('instructor_task.subtask.retry_after_failed_update')
-            update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_count)
+            return update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_count, complete_task)
         else:
             TASK_LOG.info("Failed to update status after %d retries for subtask %s of instructor task %d with status %s",
                           retry_count, current_task_id, entry_id, new_subtask_status)
@@ -498,7 +585,7 @@ def update_subtask_status(entry_id, current_task_id, new_subtask_status, retry_c
 
 
 @transaction.atomic
-def _update_subtask_status(entry_id, current_task_id, new_subtask_status):
+def _update_subtask_status(entry_id, current_task_id, new_subtask_status, complete_task=True):
     """
     Update the status of the subtask in the parent InstructorTask object tracking its progress.
 
@@ -524,6 +611,8 @@ def _update_subtask_status(entry_id, current_task_id, new_subtask_status):
     information for each subtask.  At the moment, the value for each subtask (keyed by its task_id)
     is the value of the SubtaskStatus.to_dict(), but could be expanded in future to store information
     about failure messages, progress made, etc.
+
+    Returns True if this update completed the last of the InstructorTask's subtasks.
     """
     TASK_LOG.info("Preparing to update status for subtask %s for instructor task %d with status %s",
                   current_task_id, entry_id, new_subtask_status)
@@ -574,7 +663,7 @@ def _update_subtask_status(entry_id, current_task_id, new_subtask_status):
         # At present, we mark the task as having succeeded.  In future, we should see
         # if there was a catastrophic failure that occurred, and figure out how to
         # report that here.
-        if num_remaining <= 0:
+        if num_remaining <= 0 and complete_task:
             entry.task_state = SUCCESS
         entry.subtasks = json.dumps(subtask_dict)
         entry.task_output = InstructorTask.create_output_for_success(task_progress)
@@ -583,6 +672,7 @@ def _update_subtask_status(entry_id, current_task_id, new_subtask_status):
         entry.save()
         TASK_LOG.info("Task output updated to %s for subtask %s of instructor task %d",
                       entry.task_output, current_task_id, entry_id)
+        return num_remaining <= 0
     except Exception:
         TASK_LOG.exception("Unexpected error while updating InstructorTask.")
         dog_stats_api.increment('instructor_task.subtask.update_exception')
@@ -31,11 +31,14 @@ from instructor_task.tasks_helper import (
     run_main_task,
     BaseInstructorTask,
     perform_module_state_update,
+    prepare_rescore_problem_module_states,
     rescore_problem_module_state,
     reset_attempts_module_state,
     delete_problem_module_state,
     upload_problem_responses_csv,
     upload_grades_csv,
+    upload_grades_csv_shard,
+    finish_grades_csv_shards,
     upload_problem_grade_report,
     upload_students_csv,
     cohort_students_and_upload,
@@ -78,7 +81,8 @@ def rescore_problem(entry_id, xmodule_instance_args):
         """Filter that matches problems which are marked as being done"""
         return modules_to_update.filter(state__contains='"done": true')
 
-    visit_fcn = partial(perform_module_state_update, update_fcn, filter_fcn)
+    prepare_fcn = partial(prepare_rescore_problem_module_states, xmodule_instance_args)
+    visit_fcn = partial(perform_module_state_update, update_fcn, filter_fcn, prepare_fcn=prepare_fcn)
     return run_main_task(entry_id, visit_fcn, action_name)
 
 
@@ -175,6 +179,30 @@ def calculate_grades_csv(entry_id, xmodule_instance_args):
     return run_main_task(entry_id, task_fn, action_name)
 
 
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
+def calculate_grades_csv_subtask(entry_id, course_id, start_timestamp, shard_index, user_ids, subtask_status_dict):
+    """
+    Grade a slice of a course's students for a grade report that has been
+    split across subtasks by `calculate_grades_csv`. See
+    `upload_grades_csv_shard` for a description of the arguments.
+    """
+    return upload_grades_csv_shard(
+        entry_id, course_id, start_timestamp, shard_index, user_ids, subtask_status_dict
+    )
+
+
+# The message is only acknowledged once the shards have been merged, so that the merge is run
+# again if its worker dies, rather than leaving the grade report in progress.
+@task(routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY, acks_late=True)  # pylint: disable=not-callable
+def merge_grades_csv_shards(entry_id, course_id, start_timestamp):
+    """
+    Merge the partial CSVs of a grade report that has been split across
+    subtasks by `calculate_grades_csv`, once all of the subtasks have
+    completed. See `finish_grades_csv_shards`.
+    """
+    finish_grades_csv_shards(entry_id, course_id, start_timestamp)
+
+
 @task(base=BaseInstructorTask, routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY)  # pylint: disable=not-callable
 def calculate_problem_grade_report(entry_id, xmodule_instance_args):
     """
@@ -3,13 +3,14 @@ This file contains tasks that are designed to perform background operations on t
 running state of a course.
 
 """
+import calendar
 import json
 import re
 from collections import OrderedDict
 from datetime import datetime
 from django.conf import settings
 from eventtracking import tracker
-from itertools import chain
+from itertools import chain, count, islice
 from time import time
 import unicodecsv
 import logging
@@ -57,14 +58,20 @@ from instructor_analytics.basic import (
     list_problem_responses
 )
 from instructor_analytics.csvs import format_dictlist
-from instructor_task.models import ReportStore, InstructorTask, PROGRESS
+from instructor_task.models import ReportStore, ReportShardMissing, InstructorTask, PROGRESS
+from instructor_task.subtasks import (
+    SubtaskStatus,
+    check_subtask_is_valid,
+    queue_subtasks_for_query,
+    update_subtask_status,
+)
 from lms.djangoapps.lms_xblock.runtime import LmsPartitionService
 from openedx.core.djangoapps.course_groups.cohorts import get_cohort
 from openedx.core.djangoapps.course_groups.models import CourseUserGroup
 from openedx.core.djangoapps.content.course_structures.models import CourseStructure
-from opaque_keys.edx.keys import UsageKey
+from opaque_keys.edx.keys import CourseKey, UsageKey
 from openedx.core.djangoapps.course_groups.cohorts import add_user_to_cohort, is_course_cohorted
-from student.models import CourseEnrollment, CourseAccessRole
+from student.models import CourseEnrollment, CourseAccessRole, anonymous_id_for_user
 from lms.djangoapps.teams.models import CourseTeamMembership
 from lms.djangoapps.verify_student.models import SoftwareSecurePhotoVerification
 
@@ -78,6 +85,8 @@ FILTERED_OUT_ROLES = ['staff', 'instructor', 'finance_admin', 'sales_admin']
 UPDATE_STATUS_SUCCEEDED = 'succeeded'
 UPDATE_STATUS_FAILED = 'failed'
 UPDATE_STATUS_SKIPPED = 'skipped'
+# number of StudentModules passed to each call of perform_module_state_update's prepare_fcn
+MODULE_STATE_PREPARE_CHUNK_SIZE = 100
 
 # The setting name used for events when "settings" (account settings, preferences, profile information) change.
 REPORT_REQUESTED_EVENT_NAME = u'edx.instructor.report.requested'
@@ -297,7 +306,8 @@ def run_main_task(entry_id, task_fcn, action_name):
     return task_progress
 
 
-def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, task_input, action_name):
+def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, task_input, action_name,
+                                prepare_fcn=None):
     """
     Performs generic update by visiting StudentModule instances with the update_fcn provided.
 
@@ -315,6 +325,10 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     the update is successful; False indicates the update on the particular student module failed.
     A raised exception indicates a fatal condition -- that no other student modules should be considered.
 
+    If a `prepare_fcn` is not None, it is called before the StudentModule instances are updated, for
+    each chunk of up to MODULE_STATE_PREPARE_CHUNK_SIZE of them.  It is passed two arguments:  the dict
+    of module_descriptors by module_state_key, and the list of StudentModules about to be updated.
+
     The return value is a dict containing the task's results, with the following keys:
 
           'attempted': number of attempts made
@@ -375,23 +389,33 @@ def perform_module_state_update(update_fcn, filter_fcn, _entry_id, course_id, ta
     task_progress = TaskProgress(action_name, modules_to_update.count(), start_time)
     task_progress.update_task_state()
 
-    for module_to_update in modules_to_update:
-        task_progress.attempted += 1
-        module_descriptor = problems[unicode(module_to_update.module_state_key)]
-        # There is no try here:  if there's an error, we let it throw, and the task will
-        # be marked as FAILED, with a stack trace.
-        with dog_stats_api.timer('instructor_tasks.module.time.step', tags=[u'action:{name}'.format(name=action_name)]):
-            update_status = update_fcn(module_descriptor, module_to_update)
-            if update_status == UPDATE_STATUS_SUCCEEDED:
-                # If the update_fcn returns true, then it performed some kind of work.
-                # Logging of failures is left to the update_fcn itself.
-                task_progress.succeeded += 1
-            elif update_status == UPDATE_STATUS_FAILED:
-                task_progress.failed += 1
-            elif update_status == UPDATE_STATUS_SKIPPED:
-                task_progress.skipped += 1
-            else:
-                raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
+    modules_iterator = iter(modules_to_update)
+    while True:
+        modules_chunk = list(islice(modules_iterator, MODULE_STATE_PREPARE_CHUNK_SIZE))
+        if not modules_chunk:
+            break
+        if prepare_fcn is not None:
+            prepare_fcn(problems, modules_chunk)
+
+        for module_to_update in modules_chunk:
+            task_progress.attempted += 1
+            module_descriptor = problems[unicode(module_to_update.module_state_key)]
+            # There is no try here:  if there's an error, we let it throw, and the task will
+            # be marked as FAILED, with a stack trace.
+            with dog_stats_api.timer(
+                'instructor_tasks.module.time.step', tags=[u'action:{name}'.format(name=action_name)]
+            ):
+                update_status = update_fcn(module_descriptor, module_to_update)
+                if update_status == UPDATE_STATUS_SUCCEEDED:
+                    # If the update_fcn returns true, then it performed some kind of work.
+                    # Logging of failures is left to the update_fcn itself.
+                    task_progress.succeeded += 1
+                elif update_status == UPDATE_STATUS_FAILED:
+                    task_progress.failed += 1
+                elif update_status == UPDATE_STATUS_SKIPPED:
+                    task_progress.skipped += 1
+                else:
+                    raise UpdateProblemModuleStateError("Unexpected update_status returned: {}".format(update_status))
 
     return task_progress.update_task_state()
 
@@ -557,6 +581,49 @@ def rescore_problem_module_state(xmodule_instance_args, module_descriptor, stude
             return UPDATE_STATUS_SUCCEEDED
 
 
+def prepare_rescore_problem_module_states(xmodule_instance_args, problems, student_modules):
+    """
+    Runs the scripts of the problems being rescored for all of `student_modules` at once, so
+    that rescore_problem_module_state uses the cached results instead of starting a sandbox to
+    run the script for each student.
+
+    The script is run for the first student by instantiating the problem for them; the problem
+    then runs it for the other students, with the seeds in their problem state.  Errors are only
+    logged, since rescoring each student will run into them again.
+    """
+    modules_by_problem = OrderedDict()
+    for student_module in student_modules:
+        modules_by_problem.setdefault(unicode(student_module.module_state_key), []).append(student_module)
+
+    for usage_key, problem_modules in modules_by_problem.iteritems():
+        first_module = problem_modules[0]
+        try:
+            with modulestore().bulk_operations(first_module.course_id):
+                instance = _get_module_instance_for_task(
+                    first_module.course_id,
+                    first_module.student,
+                    problems[usage_key],
+                    xmodule_instance_args,
+                    grade_bucket_type='rescore',
+                )
+            # Only capa problems have scripts.
+            lcp = getattr(instance, 'lcp', None)
+            if lcp is None:
+                continue
+
+            seeds = []
+            anonymous_student_ids = []
+            for student_module in problem_modules[1:]:
+                seed = json.loads(student_module.state).get('seed') if student_module.state else None
+                if seed is not None:
+                    seeds.append(seed)
+                    # Capa problems use the per-student anonymized id.
+                    anonymous_student_ids.append(anonymous_id_for_user(student_module.student, None))
+            lcp.cache_script_contexts(seeds, anonymous_student_ids)
+        except Exception:  # pylint: disable=broad-except
+            TASK_LOG.warning(u"error preparing to rescore problem %s", usage_key, exc_info=True)
+
+
 @outer_atomic
 def reset_attempts_module_state(xmodule_instance_args, _module_descriptor, student_module):
     """
@@ -665,15 +732,21 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     buffered, so we'll never write part of a CSV file to S3 -- i.e. any files
     that are visible in ReportStore will be complete ones.
 
+    If `settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK` is set and the course has
+    more enrolled students than that, the grading is split across subtasks
+    that each write a partial CSV (see `upload_grades_csv_shard`), and the
+    partial CSVs are merged into the final files once the last subtask is
+    done.
+
     As we start to add more CSV downloads, it will probably be worthwhile to
     make a more general CSVDoc class instead of building out the rows like we
     do here.
     """
     start_time = time()
     start_date = datetime.now(UTC)
-    status_interval = 100
     enrolled_students = CourseEnrollment.objects.users_enrolled_in(course_id)
-    task_progress = TaskProgress(action_name, enrolled_students.count(), start_time)
+    total_enrolled_students = enrolled_students.count()
+    task_progress = TaskProgress(action_name, total_enrolled_students, start_time)
 
     fmt = u'Task: {task_id}, InstructorTask ID: {entry_id}, Course: {course_id}, Input: {task_input}'
     task_info_string = fmt.format(
@@ -684,6 +757,66 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     )
     TASK_LOG.info(u'%s, Task type: %s, Starting task execution', task_info_string, action_name)
 
+    students_per_task = settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK
+    if students_per_task and total_enrolled_students > students_per_task:
+        TASK_LOG.info(
+            u'%s, Task type: %s, Queueing subtasks of %s students for total students: %s',
+            task_info_string,
+            action_name,
+            students_per_task,
+            total_enrolled_students
+        )
+        return _queue_grade_report_subtasks(
+            _entry_id, course_id, action_name, enrolled_students, total_enrolled_students, start_date
+        )
+
+    current_step = {'step': 'Calculating Grades'}
+    TASK_LOG.info(
+        u'%s, Task type: %s, Current step: %s, Starting grade calculation for total students: %s',
+        task_info_string,
+        action_name,
+        current_step,
+
+        total_enrolled_students
+    )
+    # The grade report is written out as the students are graded
+    err_rows = [["id", "username", "error_msg"]]
+    rows = _grade_report_rows(
+        course_id, enrolled_students.iterator(), task_progress, task_info_string, action_name, current_step, err_rows
+    )
+    upload_csv_to_report_store(rows, 'grade_report', course_id, start_date)
+    TASK_LOG.info(
+        u'%s, Task type: %s, Current step: %s, Grade calculation completed for students: %s/%s',
+        task_info_string,
+        action_name,
+        current_step,
+        task_progress.attempted,
+        total_enrolled_students
+    )
+
+    current_step = {'step': 'Uploading CSVs'}
+    task_progress.update_task_state(extra_meta=current_step)
+    TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
+
+    # If there are any error rows (don't count the header), write them out as well
+    if len(err_rows) > 1:
+        upload_csv_to_report_store(err_rows, 'grade_report_err', course_id, start_date)
+
+    # One last update before we close out...
+    TASK_LOG.info(u'%s, Task type: %s, Finalizing grade task', task_info_string, action_name)
+    return task_progress.update_task_state(extra_meta=current_step)
+
+
+def _grade_report_rows(course_id, students, task_progress, task_info_string, action_name, current_step, err_rows):
+    """
+    Grade `students` in the course, and yield the rows of the grade report
+    CSV as each student is graded, starting with a header row. Nothing is
+    yielded if no student could be graded. A row is appended to `err_rows`
+    for each student that could not be graded.
+
+    `task_progress` is updated with a count of the students graded.
+    """
+    status_interval = 100
     course = get_course_by_id(course_id)
     course_is_cohorted = is_course_cohorted(course.id)
     teams_enabled = course.teams_enabled
@@ -697,23 +830,8 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
     certificate_whitelist = CertificateWhitelist.objects.filter(course_id=course_id, whitelist=True)
     whitelisted_user_ids = [entry.user_id for entry in certificate_whitelist]
 
-    # Loop over all our students and build our CSV lists in memory
     header = None
-    rows = []
-    err_rows = [["id", "username", "error_msg"]]
-    current_step = {'step': 'Calculating Grades'}
-
-    total_enrolled_students = enrolled_students.count()
-    student_counter = 0
-    TASK_LOG.info(
-        u'%s, Task type: %s, Current step: %s, Starting grade calculation for total students: %s',
-        task_info_string,
-        action_name,
-        current_step,
-
-        total_enrolled_students
-    )
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students):
+    for student, gradeset, err_msg in iterate_grades_for(course, students):
         # Periodically update task status (this is a cache write)
         if task_progress.attempted % status_interval == 0:
             task_progress.update_task_state(extra_meta=current_step)
@@ -721,14 +839,13 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
 
         # Now add a log entry after each student is graded to get a sense
         # of the task's progress
-        student_counter += 1
         TASK_LOG.info(
             u'%s, Task type: %s, Current step: %s, Grade calculation in-progress for students: %s/%s',
             task_info_string,
             action_name,
             current_step,
-            student_counter,
-            total_enrolled_students
+            task_progress.attempted,
+            task_progress.total
         )
 
         if gradeset:
@@ -736,7 +853,7 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
             task_progress.succeeded += 1
             if not header:
                 header = [section['label'] for section in gradeset[u'section_breakdown']]
-                rows.append(
+                yield (
                     ["id", "email", "username", "grade"] + header + cohorts_header +
                     group_configs_header + teams_header +
                     ['Enrollment Track', 'Verification Status'] + certificate_info_header
@@ -786,7 +903,7 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
             # possible for a student to have a 0.0 show up in their row but
             # still have 100% for the course.
             row_percents = [percents.get(label, 0.0) for label in header]
-            rows.append(
+            yield (
                 [student.id, student.email, student.username, gradeset['percent']] +
                 row_percents + cohorts_group_name + group_configs_group_names + team_name +
                 [enrollment_mode] + [verification_status] + certificate_info
@@ -796,30 +913,202 @@ def upload_grades_csv(_xmodule_instance_args, _entry_id, course_id, _task_input,
             task_progress.failed += 1
             err_rows.append([student.id, student.username, err_msg])
 
-    TASK_LOG.info(
-        u'%s, Task type: %s, Current step: %s, Grade calculation completed for students: %s/%s',
-        task_info_string,
+
+def _grade_report_shard_filename(course_id, csv_name, timestamp, shard_index):
+    """
+    Return the name of the partial CSV written by subtask number `shard_index`
+    of a sharded grade report.
+    """
+    return u"{course_prefix}_{csv_name}_{timestamp_str}_{shard_index}.csv".format(
+        course_prefix=course_filename_prefix_generator(course_id),
+        csv_name=csv_name,
+        timestamp_str=timestamp.strftime("%Y-%m-%d-%H%M%S"),
+        shard_index=shard_index,
+    )
+
+
+def _queue_grade_report_subtasks(entry_id, course_id, action_name, enrolled_students, total_num, start_date):
+    """
+    Queue subtasks that each grade `settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK`
+    of the `enrolled_students` for a grade report. Returns the task progress
+    stored in the InstructorTask.
+    """
+    # Avoid a circular import: the tasks module imports this one.
+    from instructor_task.tasks import calculate_grades_csv_subtask
+
+    entry = InstructorTask.objects.get(pk=entry_id)
+    # Subtasks are created in the order the students are generated, so their
+    # index gives the order in which their partial CSVs are merged.
+    shard_indexes = count()
+
+    def _create_grades_csv_subtask(student_list, initial_subtask_status):
+        """Creates a subtask to grade the students in `student_list`."""
+        return calculate_grades_csv_subtask.subtask(
+            (
+                entry_id,
+                unicode(course_id),
+                calendar.timegm(start_date.utctimetuple()),
+                next(shard_indexes),
+                [student['pk'] for student in student_list],
+                initial_subtask_status.to_dict(),
+            ),
+            task_id=initial_subtask_status.task_id,
+            routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+        )
+
+    return queue_subtasks_for_query(
+        entry,
         action_name,
-        current_step,
-        student_counter,
-        total_enrolled_students
+        _create_grades_csv_subtask,
+        [enrolled_students.order_by('id')],
+        [],
+        settings.GRADES_DOWNLOAD_STUDENTS_PER_TASK,
+        total_num,
     )
 
-    # By this point, we've got the rows we're going to stuff into our CSV files.
-    current_step = {'step': 'Uploading CSVs'}
-    task_progress.update_task_state(extra_meta=current_step)
-    TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
 
-    # Perform the actual upload
-    upload_csv_to_report_store(rows, 'grade_report', course_id, start_date)
+def upload_grades_csv_shard(entry_id, course_id, start_timestamp, shard_index, user_ids, subtask_status_dict):
+    """
+    Grade the students with ids in `user_ids` for a sharded grade report, and
+    store their rows as partial CSVs in the `ReportStore`. The subtask that
+    completes last merges the partial CSVs into the final report files.
 
-    # If there are any error rows (don't count the header), write them out as well
+    `start_timestamp` is the UTC POSIX timestamp at which the report was
+    requested, and `subtask_status_dict` is the SubtaskStatus of this subtask
+    as a dict.
+    """
+    subtask_status = SubtaskStatus.from_dict(subtask_status_dict)
+    current_task_id = subtask_status.task_id
+    course_id = CourseKey.from_string(course_id)
+    start_date = datetime.fromtimestamp(start_timestamp, UTC)
+
+    check_subtask_is_valid(entry_id, current_task_id, subtask_status)
+
+    fmt = u'Task: {task_id}, InstructorTask ID: {entry_id}, Course: {course_id}, Shard: {shard_index}'
+    task_info_string = fmt.format(
+        task_id=current_task_id, entry_id=entry_id, course_id=course_id, shard_index=shard_index
+    )
+    action_name = 'graded'
+    task_progress = TaskProgress(action_name, len(user_ids), time())
+    try:
+        students = User.objects.filter(id__in=user_ids).order_by('id')
+        err_rows = [["id", "username", "error_msg"]]
+        rows = _grade_report_rows(
+            course_id, students, task_progress, task_info_string, action_name, {'step': 'Calculating Grades'}, err_rows
+        )
+        report_store = ReportStore.from_config('GRADES_DOWNLOAD')
+        # The grade rows have to be stored first, since generating them fills in err_rows.
+        for csv_name, csv_rows in (('grade_report', rows), ('grade_report_err', err_rows)):
+            report_store.store_shard_rows(
+                course_id, _grade_report_shard_filename(course_id, csv_name, start_date, shard_index), csv_rows
+            )
+    except Exception:
+        TASK_LOG.exception(u'%s, Grade report subtask failed unexpectedly', task_info_string)
+        # We don't know how many of the students made it into the partial
+        # CSV, so count them all as failed to keep the totals consistent.
+        subtask_status.increment(failed=len(user_ids), state=FAILURE)
+        # The shards of the other subtasks are still merged if this was the last one.
+        if update_subtask_status(entry_id, current_task_id, subtask_status, complete_task=False):
+            _queue_grade_report_merge(entry_id, course_id, start_timestamp)
+        raise
+
+    subtask_status.increment(
+        succeeded=task_progress.succeeded, failed=task_progress.failed, state=SUCCESS
+    )
+    TASK_LOG.info(u'%s, Grade report subtask finished with status %s', task_info_string, subtask_status)
+    if update_subtask_status(entry_id, current_task_id, subtask_status, complete_task=False):
+        _queue_grade_report_merge(entry_id, course_id, start_timestamp)
+
+    return subtask_status.to_dict()
+
+
+def _queue_grade_report_merge(entry_id, course_id, start_timestamp):
+    """
+    Queue the merge of the partial CSVs of a sharded grade report, once its
+    last subtask has completed.
+    """
+    # Avoid a circular import: the tasks module imports this one.
+    from instructor_task.tasks import merge_grades_csv_shards
+
+    merge_grades_csv_shards.apply_async(
+        (entry_id, unicode(course_id), start_timestamp),
+        routing_key=settings.GRADES_DOWNLOAD_ROUTING_KEY,
+    )
+
+
+def finish_grades_csv_shards(entry_id, course_id, start_timestamp):
+    """
+    Merge the partial CSVs of a sharded grade report with `merge_grade_report_shards`,
+    and only then mark its InstructorTask as having succeeded, or as having
+    failed if the merge fails.
+
+    The partial CSVs are only deleted once the InstructorTask is marked as
+    having succeeded, and the merge is skipped if it already is, so that
+    running this again (e.g. when the merge task is redelivered after its
+    worker died) never replaces the merged report with an empty one.
+    """
+    course_id = CourseKey.from_string(course_id)
+    start_date = datetime.fromtimestamp(start_timestamp, UTC)
+    entry = InstructorTask.objects.get(pk=entry_id)
+    num_shards = json.loads(entry.subtasks)['total']
+    if entry.task_state != SUCCESS:
+        try:
+            merge_grade_report_shards(course_id, start_date, num_shards)
+        except Exception:
+            TASK_LOG.exception(
+                u'Failed to merge the grade report for InstructorTask ID: %s, Course: %s', entry_id, course_id
+            )
+            InstructorTask.objects.filter(pk=entry_id).update(task_state=FAILURE)
+            raise
+        InstructorTask.objects.filter(pk=entry_id).update(task_state=SUCCESS)
+    delete_grade_report_shards(course_id, start_date, num_shards)
+
+
+def merge_grade_report_shards(course_id, start_date, num_shards):
+    """
+    Merge the partial CSVs of a sharded grade report into the final
+    grade_report (and grade_report_err, if any students failed) files. Partial
+    CSVs of subtasks that failed are missing, and are skipped.
+    """
+    report_store = ReportStore.from_config('GRADES_DOWNLOAD')
+
+    def merged_rows(csv_name):
+        """
+        Yield the rows of all the partial CSVs for `csv_name`, keeping only
+        the first header row.
+        """
+        header_written = False
+        for shard_index in range(num_shards):
+            filename = _grade_report_shard_filename(course_id, csv_name, start_date, shard_index)
+            try:
+                shard_rows = report_store.shard_rows(course_id, filename)
+            except ReportShardMissing:
+                TASK_LOG.warning(u'Grade report for %s is missing partial CSV %s', course_id, filename)
+                continue
+            for row_index, row in enumerate(shard_rows):
+                if row_index == 0:
+                    if header_written:
+                        continue
+                    header_written = True
+                yield row
+
+    upload_csv_to_report_store(merged_rows('grade_report'), 'grade_report', course_id, start_date)
+
+    err_rows = list(merged_rows('grade_report_err'))
     if len(err_rows) > 1:
         upload_csv_to_report_store(err_rows, 'grade_report_err', course_id, start_date)
 
-    # One last update before we close out...
-    TASK_LOG.info(u'%s, Task type: %s, Finalizing grade task', task_info_string, action_name)
-    return task_progress.update_task_state(extra_meta=current_step)
+
+def delete_grade_report_shards(course_id, start_date, num_shards):
+    """
+    Delete the partial CSVs of a sharded grade report, once they are merged.
+    """
+    report_store = ReportStore.from_config('GRADES_DOWNLOAD')
+    for shard_index in range(num_shards):
+        for csv_name in ('grade_report', 'grade_report_err'):
+            report_store.delete_shard(
+                course_id, _grade_report_shard_filename(course_id, csv_name, start_date, shard_index)
+            )
 
 
 def _order_problems(blocks):
@@ -932,47 +1221,56 @@ def upload_problem_grade_report(_xmodule_instance_args, _entry_id, course_id, _t
         )
 
     # Just generate the static fields for now.
-    rows = [list(header_row.values()) + ['Final Grade'] + list(chain.from_iterable(problems.values()))]
+    header = list(header_row.values()) + ['Final Grade'] + list(chain.from_iterable(problems.values()))
     error_rows = [list(header_row.values()) + ['error_msg']]
     current_step = {'step': 'Calculating Grades'}
 
-    for student, gradeset, err_msg in iterate_grades_for(course_id, enrolled_students, keep_raw_scores=True):
-        student_fields = [getattr(student, field_name) for field_name in header_row]
-        task_progress.attempted += 1
+    def generate_rows():
+        """
+        Grade the students, and yield a row for each one that was graded
+        successfully. Students that couldn't be graded are added to error_rows.
+        """
+        grades = iterate_grades_for(course_id, enrolled_students.iterator(), keep_raw_scores=True)
+        for student, gradeset, err_msg in grades:
+            student_fields = [getattr(student, field_name) for field_name in header_row]
+            task_progress.attempted += 1
 
-        if 'percent' not in gradeset or 'raw_scores' not in gradeset:
-            # There was an error grading this student.
-            # Generally there will be a non-empty err_msg, but that is not always the case.
-            if not err_msg:
-                err_msg = u"Unknown error"
-            error_rows.append(student_fields + [err_msg])
-            task_progress.failed += 1
-            continue
+            if 'percent' not in gradeset or 'raw_scores' not in gradeset:
+                # There was an error grading this student.
+                # Generally there will be a non-empty err_msg, but that is not always the case.
+                if not err_msg:
+                    err_msg = u"Unknown error"
+                error_rows.append(student_fields + [err_msg])
+                task_progress.failed += 1
+                continue
 
-        final_grade = gradeset['percent']
-        # Only consider graded problems
-        problem_scores = {unicode(score.module_id): score for score in gradeset['raw_scores'] if score.graded}
-        earned_possible_values = list()
-        for problem_id in problems:
-            try:
-                problem_score = problem_scores[problem_id]
-                earned_possible_values.append([problem_score.earned, problem_score.possible])
-            except KeyError:
-                # The student has not been graded on this problem.  For example,
-                # iterate_grades_for skips problems that students have never
-                # seen in order to speed up report generation.  It could also be
-                # the case that the student does not have access to it (e.g. A/B
-                # test or cohorted courseware).
-                earned_possible_values.append(['N/A', 'N/A'])
-        rows.append(student_fields + [final_grade] + list(chain.from_iterable(earned_possible_values)))
-
-        task_progress.succeeded += 1
-        if task_progress.attempted % status_interval == 0:
-            task_progress.update_task_state(extra_meta=current_step)
+            final_grade = gradeset['percent']
+            # Only consider graded problems
+            problem_scores = {unicode(score.module_id): score for score in gradeset['raw_scores'] if score.graded}
+            earned_possible_values = list()
+            for problem_id in problems:
+                try:
+                    problem_score = problem_scores[problem_id]
+                    earned_possible_values.append([problem_score.earned, problem_score.possible])
+                except KeyError:
+                    # The student has not been graded on this problem.  For example,
+                    # iterate_grades_for skips problems that students have never
+                    # seen in order to speed up report generation.  It could also be
+                    # the case that the student does not have access to it (e.g. A/B
+                    # test or cohorted courseware).
+                    earned_possible_values.append(['N/A', 'N/A'])
+            yield student_fields + [final_grade] + list(chain.from_iterable(earned_possible_values))
 
-    # Perform the upload if any students have been successfully graded
-    if len(rows) > 1:
-        upload_csv_to_report_store(rows, 'problem_grade_report', course_id, start_date)
+            task_progress.succeeded += 1
+            if task_progress.attempted % status_interval == 0:
+                task_progress.update_task_state(extra_meta=current_step)
+
+    # The rows are written out as the students are graded, but the upload is
+    # only started once a student has been graded successfully.
+    rows = generate_rows()
+    first_row = next(rows, None)
+    if first_row is not None:
+        upload_csv_to_report_store(chain([header, first_row], rows), 'problem_grade_report', course_id, start_date)
     # If there are any error rows, write them out as well
     if len(error_rows) > 1:
         upload_csv_to_report_store(error_rows, 'problem_grade_report_err', course_id, start_date)
@@ -1034,13 +1332,11 @@ def upload_enrollment_report(_xmodule_instance_args, _entry_id, course_id, _task
     )
     TASK_LOG.info(u'%s, Task type: %s, Starting task execution', task_info_string, action_name)
 
-    # Loop over all our students and build our CSV lists in memory
-    rows = []
-    header = None
+    # The rows are generated as the report is written out, rather than being built in memory
+    header = []
     current_step = {'step': 'Gathering Profile Information'}
     enrollment_report_provider = PaidCourseEnrollmentReportProvider()
     total_students = students_in_course.count()
-    student_counter = 0
     TASK_LOG.info(
         u'%s, Task type: %s, Current step: %s, generating detailed enrollment report for total students: %s',
         task_info_string,
@@ -1049,86 +1345,90 @@ def upload_enrollment_report(_xmodule_instance_args, _entry_id, course_id, _task
         total_students
     )
 
-    for student in students_in_course:
-        # Periodically update task status (this is a cache write)
-        if task_progress.attempted % status_interval == 0:
-            task_progress.update_task_state(extra_meta=current_step)
-        task_progress.attempted += 1
+    def generate_rows():
+        """
+        Yield the header row, and a row for each student.
+        """
+        for student in students_in_course.iterator():
+            # Periodically update task status (this is a cache write)
+            if task_progress.attempted % status_interval == 0:
+                task_progress.update_task_state(extra_meta=current_step)
+            task_progress.attempted += 1
 
-        # Now add a log entry after certain intervals to get a hint that task is in progress
-        student_counter += 1
-        if student_counter % 100 == 0:
-            TASK_LOG.info(
-                u'%s, Task type: %s, Current step: %s, gathering enrollment profile for students in progress: %s/%s',
-                task_info_string,
-                action_name,
-                current_step,
-                student_counter,
-                total_students
-            )
+            # Now add a log entry after certain intervals to get a hint that task is in progress
+            if task_progress.attempted % 100 == 0:
+                TASK_LOG.info(
+                    u'%s, Task type: %s, Current step: %s, gathering enrollment profile for students in progress: %s/%s',
+                    task_info_string,
+                    action_name,
+                    current_step,
+                    task_progress.attempted,
+                    total_students
+                )
 
-        user_data = enrollment_report_provider.get_user_profile(student.id)
-        course_enrollment_data = enrollment_report_provider.get_enrollment_info(student, course_id)
-        payment_data = enrollment_report_provider.get_payment_info(student, course_id)
-
-        # display name map for the column headers
-        enrollment_report_headers = {
-            'User ID': _('User ID'),
-            'Username': _('Username'),
-            'Full Name': _('Full Name'),
-            'First Name': _('First Name'),
-            'Last Name': _('Last Name'),
-            'Company Name': _('Company Name'),
-            'Title': _('Title'),
-            'Language': _('Language'),
-            'Year of Birth': _('Year of Birth'),
-            'Gender': _('Gender'),
-            'Level of Education': _('Level of Education'),
-            'Mailing Address': _('Mailing Address'),
-            'Goals': _('Goals'),
-            'City': _('City'),
-            'Country': _('Country'),
-            'Enrollment Date': _('Enrollment Date'),
-            'Currently Enrolled': _('Currently Enrolled'),
-            'Enrollment Source': _('Enrollment Source'),
-            'Manual (Un)Enrollment Reason': _('Manual (Un)Enrollment Reason'),
-            'Enrollment Role': _('Enrollment Role'),
-            'List Price': _('List Price'),
-            'Payment Amount': _('Payment Amount'),
-            'Coupon Codes Used': _('Coupon Codes Used'),
-            'Registration Code Used': _('Registration Code Used'),
-            'Payment Status': _('Payment Status'),
-            'Transaction Reference Number': _('Transaction Reference Number')
-        }
+            user_data = enrollment_report_provider.get_user_profile(student.id)
+            course_enrollment_data = enrollment_report_provider.get_enrollment_info(student, course_id)
+            payment_data = enrollment_report_provider.get_payment_info(student, course_id)
+
+            # display name map for the column headers
+            enrollment_report_headers = {
+                'User ID': _('User ID'),
+                'Username': _('Username'),
+                'Full Name': _('Full Name'),
+                'First Name': _('First Name'),
+                'Last Name': _('Last Name'),
+                'Company Name': _('Company Name'),
+                'Title': _('Title'),
+                'Language': _('Language'),
+                'Year of Birth': _('Year of Birth'),
+                'Gender': _('Gender'),
+                'Level of Education': _('Level of Education'),
+                'Mailing Address': _('Mailing Address'),
+                'Goals': _('Goals'),
+                'City': _('City'),
+                'Country': _('Country'),
+                'Enrollment Date': _('Enrollment Date'),
+                'Currently Enrolled': _('Currently Enrolled'),
+                'Enrollment Source': _('Enrollment Source'),
+                'Manual (Un)Enrollment Reason': _('Manual (Un)Enrollment Reason'),
+                'Enrollment Role': _('Enrollment Role'),
+                'List Price': _('List Price'),
+                'Payment Amount': _('Payment Amount'),
+                'Coupon Codes Used': _('Coupon Codes Used'),
+                'Registration Code Used': _('Registration Code Used'),
+                'Payment Status': _('Payment Status'),
+                'Transaction Reference Number': _('Transaction Reference Number')
+            }
 
-        if not header:
-            header = user_data.keys() + course_enrollment_data.keys() + payment_data.keys()
-            display_headers = []
-            for header_element in header:
-                # translate header into a localizable display string
-                display_headers.append(enrollment_report_headers.get(header_element, header_element))
-            rows.append(display_headers)
+            if not header:
+                header.extend(user_data.keys() + course_enrollment_data.keys() + payment_data.keys())
+                display_headers = []
+                for header_element in header:
+                    # translate header into a localizable display string
+                    display_headers.append(enrollment_report_headers.get(header_element, header_element))
+                yield display_headers
+
+            yield user_data.values() + course_enrollment_data.values() + payment_data.values()
+            task_progress.succeeded += 1
 
-        rows.append(user_data.values() + course_enrollment_data.values() + payment_data.values())
-        task_progress.succeeded += 1
+    # The rows are written to the report store as they are generated.
+    upload_csv_to_report_store(
+        generate_rows(), 'enrollment_report', course_id, start_date, config_name='FINANCIAL_REPORTS'
+    )
 
     TASK_LOG.info(
         u'%s, Task type: %s, Current step: %s, Detailed enrollment report generated for students: %s/%s',
         task_info_string,
         action_name,
         current_step,
-        student_counter,
+        task_progress.attempted,
         total_students
     )
 
-    # By this point, we've got the rows we're going to stuff into our CSV files.
     current_step = {'step': 'Uploading CSVs'}
     task_progress.update_task_state(extra_meta=current_step)
     TASK_LOG.info(u'%s, Task type: %s, Current step: %s', task_info_string, action_name, current_step)
 
-    # Perform the actual upload
-    upload_csv_to_report_store(rows, 'enrollment_report', course_id, start_date, config_name='FINANCIAL_REPORTS')
-
     # One last update before we close out...
     TASK_LOG.info(u'%s, Task type: %s, Finalizing detailed enrollment task', task_info_string, action_name)
     return task_progress.update_task_state(extra_meta=current_step)
@@ -3,12 +3,14 @@ Tests for instructor_task/models.py.
 """
 
 from cStringIO import StringIO
+from gzip import GzipFile
 import mock
+import os
 import time
 from datetime import datetime
 from unittest import TestCase
 
-from instructor_task.models import LocalFSReportStore, S3ReportStore
+from instructor_task.models import LocalFSReportStore, ReportShardMissing, S3ReportStore
 from instructor_task.tests.test_base import TestReportMixin
 from opaque_keys.edx.locator import CourseLocator
 
@@ -21,19 +23,49 @@ class MockKey(object):
         self.last_modified = datetime.now()
         self.bucket = bucket
 
-    def set_contents_from_string(self, contents, headers):  # pylint: disable=unused-argument
+    def set_contents_from_string(self, contents, headers=None):  # pylint: disable=unused-argument
         """ Expected method on a Key object. """
+        self.contents = contents
         self.bucket.store_key(self)
 
+    def get_contents_as_string(self):
+        """ Expected method on a Key object. """
+        return self.contents
+
     def generate_url(self, expires_in):  # pylint: disable=unused-argument
         """ Expected method on a Key object. """
         return "http://fake-edx-s3.edx.org/"
 
 
+class MockMultiPartUpload(object):
+    """
+    Mocking a boto S3 MultiPartUpload object.
+    """
+    def __init__(self, bucket, key_name):
+        self.bucket = bucket
+        self.key_name = key_name
+        self.parts = {}
+
+    def upload_part_from_file(self, fp, part_num):
+        """ Expected method on a MultiPartUpload object. """
+        self.parts[part_num] = fp.read()
+
+    def complete_upload(self):
+        """ Expected method on a MultiPartUpload object. """
+        key = MockKey(self.bucket)
+        key.key = self.key_name
+        key.set_contents_from_string(''.join(self.parts[num] for num in sorted(self.parts)))
+
+    def cancel_upload(self):
+        """ Expected method on a MultiPartUpload object. """
+        self.parts = {}
+
+
 class MockBucket(object):
     """ Mocking a boto S3 Bucket object. """
     def __init__(self, _name):
         self.keys = []
+        self.multipart_uploads = []
 
     def store_key(self, key):
         """ Not a Bucket method, created just to store the keys in the Bucket for testing purposes. """
@@ -43,6 +75,20 @@ class MockBucket(object):
         """ Expected method on a Bucket object. """
         return self.keys
 
+    def get_key(self, key_name):
+        """ Expected method on a Bucket object. """
+        return next((key for key in self.keys if key.key == key_name), None)
+
+    def delete_key(self, key_name):
+        """ Expected method on a Bucket object. """
+        self.keys = [key for key in self.keys if key.key != key_name]
+
+    def initiate_multipart_upload(self, key_name, headers=None):  # pylint: disable=unused-argument
+        """ Expected method on a Bucket object. """
+        multipart_upload = MockMultiPartUpload(self, key_name)
+        self.multipart_uploads.append(multipart_upload)
+        return multipart_upload
+
 
 class MockS3Connection(object):
     """ Mocking a boto S3 Connection """
@@ -84,6 +130,19 @@ class ReportStoreTestMixin(object):
             ['new_file', 'middle_file', 'old_file']
         )
 
+    def test_shard_rows(self):
+        """
+        Test that partial report files can be read back and deleted.
+        """
+        report_store = self.create_report_store()
+        rows = [[u'id', u'username'], [u'1', u'ni\xf1o']]
+        report_store.store_shard_rows(self.course_id, 'shard_file', rows)
+        self.assertEqual(list(report_store.shard_rows(self.course_id, 'shard_file')), rows)
+
+        report_store.delete_shard(self.course_id, 'shard_file')
+        with self.assertRaises(ReportShardMissing):
+            report_store.shard_rows(self.course_id, 'shard_file')
+
 
 class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase):
     """
@@ -93,6 +152,46 @@ class LocalFSReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase
         """ Create and return a LocalFSReportStore. """
         return LocalFSReportStore.from_config(config_name='GRADES_DOWNLOAD')
 
+    def test_shards_not_linked(self):
+        """
+        Test that partial report files are not listed by links_for().
+        """
+        report_store = self.create_report_store()
+        report_store.store(self.course_id, 'report_file', StringIO())
+        report_store.store_shard_rows(self.course_id, 'shard_file', [[u'id']])
+        self.assertEqual([link[0] for link in report_store.links_for(self.course_id)], ['report_file'])
+
+    def test_store_rows_from_generator(self):
+        """
+        Test that rows can be streamed to a report file from a generator.
+        """
+        report_store = self.create_report_store()
+        rows = ([unicode(num), u'ni\xf1o'] for num in xrange(3))
+        report_store.store_rows(self.course_id, 'report_file.csv', rows)
+        with open(report_store.path_to(self.course_id, 'report_file.csv')) as report_file:
+            self.assertEqual(report_file.read(), '0,ni\xc3\xb1o\r\n1,ni\xc3\xb1o\r\n2,ni\xc3\xb1o\r\n')
+
+    def test_partial_report_not_linked(self):
+        """
+        Test that a report is not listed by links_for() while its rows are
+        being written, nor if generating them fails.
+        """
+        report_store = self.create_report_store()
+        report_store.store(self.course_id, 'old_report.csv', StringIO())
+
+        def rows():
+            """Check the listed reports while the rows are being written, then fail."""
+            yield [u'id']
+            self.assertEqual(
+                [link[0] for link in report_store.links_for(self.course_id)], ['old_report.csv']
+            )
+            raise ValueError("Generating the report failed")
+
+        with self.assertRaises(ValueError):
+            report_store.store_rows(self.course_id, 'report.csv', rows())
+        self.assertEqual([link[0] for link in report_store.links_for(self.course_id)], ['old_report.csv'])
+        self.assertEqual(os.listdir(os.path.join(report_store.root_path, 'tmp')), [])
+
 
 @mock.patch('instructor_task.models.S3Connection', new=MockS3Connection)
 @mock.patch('instructor_task.models.Key', new=MockKey)
@@ -105,3 +204,29 @@ class S3ReportStoreTestCase(ReportStoreTestMixin, TestReportMixin, TestCase):
     def create_report_store(self):
         """ Create and return a S3ReportStore. """
         return S3ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+
+    def _stored_contents(self, report_store, filename):
+        """ Return the decompressed contents of a stored report file. """
+        key = report_store.bucket.get_key(report_store.key_for(self.course_id, filename).key)
+        return GzipFile(fileobj=StringIO(key.get_contents_as_string())).read()
+
+    def test_store_rows_small_report(self):
+        """
+        Test that a report smaller than one upload part is stored in one request.
+        """
+        report_store = self.create_report_store()
+        report_store.store_rows(self.course_id, 'report_file.csv', ([unicode(num)] for num in xrange(3)))
+        self.assertEqual(report_store.bucket.multipart_uploads, [])
+        self.assertEqual(self._stored_contents(report_store, 'report_file.csv'), '0\r\n1\r\n2\r\n')
+
+    @mock.patch('instructor_task.models.S3ReportStore.UPLOAD_PART_SIZE', 1)
+    def test_store_rows_multipart(self):
+        """
+        Test that large reports are streamed to S3 as a multipart upload.
+        """
+        report_store = self.create_report_store()
+        rows = [[unicode(num)] for num in xrange(3)]
+        report_store.store_rows(self.course_id, 'report_file.csv', iter(rows))
+        self.assertEqual(len(report_store.bucket.multipart_uploads), 1)
+        self.assertGreater(len(report_store.bucket.multipart_uploads[0].parts), 1)
+        self.assertEqual(self._stored_contents(report_store, 'report_file.csv'), '0\r\n1\r\n2\r\n')
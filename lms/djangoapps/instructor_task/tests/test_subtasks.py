@@ -26,7 +26,7 @@ class TestSubtasks(InstructorTaskCourseTestCase):
             random_id = uuid4().hex[:8]
             self.create_student(username='student{0}'.format(random_id))
 
-    def _queue_subtasks(self, create_subtask_fcn, items_per_task, initial_count, extra_count):
+    def _queue_subtasks(self, create_subtask_fcn, items_per_task, initial_count, extra_count, item_ids=False):
         """Queue subtasks while enrolling more students into course in the middle of the process."""
 
         task_id = str(uuid4())
@@ -55,6 +55,7 @@ class TestSubtasks(InstructorTaskCourseTestCase):
                 item_fields=[],
                 items_per_task=items_per_task,
                 total_num_items=initial_count,
+                item_ids=item_ids,
             )
 
     def test_queue_subtasks_for_query1(self):
@@ -80,3 +81,23 @@ class TestSubtasks(InstructorTaskCourseTestCase):
         self.assertEqual(len(mock_create_subtask_fcn_args[0][0][0]), 3)
         self.assertEqual(len(mock_create_subtask_fcn_args[1][0][0]), 3)
         self.assertEqual(len(mock_create_subtask_fcn_args[2][0][0]), 5)
+
+    def test_queue_subtasks_for_item_ids(self):
+        """Test queue_subtasks_for_query() with item ids, if the last subtask needs to accommodate > items_per_task."""
+
+        mock_create_subtask_fcn = Mock()
+        self._queue_subtasks(mock_create_subtask_fcn, 3, 8, 3, item_ids=True)
+
+        # Check the ids of the items for each subtask
+        enrollment_ids = list(CourseEnrollment.objects.filter(course_id=self.course.id).order_by('id').values_list(
+            'id', flat=True
+        ))
+        mock_create_subtask_fcn_args = mock_create_subtask_fcn.call_args_list
+        self.assertEqual(
+            [args[0][0] for args in mock_create_subtask_fcn_args],
+            [
+                [[0, enrollment_ids[0:3]]],
+                [[0, enrollment_ids[3:6]]],
+                [[0, enrollment_ids[6:11]]],
+            ]
+        )
@@ -308,6 +308,51 @@ class TestRescoreInstructorTask(TestInstructorTasks):
         self.assertEquals(output.get('action_name'), 'rescored')
         self.assertGreater(output.get('duration_ms'), 0)
 
+    @patch('instructor_task.tasks_helper.MODULE_STATE_PREPARE_CHUNK_SIZE', 4)
+    def test_rescoring_caches_script_contexts(self):
+        # The problem's script is run for each chunk of students before they are
+        # rescored, using the first student's problem for the others in the chunk.
+        input_state = json.dumps({'done': True, 'seed': 17})
+        num_students = 10
+        self._create_students_with_state(num_students, input_state)
+        task_entry = self._create_input_entry()
+        mock_instance = Mock()
+        mock_instance.rescore_problem = Mock(return_value={'success': 'correct'})
+        with patch('instructor_task.tasks_helper.get_module_for_descriptor_internal') as mock_get_module:
+            mock_get_module.return_value = mock_instance
+            self._run_task_with_mock_celery(rescore_problem, task_entry.id, task_entry.task_id)
+
+        cache_calls = mock_instance.lcp.cache_script_contexts.call_args_list
+        self.assertEquals(
+            [(len(seeds), len(anonymous_student_ids)) for (seeds, anonymous_student_ids), __ in cache_calls],
+            [(3, 3), (3, 3), (1, 1)]
+        )
+        for (seeds, __), __ in cache_calls:
+            self.assertEquals(set(seeds), {17})
+        entry = InstructorTask.objects.get(id=task_entry.id)
+        output = json.loads(entry.task_output)
+        self.assertEquals(output.get('attempted'), num_students)
+        self.assertEquals(output.get('succeeded'), num_students)
+
+    def test_rescoring_with_script_caching_failure(self):
+        # Errors when caching the script contexts are logged, and don't stop the rescoring.
+        input_state = json.dumps({'done': True, 'seed': 17})
+        num_students = 3
+        self._create_students_with_state(num_students, input_state)
+        task_entry = self._create_input_entry()
+        mock_instance = Mock()
+        mock_instance.rescore_problem = Mock(return_value={'success': 'correct'})
+        mock_instance.lcp.cache_script_contexts.side_effect = Exception("The sandbox is broken")
+        with patch('instructor_task.tasks_helper.get_module_for_descriptor_internal') as mock_get_module:
+            mock_get_module.return_value = mock_instance
+            with patch('instructor_task.tasks_helper.TASK_LOG.warning') as mock_warning:
+                self._run_task_with_mock_celery(rescore_problem, task_entry.id, task_entry.task_id)
+        self.assertTrue(mock_warning.called)
+        entry = InstructorTask.objects.get(id=task_entry.id)
+        output = json.loads(entry.task_output)
+        self.assertEquals(output.get('attempted'), num_students)
+        self.assertEquals(output.get('succeeded'), num_students)
+
 
 class TestResetAttemptsInstructorTask(TestInstructorTasks):
     """Tests instructor task that resets problem attempts."""
@@ -6,8 +6,14 @@ Unit tests for LMS instructor-initiated background tasks helper functions.
 Tests that CSV grade report generation works with unicode emails.
 
 """
+import calendar
+from datetime import datetime
+from uuid import uuid4
+
 import ddt
+from celery.states import SUCCESS
 from mock import Mock, patch
+from pytz import UTC
 import tempfile
 import json
 from openedx.core.djangoapps.course_groups import cohorts
@@ -32,7 +38,7 @@ from student.models import CourseEnrollment, CourseEnrollmentAllowed, ManualEnro
 from lms.djangoapps.verify_student.tests.factories import SoftwareSecurePhotoVerificationFactory
 from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from xmodule.partitions.partitions import Group, UserPartition
-from instructor_task.models import ReportStore
+from instructor_task.models import InstructorTask, PROGRESS, ReportShardMissing, ReportStore
 from survey.models import SurveyForm, SurveyAnswer
 from instructor_task.tasks_helper import (
     cohort_students_and_upload,
@@ -45,7 +51,13 @@ from instructor_task.tasks_helper import (
     upload_exec_summary_report,
     upload_course_survey_report,
     generate_students_certificates,
+    finish_grades_csv_shards,
+    merge_grade_report_shards,
+    upload_grades_csv_shard,
+    _grade_report_shard_filename,
 )
+from instructor_task.subtasks import SubtaskStatus, initialize_subtask_info
+from instructor_task.tests.factories import InstructorTaskFactory
 from instructor_analytics.basic import UNAVAILABLE
 from openedx.core.djangoapps.util.testing import ContentGroupTestCase, TestConditionalContent
 from teams.tests.factories import CourseTeamFactory, CourseTeamMembershipFactory
@@ -289,6 +301,118 @@ class TestInstructorGradeReport(InstructorGradeReportTestCase):
         result = upload_grades_csv(None, None, self.course.id, None, 'graded')
         self.assertDictContainsSubset({'attempted': 1, 'succeeded': 1, 'failed': 0}, result)
 
+    @override_settings(GRADES_DOWNLOAD_STUDENTS_PER_TASK=1)
+    @patch('instructor_task.tasks_helper._queue_grade_report_subtasks')
+    def test_large_course_uses_subtasks(self, mock_queue_subtasks):
+        """
+        Test that grade reports for courses with more students than
+        GRADES_DOWNLOAD_STUDENTS_PER_TASK are split across subtasks.
+        """
+        self.create_student('student1', 'student1@example.com')
+        self.create_student('student2', 'student2@example.com')
+        upload_grades_csv(None, None, self.course.id, None, 'graded')
+        self.assertTrue(mock_queue_subtasks.called)
+
+    def test_merge_grade_report_shards(self):
+        """
+        Test that the partial CSVs of a sharded grade report are merged into
+        a single report with one header row.
+        """
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        start_date = datetime.now(UTC)
+        header = [u'id', u'email', u'username', u'grade']
+        shards = [
+            [header, [u'1', u'a@example.com', u'a', u'0.5']],
+            [],
+            [header, [u'3', u'c@example.com', u'c', u'1.0']],
+        ]
+        for shard_index, rows in enumerate(shards):
+            for csv_name, csv_rows in (('grade_report', rows), ('grade_report_err', [[u'id', u'username']])):
+                report_store.store_shard_rows(
+                    self.course.id,
+                    _grade_report_shard_filename(self.course.id, csv_name, start_date, shard_index),
+                    csv_rows
+                )
+
+        merge_grade_report_shards(self.course.id, start_date, len(shards) + 1)
+
+        links = report_store.links_for(self.course.id)
+        self.assertEqual(len(links), 1)
+        with open(report_store.path_to(self.course.id, links[0][0])) as csv_file:
+            self.assertEqual(
+                [row for row in unicodecsv.reader(csv_file)],
+                [header, shards[0][1], shards[2][1]]
+            )
+
+    def test_merge_run_twice(self):
+        """
+        Test that merging a sharded grade report again, as when the merge
+        task is redelivered, keeps the merged report, and that the partial
+        CSVs are deleted once the task has succeeded.
+        """
+        entry = InstructorTaskFactory.create(
+            course_id=self.course.id, task_type='grade_course', task_key='', task_id=str(uuid4())
+        )
+        initialize_subtask_info(entry, 'graded', 1, [str(uuid4())])
+        start_timestamp = calendar.timegm(datetime.now(UTC).utctimetuple())
+        start_date = datetime.fromtimestamp(start_timestamp, UTC)
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        rows = [[u'id', u'email', u'username', u'grade'], [u'1', u'a@example.com', u'a', u'0.5']]
+        report_store.store_shard_rows(
+            self.course.id, _grade_report_shard_filename(self.course.id, 'grade_report', start_date, 0), rows
+        )
+
+        for __ in range(2):
+            finish_grades_csv_shards(entry.id, unicode(self.course.id), start_timestamp)
+
+            self.assertEqual(InstructorTask.objects.get(pk=entry.id).task_state, SUCCESS)
+            links = report_store.links_for(self.course.id)
+            self.assertEqual(len(links), 1)
+            with open(report_store.path_to(self.course.id, links[0][0])) as csv_file:
+                self.assertEqual([row for row in unicodecsv.reader(csv_file)], rows)
+            with self.assertRaises(ReportShardMissing):
+                report_store.shard_rows(
+                    self.course.id, _grade_report_shard_filename(self.course.id, 'grade_report', start_date, 0)
+                )
+
+    def test_last_grade_report_shard_fails(self):
+        """
+        Test that the shards of a sharded grade report are still merged when
+        the last subtask to complete fails, and that the task only succeeds
+        once they have been.
+        """
+        students = [
+            self.create_student('student1', 'student1@example.com'),
+            self.create_student('student2', 'student2@example.com'),
+        ]
+        entry = InstructorTaskFactory.create(
+            course_id=self.course.id, task_type='grade_course', task_key='', task_id=str(uuid4())
+        )
+        subtask_ids = [str(uuid4()) for __ in students]
+        initialize_subtask_info(entry, 'graded', len(students), subtask_ids)
+        start_timestamp = calendar.timegm(datetime.now(UTC).utctimetuple())
+
+        upload_grades_csv_shard(
+            entry.id, unicode(self.course.id), start_timestamp, 0, [students[0].id],
+            SubtaskStatus.create(subtask_ids[0]).to_dict()
+        )
+        self.assertEqual(InstructorTask.objects.get(pk=entry.id).task_state, PROGRESS)
+
+        with patch('instructor_task.tasks_helper._grade_report_rows', side_effect=ValueError('Grading failed')):
+            with self.assertRaises(ValueError):
+                upload_grades_csv_shard(
+                    entry.id, unicode(self.course.id), start_timestamp, 1, [students[1].id],
+                    SubtaskStatus.create(subtask_ids[1]).to_dict()
+                )
+
+        self.assertEqual(InstructorTask.objects.get(pk=entry.id).task_state, SUCCESS)
+        report_store = ReportStore.from_config(config_name='GRADES_DOWNLOAD')
+        links = report_store.links_for(self.course.id)
+        self.assertEqual(len(links), 1)
+        with open(report_store.path_to(self.course.id, links[0][0])) as csv_file:
+            rows = [row for row in unicodecsv.reader(csv_file)]
+        self.assertEqual([row[2] for row in rows[1:]], [students[0].username])
+
 
 class TestTeamGradeReport(InstructorGradeReportTestCase):
     """ Test that teams appear correctly in the grade report when it is enabled for the course. """
@@ -198,6 +198,15 @@ if 'loc_cache' not in CACHES:
         'LOCATION': 'edx_location_mem_cache',
     }
 
+COURSE_STRUCTURE_LOCAL_CACHE_MAX_BLOCKS = ENV_TOKENS.get(
+    'COURSE_STRUCTURE_LOCAL_CACHE_MAX_BLOCKS', COURSE_STRUCTURE_LOCAL_CACHE_MAX_BLOCKS
+)
+COURSE_STRUCTURE_CACHE_FORMAT = ENV_TOKENS.get('COURSE_STRUCTURE_CACHE_FORMAT', COURSE_STRUCTURE_CACHE_FORMAT)
+STATIC_CONTENT_DISK_CACHE_DIR = ENV_TOKENS.get('STATIC_CONTENT_DISK_CACHE_DIR', STATIC_CONTENT_DISK_CACHE_DIR)
+STATIC_CONTENT_DISK_CACHE_MAX_SIZE = ENV_TOKENS.get(
+    'STATIC_CONTENT_DISK_CACHE_MAX_SIZE', STATIC_CONTENT_DISK_CACHE_MAX_SIZE
+)
+
 # Email overrides
 DEFAULT_FROM_EMAIL = ENV_TOKENS.get('DEFAULT_FROM_EMAIL', DEFAULT_FROM_EMAIL)
 DEFAULT_FEEDBACK_EMAIL = ENV_TOKENS.get('DEFAULT_FEEDBACK_EMAIL', DEFAULT_FEEDBACK_EMAIL)
@@ -226,6 +235,7 @@ BULK_EMAIL_MAX_RETRIES = ENV_TOKENS.get('BULK_EMAIL_MAX_RETRIES', BULK_EMAIL_MAX
 BULK_EMAIL_INFINITE_RETRY_CAP = ENV_TOKENS.get('BULK_EMAIL_INFINITE_RETRY_CAP', BULK_EMAIL_INFINITE_RETRY_CAP)
 BULK_EMAIL_LOG_SENT_EMAILS = ENV_TOKENS.get('BULK_EMAIL_LOG_SENT_EMAILS', BULK_EMAIL_LOG_SENT_EMAILS)
 BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS = ENV_TOKENS.get('BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS', BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS)
+BULK_EMAIL_SMTP_CONNECTIONS = ENV_TOKENS.get('BULK_EMAIL_SMTP_CONNECTIONS', BULK_EMAIL_SMTP_CONNECTIONS)
 # We want Bulk Email running on the high-priority queue, so we define the
 # routing key that points to it. At the moment, the name is the same.
 # We have to reset the value here, since we have changed the value of the queue name.
@@ -519,7 +529,13 @@ VERIFY_STUDENT = AUTH_TOKENS.get("VERIFY_STUDENT", VERIFY_STUDENT)
 # Grades download
 GRADES_DOWNLOAD_ROUTING_KEY = HIGH_MEM_QUEUE
 
+COMPUTE_MAX_SCORES_QUEUE = ENV_TOKENS.get('COMPUTE_MAX_SCORES_QUEUE', DEFAULT_PRIORITY_QUEUE)
+UPDATE_COURSE_BLOCKS_QUEUE = ENV_TOKENS.get('UPDATE_COURSE_BLOCKS_QUEUE', DEFAULT_PRIORITY_QUEUE)
+
 GRADES_DOWNLOAD = ENV_TOKENS.get("GRADES_DOWNLOAD", GRADES_DOWNLOAD)
+GRADES_DOWNLOAD_STUDENTS_PER_TASK = ENV_TOKENS.get(
+    "GRADES_DOWNLOAD_STUDENTS_PER_TASK", GRADES_DOWNLOAD_STUDENTS_PER_TASK
+)
 
 # financial reports
 FINANCIAL_REPORTS = ENV_TOKENS.get("FINANCIAL_REPORTS", FINANCIAL_REPORTS)
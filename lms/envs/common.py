@@ -281,6 +281,11 @@ FEATURES = {
     # Enable temporary APIs required for xBlocks on Mobile
     'ENABLE_COURSE_BLOCKS_NAVIGATION_API': False,
 
+    # Update, or re-create, the cached course blocks of published courses
+    # in a Celery task, rather than leaving requests to re-create them
+    # (see UPDATE_COURSE_BLOCKS_QUEUE).
+    'PRECOMPUTE_COURSE_BLOCKS_ON_PUBLISH': False,
+
     # Enable the combined login/registration form
     'ENABLE_COMBINED_LOGIN_REGISTRATION': False,
 
@@ -367,6 +372,14 @@ FEATURES = {
     # Enable the max score cache to speed up grading
     'ENABLE_MAX_SCORE_CACHE': True,
 
+    # Compute the max scores of the problems of published courses in a
+    # Celery task, rather than leaving grading to instantiate the problems.
+    'PRECOMPUTE_MAX_SCORES_ON_PUBLISH': False,
+
+    # Store per-subsection grade totals so that grading only recomputes the
+    # subsections whose scores changed.
+    'ENABLE_PERSISTENT_SUBSECTION_GRADES': False,
+
     # Enable LTI Provider feature.
     'ENABLE_LTI_PROVIDER': False,
 }
@@ -738,6 +751,22 @@ MODULESTORE = {
     }
 }
 
+# The maximum total number of blocks in the deserialized split modulestore course
+# structures kept in each process's memory, in front of the 'course_structure_cache'
+# cache. Set to 0 to disable the in-process cache.
+COURSE_STRUCTURE_LOCAL_CACHE_MAX_BLOCKS = 100000
+
+# How split modulestore course structures are serialized in the 'course_structure_cache'
+# cache: 'pickle', or 'compact', which decodes blocks only as they are used.
+COURSE_STRUCTURE_CACHE_FORMAT = 'pickle'
+
+# A local directory in which StaticContentServer caches assets too large for the
+# cache, so that they aren't streamed from the contentstore on each request. None
+# disables it. Its files are removed, least recently used first, to keep their total
+# size within STATIC_CONTENT_DISK_CACHE_MAX_SIZE bytes.
+STATIC_CONTENT_DISK_CACHE_DIR = None
+STATIC_CONTENT_DISK_CACHE_MAX_SIZE = 10 * 1024 * 1024 * 1024
+
 #################### Python sandbox ############################################
 
 CODE_JAIL = {
@@ -751,6 +780,16 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # A pool of warm sandbox processes, which have already imported numpy etc.,
+    # for capa's safe_exec to run code in, rather than starting a new sandbox
+    # for each execution.  The limits above apply to each execution.
+    'worker_pool': {
+        # How many workers does each LMS process keep?  0 disables the pool.
+        'size': 0,
+        # How many executions does a worker run before it is replaced?
+        'max_executions': 100,
+    },
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -1694,6 +1733,12 @@ BULK_EMAIL_LOG_SENT_EMAILS = False
 # parallel, and what the SES rate is.
 BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS = 0.02
 
+# Number of SMTP connections over which each bulk email subtask sends messages
+# at the same time.  A subtask that has been retried for rate-related reasons
+# sends over a single connection.  Choose this value depending on the number
+# of workers that might be sending email in parallel, and what the SES rate is.
+BULK_EMAIL_SMTP_CONNECTIONS = 1
+
 ############################# Email Opt In ####################################
 
 # Minimum age for organization-wide email opt in
@@ -1886,6 +1931,10 @@ INSTALLED_APPS = (
     'openedx.core.djangoapps.content.course_overviews',
     'openedx.core.djangoapps.content.course_structures',
     'lms.djangoapps.course_blocks',
+    'openedx.core.djangoapps.content.block_structure',
+
+    # Max scores precomputed on publish
+    'openedx.core.djangoapps.max_scores',
 
     # Old course structure API
     'course_structure_api',
@@ -2143,12 +2192,27 @@ BADGR_ISSUER_SLUG = "example-issuer"
 ###################### Grade Downloads ######################
 GRADES_DOWNLOAD_ROUTING_KEY = HIGH_MEM_QUEUE
 
+# Queue for computing the max scores of published courses (with the
+# PRECOMPUTE_MAX_SCORES_ON_PUBLISH feature). Studio queues these tasks
+# on the LMS's queue too.
+COMPUTE_MAX_SCORES_QUEUE = DEFAULT_PRIORITY_QUEUE
+
+# Queue for updating the cached course blocks of published courses (with
+# the PRECOMPUTE_COURSE_BLOCKS_ON_PUBLISH feature). Studio queues these
+# tasks on the LMS's queue too.
+UPDATE_COURSE_BLOCKS_QUEUE = DEFAULT_PRIORITY_QUEUE
+
 GRADES_DOWNLOAD = {
     'STORAGE_TYPE': 'localfs',
     'BUCKET': 'edx-grades',
     'ROOT_PATH': '/tmp/edx-s3/grades',
 }
 
+# Number of students graded by each subtask of a grade report. Courses with
+# more students than this have their grade report split across subtasks.
+# If None, grade reports are always generated by a single task.
+GRADES_DOWNLOAD_STUDENTS_PER_TASK = None
+
 FINANCIAL_REPORTS = {
     'STORAGE_TYPE': 'localfs',
     'BUCKET': 'edx-financial-reports',
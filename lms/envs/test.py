@@ -235,6 +235,9 @@ CACHES = {
     },
 }
 
+# The in-process course structure cache would hide the mongo queries that tests count
+COURSE_STRUCTURE_LOCAL_CACHE_MAX_BLOCKS = 0
+
 # Dummy secret key for dev
 SECRET_KEY = '85920908f28904ed733fe576320db18cabd7b6cd'
 
@@ -37,6 +37,8 @@ def run():
 
     add_mimetypes()
 
+    configure_safe_exec_worker_pool()
+
     if settings.FEATURES.get('USE_CUSTOM_THEME', False):
         enable_stanford_theme()
 
@@ -68,6 +70,22 @@ def run():
     xmodule.x_module.descriptor_global_local_resource_url = lms_xblock.runtime.local_resource_url
 
 
+def configure_safe_exec_worker_pool():
+    """
+    Run capa's sandboxed Python code in a pool of warm workers, if
+    CODE_JAIL['worker_pool'] has a size.
+    """
+    pool_settings = settings.CODE_JAIL.get('worker_pool', {})
+    if pool_settings.get('size'):
+        from capa.safe_exec import configure_worker_pool
+        configure_worker_pool(
+            pool_settings['size'],
+            max_executions=pool_settings.get('max_executions', 100),
+            python_bin=settings.CODE_JAIL.get('python_bin'),
+            user=settings.CODE_JAIL.get('user'),
+        )
+
+
 def add_mimetypes():
     """
     Add extra mimetypes. Used in xblock_resource.
@@ -0,0 +1,8 @@
+"""
+Keeps the cached course blocks (see lms.djangoapps.course_blocks) up to
+date when courses are published or deleted.
+
+Courses are published in Studio, but the course blocks are collected with
+the LMS's transformers, so this app is installed in both and its task is
+routed to the LMS workers (see UPDATE_COURSE_BLOCKS_QUEUE).
+"""
@@ -0,0 +1,50 @@
+"""
+Signal handlers for invalidating cached course blocks.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.dispatch.dispatcher import receiver
+
+from openedx.core.lib.block_cache.block_cache import clear_block_cache
+from xmodule.modulestore.django import modulestore, SignalHandler
+
+from .tasks import update_course_in_cache
+
+
+@receiver(SignalHandler.course_published)
+def _listen_for_course_publish(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Catches the signal that a course has been published in the module
+    store and invalidates the corresponding cache entry if one exists.
+
+    If the PRECOMPUTE_COURSE_BLOCKS_ON_PUBLISH feature is enabled, the
+    cache entry is updated, or re-created, by a Celery task on the LMS
+    workers instead, and keeps being served until then.
+    """
+    if settings.FEATURES.get('PRECOMPUTE_COURSE_BLOCKS_ON_PUBLISH'):
+        # Note: The countdown=0 kwarg ensures the task does not access
+        # the course before the signal emitter has finished all operations.
+        update_course_in_cache.apply_async(
+            [unicode(course_key)], countdown=0, queue=settings.UPDATE_COURSE_BLOCKS_QUEUE
+        )
+    else:
+        _clear_course_from_cache(course_key)
+
+
+@receiver(SignalHandler.course_deleted)
+def _listen_for_course_delete(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Catches the signal that a course has been deleted from the
+    module store and invalidates the corresponding cache entry if one
+    exists.
+    """
+    _clear_course_from_cache(course_key)
+
+
+def _clear_course_from_cache(course_key):
+    """
+    Removes the cached block structure of the course, like
+    lms.djangoapps.course_blocks.api.clear_course_from_cache, which
+    can't be imported in Studio.
+    """
+    clear_block_cache(cache, modulestore().make_course_usage_key(course_key))
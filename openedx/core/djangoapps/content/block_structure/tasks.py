@@ -0,0 +1,36 @@
+"""
+Asynchronous tasks for updating cached course blocks.
+"""
+import logging
+
+from celery.task import task  # pylint: disable=import-error,no-name-in-module
+from opaque_keys.edx.keys import CourseKey
+
+
+log = logging.getLogger('edx.celery.task')
+
+
+@task(name=u'openedx.core.djangoapps.content.block_structure.tasks.update_course_in_cache')
+def update_course_in_cache(course_key):
+    """
+    Updates the cached block structure of the specified course, or
+    re-collects it if it can't be updated, so that requests don't need
+    to collect it themselves.
+
+    This task uses the LMS's transformers, so it must only be run by the
+    LMS workers, even when it is queued from Studio.
+    """
+    # Imported here, since the course_blocks app is only installed in the LMS.
+    from lms.djangoapps.course_blocks.api import update_course_in_cache as update_course_blocks_in_cache
+
+    # Callers should pass the course key as a Unicode string, since
+    # CourseLocator is not JSON-serializable.
+    if not isinstance(course_key, basestring):
+        raise ValueError('course_key must be a string. {} is not acceptable.'.format(type(course_key)))
+
+    course_key = CourseKey.from_string(course_key)
+    try:
+        update_course_blocks_in_cache(course_key, recollect=True)
+    except Exception as ex:
+        log.exception('An error occurred while updating the cached course blocks: %s', ex.message)
+        raise
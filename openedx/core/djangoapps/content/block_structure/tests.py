@@ -0,0 +1,41 @@
+"""
+Tests for the block_structure app's signal handlers.
+"""
+from django.conf import settings
+from django.test import TestCase
+from django.test.utils import override_settings
+from mock import patch
+from opaque_keys.edx.locator import CourseLocator
+
+from .signals import _listen_for_course_delete, _listen_for_course_publish
+
+
+@override_settings(UPDATE_COURSE_BLOCKS_QUEUE='edx.lms.core.default')
+@patch('openedx.core.djangoapps.content.block_structure.signals.clear_block_cache')
+@patch('openedx.core.djangoapps.content.block_structure.signals.update_course_in_cache.apply_async')
+class CourseBlocksSignalsTest(TestCase):
+    """
+    Tests that publishing or deleting a course invalidates its cached
+    course blocks.
+    """
+    COURSE_KEY = CourseLocator('org', 'course', 'run')
+
+    @patch.dict(settings.FEATURES, {'PRECOMPUTE_COURSE_BLOCKS_ON_PUBLISH': True})
+    def test_update_queued_on_lms_workers(self, mock_apply_async, mock_clear_block_cache):
+        _listen_for_course_publish('store', self.COURSE_KEY)
+        mock_apply_async.assert_called_once_with(
+            [unicode(self.COURSE_KEY)], countdown=0, queue='edx.lms.core.default'
+        )
+        # The previous block structure keeps being served until it's updated.
+        self.assertFalse(mock_clear_block_cache.called)
+
+    @patch.dict(settings.FEATURES, {'PRECOMPUTE_COURSE_BLOCKS_ON_PUBLISH': False})
+    def test_cleared_on_publish(self, mock_apply_async, mock_clear_block_cache):
+        _listen_for_course_publish('store', self.COURSE_KEY)
+        self.assertFalse(mock_apply_async.called)
+        self.assertEqual(mock_clear_block_cache.call_count, 1)
+
+    def test_cleared_on_delete(self, mock_apply_async, mock_clear_block_cache):
+        _listen_for_course_delete('store', self.COURSE_KEY)
+        self.assertFalse(mock_apply_async.called)
+        self.assertEqual(mock_clear_block_cache.call_count, 1)
@@ -0,0 +1,7 @@
+"""
+Precomputes the max scores of the problems of published courses.
+
+Courses are published in Studio, but the max scores are computed with the
+LMS's grading code, so this app is installed in both and its task is routed
+to the LMS workers (see COMPUTE_MAX_SCORES_QUEUE).
+"""
@@ -0,0 +1,24 @@
+"""
+Signal handlers for precomputing max scores.
+"""
+from django.conf import settings
+from django.dispatch.dispatcher import receiver
+
+from xmodule.modulestore.django import SignalHandler
+
+from .tasks import compute_max_scores
+
+
+@receiver(SignalHandler.course_published)
+def _listen_for_course_publish(sender, course_key, **kwargs):  # pylint: disable=unused-argument
+    """
+    Catches the signal that a course has been published in the module store
+    and, if the PRECOMPUTE_MAX_SCORES_ON_PUBLISH feature is enabled, computes
+    the max scores of its problems in a Celery task on the LMS workers.
+    """
+    if settings.FEATURES.get('PRECOMPUTE_MAX_SCORES_ON_PUBLISH'):
+        # Note: The countdown=0 kwarg ensures the task does not access
+        # the course before the signal emitter has finished all operations.
+        compute_max_scores.apply_async(
+            [unicode(course_key)], countdown=0, queue=settings.COMPUTE_MAX_SCORES_QUEUE
+        )
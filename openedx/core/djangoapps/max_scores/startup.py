@@ -0,0 +1,5 @@
+"""
+Setup the signals on startup.
+"""
+
+from . import signals  # pylint: disable=unused-import
@@ -0,0 +1,42 @@
+"""
+Asynchronous tasks for precomputing max scores.
+"""
+import logging
+
+from celery.task import task  # pylint: disable=import-error,no-name-in-module
+from opaque_keys.edx.keys import CourseKey
+
+from xmodule.modulestore.django import modulestore
+
+
+log = logging.getLogger('edx.celery.task')
+
+
+@task(name=u'openedx.core.djangoapps.max_scores.tasks.compute_max_scores')
+def compute_max_scores(course_key):
+    """
+    Computes and stores the max scores of the problems in the published
+    version of the specified course, so that grading doesn't need to
+    instantiate problems to find them.
+
+    This task uses the LMS's grading code, so it must only be run by the LMS
+    workers, even when it is queued from Studio.
+    """
+    # Imported here, since the courseware app is only installed in the LMS.
+    from courseware.grades import compute_max_scores as compute_course_max_scores
+
+    # Callers should pass the course key as a Unicode string, since
+    # CourseLocator is not JSON-serializable.
+    if not isinstance(course_key, basestring):
+        raise ValueError('course_key must be a string. {} is not acceptable.'.format(type(course_key)))
+
+    course_key = CourseKey.from_string(course_key)
+    course = modulestore().get_course(course_key, depth=None)
+    if course is None:
+        log.info(u'Not computing the max scores of course %s, which no longer exists', course_key)
+        return
+    try:
+        compute_course_max_scores(course)
+    except Exception as ex:
+        log.exception('An error occurred while computing the max scores: %s', ex.message)
+        raise
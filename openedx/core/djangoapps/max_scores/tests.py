@@ -0,0 +1,31 @@
+"""
+Tests for the max_scores app's signal handlers.
+"""
+from django.conf import settings
+from django.test import TestCase
+from django.test.utils import override_settings
+from mock import patch
+from opaque_keys.edx.locator import CourseLocator
+
+from .signals import _listen_for_course_publish
+
+
+@override_settings(COMPUTE_MAX_SCORES_QUEUE='edx.lms.core.default')
+@patch('openedx.core.djangoapps.max_scores.signals.compute_max_scores.apply_async')
+class CoursePublishTest(TestCase):
+    """
+    Tests that publishing a course queues the computation of its max scores.
+    """
+    COURSE_KEY = CourseLocator('org', 'course', 'run')
+
+    @patch.dict(settings.FEATURES, {'PRECOMPUTE_MAX_SCORES_ON_PUBLISH': True})
+    def test_max_scores_computed_on_lms_workers(self, mock_apply_async):
+        _listen_for_course_publish('store', self.COURSE_KEY)
+        mock_apply_async.assert_called_once_with(
+            [unicode(self.COURSE_KEY)], countdown=0, queue='edx.lms.core.default'
+        )
+
+    @patch.dict(settings.FEATURES, {'PRECOMPUTE_MAX_SCORES_ON_PUBLISH': False})
+    def test_feature_disabled(self, mock_apply_async):
+        _listen_for_course_publish('store', self.COURSE_KEY)
+        self.assertFalse(mock_apply_async.called)
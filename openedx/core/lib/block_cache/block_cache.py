@@ -1,12 +1,27 @@
 """
 Top-level module for the Block Cache framework with higher order
-functions for getting and clearing cached blocks.
+functions for getting, updating and clearing cached blocks.
 """
-from .block_structure_factory import BlockStructureFactory
+from copy import deepcopy
+from time import sleep, time
+
+from .block_structure_factory import BlockStructureFactory, EDIT_INFO_FIELDS
 from .exceptions import TransformerException
 from .transformer_registry import TransformerRegistry
 
 
+# The number of seconds after which the lock on collecting a block
+# structure expires, in case the process holding it dies. It should be
+# longer than collecting the largest block structure takes.
+COLLECT_LOCK_TIMEOUT = 5 * 60
+
+# The maximum number of seconds to wait for another process to collect
+# a block structure when there is no stale copy of it to serve, before
+# collecting it inline, and how often to check whether it is done.
+COLLECT_WAIT_TIMEOUT = 2
+COLLECT_POLL_INTERVAL = 0.2
+
+
 def get_blocks(cache, modulestore, usage_info, root_block_usage_key, transformers):
     """
     Top-level function in the Block Cache framework that manages
@@ -43,7 +58,151 @@ def get_blocks(cache, modulestore, usage_info, root_block_usage_key, transformer
             transform methods in the given transformers with the
             given usage_info.
     """
+    root_block_structure = _get_collected_block_structure(cache, modulestore, root_block_usage_key, transformers)
+
+    # Execute requested transforms on block structure.
+    for transformer in transformers:
+        transformer.transform(usage_info, root_block_structure)
+
+    # Prune the block structure to remove any unreachable blocks.
+    root_block_structure._prune_unreachable()  # pylint: disable=protected-access
+
+    return root_block_structure
+
+
+def get_blocks_for_many(cache, modulestore, usage_infos, root_block_usage_key, transformers):
+    """
+    A batch counterpart of get_blocks that returns, for each of the
+    given usage_infos, the usage keys of the blocks in the block
+    structure transformed for it.
+
+    The collected block structure is only loaded once. If all the given
+    transformers support batch transforms (see
+    BlockStructureTransformer.get_removal_masks), the transformed
+    blocks for all usage_infos are evaluated at once, in a single
+    traversal of the block structure. Otherwise, the transformers are
+    called for each usage_info on a copy of the block structure.
+
+    Arguments:
+        usage_infos ([any negotiated type]) - The usage-specific
+            objects for which to transform the block structure.
+
+        See get_blocks for the description of the other arguments.
+
+    Returns:
+        [set(UsageKey)] - For each of the given usage_infos, the usage
+            keys of the blocks in the block structure transformed for
+            it.
+    """
+    root_block_structure = _get_collected_block_structure(cache, modulestore, root_block_usage_key, transformers)
+
+    if not all(transformer.SUPPORTS_BATCH_TRANSFORM for transformer in transformers):
+        block_keys_list = []
+        for usage_info in usage_infos:
+            block_structure = deepcopy(root_block_structure)
+            for transformer in transformers:
+                transformer.transform(usage_info, block_structure)
+            block_structure._prune_unreachable()  # pylint: disable=protected-access
+            block_keys_list.append(set(block_structure.get_block_keys()))
+        return block_keys_list
+
+    removals = []
+    for transformer in transformers:
+        removals.extend(transformer.get_removal_masks(usage_infos, root_block_structure))
+    return _get_remaining_block_keys(root_block_structure, removals, len(usage_infos))
+
+
+def update_block_cache(cache, modulestore, root_block_usage_key, recollect=False):
+    """
+    Updates the cached block structure associated with the given root
+    block key after blocks within it have changed in the modulestore.
+
+    Only the subtrees containing changed blocks are loaded from the
+    modulestore and re-collected; the cached data of the rest of the
+    block structure is kept. If that isn't possible (for example, if
+    the root block itself changed, or if any registered transformer
+    doesn't support it), the whole block structure is re-collected if
+    recollect is True, and otherwise removed from the cache, to be
+    re-created on its next access.
+
+    Arguments:
+        cache (django.core.cache.backends.base.BaseCache) - The
+            cache in which the block structure's collected data is
+            stored.
+
+        modulestore (ModuleStoreRead) - The modulestore that contains
+            the updated data for the xBlocks of the block structure.
+
+        root_block_usage_key (UsageKey) - The usage_key for the root
+            of the block structure that is to be updated.
+
+        recollect (bool) - Whether to re-collect and cache the block
+            structure when it can't be updated, including when it isn't
+            in the cache. Since the previous block structure stays in
+            the cache in the meantime, requests are never left to
+            collect it themselves.
+
+    The block structure is updated while holding its collect lock, so
+    that an update doesn't overwrite another process' changes to the
+    cached block structure, or get overwritten by them.
+    """
+    lock_token = _wait_for_collect_lock(cache, root_block_usage_key)
+    try:
+        _update_block_cache(cache, modulestore, root_block_usage_key, recollect)
+    finally:
+        BlockStructureFactory.release_collect_lock(root_block_usage_key, cache, lock_token)
 
+
+def _update_block_cache(cache, modulestore, root_block_usage_key, recollect):
+    """
+    Updates the cached block structure associated with the given root
+    block key, as described in update_block_cache.
+    """
+    root_block_structure = BlockStructureFactory.create_from_cache(root_block_usage_key, cache)
+    if not root_block_structure:
+        if recollect:
+            _create_and_cache(cache, modulestore, root_block_usage_key)
+        return
+
+    registered_transformers = TransformerRegistry.get_registered_transformers()
+    changes = None
+    if (
+            all(transformer.SUPPORTS_SUBTREE_UPDATES for transformer in registered_transformers) and
+            not BlockStructureFactory.get_outdated_transformers(root_block_structure, registered_transformers)
+    ):
+        changes = BlockStructureFactory.create_from_modulestore_changes(root_block_structure, modulestore)
+    if changes is None:
+        if recollect:
+            _create_and_cache(cache, modulestore, root_block_usage_key)
+        else:
+            clear_block_cache(cache, root_block_usage_key)
+        return
+
+    changed_block_structure, changed_root_keys = changes
+    if not changed_root_keys:
+        return
+
+    _collect(changed_block_structure, registered_transformers)
+    root_block_structure._update_subtrees(  # pylint: disable=protected-access
+        changed_block_structure, changed_root_keys
+    )
+    BlockStructureFactory.serialize_to_cache(root_block_structure, cache)
+
+
+def clear_block_cache(cache, root_block_usage_key):
+    """
+    Removes the block structure associated with the given root block
+    key.
+    """
+    BlockStructureFactory.remove_from_cache(root_block_usage_key, cache)
+
+
+def _get_collected_block_structure(cache, modulestore, root_block_usage_key, transformers):
+    """
+    Returns the block structure starting at the given root block key,
+    with up to date collected data for the given transformers, from the
+    cache if possible.
+    """
     # Verify that all requested transformers are registered in the
     # Transformer Registry.
     unregistered_transformers = TransformerRegistry.find_unregistered(transformers)
@@ -53,38 +212,184 @@ def get_blocks(cache, modulestore, usage_info, root_block_usage_key, transformer
         )
 
     # Load the cached block structure.
-    root_block_structure = BlockStructureFactory.create_from_cache(root_block_usage_key, cache, transformers)
+    root_block_structure = BlockStructureFactory.create_from_cache(root_block_usage_key, cache)
 
-    # On cache miss, execute the collect phase and update the cache.
+    # On cache miss, execute the collect phase and update the cache,
+    # unless another process is already doing so.
     if not root_block_structure:
+        root_block_structure = _create_on_cache_miss(cache, modulestore, root_block_usage_key, transformers)
 
-        # Create the block structure from the modulestore.
-        root_block_structure = BlockStructureFactory.create_from_modulestore(root_block_usage_key, modulestore)
+    else:
+        # If the cached data is outdated for any registered transformer,
+        # re-collect the data of only the outdated transformers, keeping
+        # the cached data of the others.
+        outdated_transformers = BlockStructureFactory.get_outdated_transformers(
+            root_block_structure, TransformerRegistry.get_registered_transformers()
+        )
+        if outdated_transformers:
+            lock_token = BlockStructureFactory.acquire_collect_lock(root_block_usage_key, cache, COLLECT_LOCK_TIMEOUT)
+            if lock_token:
+                try:
+                    _update_outdated_transformers(root_block_structure, modulestore, outdated_transformers)
+                    BlockStructureFactory.serialize_to_cache(root_block_structure, cache)
+                finally:
+                    BlockStructureFactory.release_collect_lock(root_block_usage_key, cache, lock_token)
 
-        # Collect data from each registered transformer.
-        for transformer in TransformerRegistry.get_registered_transformers():
-            root_block_structure._add_transformer(transformer)  # pylint: disable=protected-access
-            transformer.collect(root_block_structure)
+            # Another process is already updating the cache. Only
+            # re-collect here if the requested transformers need it.
+            elif BlockStructureFactory.get_outdated_transformers(root_block_structure, transformers):
+                _update_outdated_transformers(root_block_structure, modulestore, outdated_transformers)
 
-        # Collect all fields that were requested by the transformers.
-        root_block_structure._collect_requested_xblock_fields()  # pylint: disable=protected-access
+    return root_block_structure
 
-        # Cache this information.
-        BlockStructureFactory.serialize_to_cache(root_block_structure, cache)
 
-    # Execute requested transforms on block structure.
-    for transformer in transformers:
-        transformer.transform(usage_info, root_block_structure)
+def _get_remaining_block_keys(block_structure, removals, num_usage_infos):
+    """
+    Returns, for each usage_info, the usage keys of the blocks that
+    remain in the given block structure after the given removals, as
+    returned by BlockStructureTransformer.get_removal_masks.
 
-    # Prune the block structure to remove any unreachable blocks.
-    root_block_structure._prune_unreachable()  # pylint: disable=protected-access
+    All usage_infos are evaluated at once by computing, in a single
+    topological traversal, the bitset of usage_infos for which each
+    block is reachable from the root block.
+    """
+    all_usage_infos = (1 << num_usage_infos) - 1
 
-    return root_block_structure
+    # Bitsets of the usage_infos for which each block is removed, with
+    # and without keeping its descendants.
+    removed_masks = {}
+    bypassed_masks = {}
+    for keep_descendants, masks in removals:
+        target_masks = bypassed_masks if keep_descendants else removed_masks
+        for block_key, mask in masks.iteritems():
+            target_masks[block_key] = target_masks.get(block_key, 0) | mask
 
+    # Bitsets of the usage_infos for which each block is reachable from
+    # the root block. The descendants of a removed block are only
+    # reachable through its other parents, while those of a bypassed
+    # block are reachable through its own parents.
+    reachable_masks = {}
+    excluded_block_keys = [set() for _ in xrange(num_usage_infos)]
+    for block_key in block_structure.topological_traversal():
+        parents = block_structure.get_parents(block_key)
+        if parents:
+            reachable_mask = 0
+            for parent_key in parents:
+                reachable_mask |= reachable_masks[parent_key] & ~removed_masks.get(parent_key, 0)
+        else:
+            reachable_mask = all_usage_infos
+        reachable_masks[block_key] = reachable_mask
 
-def clear_block_cache(cache, root_block_usage_key):
+        # Record the usage_infos for which the block isn't included.
+        excluded_mask = (
+            (all_usage_infos & ~reachable_mask) |
+            removed_masks.get(block_key, 0) |
+            bypassed_masks.get(block_key, 0)
+        )
+        while excluded_mask:
+            lowest_bit = excluded_mask & -excluded_mask
+            excluded_block_keys[lowest_bit.bit_length() - 1].add(block_key)
+            excluded_mask ^= lowest_bit
+
+    all_block_keys = set(reachable_masks)
+    return [all_block_keys - block_keys for block_keys in excluded_block_keys]
+
+
+def _create_on_cache_miss(cache, modulestore, root_block_usage_key, transformers):
     """
-    Removes the block structure associated with the given root block
-    key.
+    Returns the block structure for the given root block key when it
+    isn't in the cache.
+
+    Only one process at a time collects the block structure and caches
+    it. Meanwhile, other processes serve the stale copy of the block
+    structure, if there is one with data for the requested transformers,
+    or briefly wait for the block structure to be cached. If it isn't
+    cached by then, they collect the block structure themselves after
+    all, rather than holding up the request.
     """
-    BlockStructureFactory.remove_from_cache(root_block_usage_key, cache)
+    lock_token = BlockStructureFactory.acquire_collect_lock(root_block_usage_key, cache, COLLECT_LOCK_TIMEOUT)
+    if lock_token:
+        try:
+            return _create_and_cache(cache, modulestore, root_block_usage_key)
+        finally:
+            BlockStructureFactory.release_collect_lock(root_block_usage_key, cache, lock_token)
+
+    block_structure = BlockStructureFactory.create_from_cache(root_block_usage_key, cache, transformers, stale=True)
+    wait_until = time() + COLLECT_WAIT_TIMEOUT
+    while not block_structure and time() < wait_until:
+        sleep(COLLECT_POLL_INTERVAL)
+        block_structure = BlockStructureFactory.create_from_cache(root_block_usage_key, cache, transformers)
+
+    return block_structure or _create_and_cache(cache, modulestore, root_block_usage_key)
+
+
+def _wait_for_collect_lock(cache, root_block_usage_key):
+    """
+    Acquires the lock on collecting the block structure for the given
+    root block key, waiting for another process holding it to release
+    it. Returns the lock's token.
+
+    The lock expires after COLLECT_LOCK_TIMEOUT, so it can be acquired
+    by then unless yet another process acquires it first. In that case,
+    None is returned and the caller proceeds without the lock.
+    """
+    wait_until = time() + COLLECT_LOCK_TIMEOUT
+    lock_token = BlockStructureFactory.acquire_collect_lock(root_block_usage_key, cache, COLLECT_LOCK_TIMEOUT)
+    while not lock_token and time() < wait_until:
+        sleep(COLLECT_POLL_INTERVAL)
+        lock_token = BlockStructureFactory.acquire_collect_lock(root_block_usage_key, cache, COLLECT_LOCK_TIMEOUT)
+    return lock_token
+
+
+def _create_and_cache(cache, modulestore, root_block_usage_key):
+    """
+    Creates the block structure for the given root block key from the
+    modulestore, collects the data of all registered transformers, and
+    caches it.
+    """
+    # Create the block structure from the modulestore.
+    block_structure = BlockStructureFactory.create_from_modulestore(root_block_usage_key, modulestore)
+
+    # Collect data from each registered transformer.
+    _collect(block_structure, TransformerRegistry.get_registered_transformers())
+
+    # Cache this information.
+    BlockStructureFactory.serialize_to_cache(block_structure, cache)
+    return block_structure
+
+
+def _update_outdated_transformers(block_structure, modulestore, outdated_transformers):
+    """
+    Re-collects the data of the given outdated transformers in the
+    given cached block structure.
+    """
+    modulestore_block_structure = BlockStructureFactory.create_from_modulestore(
+        block_structure.root_block_usage_key, modulestore
+    )
+    _collect(modulestore_block_structure, outdated_transformers)
+    block_structure._update_transformer_data(  # pylint: disable=protected-access
+        modulestore_block_structure, outdated_transformers
+    )
+
+
+def _collect(block_structure, transformers):
+    """
+    Executes the collect phase of the given transformers on the given
+    block structure.
+
+    Arguments:
+        block_structure (BlockStructureModulestoreData) - The block
+            structure created from the modulestore.
+
+        transformers ([BlockStructureTransformer]) - The transformers
+            whose data is to be collected.
+    """
+    # pylint: disable=protected-access
+    for transformer in transformers:
+        block_structure._add_transformer(transformer)
+        transformer.collect(block_structure)
+
+    # Collect all fields that were requested by the transformers, and
+    # the edit info used to find changed blocks in update_block_cache.
+    block_structure.request_xblock_fields(*EDIT_INFO_FIELDS)
+    block_structure._collect_requested_xblock_fields()
@@ -28,6 +28,8 @@ class _BlockRelations(object):
     Data structure to encapsulate relationships for a single block,
     including its children and parents.
     """
+    __slots__ = ('parents', 'children')
+
     def __init__(self):
 
         # List of usage keys of this block's parents.
@@ -207,6 +209,28 @@ class BlockStructure(object):
         # Replace this structure's relations with the newly pruned one.
         self._block_relations = pruned_block_relations
 
+    def _get_subtree_keys(self, root_keys):
+        """
+        Returns the usage keys of the given blocks and all of their
+        descendants in this block structure.
+
+        Arguments:
+            root_keys ([UsageKey]) - Usage keys of the roots of the
+                subtrees.
+
+        Returns:
+            set(UsageKey) - The usage keys of all blocks in the
+                subtrees.
+        """
+        subtree_keys = set()
+        stack = [root_key for root_key in root_keys if self.has_block(root_key)]
+        while stack:
+            usage_key = stack.pop()
+            if usage_key not in subtree_keys:
+                subtree_keys.add(usage_key)
+                stack.extend(self.get_children(usage_key))
+        return subtree_keys
+
     def _add_relation(self, parent_key, child_key):
         """
         Adds a parent to child relationship in this block structure.
@@ -255,6 +279,8 @@ class _BlockData(object):
     """
     Data structure to encapsulate collected data for a single block.
     """
+    __slots__ = ('xblock_fields', 'transformer_data')
+
     def __init__(self):
         # Map of xblock field name to the field's value for this block.
         # dict {string: any picklable type}
@@ -521,6 +547,95 @@ class BlockStructureBlockData(BlockStructure):
             raise TransformerException('VERSION attribute is not set on transformer {0}.', transformer.name())
         self.set_transformer_data(transformer, TRANSFORMER_VERSION_KEY, transformer.VERSION)
 
+    def _update_transformer_data(self, block_structure, transformers):
+        """
+        Replaces the data collected for the given transformers, and
+        the collected xBlock fields, with the data collected in the
+        given block structure. The data collected for other
+        transformers is kept.
+
+        Arguments:
+            block_structure (BlockStructureBlockData) - A block
+                structure with the same blocks as this one, in which
+                the given transformers' data was collected.
+
+            transformers ([BlockStructureTransformer]) - The
+                transformers whose data is to be replaced.
+        """
+        for transformer in transformers:
+            transformer_name = transformer.name()
+            self._transformer_data[transformer_name] = block_structure._transformer_data.get(transformer_name, {})
+
+            for usage_key in self.get_block_keys():
+                block_data = self._block_data_map[usage_key]
+                block_data.transformer_data.pop(transformer_name, None)
+                if usage_key in block_structure._block_data_map:
+                    collected_data = block_structure._block_data_map[usage_key].transformer_data
+                    if transformer_name in collected_data:
+                        block_data.transformer_data[transformer_name] = collected_data[transformer_name]
+
+        for usage_key in self.get_block_keys():
+            if usage_key in block_structure._block_data_map:
+                self._block_data_map[usage_key].xblock_fields.update(
+                    block_structure._block_data_map[usage_key].xblock_fields
+                )
+
+    def _update_subtrees(self, block_structure, subtree_root_keys):
+        """
+        Replaces the given subtrees of this block structure, including
+        their relations and all of their collected data, with the
+        subtrees in the given block structure.
+
+        The given block structure may be partial, containing only the
+        updated subtrees and their ancestors. The collected xBlock
+        fields of the ancestors and the non-block-specific transformer
+        data are also updated from it, while the block-specific
+        transformer data of the ancestors is kept.
+
+        Arguments:
+            block_structure (BlockStructureBlockData) - A block
+                structure in which data was collected for all of the
+                registered transformers.
+
+            subtree_root_keys (set(UsageKey)) - Usage keys of the roots
+                of the subtrees that are to be replaced.
+        """
+        new_subtree_keys = block_structure._get_subtree_keys(subtree_root_keys)
+
+        # Detach the blocks in the old subtrees from their children.
+        for usage_key in self._get_subtree_keys(subtree_root_keys) | new_subtree_keys:
+            if self.has_block(usage_key):
+                for child_key in self._block_relations[usage_key].children:
+                    self._block_relations[child_key].parents.remove(usage_key)
+                self._block_relations[usage_key].children = []
+
+        # Attach the new subtrees to their parents in this structure.
+        for root_key in subtree_root_keys:
+            for parent_key in block_structure.get_parents(root_key):
+                if self.has_block(parent_key) and root_key not in self.get_children(parent_key):
+                    self._add_relation(parent_key, root_key)
+
+        # Add the blocks in the new subtrees.
+        for usage_key in new_subtree_keys:
+            for child_key in block_structure.get_children(usage_key):
+                self._add_relation(usage_key, child_key)
+            self._block_data_map[usage_key] = block_structure._block_data_map[usage_key]
+
+        # Update the xBlock fields of the other blocks.
+        for usage_key in block_structure.get_block_keys():
+            if usage_key not in new_subtree_keys and self.has_block(usage_key):
+                self._block_data_map[usage_key].xblock_fields.update(
+                    block_structure._block_data_map[usage_key].xblock_fields
+                )
+
+        self._transformer_data.update(block_structure._transformer_data)
+
+        # Remove any blocks that were only in the old subtrees.
+        self._prune_unreachable()
+        for usage_key in self._block_data_map.keys():
+            if not self.has_block(usage_key):
+                del self._block_data_map[usage_key]
+
 
 class BlockStructureModulestoreData(BlockStructureBlockData):
     """
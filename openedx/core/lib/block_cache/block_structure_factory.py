@@ -3,15 +3,27 @@ Module for factory class for BlockStructure objects.
 """
 # pylint: disable=protected-access
 from logging import getLogger
+from uuid import uuid4
 
 from openedx.core.lib.cache_utils import zpickle, zunpickle
 
-from .block_structure import BlockStructureBlockData, BlockStructureModulestoreData
+from .block_structure import BlockStructureModulestoreData
+from .compact_block_structure import decode_block_structure, encode_block_structure
 
 
 logger = getLogger(__name__)  # pylint: disable=C0103
 
 
+# The xBlock edit info fields that are collected for every block, and
+# used to find the blocks that changed since their data was collected.
+EDIT_INFO_FIELDS = ('edited_on', 'subtree_edited_on')
+
+# The version of the format in which block structures are stored in the
+# cache. It is part of their cache keys, so that data stored in another
+# format is never read.
+CACHE_FORMAT_VERSION = 2
+
+
 class BlockStructureFactory(object):
     """
     Factory class for BlockStructure objects.
@@ -64,15 +76,148 @@ class BlockStructureFactory(object):
         build_block_structure(root_xblock)
         return block_structure
 
+    @classmethod
+    def create_from_modulestore_changes(cls, block_structure, modulestore):
+        """
+        Creates and returns a partial block structure from the
+        modulestore containing the subtrees of the given block structure
+        whose blocks have changed in the modulestore since their data
+        was collected.
+
+        Changes are found by comparing the collected values of the
+        EDIT_INFO_FIELDS xBlock fields with the current ones, starting
+        at the root block and only descending into blocks whose subtree
+        was edited. A block whose own content, settings, or children
+        were edited is the root of a changed subtree.
+
+        The returned block structure contains the changed subtrees,
+        their ancestors, and the relations between them. Blocks with
+        several parents are related to all of them, and all of their
+        ancestor chains are added, since the modulestore may only mark
+        the subtree of one of the parents as edited. The xBlocks of the
+        ancestors' other children are also added (without any
+        relations), since transformers may access them when collecting
+        their parents' data.
+
+        Arguments:
+            block_structure (BlockStructureBlockData) - A block
+                structure, in which EDIT_INFO_FIELDS were collected.
+
+            modulestore (ModuleStoreRead) - The modulestore that
+                contains the current data for the xBlocks within the
+                block structure.
+
+        Returns:
+            (BlockStructureModulestoreData, set(UsageKey)) - The
+                partial block structure, and the usage keys of the
+                roots of the changed subtrees.
+
+            NoneType - If the root block itself was changed, or if the
+                changes can't be determined because the edit info isn't
+                available. The whole block structure needs to be
+                recreated in this case.
+        """
+        root_block_usage_key = block_structure.root_block_usage_key
+        root_xblock = modulestore.get_item(root_block_usage_key, depth=0)
+        if cls._is_changed(block_structure, root_xblock, 'edited_on'):
+            return None
+
+        partial_block_structure = BlockStructureModulestoreData(root_block_usage_key)
+        changed_root_keys = set()
+
+        # Map of the usage keys of the blocks that were visited to
+        # whether their descendants were added.
+        blocks_visited = {}
+
+        def add_subtree(xblock):
+            """
+            Recursively adds the given xBlock and all its descendants.
+            """
+            if blocks_visited.get(xblock.location):
+                return
+            blocks_visited[xblock.location] = True
+            partial_block_structure._add_xblock(xblock.location, xblock)
+
+            for child in xblock.get_children():
+                partial_block_structure._add_relation(xblock.location, child.location)
+                add_subtree(child)
+
+        def add_changed_descendants(xblock):
+            """
+            Recursively adds the given unchanged xBlock and the changed
+            subtrees within it.
+            """
+            if blocks_visited.get(xblock.location):
+                return
+            blocks_visited[xblock.location] = True
+            partial_block_structure._add_xblock(xblock.location, xblock)
+
+            for child in xblock.get_children():
+                if not block_structure.has_block(child.location) or cls._is_changed(
+                        block_structure, child, 'edited_on'
+                ):
+                    changed_root_keys.add(child.location)
+                    partial_block_structure._add_relation(xblock.location, child.location)
+                    add_subtree(child)
+                elif cls._is_changed(block_structure, child, 'subtree_edited_on'):
+                    partial_block_structure._add_relation(xblock.location, child.location)
+                    add_changed_descendants(child)
+                elif child.location not in blocks_visited:
+                    blocks_visited[child.location] = False
+                    partial_block_structure._add_xblock(child.location, child)
+
+        def add_other_parents(usage_key):
+            """
+            Recursively adds the parents of the given block that aren't
+            related to it yet, and their ancestors.
+            """
+            for parent_key in block_structure.get_parents(usage_key):
+                if parent_key in partial_block_structure.get_parents(usage_key):
+                    continue
+                if parent_key in blocks_visited:
+                    parent_xblock = partial_block_structure.get_xblock(parent_key)
+                elif modulestore.has_item(parent_key):
+                    parent_xblock = modulestore.get_item(parent_key, depth=0)
+                    blocks_visited[parent_key] = False
+                    partial_block_structure._add_xblock(parent_key, parent_xblock)
+                else:
+                    continue
+                # The cached relation may be outdated.
+                if usage_key not in parent_xblock.children:
+                    continue
+                is_new_parent = not partial_block_structure.has_block(parent_key)
+                partial_block_structure._add_relation(parent_key, usage_key)
+                if is_new_parent:
+                    add_other_parents(parent_key)
+
+        if cls._is_changed(block_structure, root_xblock, 'subtree_edited_on'):
+            add_changed_descendants(root_xblock)
+            for usage_key, descendants_added in blocks_visited.items():
+                if descendants_added:
+                    add_other_parents(usage_key)
+        return partial_block_structure, changed_root_keys
+
+    @classmethod
+    def _is_changed(cls, block_structure, xblock, field_name):
+        """
+        Returns whether the value of the given edit info field of the
+        given xBlock differs from the value collected in the given
+        block structure. Unknown values are treated as changed.
+        """
+        collected_value = block_structure.get_xblock_field(xblock.location, field_name)
+        current_value = getattr(xblock, field_name, None)
+        return collected_value is None or current_value is None or collected_value != current_value
+
     @classmethod
     def serialize_to_cache(cls, block_structure, cache):
         """
         Store a compressed and pickled serialization of the given
         block structure into the given cache.
 
-        The key in the cache is 'root.key.<root_block_usage_key>'.
+        The key in the cache is 'root.key.v<CACHE_FORMAT_VERSION>.<root_block_usage_key>'.
         The data stored in the cache includes the structure's
-        block relations, transformer data, and block data.
+        block relations, transformer data, and block data, in the
+        representation of compact_block_structure.
 
         Arguments:
             block_structure (BlockStructure) - The block structure
@@ -82,12 +227,7 @@ class BlockStructureFactory(object):
                 cache into which cacheable data of the block structure
                 is to be serialized.
         """
-        data_to_cache = (
-            block_structure._block_relations,
-            block_structure._transformer_data,
-            block_structure._block_data_map
-        )
-        zp_data_to_cache = zpickle(data_to_cache)
+        zp_data_to_cache = zpickle(encode_block_structure(block_structure))
         cache.set(
             cls._encode_root_cache_key(block_structure.root_block_usage_key),
             zp_data_to_cache
@@ -99,7 +239,7 @@ class BlockStructureFactory(object):
         )
 
     @classmethod
-    def create_from_cache(cls, root_block_usage_key, cache, transformers):
+    def create_from_cache(cls, root_block_usage_key, cache, transformers=None, stale=False):
         """
         Deserializes and returns the block structure starting at
         root_block_usage_key from the given cache, if it's found in the cache.
@@ -118,7 +258,12 @@ class BlockStructureFactory(object):
 
             transformers ([BlockStructureTransformer]) - A list of
                 transformers for which the block structure will be
-                transformed.
+                transformed. If None, the versions of the cached data
+                are not verified.
+
+            stale (bool) - Whether to deserialize the stale copy of the
+                block structure kept by remove_from_cache, instead of
+                the current one.
 
         Returns:
             BlockStructure - The deserialized block structure starting
@@ -130,45 +275,67 @@ class BlockStructureFactory(object):
         """
 
         # Find root_block_usage_key in the cache.
-        zp_data_from_cache = cache.get(cls._encode_root_cache_key(root_block_usage_key))
+        cache_key = (
+            cls._encode_stale_cache_key(root_block_usage_key) if stale
+            else cls._encode_root_cache_key(root_block_usage_key)
+        )
+        zp_data_from_cache = cache.get(cache_key)
         if not zp_data_from_cache:
             logger.debug(
-                "BlockStructure %r not found in the cache.",
+                "BlockStructure %r not found in the cache (stale: %s).",
                 root_block_usage_key,
+                stale,
             )
             return None
         else:
             logger.debug(
-                "Read BlockStructure %r from cache, size: %s",
+                "Read BlockStructure %r from cache (stale: %s), size: %s",
                 root_block_usage_key,
+                stale,
                 len(zp_data_from_cache),
             )
 
         # Deserialize and construct the block structure.
-        block_relations, transformer_data, block_data_map = zunpickle(zp_data_from_cache)
-        block_structure = BlockStructureBlockData(root_block_usage_key)
-        block_structure._block_relations = block_relations
-        block_structure._transformer_data = transformer_data
-        block_structure._block_data_map = block_data_map
+        block_structure = decode_block_structure(root_block_usage_key, zunpickle(zp_data_from_cache))
 
         # Verify that the cached data for all the given transformers are
         # for their latest versions.
+        if transformers is not None and cls.get_outdated_transformers(block_structure, transformers):
+            return None
+
+        return block_structure
+
+    @classmethod
+    def get_outdated_transformers(cls, block_structure, transformers):
+        """
+        Returns the transformers whose data collected in the given
+        block structure is not for their current version (including
+        transformers whose data was never collected).
+
+        Arguments:
+            block_structure (BlockStructureBlockData) - The block
+                structure whose collected data is to be verified.
+
+            transformers ([BlockStructureTransformer]) - The
+                transformers to verify.
+
+        Returns:
+            [BlockStructureTransformer] - The outdated transformers.
+        """
         outdated_transformers = {}
         for transformer in transformers:
             cached_transformer_version = block_structure._get_transformer_data_version(transformer)
             if transformer.VERSION != cached_transformer_version:
-                outdated_transformers[transformer.name()] = "version: {}, cached: {}".format(
+                outdated_transformers[transformer] = "version: {}, cached: {}".format(
                     transformer.VERSION,
                     cached_transformer_version,
                 )
         if outdated_transformers:
             logger.info(
                 "Collected data for the following transformers are outdated:\n%s.",
-                '\n'.join([t_name + ": " + t_value for t_name, t_value in outdated_transformers.iteritems()]),
+                '\n'.join([t.name() + ": " + t_value for t, t_value in outdated_transformers.iteritems()]),
             )
-            return None
-
-        return block_structure
+        return outdated_transformers.keys()
 
     @classmethod
     def remove_from_cache(cls, root_block_usage_key, cache):
@@ -176,6 +343,10 @@ class BlockStructureFactory(object):
         Removes the block structure for the given root_block_usage_key
         from the given cache.
 
+        A stale copy of the removed block structure is kept in the
+        cache, so that it can still be served while the block structure
+        is being re-created (see create_from_cache).
+
         Arguments:
             root_block_usage_key (UsageKey) - The usage_key for the root
                 of the block structure that is to be removed from
@@ -185,13 +356,74 @@ class BlockStructureFactory(object):
                 cache from which the block structure is to be
                 removed.
         """
-        cache.delete(cls._encode_root_cache_key(root_block_usage_key))
+        root_cache_key = cls._encode_root_cache_key(root_block_usage_key)
+        zp_data_from_cache = cache.get(root_cache_key)
+        if zp_data_from_cache:
+            cache.set(cls._encode_stale_cache_key(root_block_usage_key), zp_data_from_cache)
+        cache.delete(root_cache_key)
         # TODO also remove all block data?
 
+    @classmethod
+    def acquire_collect_lock(cls, root_block_usage_key, cache, timeout):
+        """
+        Atomically acquires the lock for collecting the block structure
+        for the given root_block_usage_key, so that only one process
+        re-creates the block structure at a time.
+
+        Arguments:
+            root_block_usage_key (UsageKey) - The usage_key for the root
+                of the block structure that is to be collected.
+
+            cache (django.core.cache.backends.base.BaseCache) - The
+                cache in which the lock is stored.
+
+            timeout (int) - The number of seconds after which the lock
+                expires, in case its holder never releases it.
+
+        Returns:
+            unicode - A token identifying this holder of the lock, to
+                pass to release_collect_lock, if the lock was acquired.
+
+            NoneType - If the lock is held by another process.
+        """
+        token = unicode(uuid4())
+        if cache.add(cls._encode_lock_cache_key(root_block_usage_key), token, timeout):
+            return token
+        return None
+
+    @classmethod
+    def release_collect_lock(cls, root_block_usage_key, cache, token):
+        """
+        Releases the lock acquired with acquire_collect_lock, given the
+        token it returned.
+
+        If the lock expired meanwhile and was acquired by another
+        process, the lock is left to that process.
+        """
+        lock_cache_key = cls._encode_lock_cache_key(root_block_usage_key)
+        if cache.get(lock_cache_key) == token:
+            cache.delete(lock_cache_key)
+
     @classmethod
     def _encode_root_cache_key(cls, root_block_usage_key):
         """
         Returns the cache key to use for storing the block structure
         for the given root_block_usage_key.
         """
-        return "root.key." + unicode(root_block_usage_key)
+        return u"root.key.v{}.".format(CACHE_FORMAT_VERSION) + unicode(root_block_usage_key)
+
+    @classmethod
+    def _encode_stale_cache_key(cls, root_block_usage_key):
+        """
+        Returns the cache key to use for storing the stale copy of the
+        block structure for the given root_block_usage_key.
+        """
+        return u"root.stale.v{}.".format(CACHE_FORMAT_VERSION) + unicode(root_block_usage_key)
+
+    @classmethod
+    def _encode_lock_cache_key(cls, root_block_usage_key):
+        """
+        Returns the cache key to use for the lock on collecting the
+        block structure for the given root_block_usage_key.
+        """
+        return "root.lock." + unicode(root_block_usage_key)
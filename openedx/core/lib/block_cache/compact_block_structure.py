@@ -0,0 +1,127 @@
+"""
+A compact representation of block structures, in which they are stored
+in the cache.
+
+Pickling a BlockStructureBlockData directly pickles a _BlockRelations
+and a _BlockData object for every block, each with its own lists and
+dicts, and every usage key each time it is referenced. Instead, this
+representation:
+
+* interns the usage keys of the blocks into a list, so that each block
+  is referred to by its integer index;
+* stores the children of all blocks as flat arrays of indices, with the
+  offset of each block's children (the parents are derived from them);
+* stores the collected xBlock fields and block-specific transformer
+  data column-wise, as an array of the indices of the blocks that have
+  a value for the field, along with a list of the values.
+
+Only the blocks that are reachable from the root block are included.
+"""
+from array import array
+from collections import defaultdict
+from itertools import izip
+
+from .block_structure import BlockStructureBlockData
+
+
+def encode_block_structure(block_structure):
+    """
+    Returns a picklable, compact representation of the given block
+    structure.
+
+    Arguments:
+        block_structure (BlockStructureBlockData) - The block structure
+            to encode.
+
+    Returns:
+        tuple - The representation, to be passed to
+            decode_block_structure.
+    """
+    # pylint: disable=protected-access
+    usage_keys = list(block_structure.post_order_traversal())
+    usage_keys.reverse()
+    block_indices = {usage_key: index for index, usage_key in enumerate(usage_keys)}
+
+    child_offsets = array('l', [0])
+    child_indices = array('l')
+    xblock_field_columns = defaultdict(lambda: (array('l'), []))
+    transformer_block_columns = defaultdict(lambda: defaultdict(lambda: (array('l'), [])))
+
+    for index, usage_key in enumerate(usage_keys):
+        child_indices.extend(block_indices[child_key] for child_key in block_structure.get_children(usage_key))
+        child_offsets.append(len(child_indices))
+
+        block_data = block_structure._block_data_map.get(usage_key)
+        if block_data is None:
+            continue
+        for field_name, value in block_data.xblock_fields.iteritems():
+            indices, values = xblock_field_columns[field_name]
+            indices.append(index)
+            values.append(value)
+        for transformer_name, transformer_data in block_data.transformer_data.iteritems():
+            transformer_columns = transformer_block_columns[transformer_name]
+            for key, value in transformer_data.iteritems():
+                indices, values = transformer_columns[key]
+                indices.append(index)
+                values.append(value)
+
+    return (
+        usage_keys,
+        child_offsets,
+        child_indices,
+        dict(xblock_field_columns),
+        {transformer_name: dict(columns) for transformer_name, columns in transformer_block_columns.iteritems()},
+        dict(block_structure._transformer_data),
+    )
+
+
+def decode_block_structure(root_block_usage_key, encoded_block_structure):
+    """
+    Returns the block structure represented by the output of
+    encode_block_structure.
+
+    Arguments:
+        root_block_usage_key (UsageKey) - The usage key of the root
+            block of the block structure.
+
+        encoded_block_structure (tuple) - The output of
+            encode_block_structure.
+
+    Returns:
+        BlockStructureBlockData - The decoded block structure.
+    """
+    # pylint: disable=protected-access
+    (
+        usage_keys,
+        child_offsets,
+        child_indices,
+        xblock_field_columns,
+        transformer_block_columns,
+        transformer_data,
+    ) = encoded_block_structure
+
+    block_structure = BlockStructureBlockData(root_block_usage_key)
+    block_relations = block_structure._block_relations
+    relations = []
+    for usage_key in usage_keys:
+        block_structure._add_block(block_relations, usage_key)
+        relations.append(block_relations[usage_key])
+
+    for index, usage_key in enumerate(usage_keys):
+        children = child_indices[child_offsets[index]:child_offsets[index + 1]]
+        relations[index].children = [usage_keys[child_index] for child_index in children]
+        for child_index in children:
+            relations[child_index].parents.append(usage_key)
+
+    block_data_map = block_structure._block_data_map
+    for field_name, (indices, values) in xblock_field_columns.iteritems():
+        for index, value in izip(indices, values):
+            block_data_map[usage_keys[index]].xblock_fields[field_name] = value
+
+    for transformer_name, columns in transformer_block_columns.iteritems():
+        for key, (indices, values) in columns.iteritems():
+            for index, value in izip(indices, values):
+                block_data_map[usage_keys[index]].transformer_data[transformer_name][key] = value
+
+    block_structure._transformer_data.update(transformer_data)
+    return block_structure
@@ -2,14 +2,16 @@
 Tests for block_cache.py
 """
 
+import ddt
 from django.core.cache import get_cache
 from mock import patch
 from unittest import TestCase
 
-from ..block_cache import get_blocks
+from ..block_cache import clear_block_cache, get_blocks, get_blocks_for_many, update_block_cache
+from ..block_structure_factory import BlockStructureFactory
 from ..exceptions import TransformerException
 from .test_utils import (
-    MockModulestoreFactory, MockCache, MockTransformer, ChildrenMapTestMixin
+    MockModulestoreFactory, MockCache, MockTransformer, MockXBlock, ChildrenMapTestMixin
 )
 
 
@@ -111,3 +113,342 @@ class TestBlockCache(TestCase, ChildrenMapTestMixin):
                 self.assertGreater(self.modulestore.get_items_call_count, 0)
             else:
                 self.assertEquals(self.modulestore.get_items_call_count, 0)
+
+    def test_outdated_transformer_recollected(self, mock_available_transforms):
+
+        class TestTransformer2(self.TestTransformer1):
+            """
+            Test Transformer class with its own collected data.
+            """
+            collect_call_count = 0
+
+            @classmethod
+            def collect(cls, block_structure):
+                cls.collect_call_count += 1
+                for block_key in block_structure.topological_traversal():
+                    block_structure.set_transformer_block_field(
+                        block_key, cls, cls.block_key(), cls.block_val(block_key)
+                    )
+
+        transformer_2 = TestTransformer2()
+        self.transformers.append(transformer_2)
+        mock_available_transforms.return_value = {transformer.name(): transformer for transformer in self.transformers}
+
+        get_blocks(self.mock_cache, self.modulestore, self.usage_info, 0, self.transformers)
+        self.assertEquals(TestTransformer2.collect_call_count, 1)
+
+        with patch.object(TestTransformer2, 'VERSION', 2):
+            with patch.object(self.TestTransformer1, 'collect') as mock_collect_1:
+                block_structure = get_blocks(self.mock_cache, self.modulestore, self.usage_info, 0, self.transformers)
+                self.assertFalse(mock_collect_1.called)
+            self.assertEquals(TestTransformer2.collect_call_count, 2)
+            self.assert_block_structure(block_structure, self.children_map)
+
+            # The recollected data is cached.
+            self.modulestore.get_items_call_count = 0
+            get_blocks(self.mock_cache, self.modulestore, self.usage_info, 0, self.transformers)
+            self.assertEquals(self.modulestore.get_items_call_count, 0)
+            self.assertEquals(TestTransformer2.collect_call_count, 2)
+
+
+@ddt.ddt
+@patch('openedx.core.lib.block_cache.transformer_registry.TransformerRegistry.get_available_plugins')
+class TestGetBlocksForMany(TestCase, ChildrenMapTestMixin):
+    """
+    Test class for getting blocks for many usage_infos at once.
+    """
+
+    class RemovingTransformer(MockTransformer):
+        """
+        Test Transformer class that removes the block whose key is the
+        usage_info, and its descendants.
+        """
+        SUPPORTS_BATCH_TRANSFORM = True
+
+        def transform(self, usage_info, block_structure):
+            block_structure.remove_block_if(lambda block_key: block_key == usage_info)
+
+        def get_removal_masks(self, usage_infos, block_structure):
+            masks = {}
+            for index, usage_info in enumerate(usage_infos):
+                masks[usage_info] = masks.get(usage_info, 0) | (1 << index)
+            return [(False, masks)]
+
+    class BypassingTransformer(MockTransformer):
+        """
+        Test Transformer class that removes block 1 but keeps its
+        descendants, for even usage_infos.
+        """
+        SUPPORTS_BATCH_TRANSFORM = True
+
+        def transform(self, usage_info, block_structure):
+            if usage_info % 2 == 0:
+                block_structure.remove_block_if(lambda block_key: block_key == 1, keep_descendants=True)
+
+        def get_removal_masks(self, usage_infos, block_structure):
+            mask = sum(1 << index for index, usage_info in enumerate(usage_infos) if usage_info % 2 == 0)
+            return [(True, {1: mask})]
+
+    def setUp(self):
+        super(TestGetBlocksForMany, self).setUp()
+        self.mock_cache = MockCache()
+        self.transformers = [self.BypassingTransformer(), self.RemovingTransformer()]
+
+    @ddt.data(
+        ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP,
+        ChildrenMapTestMixin.LINEAR_CHILDREN_MAP,
+        ChildrenMapTestMixin.DAG_CHILDREN_MAP,
+    )
+    def test_batch_matches_transform(self, children_map, mock_available_transforms):
+        mock_available_transforms.return_value = {transformer.name(): transformer for transformer in self.transformers}
+        modulestore = MockModulestoreFactory.create(children_map)
+        usage_infos = range(len(children_map) + 1)
+
+        expected_block_keys = [
+            set(get_blocks(self.mock_cache, modulestore, usage_info, 0, self.transformers).get_block_keys())
+            for usage_info in usage_infos
+        ]
+        self.assertEquals(
+            get_blocks_for_many(self.mock_cache, modulestore, usage_infos, 0, self.transformers),
+            expected_block_keys,
+        )
+        with patch.object(self.RemovingTransformer, 'SUPPORTS_BATCH_TRANSFORM', False):
+            self.assertEquals(
+                get_blocks_for_many(self.mock_cache, modulestore, usage_infos, 0, self.transformers),
+                expected_block_keys,
+            )
+
+
+@patch('openedx.core.lib.block_cache.transformer_registry.TransformerRegistry.get_available_plugins')
+class TestBlockCacheStampede(TestCase, ChildrenMapTestMixin):
+    """
+    Test class for the block cache's handling of concurrent cache misses.
+    """
+    def setUp(self):
+        super(TestBlockCacheStampede, self).setUp()
+        self.children_map = self.SIMPLE_CHILDREN_MAP
+        self.mock_cache = MockCache()
+        self.modulestore = MockModulestoreFactory.create(self.children_map)
+        self.transformers = [TestBlockCache.TestTransformer1()]
+
+    def get_blocks(self, mock_available_transforms):
+        """
+        Returns the block structure from get_blocks, and whether it
+        accessed the modulestore.
+        """
+        mock_available_transforms.return_value = {transformer.name(): transformer for transformer in self.transformers}
+        self.modulestore.get_items_call_count = 0
+        block_structure = get_blocks(self.mock_cache, self.modulestore, None, 0, self.transformers)
+        self.assert_block_structure(block_structure, self.children_map)
+        return block_structure, self.modulestore.get_items_call_count > 0
+
+    def test_lock_released(self, mock_available_transforms):
+        self.assertTrue(self.get_blocks(mock_available_transforms)[1])
+        self.assertTrue(BlockStructureFactory.acquire_collect_lock(0, self.mock_cache, timeout=1))
+
+    def test_release_expired_lock(self, mock_available_transforms):  # pylint: disable=unused-argument
+        expired_token = BlockStructureFactory.acquire_collect_lock(0, self.mock_cache, timeout=1)
+        self.mock_cache.map.clear()
+
+        # The lock expired and another process acquired it, so releasing
+        # the expired lock leaves it to that process.
+        token = BlockStructureFactory.acquire_collect_lock(0, self.mock_cache, timeout=1)
+        self.assertNotEquals(token, expired_token)
+        BlockStructureFactory.release_collect_lock(0, self.mock_cache, expired_token)
+        self.assertIsNone(BlockStructureFactory.acquire_collect_lock(0, self.mock_cache, timeout=1))
+
+        BlockStructureFactory.release_collect_lock(0, self.mock_cache, token)
+        self.assertTrue(BlockStructureFactory.acquire_collect_lock(0, self.mock_cache, timeout=1))
+
+    def test_serve_stale_while_locked(self, mock_available_transforms):
+        self.get_blocks(mock_available_transforms)
+        clear_block_cache(self.mock_cache, 0)
+        BlockStructureFactory.acquire_collect_lock(0, self.mock_cache, timeout=1)
+
+        self.assertFalse(self.get_blocks(mock_available_transforms)[1])
+        self.assertIsNone(BlockStructureFactory.create_from_cache(0, self.mock_cache))
+
+    @patch('openedx.core.lib.block_cache.block_cache.sleep')
+    def test_wait_while_locked(self, mock_sleep, mock_available_transforms):
+        self.get_blocks(mock_available_transforms)
+        cached_block_structure = BlockStructureFactory.create_from_cache(0, self.mock_cache)
+        self.mock_cache.map.clear()
+        BlockStructureFactory.acquire_collect_lock(0, self.mock_cache, timeout=1)
+
+        # The block structure is cached by another process while waiting.
+        mock_sleep.side_effect = lambda interval: BlockStructureFactory.serialize_to_cache(
+            cached_block_structure, self.mock_cache
+        )
+        self.assertFalse(self.get_blocks(mock_available_transforms)[1])
+        self.assertEquals(mock_sleep.call_count, 1)
+
+    @patch('openedx.core.lib.block_cache.block_cache.COLLECT_WAIT_TIMEOUT', 0)
+    def test_collect_after_wait_timeout(self, mock_available_transforms):
+        BlockStructureFactory.acquire_collect_lock(0, self.mock_cache, timeout=1)
+        self.assertTrue(self.get_blocks(mock_available_transforms)[1])
+        self.assertIsNotNone(BlockStructureFactory.create_from_cache(0, self.mock_cache))
+
+
+@patch('openedx.core.lib.block_cache.transformer_registry.TransformerRegistry.get_available_plugins')
+class TestUpdateBlockCache(TestCase, ChildrenMapTestMixin):
+    """
+    Test class for updating cached block structures.
+    """
+
+    class TestTransformer(MockTransformer):
+        """
+        Test Transformer class that records the blocks it collects.
+        """
+        SUPPORTS_SUBTREE_UPDATES = True
+        collected_blocks = set()
+
+        @classmethod
+        def collect(cls, block_structure):
+            """
+            Sets transformer block data for each block in the structure.
+            """
+            for block_key in block_structure.topological_traversal():
+                cls.collected_blocks.add(block_key)
+                block_structure.set_transformer_block_field(
+                    block_key, cls, 'display_name', block_structure.get_xblock(block_key).display_name
+                )
+
+    def setUp(self):
+        super(TestUpdateBlockCache, self).setUp()
+        self.children_map = self.SIMPLE_CHILDREN_MAP
+        self.mock_cache = MockCache()
+        self.modulestore = MockModulestoreFactory.create(self.children_map)
+        self.transformers = [self.TestTransformer()]
+        for xblock in self.modulestore.blocks.itervalues():
+            xblock.field_map.update(edited_on=1, subtree_edited_on=1, display_name='original')
+
+    def get_cached_block_structure(self):
+        """
+        Returns the block structure currently in the cache.
+        """
+        return BlockStructureFactory.create_from_cache(0, self.mock_cache, self.transformers)
+
+    def populate_cache(self, mock_available_transforms):
+        """
+        Populates the cache with the block structure, and resets the
+        blocks recorded by the test transformer.
+        """
+        mock_available_transforms.return_value = {transformer.name(): transformer for transformer in self.transformers}
+        get_blocks(self.mock_cache, self.modulestore, None, 0, self.transformers)
+        self.TestTransformer.collected_blocks = set()
+
+    def edit_block(self, block_key, **fields):
+        """
+        Updates the given block and the subtree edit info of its
+        ancestors, as the modulestore would.
+        """
+        xblock = self.modulestore.blocks[block_key]
+        xblock.field_map.update(fields, edited_on=2, subtree_edited_on=2)
+        parents_map = self.get_parents_map(self.children_map)
+        ancestors = list(parents_map[block_key])
+        while ancestors:
+            ancestor = ancestors.pop()
+            self.modulestore.blocks[ancestor].field_map['subtree_edited_on'] = 2
+            ancestors.extend(parents_map[ancestor])
+
+    def test_update_changed_subtree(self, mock_available_transforms):
+        self.populate_cache(mock_available_transforms)
+
+        # Replace block 3 with a new block 5 under block 1.
+        self.modulestore.blocks[5] = MockXBlock(
+            5, field_map={'display_name': 'new', 'edited_on': 2, 'subtree_edited_on': 2}, modulestore=self.modulestore
+        )
+        self.modulestore.blocks[1].children = [4, 5]
+        self.edit_block(1, display_name='edited')
+        self.children_map = [[1, 2], [4, 5], [], [], [], []]
+
+        update_block_cache(self.mock_cache, self.modulestore, 0)
+
+        # Only the changed subtree and its ancestors were collected.
+        self.assertEquals(self.TestTransformer.collected_blocks, {0, 1, 4, 5})
+        block_structure = self.get_cached_block_structure()
+        self.assert_block_structure(block_structure, self.children_map, missing_blocks=[3])
+        for block_key, display_name in ((1, 'edited'), (2, 'original'), (4, 'original'), (5, 'new')):
+            self.assertEquals(
+                block_structure.get_transformer_block_field(block_key, self.TestTransformer, 'display_name'),
+                display_name,
+            )
+        self.assertEquals(block_structure.get_xblock_field(0, 'subtree_edited_on'), 2)
+        self.assertEquals(block_structure.get_xblock_field(2, 'edited_on'), 1)
+
+    def test_update_block_with_several_parents(self, mock_available_transforms):
+        self.children_map = self.DAG_CHILDREN_MAP
+        self.modulestore = MockModulestoreFactory.create(self.children_map)
+        for xblock in self.modulestore.blocks.itervalues():
+            xblock.field_map.update(edited_on=1, subtree_edited_on=1, display_name='original')
+        self.populate_cache(mock_available_transforms)
+
+        # Edit block 3, but only mark the subtrees of its ancestors
+        # through block 1 as edited.
+        self.modulestore.blocks[3].field_map.update(display_name='edited', edited_on=2, subtree_edited_on=2)
+        for ancestor in (0, 1):
+            self.modulestore.blocks[ancestor].field_map['subtree_edited_on'] = 2
+
+        update_block_cache(self.mock_cache, self.modulestore, 0)
+
+        # Block 3 was collected with both of its parents.
+        self.assertEquals(self.TestTransformer.collected_blocks, {0, 1, 2, 3, 5, 6})
+        block_structure = self.get_cached_block_structure()
+        self.assert_block_structure(block_structure, self.children_map)
+        self.assertEquals(
+            block_structure.get_transformer_block_field(3, self.TestTransformer, 'display_name'), 'edited'
+        )
+
+    @patch('openedx.core.lib.block_cache.block_cache.sleep')
+    def test_update_waits_for_lock(self, mock_sleep, mock_available_transforms):
+        self.populate_cache(mock_available_transforms)
+        self.edit_block(3, display_name='edited')
+        lock_token = BlockStructureFactory.acquire_collect_lock(0, self.mock_cache, timeout=1)
+
+        # The other process releases the lock while waiting.
+        mock_sleep.side_effect = lambda interval: BlockStructureFactory.release_collect_lock(
+            0, self.mock_cache, lock_token
+        )
+        update_block_cache(self.mock_cache, self.modulestore, 0)
+        self.assertEquals(mock_sleep.call_count, 1)
+        self.assertEquals(
+            self.get_cached_block_structure().get_transformer_block_field(3, self.TestTransformer, 'display_name'),
+            'edited',
+        )
+        self.assertTrue(BlockStructureFactory.acquire_collect_lock(0, self.mock_cache, timeout=1))
+
+    def test_update_nothing_changed(self, mock_available_transforms):
+        self.populate_cache(mock_available_transforms)
+        update_block_cache(self.mock_cache, self.modulestore, 0)
+        self.assertEquals(self.TestTransformer.collected_blocks, set())
+        self.assert_block_structure(self.get_cached_block_structure(), self.children_map)
+
+    def test_root_changed(self, mock_available_transforms):
+        self.populate_cache(mock_available_transforms)
+        self.edit_block(0)
+        update_block_cache(self.mock_cache, self.modulestore, 0)
+        self.assertIsNone(self.get_cached_block_structure())
+
+    def test_subtree_updates_unsupported(self, mock_available_transforms):
+        self.populate_cache(mock_available_transforms)
+        self.edit_block(3)
+        with patch.object(self.TestTransformer, 'SUPPORTS_SUBTREE_UPDATES', False):
+            update_block_cache(self.mock_cache, self.modulestore, 0)
+        self.assertIsNone(self.get_cached_block_structure())
+
+    def test_root_changed_recollect(self, mock_available_transforms):
+        self.populate_cache(mock_available_transforms)
+        self.edit_block(0, display_name='edited')
+        update_block_cache(self.mock_cache, self.modulestore, 0, recollect=True)
+        self.assertEquals(self.TestTransformer.collected_blocks, set(range(len(self.children_map))))
+        self.assertEquals(
+            self.get_cached_block_structure().get_transformer_block_field(0, self.TestTransformer, 'display_name'),
+            'edited',
+        )
+
+    def test_recollect_not_cached(self, mock_available_transforms):
+        mock_available_transforms.return_value = {transformer.name(): transformer for transformer in self.transformers}
+        update_block_cache(self.mock_cache, self.modulestore, 0)
+        self.assertIsNone(self.get_cached_block_structure())
+        update_block_cache(self.mock_cache, self.modulestore, 0, recollect=True)
+        self.assert_block_structure(self.get_cached_block_structure(), self.children_map)
@@ -0,0 +1,66 @@
+"""
+Tests for compact_block_structure.py
+"""
+# pylint: disable=protected-access
+import cPickle as pickle
+import ddt
+from unittest import TestCase
+
+from ..block_structure import BlockStructureBlockData
+from ..compact_block_structure import decode_block_structure, encode_block_structure
+from .test_utils import MockTransformer, ChildrenMapTestMixin
+
+
+@ddt.ddt
+class TestCompactBlockStructure(TestCase, ChildrenMapTestMixin):
+    """
+    Tests for encoding and decoding block structures.
+    """
+    def create_block_structure_with_data(self, children_map):
+        """
+        Returns a block structure for the given children_map, with
+        collected data for each block.
+        """
+        block_structure = self.create_block_structure(BlockStructureBlockData, children_map)
+        block_structure._add_transformer(MockTransformer)
+        block_structure.set_transformer_data(MockTransformer, 'course_data', 'course value')
+        for block_key in block_structure.get_block_keys():
+            block_structure._block_data_map[block_key].xblock_fields['display_name'] = 'Block {}'.format(block_key)
+            if block_key % 2:
+                block_structure.set_transformer_block_field(block_key, MockTransformer, 'odd', block_key)
+        return block_structure
+
+    def encode_and_decode(self, block_structure):
+        """
+        Returns the given block structure after encoding, pickling,
+        and decoding it.
+        """
+        encoded = pickle.dumps(encode_block_structure(block_structure), pickle.HIGHEST_PROTOCOL)
+        return decode_block_structure(block_structure.root_block_usage_key, pickle.loads(encoded))
+
+    @ddt.data(
+        [],
+        ChildrenMapTestMixin.SIMPLE_CHILDREN_MAP,
+        ChildrenMapTestMixin.LINEAR_CHILDREN_MAP,
+        ChildrenMapTestMixin.DAG_CHILDREN_MAP,
+    )
+    def test_round_trip(self, children_map):
+        block_structure = self.encode_and_decode(self.create_block_structure_with_data(children_map))
+        self.assert_block_structure(block_structure, children_map)
+
+        self.assertEquals(block_structure._get_transformer_data_version(MockTransformer), MockTransformer.VERSION)
+        self.assertEquals(block_structure.get_transformer_data(MockTransformer, 'course_data'), 'course value')
+        for block_key in block_structure.get_block_keys():
+            self.assertEquals(block_structure.get_xblock_field(block_key, 'display_name'), 'Block {}'.format(block_key))
+            self.assertEquals(
+                block_structure.get_transformer_block_field(block_key, MockTransformer, 'odd'),
+                block_key if block_key % 2 else None,
+            )
+
+    def test_unreachable_blocks_excluded(self):
+        block_structure = self.create_block_structure_with_data(self.SIMPLE_CHILDREN_MAP)
+        block_structure.remove_block(1, keep_descendants=False)
+
+        block_structure = self.encode_and_decode(block_structure)
+        self.assert_block_structure(block_structure, [[2], [], [], [], []], missing_blocks=[1, 3, 4])
+        self.assertIsNone(block_structure.get_xblock_field(3, 'display_name'))
@@ -59,6 +59,12 @@ class MockModulestore(object):
         self.get_items_call_count += 1
         return self.blocks.get(block_key)
 
+    def has_item(self, block_key):
+        """
+        Returns whether the given block_key is in the mock modulestore.
+        """
+        return block_key in self.blocks
+
 
 class MockCache(object):
     """
@@ -75,6 +81,17 @@ class MockCache(object):
         """
         self.map[key] = val
 
+    def add(self, key, val, timeout=None):  # pylint: disable=unused-argument
+        """
+        Associates the given key with the given value in the cache,
+        unless the key is already in the cache. Returns whether the
+        value was added.
+        """
+        if key in self.map:
+            return False
+        self.map[key] = val
+        return True
+
     def get(self, key, default=None):
         """
         Returns the value associated with the given key in the cache;
@@ -100,7 +117,7 @@ class MockCache(object):
         """
         Deletes the given key from the cache.
         """
-        del self.map[key]
+        self.map.pop(key, None)
 
 
 class MockModulestoreFactory(object):
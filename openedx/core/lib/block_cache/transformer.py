@@ -28,6 +28,25 @@ class BlockStructureTransformer(object):
     #
     VERSION = 0
 
+    # Whether the transformer's collected data can be updated for only
+    # the subtrees of a block structure that changed, rather than
+    # re-collected for the whole block structure.
+    #
+    # That is possible when the data collected for a block only
+    # depends on the block, its ancestors, and its descendants, and the
+    # non-block-specific data only depends on the root block. When
+    # collecting for a changed subtree, the collect method is given a
+    # block structure containing only the subtree and its ancestors
+    # (although the xBlocks of the ancestors' other children are also
+    # available through get_xblock).
+    #
+    SUPPORTS_SUBTREE_UPDATES = False
+
+    # Whether the transformer implements get_removal_masks, so that it
+    # can be applied for many usage_infos at once by
+    # block_cache.get_blocks_for_many.
+    SUPPORTS_BATCH_TRANSFORM = False
+
     @classmethod
     def name(cls):
         """
@@ -126,3 +145,34 @@ class BlockStructureTransformer(object):
                 transformer, that is to be transformed in place.
         """
         pass
+
+    def get_removal_masks(self, usage_infos, block_structure):
+        """
+        An optional batch counterpart of the transform method, for
+        transformers that only remove blocks from the block structure
+        (setting SUPPORTS_BATCH_TRANSFORM to True). It evaluates which
+        blocks the transform method would remove for each of the given
+        usage_infos at once, without mutating the block structure.
+
+        The removals should be evaluated against the given block
+        structure as collected, so they must not depend on the removals
+        made by other transformers.
+
+        Arguments:
+            usage_infos ([any negotiated type]) - The usage-specific
+                objects for which to evaluate the transform.
+
+            block_structure (BlockStructureBlockData) - A block
+                structure, with already collected data for the
+                transformer, that must not be modified.
+
+        Returns:
+            [(bool, {UsageKey: int})] - A list of (keep_descendants,
+                masks) pairs, one for each set of calls to remove_block
+                (or remove_block_if) with the given keep_descendants
+                value the transform method would make. The masks map
+                the usage key of each removed block to a bitset of the
+                usage_infos for which it is removed, whose i-th bit is
+                set for usage_infos[i].
+        """
+        raise NotImplementedError
@@ -14,7 +14,8 @@ def wrap_message(message, width=MAX_LINE_LENGTH):
     a line. To ensure that messages look consistent this helper function wraps long lines to a conservative length.
     """
     lines = message.split('\n')
-    wrapped_lines = [textwrap.fill(
+    # Lines that are short enough are left as they are, which is what filling them would return.
+    wrapped_lines = [line if len(line) <= width else textwrap.fill(
         line, width, expand_tabs=False, replace_whitespace=False, drop_whitespace=False, break_on_hyphens=False
     ) for line in lines]
     wrapped_message = '\n'.join(wrapped_lines)